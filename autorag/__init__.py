@@ -17,6 +17,9 @@ from llama_index.llms.openai_like import OpenAILike
 from langchain_openai.embeddings import OpenAIEmbeddings
 from rich.logging import RichHandler
 
+from autorag.model_registry import model_registry
+from autorag.onnx_runtime import ONNXEmbedding
+
 version_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "VERSION")
 
 with open(version_path, "r") as f:
@@ -28,17 +31,18 @@ class LazyInit:
 		self._factory = factory
 		self._args = args
 		self._kwargs = kwargs
-		self._instance = None
+
+	def _create(self):
+		return self._factory(*self._args, **self._kwargs)
 
 	def __call__(self):
-		if self._instance is None:
-			self._instance = self._factory(*self._args, **self._kwargs)
-		return self._instance
+		# The instance is shared and can be evicted under the model memory budget.
+		return model_registry.get(self, self._create)
 
 	def __getattr__(self, name):
-		if self._instance is None:
-			self._instance = self._factory(*self._args, **self._kwargs)
-		return getattr(self._instance, name)
+		if name.startswith("_"):
+			raise AttributeError(name)
+		return getattr(self(), name)
 
 
 class MockEmbeddingRandom(MockEmbedding):
@@ -102,6 +106,21 @@ except ImportError:
 		"To use local version, run pip install 'AutoRAG[gpu]'"
 	)
 
+# The int8 ONNX Runtime version of the local embedding models for CPU.
+# The graphs are exported at the first use to the project resources directory.
+embedding_models["huggingface_baai_bge_small_onnx"] = LazyInit(
+	ONNXEmbedding, model_name="BAAI/bge-small-en-v1.5", pooling="cls"
+)
+embedding_models["huggingface_all_mpnet_base_v2_onnx"] = LazyInit(
+	ONNXEmbedding,
+	model_name="sentence-transformers/all-mpnet-base-v2",
+	pooling="mean",
+	max_length=512,
+)
+embedding_models["huggingface_bge_m3_onnx"] = LazyInit(
+	ONNXEmbedding, model_name="BAAI/bge-m3", pooling="cls"
+)
+
 
 class AutoRAGBedrock(Bedrock):
 	async def acomplete(
@@ -1,4 +1,5 @@
 import importlib.resources
+import json
 import logging
 import os
 import pathlib
@@ -8,11 +9,14 @@ from typing import Optional
 
 import click
 import nest_asyncio
+import pandas as pd
 
 from autorag import dashboard
 from autorag.deploy import extract_best_config as original_extract_best_config
 from autorag.deploy.api import ApiRunner
 from autorag.evaluator import Evaluator
+from autorag.onnx_runtime import ONNX_TASKS, benchmark_onnx_runtime
+from autorag.result_cache import ResultCache
 from autorag.validator import Validator
 
 logger = logging.getLogger("AutoRAG")
@@ -51,13 +55,23 @@ def cli():
 	type=bool,
 	default=False,
 )
-def evaluate(config, qa_data_path, corpus_data_path, project_dir, skip_validation):
+@click.option(
+	"--use_result_cache",
+	help="Use the cached module results at the project directory. Default is False.",
+	type=bool,
+	default=False,
+)
+def evaluate(
+	config, qa_data_path, corpus_data_path, project_dir, skip_validation, use_result_cache
+):
 	if not config.endswith(".yaml") and not config.endswith(".yml"):
 		raise ValueError(f"Config file {config} is not a yaml or yml file.")
 	if not os.path.exists(config):
 		raise ValueError(f"Config file {config} does not exist.")
 	evaluator = Evaluator(qa_data_path, corpus_data_path, project_dir=project_dir)
-	evaluator.start_trial(config, skip_validation=skip_validation)
+	evaluator.start_trial(
+		config, skip_validation=skip_validation, use_result_cache=use_result_cache
+	)
 
 
 @click.command()
@@ -162,14 +176,20 @@ def extract_best_config(trial_path: str, output_path: str):
 
 @click.command()
 @click.option("--trial_path", help="Path to trial directory.", type=str)
-def restart_evaluate(trial_path):
+@click.option(
+	"--use_result_cache",
+	help="Use the cached module results at the project directory. Default is False.",
+	type=bool,
+	default=False,
+)
+def restart_evaluate(trial_path, use_result_cache):
 	if not os.path.exists(trial_path):
 		raise ValueError(f"trial_path {trial_path} does not exist.")
 	project_dir = str(pathlib.PurePath(trial_path).parent)
 	qa_data_path = os.path.join(project_dir, "data", "qa.parquet")
 	corpus_data_path = os.path.join(project_dir, "data", "corpus.parquet")
 	evaluator = Evaluator(qa_data_path, corpus_data_path, project_dir)
-	evaluator.restart_trial(trial_path)
+	evaluator.restart_trial(trial_path, use_result_cache=use_result_cache)
 
 
 @click.command()
@@ -194,6 +214,123 @@ def validate(config, qa_data_path, corpus_data_path):
 	validator.validate(config)
 
 
+@click.command()
+@click.option("--model_name", help="HuggingFace model name or path.", type=str)
+@click.option(
+	"--task",
+	type=click.Choice(ONNX_TASKS),
+	default="sequence-classification",
+	help="sequence-classification for the cross-encoder rerankers, "
+	"feature-extraction for the embedding models and colbert, "
+	"seq2seq-first-token for monot5.",
+)
+@click.option(
+	"--corpus_data_path",
+	help="Path to corpus dataset. The passages are used as the benchmark inputs.",
+	type=str,
+)
+@click.option(
+	"--project_dir",
+	help="Path to project directory. The exported ONNX graph is cached here.",
+	type=str,
+	default=os.getcwd(),
+)
+@click.option("--num_texts", type=int, default=256, help="The number of passages.")
+@click.option("--batch_size", type=int, default=32)
+@click.option(
+	"--pooling", type=click.Choice(["cls", "mean"]), default="cls", help="Embedding pooling."
+)
+@click.option("--no_quantize", is_flag=True, help="Benchmark the fp32 ONNX graph.")
+def benchmark_onnx(
+	model_name,
+	task,
+	corpus_data_path,
+	project_dir,
+	num_texts,
+	batch_size,
+	pooling,
+	no_quantize,
+):
+	contents = (
+		pd.read_parquet(corpus_data_path, engine="pyarrow")["contents"]
+		.tolist()[:num_texts]
+	)
+	# The head of each passage is a relevant query, and the next passage is an irrelevant one.
+	queries = [content[:100] for content in contents]
+	passages = contents + contents[1:] + contents[:1]
+	text_pairs = None
+	if task == "feature-extraction":
+		texts = contents
+	elif task == "sequence-classification":
+		texts, text_pairs = queries + queries, passages
+	else:
+		texts = [
+			f"Query: {query} Document: {passage}"
+			for query, passage in zip(queries + queries, passages)
+		]
+	result = benchmark_onnx_runtime(
+		model_name,
+		task,
+		texts,
+		text_pairs,
+		project_dir=project_dir,
+		batch_size=batch_size,
+		quantize=not no_quantize,
+		pooling=pooling,
+	)
+	click.echo(json.dumps(result, indent=4))
+
+
+@click.command()
+@click.option(
+	"--project_dir", help="Path to project directory.", type=str, default=os.getcwd()
+)
+@click.option("--prune", is_flag=True, help="Delete the cached results.")
+@click.option(
+	"--module_name", type=str, default=None, help="Prune the results of this module."
+)
+@click.option(
+	"--max_age_days",
+	type=float,
+	default=None,
+	help="Prune the results that are not used for more than this days.",
+)
+@click.option(
+	"--max_size_mb",
+	type=float,
+	default=None,
+	help="Prune the least recently used results until the cache is under this size.",
+)
+@click.option("--all", "prune_all", is_flag=True, help="Prune all cached results.")
+def result_cache(project_dir, prune, module_name, max_age_days, max_size_mb, prune_all):
+	cache = ResultCache(project_dir)
+	if prune:
+		if not prune_all and all(
+			option is None for option in (module_name, max_age_days, max_size_mb)
+		):
+			raise click.UsageError(
+				"Set --module_name, --max_age_days, --max_size_mb, or --all to prune."
+			)
+		deleted = cache.prune(
+			module_name=module_name,
+			max_age_days=max_age_days,
+			max_size_mb=max_size_mb,
+			prune_all=prune_all,
+		)
+		click.echo(f"Deleted {deleted} cached results.")
+		return
+	entries = cache.entries()
+	if entries.empty:
+		click.echo(f"There is no cached result at {cache.cache_dir}.")
+		return
+	click.echo(entries.drop(columns=["module_params"]).to_string(index=False))
+	click.echo(
+		f"{len(entries)} cached results, "
+		f"{entries['size_bytes'].sum() / (1024 * 1024):.2f} MB, "
+		f"{int(entries['hits'].sum())} hits"
+	)
+
+
 cli.add_command(evaluate, "evaluate")
 cli.add_command(run_api, "run_api")
 cli.add_command(run_web, "run_web")
@@ -201,6 +338,8 @@ cli.add_command(run_dashboard, "dashboard")
 cli.add_command(extract_best_config, "extract_best_config")
 cli.add_command(restart_evaluate, "restart_evaluate")
 cli.add_command(validate, "validate")
+cli.add_command(benchmark_onnx, "benchmark_onnx")
+cli.add_command(result_cache, "result_cache")
 
 if __name__ == "__main__":
 	cli()
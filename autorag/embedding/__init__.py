@@ -0,0 +1,8 @@
+from .cache import (
+	EmbeddingCache,
+	CachedEmbedding,
+	set_embedding_cache,
+	get_embedding_cache,
+	load_embedding_model,
+	unwrap_embedding,
+)
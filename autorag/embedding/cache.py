@@ -0,0 +1,411 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import List, Optional, Dict, Iterable, Tuple
+
+import numpy as np
+
+from llama_index.core import MockEmbedding
+
+from autorag import embedding_models
+
+logger = logging.getLogger("AutoRAG")
+
+EMBEDDING_CACHE_DIR_ENV = "AUTORAG_EMBEDDING_CACHE_DIR"
+EMBEDDING_CACHE_MAX_BYTES_ENV = "AUTORAG_EMBEDDING_CACHE_MAX_BYTES"
+DEFAULT_EMBEDDING_CACHE_MAX_BYTES = 4 * 1024**3
+DIGEST_SIZE = 16
+
+
+def normalize_text(text: str) -> str:
+	"""
+	Normalize the text before hashing.
+	The unicode normalization form is NFC, and the leading and trailing whitespaces are removed.
+	"""
+	return unicodedata.normalize("NFC", text).strip()
+
+
+def text_digest(text: str) -> bytes:
+	return hashlib.blake2b(
+		normalize_text(text).encode("utf-8"), digest_size=DIGEST_SIZE
+	).digest()
+
+
+class EmbeddingStore:
+	def __init__(self, path: str, max_bytes: int):
+		"""
+		The on-disk embedding store of a single embedding model.
+		The vectors, the text digests, and the last access clock of each slot are memory-mapped files.
+		When the store exceeds the max_bytes, the least recently used vectors are evicted.
+
+		:param path: The directory path of the store.
+		:param max_bytes: The maximum bytes of the store files.
+		"""
+		self.path = path
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+		os.makedirs(self.path, exist_ok=True)
+		meta_path = os.path.join(self.path, "meta.json")
+		if os.path.exists(meta_path):
+			with open(meta_path, "r") as f:
+				self.meta = json.load(f)
+		else:
+			self.meta = {"dimension": None, "count": 0, "capacity": 0, "clock": 0}
+		self._load()
+
+	def _file_path(self, filename: str) -> str:
+		return os.path.join(self.path, filename)
+
+	def _load(self):
+		if self.meta["capacity"] > 0:
+			self.digests = np.load(self._file_path("digests.npy"), mmap_mode="r+")
+			self.vectors = np.load(self._file_path("vectors.npy"), mmap_mode="r+")
+			self.last_used = np.load(self._file_path("last_used.npy"), mmap_mode="r+")
+		else:
+			self.digests, self.vectors, self.last_used = None, None, None
+		count = self.meta["count"]
+		self.slots: Dict[bytes, int] = (
+			{digest: slot for slot, digest in enumerate(self.digests[:count].tolist())}
+			if count > 0
+			else {}
+		)
+
+	def _save_meta(self):
+		tmp_path = self._file_path(".meta.json.tmp")
+		with open(tmp_path, "w") as f:
+			json.dump(self.meta, f)
+		os.replace(tmp_path, self._file_path("meta.json"))
+
+	@property
+	def row_bytes(self) -> int:
+		return self.meta["dimension"] * 4 + DIGEST_SIZE + 8
+
+	@property
+	def max_rows(self) -> int:
+		return max(self.max_bytes // self.row_bytes, 1)
+
+	def _rewrite(self, capacity: int, keep: np.ndarray):
+		"""
+		Rewrite the memory-mapped files with the capacity, keeping only the keep slots.
+		"""
+		dimension = self.meta["dimension"]
+		for filename, dtype, shape, old in [
+			("digests.npy", f"S{DIGEST_SIZE}", (capacity,), self.digests),
+			("vectors.npy", np.float32, (capacity, dimension), self.vectors),
+			("last_used.npy", np.int64, (capacity,), self.last_used),
+		]:
+			tmp_path = self._file_path(f".{filename}.tmp")
+			new = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+			if old is not None and len(keep) > 0:
+				new[: len(keep)] = old[keep]
+			new.flush()
+			del new
+			os.replace(tmp_path, self._file_path(filename))
+		self.meta["count"] = len(keep)
+		self.meta["capacity"] = capacity
+		self._save_meta()
+		self._load()
+
+	def lookup(self, digests: List[bytes]) -> np.ndarray:
+		"""
+		Find the slots of the digests. The missing digest is -1.
+		The slots are valid only until the next write, because the eviction reorders them.
+		Use the get method to look up and read the vectors at once.
+		"""
+		with self.lock:
+			return self._lookup(digests)
+
+	def _lookup(self, digests: List[bytes]) -> np.ndarray:
+		return np.array(
+			[self.slots.get(digest, -1) for digest in digests], dtype=np.int64
+		)
+
+	def read(self, slots: np.ndarray) -> np.ndarray:
+		"""
+		Read the vectors of the slots and mark them as recently used.
+		"""
+		with self.lock:
+			return self._read(slots)
+
+	def _read(self, slots: np.ndarray) -> np.ndarray:
+		self.meta["clock"] += 1
+		self.last_used[slots] = self.meta["clock"]
+		return np.asarray(self.vectors[slots])
+
+	def get(self, digests: List[bytes]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+		"""
+		Look up the digests and read the vectors of the hits in one locked section,
+		so a concurrent write can't evict or move the slots in between.
+
+		:param digests: The text digests.
+		:return: The hit mask of the digests and the vectors of the hits.
+		    The vectors are None when there is no hit.
+		"""
+		with self.lock:
+			slots = self._lookup(digests)
+			hit_mask = slots >= 0
+			if not hit_mask.any():
+				return hit_mask, None
+			return hit_mask, self._read(slots[hit_mask])
+
+	def write(self, digests: List[bytes], vectors: np.ndarray):
+		"""
+		Write the vectors of the new digests.
+		When the store is full, the least recently used quarter of the vectors is evicted first.
+		The digests already written by another thread are skipped.
+		"""
+		if len(digests) == 0:
+			return
+		vectors = np.asarray(vectors, dtype=np.float32)
+		with self.lock:
+			new_rows = [
+				row for row, digest in enumerate(digests) if digest not in self.slots
+			]
+			if len(new_rows) == 0:
+				return
+			if len(new_rows) < len(digests):
+				digests = [digests[row] for row in new_rows]
+				vectors = vectors[new_rows]
+			if self.meta["dimension"] is None:
+				self.meta["dimension"] = vectors.shape[1]
+			elif self.meta["dimension"] != vectors.shape[1]:
+				raise ValueError(
+					f"The embedding dimension of the cache is {self.meta['dimension']}, "
+					f"but the new embedding dimension is {vectors.shape[1]}."
+				)
+			if len(digests) > self.max_rows:
+				digests, vectors = digests[-self.max_rows :], vectors[-self.max_rows :]
+			count = self.meta["count"]
+			if count + len(digests) > self.max_rows:
+				keep_count = max(min(self.max_rows * 3 // 4, self.max_rows - len(digests)), 0)
+				order = np.argsort(-np.asarray(self.last_used[:count]), kind="stable")
+				keep = np.sort(order[:keep_count])
+				logger.info(
+					f"Evict {count - len(keep)} embeddings from the embedding cache {self.path}"
+				)
+				self._rewrite(self.meta["capacity"], keep)
+				count = self.meta["count"]
+			if count + len(digests) > self.meta["capacity"]:
+				new_capacity = min(
+					max(count + len(digests), self.meta["capacity"] * 2, 1024),
+					self.max_rows,
+				)
+				self._rewrite(new_capacity, np.arange(count))
+			self.meta["clock"] += 1
+			new_count = count + len(digests)
+			self.digests[count:new_count] = digests
+			self.vectors[count:new_count] = vectors
+			self.last_used[count:new_count] = self.meta["clock"]
+			for slot, digest in enumerate(digests, start=count):
+				self.slots[digest] = slot
+			for array in (self.digests, self.vectors, self.last_used):
+				array.flush()
+			self.meta["count"] = new_count
+			self._save_meta()
+
+	def __len__(self):
+		return self.meta["count"]
+
+
+class EmbeddingCache:
+	def __init__(
+		self, cache_dir: str, max_bytes: int = DEFAULT_EMBEDDING_CACHE_MAX_BYTES
+	):
+		"""
+		The persistent, content-addressed embedding cache.
+		The vectors are keyed by the embedding model name and the hash of the normalized text,
+		and each embedding model has its own store directory at the cache_dir.
+
+		:param cache_dir: The directory path of the cache.
+		:param max_bytes: The maximum bytes of each embedding model store.
+		    Default is 4GB.
+		"""
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		self.stores: Dict[str, EmbeddingStore] = {}
+		self.lock = threading.Lock()
+
+	def store(self, model_key: str) -> EmbeddingStore:
+		with self.lock:
+			if model_key not in self.stores:
+				dirname = re.sub(r"[^0-9A-Za-z_.-]", "_", model_key)[:64]
+				dirname += "_" + hashlib.blake2b(model_key.encode(), digest_size=4).hexdigest()
+				self.stores[model_key] = EmbeddingStore(
+					os.path.join(self.cache_dir, dirname), self.max_bytes
+				)
+			return self.stores[model_key]
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_loaded = False
+
+
+def set_embedding_cache(
+	cache_dir: Optional[str], max_bytes: int = DEFAULT_EMBEDDING_CACHE_MAX_BYTES
+):
+	"""
+	Set the process-wide embedding cache.
+
+	:param cache_dir: The directory path of the cache. If None, the embedding cache is disabled.
+	:param max_bytes: The maximum bytes of each embedding model store.
+	"""
+	global _embedding_cache, _embedding_cache_loaded
+	_embedding_cache_loaded = True
+	if cache_dir is None:
+		_embedding_cache = None
+	elif _embedding_cache is None or (
+		_embedding_cache.cache_dir != cache_dir
+		or _embedding_cache.max_bytes != max_bytes
+	):
+		_embedding_cache = EmbeddingCache(cache_dir, max_bytes)
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+	"""
+	Get the process-wide embedding cache.
+	At first, it is set from the AUTORAG_EMBEDDING_CACHE_DIR and
+	AUTORAG_EMBEDDING_CACHE_MAX_BYTES environment variables.
+	"""
+	if not _embedding_cache_loaded:
+		cache_dir = os.environ.get(EMBEDDING_CACHE_DIR_ENV)
+		max_bytes = int(
+			os.environ.get(
+				EMBEDDING_CACHE_MAX_BYTES_ENV, DEFAULT_EMBEDDING_CACHE_MAX_BYTES
+			)
+		)
+		set_embedding_cache(cache_dir, max_bytes)
+	return _embedding_cache
+
+
+class CachedEmbedding:
+	def __init__(self, embedding_model, model_key: str, cache: EmbeddingCache):
+		"""
+		The wrapper of the embedding model, which checks the embedding cache in bulk
+		and calls the embedding model only for the cache misses.
+		The other attributes are delegated to the embedding model.
+
+		:param embedding_model: The llama index embedding model instance.
+		:param model_key: The key of the embedding model at the cache.
+		:param cache: The embedding cache.
+		"""
+		object.__setattr__(self, "model", embedding_model)
+		object.__setattr__(self, "model_key", model_key)
+		object.__setattr__(self, "cache", cache)
+
+	def __getattr__(self, name):
+		return getattr(self.model, name)
+
+	def __setattr__(self, name, value):
+		setattr(self.model, name, value)
+
+	def _split(self, texts: List[str]):
+		store = self.cache.store(self.model_key)
+		digests = list(map(text_digest, texts))
+		# read the hits right away, because a concurrent write can evict them
+		hit_mask, hit_embeddings = store.get(digests)
+		miss_digests: Dict[bytes, str] = {}
+		for digest, text, hit in zip(digests, texts, hit_mask):
+			if not hit and digest not in miss_digests:
+				miss_digests[digest] = text
+		return store, digests, hit_mask, hit_embeddings, miss_digests
+
+	@staticmethod
+	def _merge(
+		store: EmbeddingStore,
+		digests: List[bytes],
+		hit_mask: np.ndarray,
+		hit_embeddings: Optional[np.ndarray],
+		miss_digests: Iterable[bytes],
+		miss_embeddings: List[List[float]],
+	) -> List[List[float]]:
+		miss_digests = list(miss_digests)
+		miss_embeddings = np.asarray(miss_embeddings, dtype=np.float32)
+		dimension = (
+			miss_embeddings.shape[1]
+			if len(miss_digests) > 0
+			else hit_embeddings.shape[1]
+		)
+		result = np.empty((len(digests), dimension), dtype=np.float32)
+		if hit_embeddings is not None:
+			result[hit_mask] = hit_embeddings
+		if len(miss_digests) > 0:
+			store.write(miss_digests, miss_embeddings)
+			miss_rows = {digest: row for row, digest in enumerate(miss_digests)}
+			miss_indices = np.flatnonzero(~hit_mask)
+			result[miss_indices] = miss_embeddings[
+				[miss_rows[digests[i]] for i in miss_indices]
+			]
+		return result.tolist()
+
+	def get_text_embedding_batch(self, texts: List[str], **kwargs) -> List[List[float]]:
+		if len(texts) == 0:
+			return []
+		store, digests, hit_mask, hit_embeddings, miss_digests = self._split(texts)
+		miss_embeddings = (
+			self.model.get_text_embedding_batch(list(miss_digests.values()), **kwargs)
+			if len(miss_digests) > 0
+			else []
+		)
+		return self._merge(
+			store,
+			digests,
+			hit_mask,
+			hit_embeddings,
+			miss_digests.keys(),
+			miss_embeddings,
+		)
+
+	async def aget_text_embedding_batch(
+		self, texts: List[str], **kwargs
+	) -> List[List[float]]:
+		if len(texts) == 0:
+			return []
+		store, digests, hit_mask, hit_embeddings, miss_digests = self._split(texts)
+		miss_embeddings = (
+			await self.model.aget_text_embedding_batch(
+				list(miss_digests.values()), **kwargs
+			)
+			if len(miss_digests) > 0
+			else []
+		)
+		return self._merge(
+			store,
+			digests,
+			hit_mask,
+			hit_embeddings,
+			miss_digests.keys(),
+			miss_embeddings,
+		)
+
+
+def unwrap_embedding(embedding_model):
+	"""
+	Get the original embedding model from the CachedEmbedding.
+	"""
+	if isinstance(embedding_model, CachedEmbedding):
+		return embedding_model.model
+	return embedding_model
+
+
+def load_embedding_model(embedding_model_name: str):
+	"""
+	Load the embedding model from the embedding_models.
+	When the embedding cache is set, the embedding model is wrapped with the CachedEmbedding.
+	The mock embedding model is not cached, because its vectors are random.
+
+	:param embedding_model_name: The name of the embedding model at the embedding_models.
+	:return: The embedding model instance.
+	"""
+	embedding_model = embedding_models[embedding_model_name]()
+	cache = get_embedding_cache()
+	if cache is None or isinstance(embedding_model, MockEmbedding):
+		return embedding_model
+	model_key = embedding_model_name
+	model_name = getattr(embedding_model, "model_name", None)
+	if isinstance(model_name, str) and model_name != embedding_model_name:
+		model_key += f"-{model_name}"
+	return CachedEmbedding(embedding_model, model_key, cache)
@@ -14,7 +14,7 @@ from rouge_score import tokenizers
 from rouge_score.rouge_scorer import RougeScorer
 from sacrebleu.metrics.bleu import BLEU
 
-from autorag import embedding_models
+from autorag.embedding.cache import load_embedding_model, unwrap_embedding
 from autorag.evaluation.metric.deepeval_prompt import FaithfulnessTemplate
 from autorag.evaluation.metric.util import (
 	autorag_metric_loop,
@@ -330,12 +330,12 @@ def sem_score(
 	generations = [metric_input.generated_texts for metric_input in metric_inputs]
 	generation_gt = [metric_input.generation_gt for metric_input in metric_inputs]
 	if embedding_model is None:
-		embedding_model = embedding_models.get("huggingface_all_mpnet_base_v2")()
+		embedding_model = load_embedding_model("huggingface_all_mpnet_base_v2")
 
 	embedding_model.embed_batch_size = batch
 
 	openai_embedding_max_length = 8000
-	if isinstance(embedding_model, OpenAIEmbedding):
+	if isinstance(unwrap_embedding(embedding_model), OpenAIEmbedding):
 		generations = openai_truncate_by_token(
 			generations, openai_embedding_max_length, embedding_model.model_name
 		)
@@ -345,7 +345,7 @@ def sem_score(
 	)
 	gt_lengths = list(map(len, generation_gt))
 	flatten_gt = list(itertools.chain.from_iterable(generation_gt))
-	if isinstance(embedding_model, OpenAIEmbedding):
+	if isinstance(unwrap_embedding(embedding_model), OpenAIEmbedding):
 		flatten_gt = openai_truncate_by_token(
 			flatten_gt, openai_embedding_max_length, embedding_model.model_name
 		)
@@ -365,9 +365,7 @@ def sem_score(
 		)
 		result.append(max(similarity_scores))
 
-	del embedding_model
-	empty_cuda_cache()
-
+	# The default embedding model is shared with the model registry, so it is not freed here.
 	return result
 
 
@@ -0,0 +1,241 @@
+import math
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from autorag.schema.metricinput import MetricInput
+
+RETRIEVAL_MATRIX_METRICS = [
+	"retrieval_recall",
+	"retrieval_precision",
+	"retrieval_f1",
+	"retrieval_ndcg",
+	"retrieval_mrr",
+	"retrieval_map",
+]
+
+
+def python_sum(terms: np.ndarray) -> np.ndarray:
+	"""
+	Sum the float terms at the last axis in the same way as the Python built-in `sum`.
+	Python 3.12 and later use the Neumaier compensated summation for floats,
+	and the earlier versions add the floats one by one.
+	So the result is exactly the same as `sum` of each row.
+
+	:param terms: The float terms to sum. The last axis is summed.
+	:return: The sums.
+	"""
+	result = np.zeros(terms.shape[:-1], dtype=np.float64)
+	if sys.version_info < (3, 12):
+		for index in range(terms.shape[-1]):
+			result = result + terms[..., index]
+		return result
+	compensation = np.zeros_like(result)
+	for index in range(terms.shape[-1]):
+		term = terms[..., index]
+		total = result + term
+		compensation += np.where(
+			np.abs(result) >= np.abs(term), (result - total) + term, (term - total) + result
+		)
+		result = total
+	return np.where(
+		(compensation != 0) & np.isfinite(compensation), result + compensation, result
+	)
+
+
+class RetrievalMetricEngine:
+	def __init__(self, metric_inputs: List[MetricInput]):
+		"""
+		The retrieval metric engine that computes the retrieval metrics of all rows with NumPy.
+		The ground truth ids are encoded once to integer codes with their row and group.
+		The retrieved ids are encoded to the codes of the ground truth ids,
+		and every metric is computed from the hit matrix of (row, ground truth group, rank).
+		The results are exactly the same as the per-row retrieval metric functions.
+
+		:param metric_inputs: The list of metric input schema for AutoRAG.
+			It uses `retrieval_gt` only.
+		"""
+		self.row_count = len(metric_inputs)
+		self.gt_valid = np.array(
+			[
+				metric_input.is_fields_notnone(fields_to_check=["retrieval_gt"])
+				for metric_input in metric_inputs
+			],
+			dtype=bool,
+		)
+		entry_rows, entry_groups, entry_ids = [], [], []
+		for row, metric_input in enumerate(metric_inputs):
+			if not self.gt_valid[row]:
+				continue
+			for group, gt_group in enumerate(metric_input.retrieval_gt):
+				entry_rows.extend([row] * len(gt_group))
+				entry_groups.extend([group] * len(gt_group))
+				entry_ids.extend(gt_group)
+		entry_codes, uniques = pd.factorize(np.asarray(entry_ids, dtype=object))
+		self.vocabulary = pd.Index(uniques)
+		self.entry_rows = np.asarray(entry_rows, dtype=np.int64)
+		self.entry_groups = np.asarray(entry_groups, dtype=np.int64)
+		self.entry_codes = entry_codes.astype(np.int64)
+
+		self.group_counts = np.zeros(self.row_count, dtype=np.int64)
+		self.flat_gt_counts = np.bincount(self.entry_rows, minlength=self.row_count)
+		for row, metric_input in enumerate(metric_inputs):
+			if self.gt_valid[row]:
+				self.group_counts[row] = len(metric_input.retrieval_gt)
+		self.max_group_count = max(int(self.group_counts.max(initial=0)), 1)
+		# The entries of a (row, group) are contiguous, so they are reduced together.
+		group_keys = self.entry_rows * self.max_group_count + self.entry_groups
+		self.group_starts = np.flatnonzero(
+			np.concatenate([[True], group_keys[1:] != group_keys[:-1]])
+		)
+		self.group_rows = self.entry_rows[self.group_starts]
+		self.group_columns = self.entry_groups[self.group_starts]
+
+	def encode_ids(self, pred_ids: List[List[str]]) -> np.ndarray:
+		"""
+		Encode the retrieved ids to the codes of the ground truth ids.
+		The ids that are not in the ground truth are encoded to -1,
+		and the padding after the end of each retrieved ids is -2.
+
+		:param pred_ids: The retrieved ids of each row.
+		:return: The codes with the shape of (row count, max retrieved count).
+		"""
+		lengths = np.fromiter(
+			(len(row_ids) for row_ids in pred_ids), dtype=np.int64, count=len(pred_ids)
+		)
+		width = int(lengths.max(initial=0))
+		codes = np.full((len(pred_ids), width), -2, dtype=np.int64)
+		flat_ids = [pred_id for row_ids in pred_ids for pred_id in row_ids]
+		if flat_ids:
+			flat_codes = self.vocabulary.get_indexer(np.asarray(flat_ids, dtype=object))
+			codes[np.arange(width) < lengths[:, np.newaxis]] = flat_codes
+		return codes
+
+	def compute(
+		self,
+		pred_codes: np.ndarray,
+		metrics: List[str],
+		pred_valid: Optional[np.ndarray] = None,
+	) -> Dict[str, List[Optional[float]]]:
+		"""
+		Compute the retrieval metrics of all rows.
+
+		:param pred_codes: The encoded retrieved ids from `encode_ids`.
+		:param metrics: The retrieval metric names to compute.
+		:param pred_valid: Whether the retrieved ids of each row are valid.
+			The metric of the invalid rows is None, like the per-row metric functions.
+			Default is None, which means every row with retrieved ids is valid.
+		:return: The metric values of each metric name.
+		"""
+		for metric in metrics:
+			if metric not in RETRIEVAL_MATRIX_METRICS:
+				raise ValueError(
+					f"metric {metric} is not in supported metrics: {RETRIEVAL_MATRIX_METRICS}"
+				)
+		lengths = np.count_nonzero(pred_codes != -2, axis=1)
+		valid = self.gt_valid & (lengths > 0)
+		if pred_valid is not None:
+			valid &= pred_valid
+		if pred_codes.shape[1] == 0:
+			pred_codes = np.full((self.row_count, 1), -2, dtype=np.int64)
+		width = pred_codes.shape[1]
+		ranks = np.arange(width)
+
+		# (row, group, rank) hit matrix
+		entry_hits = pred_codes[self.entry_rows] == self.entry_codes[:, np.newaxis]
+		group_hits = np.zeros((self.row_count, self.max_group_count, width), dtype=bool)
+		if len(self.entry_codes) > 0:
+			group_hits[self.group_rows, self.group_columns] = np.logical_or.reduceat(
+				entry_hits, self.group_starts, axis=0
+			)
+		hits = group_hits.any(axis=1)
+		group_any_hits = group_hits.any(axis=2)
+		group_counts = np.maximum(self.group_counts, 1)
+		safe_lengths = np.maximum(lengths, 1)
+
+		results = {}
+		with np.errstate(divide="ignore", invalid="ignore"):
+			recall = group_any_hits.sum(axis=1) / group_counts
+			recall = np.where(self.group_counts > 0, recall, 0.0)
+
+			# The precision counts the unique retrieved ids.
+			row_codes = np.where(pred_codes >= 0, pred_codes, -1 - ranks)
+			order = np.argsort(row_codes, axis=1, kind="stable")
+			sorted_codes = np.take_along_axis(row_codes, order, axis=1)
+			first_sorted = np.ones_like(sorted_codes, dtype=bool)
+			first_sorted[:, 1:] = sorted_codes[:, 1:] != sorted_codes[:, :-1]
+			first_occurrence = np.zeros_like(first_sorted)
+			np.put_along_axis(first_occurrence, order, first_sorted, axis=1)
+			precision = np.count_nonzero(hits & first_occurrence, axis=1) / safe_lengths
+
+			if "retrieval_recall" in metrics:
+				results["retrieval_recall"] = recall
+			if "retrieval_precision" in metrics:
+				results["retrieval_precision"] = precision
+			if "retrieval_f1" in metrics:
+				denominator = recall + precision
+				results["retrieval_f1"] = np.where(
+					denominator == 0, 0.0, 2 * (recall * precision) / denominator
+				)
+
+			if "retrieval_ndcg" in metrics:
+				discounts = np.array([1 / math.log2(rank + 2) for rank in range(width)])
+				ideal_dcgs = np.array(
+					[sum(discounts[:count].tolist()) for count in range(width + 1)]
+				)
+				dcg = python_sum(np.where(hits, discounts, 0.0))
+				idcg = ideal_dcgs[np.minimum(self.flat_gt_counts, lengths)]
+				results["retrieval_ndcg"] = np.where(idcg > 0, dcg / idcg, 0.0)
+
+			if "retrieval_mrr" in metrics:
+				first_ranks = group_hits.argmax(axis=2)
+				reciprocal_ranks = np.where(group_any_hits, 1.0 / (first_ranks + 1), 0.0)
+				results["retrieval_mrr"] = np.where(
+					group_any_hits.any(axis=1),
+					python_sum(reciprocal_ranks) / group_counts,
+					0.0,
+				)
+
+			if "retrieval_map" in metrics:
+				cumulative_hits = np.cumsum(group_hits, axis=2)
+				precisions = np.where(group_hits, cumulative_hits / (ranks + 1), 0.0)
+				hit_counts = group_hits.sum(axis=2)
+				average_precisions = np.where(
+					hit_counts > 0, python_sum(precisions) / np.maximum(hit_counts, 1), 0.0
+				)
+				results["retrieval_map"] = np.where(
+					self.group_counts > 0,
+					python_sum(average_precisions) / group_counts,
+					0.0,
+				)
+
+		return {
+			metric: [
+				value if is_valid else None
+				for value, is_valid in zip(results[metric].tolist(), valid.tolist())
+			]
+			for metric in metrics
+		}
+
+	def compute_ids(
+		self, pred_ids: List[List[str]], metrics: List[str]
+	) -> Dict[str, List[Optional[float]]]:
+		"""
+		Compute the retrieval metrics of the retrieved ids of all rows.
+
+		:param pred_ids: The retrieved ids of each row.
+		:param metrics: The retrieval metric names to compute.
+		:return: The metric values of each metric name.
+		"""
+		pred_valid = np.array(
+			[
+				MetricInput(retrieved_ids=row_ids).is_fields_notnone(
+					fields_to_check=["retrieved_ids"]
+				)
+				for row_ids in pred_ids
+			],
+			dtype=bool,
+		)
+		return self.compute(self.encode_ids(pred_ids), metrics, pred_valid=pred_valid)
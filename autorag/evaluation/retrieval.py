@@ -12,6 +12,10 @@ from autorag.evaluation.metric import (
 	retrieval_mrr,
 	retrieval_map,
 )
+from autorag.evaluation.metric.retrieval_matrix import (
+	RETRIEVAL_MATRIX_METRICS,
+	RetrievalMetricEngine,
+)
 from autorag.evaluation.util import cast_metrics
 from autorag.schema.metricinput import MetricInput
 
@@ -54,9 +58,21 @@ def evaluate_retrieval(
 
 			metric_scores = {}
 			metric_names, metric_params = cast_metrics(metrics)
+			# The retrieval metrics without parameters are computed at once with the metric engine.
+			engine_metrics = [
+				metric_name
+				for metric_name, metric_param in zip(metric_names, metric_params)
+				if metric_name in RETRIEVAL_MATRIX_METRICS and not metric_param
+			]
+			if engine_metrics:
+				engine_scores = RetrievalMetricEngine(metric_inputs).compute_ids(
+					pred_ids, engine_metrics
+				)
 
 			for metric_name, metric_param in zip(metric_names, metric_params):
-				if metric_name in RETRIEVAL_METRIC_FUNC_DICT:
+				if metric_name in engine_metrics:
+					metric_scores[metric_name] = engine_scores[metric_name]
+				elif metric_name in RETRIEVAL_METRIC_FUNC_DICT:
 					metric_func = RETRIEVAL_METRIC_FUNC_DICT[metric_name]
 					metric_scores[metric_name] = metric_func(
 						metric_inputs=metric_inputs, **metric_param
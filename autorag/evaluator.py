@@ -3,6 +3,7 @@ import json
 import logging
 import os
 import shutil
+from contextlib import nullcontext
 from datetime import datetime
 from itertools import chain
 from typing import List, Dict, Optional
@@ -11,14 +12,14 @@ from rich.progress import Progress, BarColumn, TimeElapsedColumn
 import pandas as pd
 import yaml
 
+from autorag.model_registry import model_registry
+from autorag.module_cache import module_instance_scope
 from autorag.node_line import run_node_line
-from autorag.nodes.retrieval.base import get_bm25_pkl_name
+from autorag.result_cache import result_cache_scope
+from autorag.nodes.retrieval.base import get_bm25_index_name
 from autorag.nodes.retrieval.bm25 import bm25_ingest
-from autorag.nodes.retrieval.vectordb import (
-	vectordb_ingest,
-	filter_exist_ids,
-	filter_exist_ids_from_retrieval_gt,
-)
+from autorag.nodes.retrieval.bm25_index import wait_for_merges
+from autorag.nodes.retrieval.vectordb import vectordb_ingest_with_manifest
 from autorag.schema import Node
 from autorag.schema.node import (
 	module_type_exists,
@@ -37,6 +38,7 @@ from autorag.utils.util import (
 	get_event_loop,
 )
 from autorag.vectordb import load_all_vectordb_from_yaml
+from autorag.vectordb.manifest import IngestManifest, get_manifest_path
 
 logger = logging.getLogger("AutoRAG")
 
@@ -103,8 +105,13 @@ class Evaluator:
 		if not os.path.exists(corpus_path_in_project):
 			self.corpus_data.to_parquet(corpus_path_in_project, index=False)
 
+	@module_instance_scope()
 	def start_trial(
-		self, yaml_path: str, skip_validation: bool = False, full_ingest: bool = True
+		self,
+		yaml_path: str,
+		skip_validation: bool = False,
+		full_ingest: bool = True,
+		use_result_cache: bool = False,
 	):
 		"""
 		Start AutoRAG trial.
@@ -118,6 +125,10 @@ class Evaluator:
 			Default is False.
 		:param full_ingest: If True, it checks the whole corpus data from corpus.parquet that exists in the Vector DB.
 			If your corpus is huge and don't want to check the whole vector DB, please set it to False.
+		:param use_result_cache: If True, the module results are cached at the project resources directory.
+			The module run that has the same module, parameters, input, and corpus with the cached one
+			uses the cached result, even if it was run at another trial.
+			Default is False.
 		:return: None
 		"""
 		# Make Resources directory
@@ -157,6 +168,7 @@ class Evaluator:
 
 		node_lines = self._load_node_lines(yaml_path)
 		self.__ingest_bm25_full(node_lines)
+		model_registry.reset_stats()
 
 		with Progress(
 			"[progress.description]{task.description}",
@@ -203,9 +215,10 @@ class Evaluator:
 				if i == 0:
 					previous_result = self.qa_data
 				logger.info(f"Running node line {node_line_name}...")
-				previous_result = run_node_line(
-					node_line, node_line_dir, previous_result, progress, task_eval
-				)
+				with self._result_cache_scope(use_result_cache):
+					previous_result = run_node_line(
+						node_line, node_line_dir, previous_result, progress, task_eval
+					)
 
 				trial_summary_df = self._append_node_line_summary(
 					node_line_name, node_line_dir, trial_summary_df
@@ -214,9 +227,17 @@ class Evaluator:
 			trial_summary_df.to_csv(
 				os.path.join(self.project_dir, trial_name, "summary.csv"), index=False
 			)
+			self._save_model_registry_summary(
+				os.path.join(self.project_dir, trial_name)
+			)
 
 			logger.info("Evaluation complete.")
 
+	def _result_cache_scope(self, use_result_cache: bool):
+		if use_result_cache:
+			return result_cache_scope(self.project_dir)
+		return nullcontext()
+
 	def __ingest_bm25_full(self, node_lines: Dict[str, List[Node]]):
 		if any(
 			list(
@@ -239,13 +260,15 @@ class Evaluator:
 				bm25_tokenizer_list = ["porter_stemmer"]
 			for bm25_tokenizer in bm25_tokenizer_list:
 				bm25_dir = os.path.join(
-					self.project_dir, "resources", get_bm25_pkl_name(bm25_tokenizer)
+					self.project_dir, "resources", get_bm25_index_name(bm25_tokenizer)
 				)
 				if not os.path.exists(os.path.dirname(bm25_dir)):
 					os.makedirs(os.path.dirname(bm25_dir))
 				# ingest because bm25 supports update new corpus data
 				bm25_ingest(bm25_dir, self.corpus_data, bm25_tokenizer=bm25_tokenizer)
 			logger.info("BM25 corpus embedding complete.")
+		# the bm25 segments must not be merged while the trial evaluates them
+		wait_for_merges()
 
 	def __get_new_trial_name(self) -> str:
 		trial_json_path = os.path.join(self.project_dir, "trial.json")
@@ -284,7 +307,8 @@ class Evaluator:
 			)
 		return node_line_dict
 
-	def restart_trial(self, trial_path: str):
+	@module_instance_scope()
+	def restart_trial(self, trial_path: str, use_result_cache: bool = False):
 		logger.info(ascii_art)
 		os.environ["PROJECT_DIR"] = self.project_dir
 		# Check if trial_path exists
@@ -297,6 +321,8 @@ class Evaluator:
 		# Extract node lines from config.yaml
 		yaml_path = os.path.join(trial_path, "config.yaml")
 		node_lines = self._load_node_lines(yaml_path)
+		model_registry.reset_stats()
+		wait_for_merges()
 
 		node_line_names = list(node_lines.keys())
 		nodes = list(node_lines.values())
@@ -342,7 +368,8 @@ class Evaluator:
 					conflict_line_dir, completed_node_name, summary_lst
 				)
 			for node in remain_nodes:
-				previous_result = node.run(previous_result, conflict_line_dir)
+				with self._result_cache_scope(use_result_cache):
+					previous_result = node.run(previous_result, conflict_line_dir)
 				summary_lst = self._append_node_summary(
 					conflict_line_dir, node.node_type, summary_lst
 				)
@@ -377,13 +404,15 @@ class Evaluator:
 				if not os.path.exists(node_line_dir):
 					os.makedirs(node_line_dir)
 				logger.info(f"Running node line {node_line_name}...")
-				previous_result = run_node_line(
-					node_line, node_line_dir, previous_result
-				)
+				with self._result_cache_scope(use_result_cache):
+					previous_result = run_node_line(
+						node_line, node_line_dir, previous_result
+					)
 				trial_summary_df = self._append_node_line_summary(
 					node_line_name, node_line_dir, trial_summary_df
 				)
 		trial_summary_df.to_csv(os.path.join(trial_path, "summary.csv"), index=False)
+		self._save_model_registry_summary(trial_path)
 
 		logger.info("Evaluation complete.")
 
@@ -497,6 +526,17 @@ class Evaluator:
 			)
 		return trial_summary_df
 
+	@staticmethod
+	def _save_model_registry_summary(trial_path: str):
+		registry_summary = model_registry.summary()
+		with open(os.path.join(trial_path, "model_registry.json"), "w") as f:
+			json.dump(registry_summary, f, indent=4)
+		logger.info(
+			f"Shared models were reused {registry_summary['hits']} times "
+			f"and loaded {registry_summary['loads']} times. "
+			f"Saved about {registry_summary['saved_seconds']:.1f} seconds of model loading."
+		)
+
 	@staticmethod
 	def _append_node_summary(
 		node_line_dir: str, node_name: str, summary_lst: List[Dict]
@@ -546,15 +586,26 @@ class Evaluator:
 
 	async def __ingest_vectordb(self, yaml_path, full_ingest: bool):
 		vectordb_list = load_all_vectordb_from_yaml(yaml_path, self.project_dir)
+		vectordb_configs = load_yaml_config(yaml_path).get("vectordb", [])
+		if len(vectordb_configs) == 0:
+			vectordb_configs = [{}]  # the default vectordb
 		if full_ingest is True:
 			# get the target ingest corpus from the whole corpus
-			for vectordb in vectordb_list:
-				target_corpus = await filter_exist_ids(vectordb, self.corpus_data)
-				await vectordb_ingest(vectordb, target_corpus)
+			target_corpus = self.corpus_data
 		else:
 			# get the target ingest corpus from the retrieval gt only
-			for vectordb in vectordb_list:
-				target_corpus = await filter_exist_ids_from_retrieval_gt(
-					vectordb, self.qa_data, self.corpus_data
+			retrieval_gt_ids = set(
+				chain.from_iterable(
+					chain.from_iterable(self.qa_data["retrieval_gt"].tolist())
 				)
-				await vectordb_ingest(vectordb, target_corpus)
+			)
+			target_corpus = self.corpus_data[
+				self.corpus_data["doc_id"].isin(retrieval_gt_ids)
+			]
+		for vectordb, vectordb_config in zip(vectordb_list, vectordb_configs):
+			manifest = IngestManifest(
+				get_manifest_path(
+					os.path.join(self.project_dir, "resources"), vectordb_config
+				)
+			)
+			await vectordb_ingest_with_manifest(vectordb, target_corpus, manifest)
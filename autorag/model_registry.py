@@ -0,0 +1,292 @@
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("AutoRAG")
+
+DEFAULT_MEMORY_BUDGET = 4 * 1024**3
+
+
+def estimate_model_bytes(model: Any, max_depth: int = 2) -> int:
+	"""
+	Estimate the resident memory of a model with the size of its torch parameters and buffers.
+	The torch modules are searched in the model itself and in its attributes,
+	like `model` of the CrossEncoder or `_model` of the HuggingFaceEmbedding.
+	API models or the models without torch modules are estimated as zero bytes.
+
+	:param model: The model instance. It can be a tuple of models, like (tokenizer, model).
+	:param max_depth: The depth of attributes to search the torch modules.
+	:return: The estimated bytes.
+	"""
+	return _estimate_tensor_bytes(model, max_depth, gpu_only=False)
+
+
+def estimate_model_gpu_bytes(model: Any, max_depth: int = 2) -> int:
+	"""
+	Estimate the GPU memory of a model with the size of its torch parameters and buffers
+	that are not on the CPU device.
+
+	:param model: The model instance. It can be a tuple of models, like (tokenizer, model).
+	:param max_depth: The depth of attributes to search the torch modules.
+	:return: The estimated bytes.
+	"""
+	return _estimate_tensor_bytes(model, max_depth, gpu_only=True)
+
+
+def _estimate_tensor_bytes(model: Any, max_depth: int, gpu_only: bool) -> int:
+	seen_tensors = set()
+	seen_objects = set()
+
+	def tensor_bytes(module) -> int:
+		total = 0
+		for tensor in list(module.parameters()) + list(module.buffers()):
+			if id(tensor) in seen_tensors:
+				continue
+			seen_tensors.add(id(tensor))
+			device_type = getattr(getattr(tensor, "device", None), "type", "cpu")
+			if gpu_only and device_type == "cpu":
+				continue
+			total += tensor.numel() * tensor.element_size()
+		return total
+
+	def search(obj, depth: int) -> int:
+		if obj is None or id(obj) in seen_objects:
+			return 0
+		seen_objects.add(id(obj))
+		if callable(getattr(obj, "parameters", None)) and callable(
+			getattr(obj, "buffers", None)
+		):
+			try:
+				return tensor_bytes(obj)
+			except Exception:
+				return 0
+		if depth <= 0:
+			return 0
+		if isinstance(obj, (tuple, list)):
+			return sum(search(item, depth - 1) for item in obj)
+		return sum(
+			search(getattr(obj, name, None), depth - 1)
+			for name in ("model", "_model", "client", "_client")
+		)
+
+	return search(model, max_depth)
+
+
+class ModelRegistry:
+	def __init__(self, memory_budget: Optional[int] = DEFAULT_MEMORY_BUDGET):
+		"""
+		The process-wide registry of the shared model instances.
+		The modules get their model with the same key from here, so the same weights are loaded once
+		and shared between the module instances.
+		When the estimated resident memory exceeds the budget, the least recently used models are evicted.
+		The models on the GPU are released at the end of each node by `release_gpu_models`,
+		because the next node usually needs the GPU memory for its own models.
+
+		:param memory_budget: The memory budget in bytes. None means no budget.
+		"""
+		self.memory_budget = memory_budget
+		self._models: "OrderedDict[Hashable, Any]" = OrderedDict()
+		self._sizes: Dict[Hashable, int] = {}
+		self._gpu_sizes: Dict[Hashable, int] = {}
+		self._load_seconds: Dict[Hashable, float] = {}
+		self._lock = threading.RLock()
+		self.reset_stats()
+
+	def reset_stats(self):
+		self.loads = 0
+		self.hits = 0
+		self.evictions = 0
+		self.gpu_releases = 0
+		self.load_seconds = 0.0
+		self.saved_seconds = 0.0
+
+	@property
+	def resident_bytes(self) -> int:
+		return sum(self._sizes.values())
+
+	@property
+	def resident_gpu_bytes(self) -> int:
+		return sum(self._gpu_sizes.values())
+
+	def __contains__(self, key: Hashable) -> bool:
+		return key in self._models
+
+	def __len__(self):
+		return len(self._models)
+
+	def get(
+		self,
+		key: Hashable,
+		loader: Callable[[], Any],
+		size_estimator: Callable[[Any], int] = estimate_model_bytes,
+		gpu_size_estimator: Callable[[Any], int] = estimate_model_gpu_bytes,
+	) -> Any:
+		"""
+		Get the shared model instance of the key.
+		If the model is not loaded yet or evicted, it is loaded with the loader.
+
+		:param key: The hashable key of the model, like the model name with its parameters.
+		:param loader: The function that loads the model.
+		:param size_estimator: The function that estimates the resident bytes of the loaded model.
+			Default is estimate_model_bytes.
+		:param gpu_size_estimator: The function that estimates the GPU bytes of the loaded model.
+			Default is estimate_model_gpu_bytes.
+		:return: The shared model instance.
+		"""
+		with self._lock:
+			if key in self._models:
+				self._models.move_to_end(key)
+				self.hits += 1
+				self.saved_seconds += self._load_seconds[key]
+				return self._models[key]
+
+			start_time = time.perf_counter()
+			model = loader()
+			load_seconds = time.perf_counter() - start_time
+			self._models[key] = model
+			self._sizes[key] = size_estimator(model)
+			self._gpu_sizes[key] = gpu_size_estimator(model)
+			self._load_seconds[key] = load_seconds
+			self.loads += 1
+			self.load_seconds += load_seconds
+			self._evict(keep=key)
+			return model
+
+	def evict(self, key: Hashable) -> bool:
+		"""
+		Remove the model from the registry.
+		The memory is freed when the module instances that use the model are deleted too.
+
+		:param key: The key of the model.
+		:return: True if the model was in the registry.
+		"""
+		with self._lock:
+			if key not in self._models:
+				return False
+			self._pop(key)
+		self._free_memory()
+		return True
+
+	def release_gpu_models(self) -> int:
+		"""
+		Remove the models on the GPU from the registry, and free the GPU memory.
+		The models on the CPU stay in the registry.
+
+		:return: The number of released models.
+		"""
+		with self._lock:
+			keys = [key for key, size in self._gpu_sizes.items() if size > 0]
+			for key in keys:
+				logger.info(
+					f"Release GPU model {key} from the model registry. ({self._gpu_sizes[key]} bytes)"
+				)
+				self._pop(key)
+			self.gpu_releases += len(keys)
+		if len(keys) > 0:
+			self._free_memory()
+		return len(keys)
+
+	def clear(self):
+		with self._lock:
+			for key in list(self._models.keys()):
+				self._pop(key)
+		self._free_memory()
+
+	def summary(self) -> Dict[str, Any]:
+		return {
+			"resident_models": len(self._models),
+			"resident_bytes": self.resident_bytes,
+			"memory_budget": self.memory_budget,
+			"loads": self.loads,
+			"hits": self.hits,
+			"evictions": self.evictions,
+			"gpu_releases": self.gpu_releases,
+			"load_seconds": round(self.load_seconds, 4),
+			"saved_seconds": round(self.saved_seconds, 4),
+		}
+
+	def _evict(self, keep: Hashable):
+		if self.memory_budget is None:
+			return
+		evicted = False
+		for key in list(self._models.keys()):
+			if self.resident_bytes <= self.memory_budget:
+				break
+			if key == keep:
+				continue
+			logger.info(
+				f"Evict model {key} from the model registry. ({self._sizes[key]} bytes)"
+			)
+			self._pop(key)
+			self.evictions += 1
+			evicted = True
+		if evicted:
+			self._free_memory()
+
+	def _pop(self, key: Hashable):
+		self._models.pop(key)
+		self._sizes.pop(key)
+		self._gpu_sizes.pop(key)
+		self._load_seconds.pop(key)
+
+	@staticmethod
+	def _free_memory():
+		gc.collect()
+		try:
+			import torch
+
+			if torch.cuda.is_available():
+				torch.cuda.empty_cache()
+		except ImportError:
+			pass
+
+
+def _budget_from_env() -> Optional[int]:
+	budget = os.environ.get("AUTORAG_MODEL_MEMORY_BUDGET")
+	if budget is None:
+		return DEFAULT_MEMORY_BUDGET
+	budget = int(budget)
+	return budget if budget > 0 else None
+
+
+model_registry = ModelRegistry(_budget_from_env())
+
+
+def set_model_memory_budget(memory_budget: Optional[int]):
+	"""
+	Set the memory budget of the process-wide model registry.
+	The models over the budget are evicted right away.
+
+	:param memory_budget: The memory budget in bytes. None means no budget.
+	"""
+	with model_registry._lock:
+		model_registry.memory_budget = memory_budget
+		model_registry._evict(keep=None)
+
+
+def make_model_key(*names, **params) -> Tuple:
+	"""
+	Make the registry key of a model with its names and loading parameters.
+	The same model loaded with other parameters gets another key.
+
+	:param names: The model class name, model name, device and so on.
+	:param params: The loading parameters of the model.
+	:return: The hashable key.
+	"""
+	return names + (json.dumps(params, sort_keys=True, default=str),)
+
+
+def get_shared_model(key: Hashable, loader: Callable[[], Any]) -> Any:
+	"""
+	Get the shared model instance from the process-wide model registry.
+
+	:param key: The hashable key of the model.
+	:param loader: The function that loads the model when it is not resident.
+	:return: The shared model instance.
+	"""
+	return model_registry.get(key, loader)
@@ -0,0 +1,144 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger("AutoRAG")
+
+
+class ModuleInstanceCache:
+	def __init__(self):
+		"""
+		The cache of the initialized module instances in a module instance scope.
+		The modules with `instance_cache_params` are initialized once per the same init parameters,
+		so the second run of the same module does not load its index, vector store, or models again.
+		"""
+		self._instances: Dict[Hashable, Any] = {}
+		self._lock = threading.RLock()
+		self.creates = 0
+		self.hits = 0
+
+	def __len__(self):
+		return len(self._instances)
+
+	def get(self, module_cls, project_dir, *args, **kwargs) -> Any:
+		"""
+		Get the module instance of the init parameters.
+		If it is not initialized yet in this scope, initialize and keep it.
+
+		:param module_cls: The module class.
+		:param project_dir: The project directory.
+		:param args: The positional arguments of the module init.
+		:param kwargs: The module parameters. Only `instance_cache_params` of the module make the key.
+		:return: The module instance.
+		"""
+		key = make_instance_key(module_cls, project_dir, *args, **kwargs)
+		with self._lock:
+			if key in self._instances:
+				self.hits += 1
+				return self._instances[key]
+			instance = module_cls(project_dir, *args, **kwargs)
+			self._instances[key] = instance
+			self.creates += 1
+			return instance
+
+	def clear(self):
+		with self._lock:
+			self._instances.clear()
+
+	def summary(self) -> Dict[str, int]:
+		return {
+			"resident_instances": len(self._instances),
+			"creates": self.creates,
+			"hits": self.hits,
+		}
+
+
+def make_instance_key(module_cls, project_dir, *args, **kwargs) -> Hashable:
+	init_params = {
+		name: kwargs.get(name) for name in getattr(module_cls, "instance_cache_params")
+	}
+	return (
+		module_cls,
+		str(project_dir),
+		json.dumps(args, default=str),
+		json.dumps(init_params, sort_keys=True, default=str),
+	)
+
+
+_active_cache: Optional[ModuleInstanceCache] = None
+_scope_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+@contextmanager
+def module_instance_scope():
+	"""
+	Reuse the initialized module instances inside this scope.
+	The nested scope joins the outer scope, so the instances live until the outermost scope ends.
+	For example, the Evaluator opens a scope for a whole trial,
+	and the retrieval node opens a scope for a node run.
+
+	:return: The module instance cache of the scope.
+	"""
+	global _active_cache
+	with _scope_lock:
+		outer_cache = _active_cache
+		if outer_cache is None:
+			_active_cache = ModuleInstanceCache()
+		cache = _active_cache
+	if outer_cache is not None:
+		yield cache
+		return
+	try:
+		yield cache
+	finally:
+		with _scope_lock:
+			_active_cache = None
+		summary = cache.summary()
+		if summary["hits"] > 0:
+			logger.info(
+				f"Reused module instances {summary['hits']} times "
+				f"instead of initializing them again. ({summary['creates']} instances)"
+			)
+		cache.clear()
+
+
+@contextmanager
+def module_instance_bypass():
+	"""
+	Initialize new module instances at the current thread, without the module instance scope.
+	The cached instances are made at the other thread, and they can have the async clients
+	that are bound to the event loop of that thread.
+	So the node scheduler runs the I/O-bound candidates at its threads with their own instances.
+	"""
+	outer_bypass = getattr(_thread_state, "bypass", False)
+	_thread_state.bypass = True
+	try:
+		yield
+	finally:
+		_thread_state.bypass = outer_bypass
+
+
+def get_module_instance(module_cls, project_dir, *args, **kwargs) -> Any:
+	"""
+	Get the module instance.
+	If the module has `instance_cache_params` and there is an active module instance scope,
+	the instance is reused from the scope.
+	Else, or inside `module_instance_bypass` at the current thread, a new instance is initialized.
+
+	:param module_cls: The module class.
+	:param project_dir: The project directory.
+	:param args: The positional arguments of the module init.
+	:param kwargs: The keyword arguments of the module init.
+	:return: The module instance.
+	"""
+	cache = _active_cache
+	if (
+		cache is None
+		or getattr(_thread_state, "bypass", False)
+		or getattr(module_cls, "instance_cache_params", None) is None
+	):
+		return module_cls(project_dir, *args, **kwargs)
+	return cache.get(module_cls, project_dir, *args, **kwargs)
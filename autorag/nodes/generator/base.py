@@ -15,6 +15,8 @@ logger = logging.getLogger("AutoRAG")
 
 
 class BaseGenerator(BaseModule, metaclass=abc.ABCMeta):
+	result_cache_columns = ("prompts",)
+
 	def __init__(self, project_dir: str, llm: str, *args, **kwargs):
 		logger.info(f"Initialize generator node - {self.__class__.__name__}")
 		self.llm = llm
@@ -15,6 +15,8 @@ from autorag.utils.util import (
 
 
 class LlamaIndexLLM(BaseGenerator):
+	workload_type = "io"
+
 	def __init__(self, project_dir: str, llm: str, batch: int = 16, *args, **kwargs):
 		"""
 		Initialize the Llama Index LLM module.
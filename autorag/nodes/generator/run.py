@@ -6,8 +6,17 @@ import pandas as pd
 
 from autorag.evaluation import evaluate_generation
 from autorag.evaluation.util import cast_metrics
+from autorag.pruning import (
+	SuccessiveHalving,
+	filter_pruned,
+	make_metric_columns,
+	make_pruning_columns,
+	run_candidates,
+)
+from autorag.result_cache import make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import filter_by_threshold, select_best
 from autorag.utils.util import to_list
 
 
@@ -44,22 +53,6 @@ def run_generator_node(
 	if "generation_gt" not in qa_data.columns:
 		raise ValueError("You must have 'generation_gt' column in qa.parquet.")
 
-	results, execution_times = zip(
-		*map(
-			lambda x: measure_speed(
-				x[0].run_evaluator,
-				project_dir=project_dir,
-				previous_result=previous_result,
-				**x[1],
-			),
-			zip(modules, module_params),
-		)
-	)
-	average_times = list(map(lambda x: x / len(results[0]), execution_times))
-
-	# get average token usage
-	token_usages = list(map(lambda x: x["generated_tokens"].apply(len).mean(), results))
-
 	# make rows to metric_inputs
 	generation_gt = to_list(qa_data["generation_gt"].tolist())
 
@@ -68,14 +61,33 @@ def run_generator_node(
 	metric_names, metric_params = cast_metrics(strategies.get("metrics"))
 	if metric_names is None or len(metric_names) <= 0:
 		raise ValueError("You must at least one metrics for generator evaluation.")
-	results = list(
-		map(
-			lambda result: evaluate_generator_node(
-				result, metric_inputs, strategies.get("metrics")
-			),
-			results,
+
+	scheduler = NodeScheduler.from_strategies(strategies)
+
+	def run_modules(input_modules, input_module_params, input_result):
+		return scheduler.run(
+			input_modules, input_module_params, project_dir, input_result
 		)
+
+	def evaluate(result: pd.DataFrame, rows: List[int]):
+		return evaluate_generator_node(
+			result, [metric_inputs[row] for row in rows], strategies.get("metrics")
+		)
+
+	results, execution_times, cpu_times, cache_hits, pruned_stages = run_candidates(
+		modules,
+		module_params,
+		previous_result,
+		run_modules,
+		evaluate,
+		metric_names,
+		pruning=SuccessiveHalving.from_strategies(strategies),
 	)
+	row_counts = list(map(len, results))
+	average_times = list(map(lambda x, y: x / y, execution_times, row_counts))
+
+	# get average token usage
+	token_usages = list(map(lambda x: x["generated_tokens"].apply(len).mean(), results))
 
 	# save results to folder
 	filepaths = list(
@@ -92,15 +104,18 @@ def run_generator_node(
 			"module_name": list(map(lambda module: module.__name__, modules)),
 			"module_params": module_params,
 			"execution_time": average_times,
+			**make_cache_hit_column(cache_hits),
+			**scheduler.summary_columns(cpu_times, row_counts),
+			**make_pruning_columns(pruned_stages, results),
 			"average_output_token": token_usages,
-			**{
-				metric: list(map(lambda x: x[metric].mean(), results))
-				for metric in metric_names
-			},
+			**make_metric_columns(results, metric_names, pruned_stages),
 		}
 	)
 
 	# filter by strategies
+	results, average_times, token_usages, filenames = filter_pruned(
+		pruned_stages, results, average_times, token_usages, filenames
+	)
 	if strategies.get("speed_threshold") is not None:
 		results, filenames = filter_by_threshold(
 			results, average_times, strategies["speed_threshold"], filenames
@@ -3,7 +3,7 @@ from typing import List
 import numpy as np
 import pandas as pd
 
-from autorag import embedding_models
+from autorag.embedding.cache import load_embedding_model
 from autorag.evaluation.metric.util import calculate_cosine_similarity
 from autorag.nodes.passageaugmenter.base import BasePassageAugmenter
 from autorag.utils.util import (
@@ -35,7 +35,7 @@ class PrevNextPassageAugmenter(BasePassageAugmenter):
 		self.slim_corpus_df = slim_corpus_df
 
 		# init embedding model
-		self.embedding_model = embedding_models[embedding_model]()
+		self.embedding_model = load_embedding_model(embedding_model)
 
 	def __del__(self):
 		del self.embedding_model
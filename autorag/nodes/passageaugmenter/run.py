@@ -6,8 +6,10 @@ from typing import List, Dict
 import pandas as pd
 
 from autorag.nodes.retrieval.run import evaluate_retrieval_node
+from autorag.result_cache import is_result_cache_hit, make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import filter_by_threshold, select_best
 from autorag.utils.util import apply_recursive, to_list
 
 logger = logging.getLogger("AutoRAG")
@@ -29,18 +31,12 @@ def run_passage_augmenter_node(
 	retrieval_gt = qa_df["retrieval_gt"].tolist()
 	retrieval_gt = apply_recursive(lambda x: str(x), to_list(retrieval_gt))
 
-	results, execution_times = zip(
-		*map(
-			lambda task: measure_speed(
-				task[0].run_evaluator,
-				project_dir=project_dir,
-				previous_result=previous_result,
-				**task[1],
-			),
-			zip(modules, module_params),
-		)
+	scheduler = NodeScheduler.from_strategies(strategies)
+	results, execution_times, cpu_times = scheduler.run(
+		modules, module_params, project_dir, previous_result
 	)
 	average_times = list(map(lambda x: x / len(results[0]), execution_times))
+	cache_hits = list(map(is_result_cache_hit, results))
 	metric_inputs = [
 		MetricInput(retrieval_gt=ret_gt, query=query, generation_gt=gen_gt)
 		for ret_gt, query, gen_gt in zip(
@@ -84,6 +80,8 @@ def run_passage_augmenter_node(
 			"module_name": list(map(lambda module: module.__name__, modules)),
 			"module_params": module_params,
 			"execution_time": average_times,
+			**make_cache_hit_column(cache_hits),
+			**scheduler.summary_columns(cpu_times, len(results[0])),
 			**{
 				f"passage_augmenter_{metric}": list(
 					map(lambda result: result[metric].mean(), results)
@@ -45,6 +45,7 @@ class BasePassageCompressor(BaseModule, metaclass=abc.ABCMeta):
 
 class LlamaIndexCompressor(BasePassageCompressor, metaclass=abc.ABCMeta):
 	param_list = ["prompt", "chat_prompt", "batch"]
+	workload_type = "io"
 
 	def __init__(self, project_dir: str, **kwargs):
 		"""
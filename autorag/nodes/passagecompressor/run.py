@@ -9,8 +9,10 @@ from autorag.evaluation.metric import (
 	retrieval_token_precision,
 	retrieval_token_f1,
 )
+from autorag.result_cache import is_result_cache_hit, make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import filter_by_threshold, select_best
 from autorag.utils.util import fetch_contents
 
 
@@ -55,19 +57,13 @@ def run_passage_compressor_node(
 	), "Can't use passage compressor if you don't have retrieval gt values in QA dataset."
 
 	# run modules
-	results, execution_times = zip(
-		*map(
-			lambda task: measure_speed(
-				task[0].run_evaluator,
-				project_dir=project_dir,
-				previous_result=previous_result,
-				**task[1],
-			),
-			zip(modules, module_params),
-		)
+	scheduler = NodeScheduler.from_strategies(strategies)
+	results, execution_times, cpu_times = scheduler.run(
+		modules, module_params, project_dir, previous_result
 	)
 	results = list(results)
 	average_times = list(map(lambda x: x / len(results[0]), execution_times))
+	cache_hits = list(map(is_result_cache_hit, results))
 
 	retrieval_gt_contents = list(
 		map(lambda x: fetch_contents(corpus_data, x), qa_data["retrieval_gt"].tolist())
@@ -109,6 +105,8 @@ def run_passage_compressor_node(
 			"module_name": list(map(lambda module: module.__name__, modules)),
 			"module_params": module_params,
 			"execution_time": average_times,
+			**make_cache_hit_column(cache_hits),
+			**scheduler.summary_columns(cpu_times, len(results[0])),
 			**{
 				f"passage_compressor_{metric}": list(
 					map(lambda result: result[metric].mean(), results)
@@ -12,6 +12,13 @@ logger = logging.getLogger("AutoRAG")
 
 
 class BasePassageFilter(BaseModule, metaclass=abc.ABCMeta):
+	result_cache_columns = (
+		"query",
+		"retrieved_contents",
+		"retrieved_ids",
+		"retrieve_scores",
+	)
+
 	def __init__(self, project_dir: Union[str, Path], *args, **kwargs):
 		logger.info(f"Initialize passage filter node - {self.__class__.__name__}")
 
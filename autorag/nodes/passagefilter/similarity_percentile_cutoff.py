@@ -4,7 +4,7 @@ from typing import List, Tuple, Union
 import numpy as np
 import pandas as pd
 
-from autorag import embedding_models
+from autorag.embedding.cache import load_embedding_model
 from autorag.evaluation.metric.util import calculate_cosine_similarity
 from autorag.nodes.passagefilter.base import BasePassageFilter
 from autorag.nodes.passagefilter.similarity_threshold_cutoff import (
@@ -15,6 +15,8 @@ from autorag.utils.util import empty_cuda_cache
 
 
 class SimilarityPercentileCutoff(BasePassageFilter):
+	workload_type = "io"
+
 	def __init__(self, project_dir: Union[str, Path], *args, **kwargs):
 		"""
 		Initialize the SimilarityPercentileCutoff module
@@ -25,7 +27,7 @@ class SimilarityPercentileCutoff(BasePassageFilter):
 		"""
 		super().__init__(project_dir, *args, **kwargs)
 		embedding_model_str = kwargs.pop("embedding_model", "openai")
-		self.embedding_model = embedding_models[embedding_model_str]()
+		self.embedding_model = load_embedding_model(embedding_model_str)
 
 	def __del__(self):
 		super().__del__()
@@ -3,7 +3,7 @@ from typing import List, Tuple
 import numpy as np
 import pandas as pd
 
-from autorag import embedding_models
+from autorag.embedding.cache import load_embedding_model
 from autorag.evaluation.metric.util import calculate_cosine_similarity
 from autorag.nodes.passagefilter.base import BasePassageFilter
 from autorag.utils.util import (
@@ -14,6 +14,8 @@ from autorag.utils.util import (
 
 
 class SimilarityThresholdCutoff(BasePassageFilter):
+	workload_type = "io"
+
 	def __init__(self, project_dir: str, *args, **kwargs):
 		"""
 		Initialize the SimilarityThresholdCutoff module
@@ -24,7 +26,7 @@ class SimilarityThresholdCutoff(BasePassageFilter):
 		"""
 		super().__init__(project_dir, *args, **kwargs)
 		embedding_model_str = kwargs.pop("embedding_model", "openai")
-		self.embedding_model = embedding_models[embedding_model_str]()
+		self.embedding_model = load_embedding_model(embedding_model_str)
 
 	def __del__(self):
 		del self.embedding_model
@@ -3,6 +3,8 @@ from typing import List, Tuple
 import numpy as np
 import pandas as pd
 
+from autorag.model_registry import get_shared_model, make_model_key
+from autorag.onnx_runtime import ONNXModel, load_onnx_model
 from autorag.nodes.passagereranker.base import BasePassageReranker
 from autorag.utils.util import (
 	flatten_apply,
@@ -15,10 +17,14 @@ from autorag.utils.util import (
 
 
 class ColbertReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir: str,
 		model_name: str = "colbert-ir/colbertv2.0",
+		backend: str = "torch",
+		quantize: bool = True,
 		*args,
 		**kwargs,
 	):
@@ -29,9 +35,21 @@ class ColbertReranker(BasePassageReranker):
 		:param model_name: The model name for Colbert rerank.
 			You can choose a colbert model for reranking.
 			The default is "colbert-ir/colbertv2.0".
+		:param backend: The inference backend. "torch" or "onnx".
+			The "onnx" backend runs the exported ONNX graph on CPU with the ONNX Runtime.
+			Default is "torch".
+		:param quantize: Whether to use the dynamic int8 quantization at the "onnx" backend.
+			Default is True.
 		:param kwargs: Extra parameter for the model.
 		"""
 		super().__init__(project_dir)
+		self.backend = backend
+		if backend == "onnx":
+			self.model = load_onnx_model(
+				model_name, "feature-extraction", project_dir, quantize
+			)
+			self.tokenizer = self.model.tokenizer
+			return
 		try:
 			import torch
 			from transformers import AutoModel, AutoTokenizer
@@ -41,10 +59,18 @@ class ColbertReranker(BasePassageReranker):
 			)
 		self.device = "cuda" if torch.cuda.is_available() else "cpu"
 		model_params = pop_params(AutoModel.from_pretrained, kwargs)
-		self.model = AutoModel.from_pretrained(model_name, **model_params).to(
-			self.device
+
+		def load_model():
+			model = AutoModel.from_pretrained(model_name, **model_params).to(
+				self.device
+			)
+			tokenizer = AutoTokenizer.from_pretrained(model_name)
+			return model, tokenizer
+
+		self.model, self.tokenizer = get_shared_model(
+			make_model_key("ColbertReranker", model_name, self.device, **model_params),
+			load_model,
 		)
-		self.tokenizer = AutoTokenizer.from_pretrained(model_name)
 
 	def __del__(self):
 		del self.model
@@ -82,16 +108,27 @@ class ColbertReranker(BasePassageReranker):
 		"""
 
 		# get query and content embeddings
-		query_embedding_list = get_colbert_embedding_batch(
-			queries, self.model, self.tokenizer, batch
-		)
-		content_embedding_list = flatten_apply(
-			get_colbert_embedding_batch,
-			contents_list,
-			model=self.model,
-			tokenizer=self.tokenizer,
-			batch_size=batch,
-		)
+		if self.backend == "onnx":
+			query_embedding_list = get_colbert_onnx_embedding_batch(
+				queries, self.model, batch
+			)
+			content_embedding_list = flatten_apply(
+				get_colbert_onnx_embedding_batch,
+				contents_list,
+				model=self.model,
+				batch_size=batch,
+			)
+		else:
+			query_embedding_list = get_colbert_embedding_batch(
+				queries, self.model, self.tokenizer, batch
+			)
+			content_embedding_list = flatten_apply(
+				get_colbert_embedding_batch,
+				contents_list,
+				model=self.model,
+				tokenizer=self.tokenizer,
+				batch_size=batch,
+			)
 		df = pd.DataFrame(
 			{
 				"ids": ids_list,
@@ -153,6 +190,20 @@ def get_colbert_embedding_batch(
 		return list(map(lambda x: x.detach().numpy(), tensor_results))
 
 
+def get_colbert_onnx_embedding_batch(
+	input_strings: List[str], model: ONNXModel, batch_size: int
+) -> List[np.array]:
+	encoding = model.tokenize(input_strings, max_length=512)
+	result_embedding = [
+		model.forward({name: value[i : i + batch_size] for name, value in encoding.items()})
+		for i in range(0, len(input_strings), batch_size)
+	]
+	total_array = np.concatenate(
+		result_embedding, axis=0
+	)  # shape [batch_size, token_length, embedding_dim]
+	return list(np.split(total_array, total_array.shape[0]))
+
+
 def slice_tokenizer_result(tokenizer_output, batch_size):
 	input_ids_batches = slice_tensor(tokenizer_output["input_ids"], batch_size)
 	attention_mask_batches = slice_tensor(
@@ -2,6 +2,7 @@ from typing import List, Tuple, Iterable
 
 import pandas as pd
 
+from autorag.onnx_runtime import load_onnx_model, onnx_cross_encoder_run_model
 from autorag.nodes.passagereranker.base import BasePassageReranker
 from autorag.utils.util import (
 	make_batch,
@@ -15,8 +16,16 @@ from autorag.utils.util import (
 
 
 class FlagEmbeddingReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
-		self, project_dir, model_name: str = "BAAI/bge-reranker-large", *args, **kwargs
+		self,
+		project_dir,
+		model_name: str = "BAAI/bge-reranker-large",
+		backend: str = "torch",
+		quantize: bool = True,
+		*args,
+		**kwargs,
 	):
 		"""
 		Initialize the FlagEmbeddingReranker module.
@@ -24,9 +33,20 @@ class FlagEmbeddingReranker(BasePassageReranker):
 		:param project_dir: The project directory.
 		:param model_name: The name of the BAAI Reranker normal-model name.
 		Default is "BAAI/bge-reranker-large"
+		:param backend: The inference backend. "torch" or "onnx".
+			The "onnx" backend runs the exported ONNX graph on CPU with the ONNX Runtime.
+			Default is "torch".
+		:param quantize: Whether to use the dynamic int8 quantization at the "onnx" backend.
+			Default is True.
 		:param kwargs: Extra parameter for FlagEmbedding.FlagReranker
 		"""
 		super().__init__(project_dir)
+		self.backend = backend
+		if backend == "onnx":
+			self.model = load_onnx_model(
+				model_name, "sequence-classification", project_dir, quantize
+			)
+			return
 		try:
 			from FlagEmbedding import FlagReranker
 		except ImportError:
@@ -72,9 +92,20 @@ class FlagEmbeddingReranker(BasePassageReranker):
 			list(map(lambda x: [query, x], content_list))
 			for query, content_list in zip(queries, contents_list)
 		]
-		rerank_scores = flatten_apply(
-			flag_embedding_run_model, nested_list, model=self.model, batch_size=batch
-		)
+		if self.backend == "onnx":
+			rerank_scores = flatten_apply(
+				onnx_cross_encoder_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+			)
+		else:
+			rerank_scores = flatten_apply(
+				flag_embedding_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+			)
 
 		df = pd.DataFrame(
 			{
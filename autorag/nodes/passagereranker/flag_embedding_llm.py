@@ -15,6 +15,8 @@ from autorag.utils.util import (
 
 
 class FlagEmbeddingLLMReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir,
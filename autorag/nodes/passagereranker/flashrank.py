@@ -33,6 +33,8 @@ model_file_map = {
 
 
 class FlashRankReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self, project_dir: str, model: str = "ms-marco-TinyBERT-L-2-v2", *args, **kwargs
 	):
@@ -11,6 +11,8 @@ JINA_API_URL = "https://api.jina.ai/v1/rerank"
 
 
 class JinaReranker(BasePassageReranker):
+	workload_type = "io"
+
 	def __init__(self, project_dir: str, api_key: str = None, *args, **kwargs):
 		"""
 		Initialize Jina rerank node.
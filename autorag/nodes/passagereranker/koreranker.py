@@ -3,6 +3,8 @@ from typing import List, Tuple
 import numpy as np
 import pandas as pd
 
+from autorag.model_registry import get_shared_model, make_model_key
+from autorag.onnx_runtime import load_onnx_model, onnx_cross_encoder_run_model
 from autorag.nodes.passagereranker.base import BasePassageReranker
 from autorag.utils.util import (
 	make_batch,
@@ -15,21 +17,53 @@ from autorag.utils.util import (
 
 
 class KoReranker(BasePassageReranker):
-	def __init__(self, project_dir: str, *args, **kwargs):
+	prefix_stable = True
+
+	def __init__(
+		self,
+		project_dir: str,
+		backend: str = "torch",
+		quantize: bool = True,
+		*args,
+		**kwargs,
+	):
+		"""
+		Initialize the ko-reranker module.
+
+		:param project_dir: The project directory
+		:param backend: The inference backend. "torch" or "onnx".
+			The "onnx" backend runs the exported ONNX graph on CPU with the ONNX Runtime.
+			Default is "torch".
+		:param quantize: Whether to use the dynamic int8 quantization at the "onnx" backend.
+			Default is True.
+		"""
 		super().__init__(project_dir)
+		model_path = "Dongjin-kr/ko-reranker"
+		self.backend = backend
+		if backend == "onnx":
+			self.model = load_onnx_model(
+				model_path, "sequence-classification", project_dir, quantize
+			)
+			return
 		try:
 			import torch
 			from transformers import AutoModelForSequenceClassification, AutoTokenizer
 		except ImportError:
 			raise ImportError("For using KoReranker, please install torch first.")
 
-		model_path = "Dongjin-kr/ko-reranker"
-		self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-		self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
-		self.model.eval()
 		# Determine the device to run the model on (GPU if available, otherwise CPU)
 		self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-		self.model.to(self.device)
+
+		def load_model():
+			tokenizer = AutoTokenizer.from_pretrained(model_path)
+			model = AutoModelForSequenceClassification.from_pretrained(model_path)
+			model.eval()
+			model.to(self.device)
+			return tokenizer, model
+
+		self.tokenizer, self.model = get_shared_model(
+			make_model_key("KoReranker", model_path, str(self.device)), load_model
+		)
 
 	def __del__(self):
 		del self.model
@@ -67,14 +101,22 @@ class KoReranker(BasePassageReranker):
 			list(map(lambda x: [query, x], content_list))
 			for query, content_list in zip(queries, contents_list)
 		]
-		scores_nps = flatten_apply(
-			koreranker_run_model,
-			nested_list,
-			model=self.model,
-			batch_size=batch,
-			tokenizer=self.tokenizer,
-			device=self.device,
-		)
+		if self.backend == "onnx":
+			scores_nps = flatten_apply(
+				onnx_cross_encoder_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+			)
+		else:
+			scores_nps = flatten_apply(
+				koreranker_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+				tokenizer=self.tokenizer,
+				device=self.device,
+			)
 
 		rerank_scores = list(
 			map(
@@ -14,6 +14,8 @@ from autorag.utils.util import (
 
 
 class MixedbreadAIReranker(BasePassageReranker):
+	workload_type = "io"
+
 	def __init__(
 		self,
 		project_dir: str,
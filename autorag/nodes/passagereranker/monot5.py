@@ -1,8 +1,11 @@
 from itertools import chain
 from typing import List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from autorag.model_registry import get_shared_model, make_model_key
+from autorag.onnx_runtime import ONNXModel, load_onnx_model
 from autorag.nodes.passagereranker.base import BasePassageReranker
 from autorag.utils.util import (
 	make_batch,
@@ -39,10 +42,14 @@ prediction_tokens = {
 
 
 class MonoT5(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir: str,
 		model_name: str = "castorini/monot5-3b-msmarco-10k",
+		backend: str = "torch",
+		quantize: bool = True,
 		*args,
 		**kwargs,
 	):
@@ -55,29 +62,51 @@ class MonoT5(BasePassageReranker):
 				If there is a '/' in the model name parameter,
 				when we create the file to store the results, the path will be twisted because of the '/'.
 				Therefore, it will be received as '_' instead of '/'.
+		:param backend: The inference backend. "torch" or "onnx".
+			The "onnx" backend runs the exported ONNX graph on CPU with the ONNX Runtime.
+			The ONNX graph scores with the logits of the first decoder step.
+			Default is "torch".
+		:param quantize: Whether to use the dynamic int8 quantization at the "onnx" backend.
+			Default is True.
 		:param kwargs: The extra arguments for the MonoT5 reranker
 		"""
 		super().__init__(project_dir)
+		# replace '_' to '/'
+		if "_" in model_name:
+			model_name = model_name.replace("_", "/")
+		token_false, token_true = prediction_tokens[model_name]
+		self.backend = backend
+		if backend == "onnx":
+			self.model = load_onnx_model(
+				model_name, "seq2seq-first-token", project_dir, quantize
+			)
+			self.tokenizer = self.model.tokenizer
+			self.token_false_id = self.tokenizer.convert_tokens_to_ids(token_false)
+			self.token_true_id = self.tokenizer.convert_tokens_to_ids(token_true)
+			return
 		try:
 			import torch
 			from transformers import T5Tokenizer, T5ForConditionalGeneration
 		except ImportError:
 			raise ImportError("For using MonoT5 Reranker, please install torch first.")
-		# replace '_' to '/'
-		if "_" in model_name:
-			model_name = model_name.replace("_", "/")
-		# Load the tokenizer and model from the pre-trained MonoT5 model
-		self.tokenizer = T5Tokenizer.from_pretrained(model_name)
 		model_params = pop_params(T5ForConditionalGeneration.from_pretrained, kwargs)
-		self.model = T5ForConditionalGeneration.from_pretrained(
-			model_name, **model_params
-		).eval()
-
 		# Determine the device to run the model on (GPU if available, otherwise CPU)
 		self.device = "cuda" if torch.cuda.is_available() else "cpu"
-		self.model.to(self.device)
 
-		token_false, token_true = prediction_tokens[model_name]
+		# Load the tokenizer and model from the pre-trained MonoT5 model
+		def load_model():
+			tokenizer = T5Tokenizer.from_pretrained(model_name)
+			model = T5ForConditionalGeneration.from_pretrained(
+				model_name, **model_params
+			).eval()
+			model.to(self.device)
+			return tokenizer, model
+
+		self.tokenizer, self.model = get_shared_model(
+			make_model_key("MonoT5", model_name, self.device, **model_params),
+			load_model,
+		)
+
 		self.token_false_id = self.tokenizer.convert_tokens_to_ids(token_false)
 		self.token_true_id = self.tokenizer.convert_tokens_to_ids(token_true)
 
@@ -120,16 +149,26 @@ class MonoT5(BasePassageReranker):
 			for query, content_list in zip(queries, contents_list)
 		]
 
-		rerank_scores = flatten_apply(
-			monot5_run_model,
-			nested_list,
-			model=self.model,
-			batch_size=batch,
-			tokenizer=self.tokenizer,
-			device=self.device,
-			token_false_id=self.token_false_id,
-			token_true_id=self.token_true_id,
-		)
+		if self.backend == "onnx":
+			rerank_scores = flatten_apply(
+				monot5_onnx_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+				token_false_id=self.token_false_id,
+				token_true_id=self.token_true_id,
+			)
+		else:
+			rerank_scores = flatten_apply(
+				monot5_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+				tokenizer=self.tokenizer,
+				device=self.device,
+				token_false_id=self.token_false_id,
+				token_true_id=self.token_true_id,
+			)
 
 		df = pd.DataFrame(
 			{
@@ -188,3 +227,24 @@ def monot5_run_model(
 		probs = torch.nn.functional.softmax(logits, dim=-1)[:, 1]
 		results.extend(probs.tolist())
 	return results
+
+
+def monot5_onnx_run_model(
+	input_texts,
+	model: ONNXModel,
+	batch_size: int,
+	token_false_id,
+	token_true_id,
+):
+	batch_input_texts = make_batch(input_texts, batch_size)
+	results = []
+	for batch_texts in batch_input_texts:
+		flattened_batch_texts = list(chain.from_iterable(batch_texts))
+		logits = model(flattened_batch_texts, max_length=512)[
+			:, [token_false_id, token_true_id]
+		].astype(np.float32)
+		# Calculate the softmax probability of the 'true' token
+		exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+		probs = exp_logits[:, 1] / exp_logits.sum(axis=1)
+		results.extend(probs.tolist())
+	return results
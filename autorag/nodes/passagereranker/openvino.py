@@ -19,6 +19,8 @@ from autorag.utils.util import (
 
 
 class OpenVINOReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir: str,
@@ -7,6 +7,8 @@ from autorag.utils import result_to_dataframe
 
 
 class PassReranker(BasePassageReranker):
+	prefix_stable = True
+
 	@result_to_dataframe(["retrieved_contents", "retrieved_ids", "retrieve_scores"])
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
 		top_k = kwargs.pop("top_k")
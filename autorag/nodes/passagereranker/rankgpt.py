@@ -21,6 +21,8 @@ from autorag.utils.util import (
 
 
 class RankGPT(BasePassageReranker):
+	workload_type = "io"
+
 	def __init__(
 		self, project_dir: str, llm: Optional[Union[str, LLM]] = None, **kwargs
 	):
@@ -6,8 +6,22 @@ from typing import List, Dict
 import pandas as pd
 
 from autorag.nodes.retrieval.run import evaluate_retrieval_node
+from autorag.pruning import (
+	SuccessiveHalving,
+	filter_pruned,
+	make_metric_columns,
+	make_pruning_columns,
+	run_candidates,
+)
+from autorag.result_cache import make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import (
+	measure_module_speed,
+	filter_by_threshold,
+	select_best,
+	make_shared_execution_column,
+)
 from autorag.utils.util import apply_recursive, to_list
 
 logger = logging.getLogger("AutoRAG")
@@ -51,34 +65,38 @@ def run_passage_reranker_node(
 		)
 	]
 
-	results, execution_times = zip(
-		*map(
-			lambda task: measure_speed(
-				task[0].run_evaluator,
-				project_dir=project_dir,
-				previous_result=previous_result,
-				**task[1],
-			),
-			zip(modules, module_params),
-		)
-	)
-	average_times = list(map(lambda x: x / len(results[0]), execution_times))
-
-	# run metrics before filtering
 	if strategies.get("metrics") is None:
 		raise ValueError(
 			"You must at least one metrics for passage_reranker evaluation."
 		)
-	results = list(
-		map(
-			lambda x: evaluate_retrieval_node(
-				x,
-				metric_inputs,
-				strategies.get("metrics"),
-			),
-			results,
+	scheduler = NodeScheduler.from_strategies(strategies)
+
+	def run_modules(input_modules, input_module_params, input_result):
+		return measure_module_speed(
+			input_modules,
+			input_module_params,
+			project_dir=project_dir,
+			previous_result=input_result,
+			scheduler=scheduler,
 		)
+
+	def evaluate(result: pd.DataFrame, rows: List[int]):
+		return evaluate_retrieval_node(
+			result, [metric_inputs[row] for row in rows], strategies.get("metrics")
+		)
+
+	# run modules and metrics before filtering
+	results, execution_times, cpu_times, cache_hits, pruned_stages = run_candidates(
+		modules,
+		module_params,
+		previous_result,
+		run_modules,
+		evaluate,
+		strategies.get("metrics"),
+		pruning=SuccessiveHalving.from_strategies(strategies),
 	)
+	row_counts = list(map(len, results))
+	average_times = list(map(lambda x, y: x / y, execution_times, row_counts))
 
 	# save results to folder
 	save_dir = os.path.join(node_line_dir, "passage_reranker")  # node name
@@ -98,16 +116,23 @@ def run_passage_reranker_node(
 			"module_name": list(map(lambda module: module.__name__, modules)),
 			"module_params": module_params,
 			"execution_time": average_times,
-			**{
-				f"passage_reranker_{metric}": list(
-					map(lambda result: result[metric].mean(), results)
-				)
-				for metric in strategies.get("metrics")
-			},
+			**make_cache_hit_column(cache_hits),
+			**scheduler.summary_columns(cpu_times, row_counts),
+			**make_pruning_columns(pruned_stages, results),
+			**make_shared_execution_column(results, filenames),
+			**make_metric_columns(
+				results,
+				strategies.get("metrics"),
+				pruned_stages,
+				prefix="passage_reranker_",
+			),
 		}
 	)
 
 	# filter by strategies
+	results, average_times, filenames = filter_pruned(
+		pruned_stages, results, average_times, filenames
+	)
 	if strategies.get("speed_threshold") is not None:
 		results, filenames = filter_by_threshold(
 			results, average_times, strategies["speed_threshold"], filenames
@@ -2,6 +2,8 @@ from typing import List, Tuple
 
 import pandas as pd
 
+from autorag.model_registry import get_shared_model, make_model_key
+from autorag.onnx_runtime import load_onnx_model, onnx_cross_encoder_run_model
 from autorag.nodes.passagereranker.base import BasePassageReranker
 from autorag.utils.util import (
 	flatten_apply,
@@ -15,10 +17,14 @@ from autorag.utils.util import (
 
 
 class SentenceTransformerReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir: str,
 		model_name: str = "cross-encoder/ms-marco-MiniLM-L-2-v2",
+		backend: str = "torch",
+		quantize: bool = True,
 		*args,
 		**kwargs,
 	):
@@ -28,9 +34,20 @@ class SentenceTransformerReranker(BasePassageReranker):
 		:param project_dir: The project directory
 		:param model_name: The name of the Sentence Transformer model to use for reranking
 		Default is "cross-encoder/ms-marco-MiniLM-L-2-v2"
+		:param backend: The inference backend. "torch" or "onnx".
+			The "onnx" backend runs the exported ONNX graph on CPU with the ONNX Runtime.
+			Default is "torch".
+		:param quantize: Whether to use the dynamic int8 quantization at the "onnx" backend.
+			Default is True.
 		:param kwargs: The CrossEncoder parameters
 		"""
 		super().__init__(project_dir, *args, **kwargs)
+		self.backend = backend
+		if backend == "onnx":
+			self.model = load_onnx_model(
+				model_name, "sequence-classification", project_dir, quantize
+			)
+			return
 		try:
 			import torch
 			from sentence_transformers import CrossEncoder
@@ -40,7 +57,10 @@ class SentenceTransformerReranker(BasePassageReranker):
 			)
 		self.device = "cuda" if torch.cuda.is_available() else "cpu"
 		model_params = pop_params(CrossEncoder.__init__, kwargs)
-		self.model = CrossEncoder(model_name, device=self.device, **model_params)
+		self.model = get_shared_model(
+			make_model_key("CrossEncoder", model_name, self.device, **model_params),
+			lambda: CrossEncoder(model_name, device=self.device, **model_params),
+		)
 
 	def __del__(self):
 		del self.model
@@ -87,12 +107,21 @@ class SentenceTransformerReranker(BasePassageReranker):
 			list(map(lambda x: [query, x], content_list))
 			for query, content_list in zip(queries, contents_list)
 		]
-		rerank_scores = flatten_apply(
-			sentence_transformer_run_model,
-			nested_list,
-			model=self.model,
-			batch_size=batch,
-		)
+		if self.backend == "onnx":
+			rerank_scores = flatten_apply(
+				onnx_cross_encoder_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+				activation="sigmoid",
+			)
+		else:
+			rerank_scores = flatten_apply(
+				sentence_transformer_run_model,
+				nested_list,
+				model=self.model,
+				batch_size=batch,
+			)
 
 		df = pd.DataFrame(
 			{
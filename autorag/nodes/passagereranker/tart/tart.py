@@ -19,6 +19,8 @@ from autorag.utils.util import (
 
 
 class Tart(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(self, project_dir: str, *args, **kwargs):
 		super().__init__(project_dir)
 		try:
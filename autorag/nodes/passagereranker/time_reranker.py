@@ -9,6 +9,8 @@ from autorag.utils import result_to_dataframe, fetch_contents
 
 
 class TimeReranker(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(self, project_dir: str, *args, **kwargs):
 		super().__init__(project_dir, *args, **kwargs)
 		self.corpus_df = pd.read_parquet(
@@ -11,6 +11,8 @@ logger = logging.getLogger("AutoRAG")
 
 
 class Upr(BasePassageReranker):
+	prefix_stable = True
+
 	def __init__(
 		self,
 		project_dir: str,
@@ -13,6 +13,8 @@ logger = logging.getLogger("AutoRAG")
 
 
 class BaseQueryExpansion(BaseModule, metaclass=abc.ABCMeta):
+	result_cache_columns = ("query",)
+
 	def __init__(self, project_dir: Union[str, Path], *args, **kwargs):
 		logger.info(
 			f"Initialize query expansion node - {self.__class__.__name__} module..."
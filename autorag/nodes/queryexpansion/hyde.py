@@ -9,6 +9,8 @@ hyde_prompt = "Please write a passage to answer the question"
 
 
 class HyDE(BaseQueryExpansion):
+	workload_type = "io"
+
 	@result_to_dataframe(["queries"])
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
 		queries = self.cast_to_run(previous_result, *args, **kwargs)
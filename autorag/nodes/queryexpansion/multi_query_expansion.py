@@ -15,6 +15,8 @@ multi_query_expansion_prompt = """You are an AI language model assistant.
 
 
 class MultiQueryExpansion(BaseQueryExpansion):
+	workload_type = "io"
+
 	@result_to_dataframe(["queries"])
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
 		queries = self.cast_to_run(previous_result, *args, **kwargs)
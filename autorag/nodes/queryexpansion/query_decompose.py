@@ -53,6 +53,8 @@ decompose_prompt = """Decompose a question in self-contained sub-questions. Use
 
 
 class QueryDecompose(BaseQueryExpansion):
+	workload_type = "io"
+
 	@result_to_dataframe(["queries"])
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
 		queries = self.cast_to_run(previous_result, *args, **kwargs)
@@ -7,8 +7,10 @@ from typing import List, Dict, Optional
 import pandas as pd
 
 from autorag.nodes.retrieval.run import evaluate_retrieval_node
+from autorag.result_cache import is_result_cache_hit, make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import filter_by_threshold, select_best
 from autorag.support import get_support_modules
 from autorag.utils.util import make_combinations, explode
 
@@ -46,18 +48,12 @@ def run_query_expansion_node(
 	project_dir = pathlib.PurePath(node_line_dir).parent.parent
 
 	# run query expansion
-	results, execution_times = zip(
-		*map(
-			lambda task: measure_speed(
-				task[0].run_evaluator,
-				project_dir=project_dir,
-				previous_result=previous_result,
-				**task[1],
-			),
-			zip(modules, module_params),
-		)
+	scheduler = NodeScheduler.from_strategies(strategies)
+	results, execution_times, cpu_times = scheduler.run(
+		modules, module_params, project_dir, previous_result
 	)
 	average_times = list(map(lambda x: x / len(results[0]), execution_times))
+	cache_hits = list(map(is_result_cache_hit, results))
 
 	# save results to folder
 	pseudo_module_params = deepcopy(module_params)
@@ -79,6 +75,8 @@ def run_query_expansion_node(
 			"module_name": list(map(lambda module: module.__name__, modules)),
 			"module_params": module_params,
 			"execution_time": average_times,
+			**make_cache_hit_column(cache_hits),
+			**scheduler.summary_columns(cpu_times, len(results[0])),
 		}
 	)
 
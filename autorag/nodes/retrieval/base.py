@@ -1,10 +1,13 @@
 import abc
 import logging
 import os
-from typing import List, Union, Tuple
+from itertools import chain
+from typing import Callable, List, Union, Tuple
 
+import numpy as np
 import pandas as pd
 
+from autorag.module_cache import get_module_instance
 from autorag.schema import BaseModule
 from autorag.support import get_support_modules
 from autorag.utils import fetch_contents, result_to_dataframe, validate_qa_dataset
@@ -27,6 +30,39 @@ class BaseRetrieval(BaseModule, metaclass=abc.ABCMeta):
 	def __del__(self):
 		logger.info(f"Deleting retrieval node - {self.__class__.__name__} module...")
 
+	@classmethod
+	def result_cache_input(cls, previous_result: pd.DataFrame) -> pd.DataFrame:
+		# The module adds the queries column from the query column,
+		# so the queries are cast the same way whether the column exists or not.
+		queries = (
+			previous_result["queries"]
+			if "queries" in previous_result.columns
+			else previous_result["query"]
+		)
+		return pd.DataFrame(
+			{
+				"queries": [
+					[query] if isinstance(query, str) else query
+					for query in queries.tolist()
+				]
+			}
+		)
+
+	@classmethod
+	def is_prefix_stable(
+		cls, previous_result: pd.DataFrame, project_dir=None, **kwargs
+	) -> bool:
+		if not cls.prefix_stable:
+			return False
+		if "queries" not in previous_result.columns:
+			return True
+		# The passages of multiple queries are evenly distributed by top_k,
+		# so a smaller top_k is not the prefix of a larger top_k.
+		return all(
+			isinstance(queries, str) or len(queries) == 1
+			for queries in previous_result["queries"]
+		)
+
 	def cast_to_run(self, previous_result: pd.DataFrame, *args, **kwargs):
 		logger.info(f"Running retrieval node - {self.__class__.__name__} module...")
 		validate_qa_dataset(previous_result)
@@ -44,15 +80,16 @@ class BaseRetrieval(BaseModule, metaclass=abc.ABCMeta):
 
 
 class HybridRetrieval(BaseRetrieval, metaclass=abc.ABCMeta):
+	instance_cache_params = ("target_modules", "target_module_params")
+
 	def __init__(
 		self, project_dir: str, target_modules, target_module_params, *args, **kwargs
 	):
 		super().__init__(project_dir)
 		self.target_modules = list(
 			map(
-				lambda x, y: get_support_modules(x)(
-					**y,
-					project_dir=project_dir,
+				lambda x, y: get_module_instance(
+					get_support_modules(x), project_dir, **y
 				),
 				target_modules,
 				target_module_params,
@@ -92,6 +129,210 @@ class HybridRetrieval(BaseRetrieval, metaclass=abc.ABCMeta):
 		return contents, ids, scores
 
 
+class HybridFusionTable:
+	def __init__(self, ids: Tuple, scores: Tuple):
+		"""
+		The flattened retrieval results of all queries and all target modules for the hybrid fusion.
+		The ids are mapped to integer codes once,
+		and every passage of a query gets a slot in the order of the first appearance,
+		the first module first.
+		So the fusion of all queries runs with NumPy operations without the pandas per-row overhead.
+
+		:param ids: The tuple of ids of each target module.
+		:param scores: The tuple of scores of each target module.
+		"""
+		self.module_count = len(ids)
+		self.row_count = len(ids[0])
+		self.lengths = [
+			np.fromiter(map(len, module_ids), dtype=np.int64, count=self.row_count)
+			for module_ids in ids
+		]
+		self.offsets = [
+			np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+			for lengths in self.lengths
+		]
+		self.scores = [
+			np.fromiter(
+				chain.from_iterable(module_scores),
+				dtype=np.float64,
+				count=int(lengths.sum()),
+			)
+			for module_scores, lengths in zip(scores, self.lengths)
+		]
+		codes, self.uniques = pd.factorize(
+			np.fromiter(
+				chain.from_iterable(chain.from_iterable(ids)),
+				dtype=object,
+				count=int(sum(lengths.sum() for lengths in self.lengths)),
+			)
+		)
+		code_count = max(len(self.uniques), 1)
+		rows = np.concatenate(
+			[np.repeat(np.arange(self.row_count), lengths) for lengths in self.lengths]
+		)
+		row_codes = rows * code_count + codes
+		# The flat order is module-major, so the smallest flat index of a passage
+		# is its first appearance at the first module that retrieved it.
+		unique_row_codes, first_index, inverse = np.unique(
+			row_codes, return_index=True, return_inverse=True
+		)
+		unique_rows = unique_row_codes // code_count
+		slot_order = np.lexsort((first_index, unique_rows))
+		slot_of_unique = np.empty_like(slot_order)
+		slot_of_unique[slot_order] = np.arange(len(slot_order))
+
+		self.slot_count = len(slot_order)
+		self.slot_rows = unique_rows[slot_order]
+		self.slot_codes = (unique_row_codes % code_count)[slot_order]
+		entry_slots = slot_of_unique[inverse]
+		module_ends = np.cumsum([len(module_scores) for module_scores in self.scores])
+		self.entry_slots = np.split(entry_slots, module_ends[:-1])
+
+	def normalize(
+		self, module_index: int, normalize_func: Callable, fixed_min_value: float
+	) -> np.ndarray:
+		"""
+		Normalize the scores of each query of a module.
+		The queries with the same number of passages are normalized at once,
+		so the result is the same as normalizing each list of scores.
+
+		:param module_index: The index of the target module.
+		:param normalize_func: The normalize function that works at the last axis.
+		:param fixed_min_value: The theoretical minimum value for the normalize function.
+		:return: The flat normalized scores of the module.
+		"""
+		module_scores = self.scores[module_index]
+		lengths = self.lengths[module_index]
+		offsets = self.offsets[module_index]
+		result = np.empty_like(module_scores)
+		for length in np.unique(lengths):
+			if length == 0:
+				continue
+			indices = offsets[lengths == length][:, np.newaxis] + np.arange(length)
+			result[indices] = normalize_func(module_scores[indices], fixed_min_value)
+		return result
+
+	def deduplicate(
+		self, module_index: int, values: np.ndarray
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Assign the values of a module to the slots.
+		When a module retrieved the same passage twice, the last value is used.
+
+		:param module_index: The index of the target module.
+		:param values: The flat values of the module.
+		:return: The unique slots and the values of them.
+		"""
+		entry_slots = self.entry_slots[module_index]
+		_, last_index = np.unique(entry_slots[::-1], return_index=True)
+		last_index = len(entry_slots) - 1 - last_index
+		return entry_slots[last_index], values[last_index]
+
+	def rank(self, slots: np.ndarray, values: np.ndarray) -> np.ndarray:
+		"""
+		Rank the deduplicated values in each query in descending order with the minimum rank of the ties.
+		The NaN values get the rank zero.
+
+		:param slots: The unique slots of a module.
+		:param values: The values of the slots.
+		:return: The ranks of the slots, starting from 1.
+		"""
+		rows = self.slot_rows[slots]
+		order = np.lexsort((-values, rows))
+		sorted_rows = rows[order]
+		sorted_values = values[order]
+		positions = np.arange(len(order))
+		new_row = np.ones(len(order), dtype=bool)
+		new_row[1:] = sorted_rows[1:] != sorted_rows[:-1]
+		new_run = new_row.copy()
+		new_run[1:] |= sorted_values[1:] != sorted_values[:-1]
+		row_start = np.maximum.accumulate(np.where(new_row, positions, 0))
+		run_start = np.maximum.accumulate(np.where(new_run, positions, 0))
+		ranks = np.empty(len(order), dtype=np.float64)
+		ranks[order] = run_start - row_start + 1
+		ranks[np.isnan(values)] = 0
+		return ranks
+
+	def select_top_k(
+		self, fused_scores: np.ndarray, top_k: int
+	) -> Tuple[List[List[str]], List[List[float]]]:
+		"""
+		Select the top_k passages of each query with the fused scores.
+		The order is the same as the descending `sort_values` of pandas with each query,
+		including the order of the ties, and the NaN scores go last.
+
+		:param fused_scores: The fused scores of all slots.
+		:param top_k: The number of passages to be retrieved.
+		:return: The ids and the fused scores of each query.
+		"""
+		top_codes, top_scores, result_counts = self.select_top_k_codes(
+			fused_scores[np.newaxis], top_k
+		)
+		top_ids = np.asarray(self.uniques, dtype=object)[top_codes[0]]
+		return (
+			[
+				row_ids[:count]
+				for row_ids, count in zip(top_ids.tolist(), result_counts)
+			],
+			[
+				row_scores[:count]
+				for row_scores, count in zip(top_scores[0].tolist(), result_counts)
+			],
+		)
+
+	def select_top_k_codes(
+		self, fused_scores: np.ndarray, top_k: int
+	) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+		"""
+		Select the top_k passages of each query for several fused scores at once,
+		like the fused scores of every weight candidate.
+		The order of each fused scores is the same as `select_top_k`.
+
+		:param fused_scores: The fused scores with the shape of (fusion count, slot count).
+		:param top_k: The number of passages to be retrieved.
+		:return: The id codes and the scores of the top_k passages with the shape of
+			(fusion count, row count, top_k), and the number of retrieved passages of each query.
+			The id codes are the indices of `uniques`.
+		"""
+		fusion_count = len(fused_scores)
+		slot_counts = np.bincount(self.slot_rows, minlength=self.row_count)
+		row_starts = np.concatenate([[0], np.cumsum(slot_counts)[:-1]]).astype(np.int64)
+		width = int(slot_counts.max()) if self.row_count > 0 else 0
+		padded_scores = np.full((fusion_count, self.row_count, width), np.nan)
+		padded_codes = np.zeros((self.row_count, width), dtype=np.int64)
+		columns = np.arange(self.slot_count) - row_starts[self.slot_rows]
+		padded_scores[:, self.slot_rows, columns] = fused_scores
+		padded_codes[self.slot_rows, columns] = self.slot_codes
+		padded_scores = padded_scores.reshape(fusion_count * self.row_count, width)
+
+		# The non-NaN scores first, keeping the slot order.
+		positions = np.argsort(np.isnan(padded_scores), axis=1, kind="stable")
+		valid_counts = np.count_nonzero(~np.isnan(padded_scores), axis=1)
+		order = positions.copy()
+		for valid_count in np.unique(valid_counts):
+			if valid_count == 0:
+				continue
+			rows = np.nonzero(valid_counts == valid_count)[0]
+			row_positions = positions[rows, :valid_count]
+			# Same steps as pandas nargsort with ascending=False.
+			reversed_scores = np.ascontiguousarray(
+				np.take_along_axis(padded_scores[rows], row_positions, axis=1)[:, ::-1]
+			)
+			indexer = (valid_count - 1 - np.argsort(reversed_scores, axis=1))[:, ::-1]
+			order[rows, :valid_count] = np.take_along_axis(row_positions, indexer, axis=1)
+		order = order[:, :top_k]
+		top_scores = np.take_along_axis(padded_scores, order, axis=1)
+		top_codes = np.take_along_axis(
+			np.tile(padded_codes, (fusion_count, 1)), order, axis=1
+		)
+		result_shape = (fusion_count, self.row_count, order.shape[1])
+		return (
+			top_codes.reshape(result_shape),
+			top_scores.reshape(result_shape),
+			np.minimum(slot_counts, top_k).tolist(),
+		)
+
+
 def cast_queries(queries: Union[str, List[str]]) -> List[str]:
 	if isinstance(queries, str):
 		return [queries]
@@ -125,3 +366,8 @@ def evenly_distribute_passages(
 def get_bm25_pkl_name(bm25_tokenizer: str):
 	bm25_tokenizer = bm25_tokenizer.replace("/", "")
 	return f"bm25_{bm25_tokenizer}.pkl"
+
+
+def get_bm25_index_name(bm25_tokenizer: str):
+	bm25_tokenizer = bm25_tokenizer.replace("/", "")
+	return f"bm25_{bm25_tokenizer}"
@@ -1,33 +1,84 @@
-import asyncio
+import functools
+import logging
+import math
 import os
 import pickle
 import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from typing import List, Dict, Tuple, Callable, Union, Iterable, Optional
 
 import numpy as np
 import pandas as pd
 from llama_index.core.indices.keyword_table.utils import simple_extract_keywords
 from nltk import PorterStemmer
-from rank_bm25 import BM25Okapi
 from transformers import AutoTokenizer, PreTrainedTokenizerBase
 
 from autorag.nodes.retrieval.base import (
 	evenly_distribute_passages,
 	BaseRetrieval,
 	get_bm25_pkl_name,
+	get_bm25_index_name,
 )
+from autorag.nodes.retrieval.bm25_index import (
+	BM25SegmentedIndex,
+	is_bm25_index,
+	make_tmp_index_dir,
+	rename_index_into_place,
+)
+from autorag.result_cache import path_version
 from autorag.utils import validate_corpus_dataset, fetch_contents
 from autorag.utils.util import (
-	get_event_loop,
 	normalize_string,
 	result_to_dataframe,
 	pop_params,
 )
 
+logger = logging.getLogger("AutoRAG")
+
+
+@functools.lru_cache(maxsize=1)
+def load_kiwi():
+	from kiwipiepy import Kiwi
+
+	# analyze the batch of texts with all cores
+	return Kiwi(num_workers=-1)
+
+
+@functools.lru_cache(maxsize=1)
+def load_kkma():
+	from konlpy.tag import Kkma
+
+	return Kkma()
+
+
+@functools.lru_cache(maxsize=1)
+def load_okt():
+	from konlpy.tag import Okt
+
+	return Okt()
+
+
+@functools.lru_cache(maxsize=1)
+def load_sudachipy():
+	from sudachipy import dictionary
+
+	return dictionary.Dictionary(dict="core").create()
+
+
+_porter_stemmer = PorterStemmer()
+
+
+@functools.lru_cache(maxsize=2**18)
+def porter_stem(word: str) -> str:
+	# Stemming is the slowest part of the porter_stemmer tokenizer and the words repeat a lot.
+	return _porter_stemmer.stem(word)
+
 
 def tokenize_ko_kiwi(texts: List[str]) -> List[List[str]]:
 	try:
-		from kiwipiepy import Kiwi, Token
+		from kiwipiepy import Token
 	except ImportError:
 		raise ImportError(
 			"You need to install kiwipiepy to use 'ko_kiwi' tokenizer. "
@@ -35,49 +86,50 @@ def tokenize_ko_kiwi(texts: List[str]) -> List[List[str]]:
 			"Or install Korean version of AutoRAG by running 'pip install AutoRAG[ko]'."
 		)
 	texts = list(map(lambda x: x.strip().lower(), texts))
-	kiwi = Kiwi()
+	kiwi = load_kiwi()
 	tokenized_list: Iterable[List[Token]] = kiwi.tokenize(texts)
 	return [list(map(lambda x: x.form, token_list)) for token_list in tokenized_list]
 
 
 def tokenize_ko_kkma(texts: List[str]) -> List[List[str]]:
 	try:
-		from konlpy.tag import Kkma
+		import konlpy  # noqa: F401
 	except ImportError:
 		raise ImportError(
 			"You need to install konlpy to use 'ko_kkma' tokenizer. "
 			"Please install konlpy by running 'pip install konlpy'. "
 			"Or install Korean version of AutoRAG by running 'pip install AutoRAG[ko]'."
 		)
-	tokenizer = Kkma()
+	tokenizer = load_kkma()
+	# konlpy has no batch API, so the batch is tokenized text by text.
+	# The large batches are split to the process pool by tokenize_texts.
 	tokenized_list: List[List[str]] = list(map(lambda x: tokenizer.morphs(x), texts))
 	return tokenized_list
 
 
 def tokenize_ko_okt(texts: List[str]) -> List[List[str]]:
 	try:
-		from konlpy.tag import Okt
+		import konlpy  # noqa: F401
 	except ImportError:
 		raise ImportError(
 			"You need to install konlpy to use 'ko_kkma' tokenizer. "
 			"Please install konlpy by running 'pip install konlpy'. "
 			"Or install Korean version of AutoRAG by running 'pip install AutoRAG[ko]'."
 		)
-	tokenizer = Okt()
+	tokenizer = load_okt()
+	# konlpy has no batch API, so the batch is tokenized text by text.
+	# The large batches are split to the process pool by tokenize_texts.
 	tokenized_list: List[List[str]] = list(map(lambda x: tokenizer.morphs(x), texts))
 	return tokenized_list
 
 
 def tokenize_porter_stemmer(texts: List[str]) -> List[List[str]]:
-	def tokenize_remove_stopword(text: str, stemmer) -> List[str]:
+	def tokenize_remove_stopword(text: str) -> List[str]:
 		text = text.lower()
 		words = list(simple_extract_keywords(text))
-		return [stemmer.stem(word) for word in words]
+		return [porter_stem(word) for word in words]
 
-	stemmer = PorterStemmer()
-	tokenized_list: List[List[str]] = list(
-		map(lambda x: tokenize_remove_stopword(x, stemmer), texts)
-	)
+	tokenized_list: List[List[str]] = list(map(tokenize_remove_stopword, texts))
 	return tokenized_list
 
 
@@ -99,15 +151,15 @@ def load_bm25_corpus(bm25_path: str) -> Dict:
 
 def tokenize_ja_sudachipy(texts: List[str]) -> List[List[str]]:
 	try:
-		from sudachipy import dictionary, tokenizer
+		from sudachipy import tokenizer
 	except ImportError:
 		raise ImportError(
 			"You need to install SudachiPy to use 'sudachipy' tokenizer. "
 			"Please install SudachiPy by running 'pip install sudachipy'."
 		)
 
-	# Initialize SudachiPy with the default tokenizer
-	tokenizer_obj = dictionary.Dictionary(dict="core").create()
+	# Reuse the SudachiPy tokenizer, because loading the dictionary is slow
+	tokenizer_obj = load_sudachipy()
 
 	# Choose the tokenizer mode: NORMAL, SEARCH, A
 	mode = tokenizer.Tokenizer.SplitMode.A
@@ -129,9 +181,50 @@ BM25_TOKENIZER = {
 	"ko_okt": tokenize_ko_okt,
 	"sudachipy": tokenize_ja_sudachipy,
 }
+# The tokenizers that use multiple threads by themselves. They are not run at the process pool.
+BM25_MULTITHREADED_TOKENIZERS = ["ko_kiwi"]
+
+
+class BM25Tokenizer:
+	def __init__(
+		self,
+		name: str,
+		tokenize_fn: Callable[[List[str]], List[List[Union[int, str]]]],
+		multithreaded: bool = False,
+	):
+		"""
+		The batch tokenizer of the BM25.
+		Each backend tokenizes a list of texts at once with its batch API,
+		like the huggingface tokenizer call or the Kiwi tokenize with multiple texts.
+
+		:param name: The tokenizer name that is saved at the bm25 index.
+		:param tokenize_fn: The function that tokenizes a list of texts.
+		:param multithreaded: Whether the backend uses multiple threads by itself.
+		    Default is False.
+		"""
+		self.name = name
+		self.tokenize_fn = tokenize_fn
+		self.multithreaded = multithreaded
+
+	def tokenize_batch(self, texts: List[str]) -> List[List[Union[int, str]]]:
+		"""
+		Tokenize the texts at once.
+
+		:param texts: The list of texts to tokenize.
+		:return: 2-d list of tokens.
+		"""
+		if len(texts) == 0:
+			return []
+		return self.tokenize_fn(list(texts))
+
+	def __call__(self, texts: List[str]) -> List[List[Union[int, str]]]:
+		return self.tokenize_batch(texts)
 
 
 class BM25(BaseRetrieval):
+	instance_cache_params = ("bm25_tokenizer",)
+	prefix_stable = True
+
 	def __init__(self, project_dir: str, *args, **kwargs):
 		"""
 		Initialize BM25 module.
@@ -150,25 +243,31 @@ class BM25(BaseRetrieval):
 		bm25_tokenizer = kwargs.get("bm25_tokenizer", None)
 		if bm25_tokenizer is None:
 			bm25_tokenizer = "porter_stemmer"
-		bm25_path = os.path.join(self.resources_dir, get_bm25_pkl_name(bm25_tokenizer))
-
-		assert (
-			bm25_path is not None
-		), "bm25_path must be specified for using bm25 retrieval."
-		assert os.path.exists(
-			bm25_path
-		), f"bm25_path {bm25_path} does not exist. Please ingest first."
-
-		self.bm25_corpus = load_bm25_corpus(bm25_path)
-		assert (
-			"tokens" and "passage_id" in list(self.bm25_corpus.keys())
-		), "bm25_corpus must contain tokens and passage_id. Please check you ingested bm25 corpus correctly."
+		bm25_path = os.path.join(
+			self.resources_dir, get_bm25_index_name(bm25_tokenizer)
+		)
+		assert is_bm25_index(bm25_path), (
+			f"bm25_path {bm25_path} does not exist. Please ingest first. "
+			f"The legacy bm25 pickle corpus is migrated to the bm25 index at the ingestion."
+		)
+
+		self.bm25_instance = BM25SegmentedIndex(bm25_path)
 		self.tokenizer = select_bm25_tokenizer(bm25_tokenizer)
-		assert self.bm25_corpus["tokenizer_name"] == bm25_tokenizer, (
-			f"The bm25 corpus tokenizer is {self.bm25_corpus['tokenizer_name']}, but your input is {bm25_tokenizer}. "
-			f"You need to ingest again. Delete bm25 pkl file and re-ingest it."
+		assert self.bm25_instance.tokenizer_name == bm25_tokenizer, (
+			f"The bm25 corpus tokenizer is {self.bm25_instance.tokenizer_name}, but your input is {bm25_tokenizer}. "
+			f"You need to ingest again. Delete bm25 index directory and re-ingest it."
 		)
-		self.bm25_instance = BM25Okapi(self.bm25_corpus["tokens"])
+
+	@classmethod
+	def result_cache_versions(cls, project_dir, *args, **kwargs) -> Dict[str, str]:
+		bm25_tokenizer = kwargs.get("bm25_tokenizer", None) or "porter_stemmer"
+		return {
+			"bm25": path_version(
+				os.path.join(
+					project_dir, "resources", get_bm25_index_name(bm25_tokenizer)
+				)
+			)
+		}
 
 	@result_to_dataframe(["retrieved_contents", "retrieved_ids", "retrieve_scores"])
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
@@ -183,10 +282,12 @@ class BM25(BaseRetrieval):
 		queries: List[List[str]],
 		top_k: int,
 		ids: Optional[List[List[str]]] = None,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
 	) -> Tuple[List[List[str]], List[List[float]]]:
 		"""
 		BM25 retrieval function.
-		You have to load a pickle file that is already ingested.
+		You have to load a bm25 index that is already ingested.
 
 		:param queries: 2-d list of query strings.
 		    Each element of the list is a query strings of each row.
@@ -194,9 +295,20 @@ class BM25(BaseRetrieval):
 		:param ids: The optional list of ids that you want to retrieve.
 		    You don't need to specify this in the general use cases.
 		    Default is None.
+		:param k1: The BM25 k1 parameter, which controls the term frequency saturation.
+		    It is applied at the scoring time, so you don't need to ingest again to change it.
+		    Default is None, which means the k1 of the bm25 index (1.5).
+		:param b: The BM25 b parameter, which controls the document length normalization.
+		    It is applied at the scoring time, so you don't need to ingest again to change it.
+		    Default is None, which means the b of the bm25 index (0.75).
 		:return: The 2-d list contains a list of passage ids that retrieved from bm25 and 2-d list of its scores.
 		    It will be a length of queries. And each element has a length of top_k.
 		"""
+		if k1 is not None and k1 < 0:
+			raise ValueError(f"k1 must be non-negative, but got {k1}.")
+		if b is not None and not 0 <= b <= 1:
+			raise ValueError(f"b must be between 0 and 1, but got {b}.")
+
 		if ids is not None:
 			score_result = list(
 				map(
@@ -205,7 +317,8 @@ class BM25(BaseRetrieval):
 						id_list,
 						self.tokenizer,
 						self.bm25_instance,
-						self.bm25_corpus,
+						k1=k1,
+						b=b,
 					),
 					queries,
 					ids,
@@ -213,26 +326,75 @@ class BM25(BaseRetrieval):
 			)
 			return ids, score_result
 
-		# run async bm25_pure function
-		tasks = [
-			bm25_pure(
-				input_queries,
-				top_k,
-				self.tokenizer,
-				self.bm25_instance,
-				self.bm25_corpus,
-			)
-			for input_queries in queries
-		]
-		loop = get_event_loop()
-		results = loop.run_until_complete(asyncio.gather(*tasks))
-		id_result = list(map(lambda x: x[0], results))
-		score_result = list(map(lambda x: x[1], results))
-		return id_result, score_result
+		return bm25_pure_batch(
+			queries, top_k, self.tokenizer, self.bm25_instance, k1=k1, b=b
+		)
+
+
+def bm25_pure_batch(
+	queries: List[List[str]],
+	top_k: int,
+	tokenizer,
+	bm25_api: BM25SegmentedIndex,
+	batch_size: int = 1024,
+	k1: Optional[float] = None,
+	b: Optional[float] = None,
+) -> Tuple[List[List[str]], List[List[float]]]:
+	"""
+	Batched BM25 retrieval function.
+	It tokenizes the queries of all rows at once and scores them with the sparse matrix product,
+	instead of scoring row by row.
+
+	:param queries: 2-d list of query strings.
+	    Each element of the list is a query strings of each row.
+	:param top_k: The number of passages to be retrieved.
+	:param tokenizer: A tokenizer that will be used to tokenize queries.
+	:param bm25_api: A bm25 index instance that will be used to retrieve passages.
+	:param batch_size: The number of queries to score at once. Default is 1024.
+	:param k1: The BM25 k1 parameter. Default is None, which means the k1 of the bm25 index.
+	:param b: The BM25 b parameter. Default is None, which means the b of the bm25 index.
+	:return: The 2-d list contains a list of passage ids that retrieved from bm25 and 2-d list of its scores.
+	"""
+	flat_queries = list(chain.from_iterable(queries))
+	tokenized_queries = (
+		tokenize_texts(flat_queries, tokenizer)
+		if isinstance(tokenizer, BM25Tokenizer)
+		else tokenize(flat_queries, tokenizer)
+	)
+	rows_list, scores_list = bm25_api.get_top_k_batch(
+		tokenized_queries, top_k, batch_size=batch_size, k1=k1, b=b
+	)
+	passage_ids = bm25_api.get_passage_ids(
+		np.concatenate([np.empty(0, dtype=np.int64)] + rows_list)
+	)
+
+	id_result, score_result = [], []
+	query_index, passage_index = 0, 0
+	for input_queries in queries:
+		row_ids, row_scores = [], []
+		for rows, scores in zip(
+			rows_list[query_index : query_index + len(input_queries)],
+			scores_list[query_index : query_index + len(input_queries)],
+		):
+			row_ids.append(passage_ids[passage_index : passage_index + len(rows)])
+			row_scores.append(scores.tolist())
+			passage_index += len(rows)
+		query_index += len(input_queries)
+		ids, scores = sort_bm25_result(
+			*evenly_distribute_passages(row_ids, row_scores, top_k)
+		)
+		id_result.append(ids)
+		score_result.append(scores)
+	return id_result, score_result
 
 
 async def bm25_pure(
-	queries: List[str], top_k: int, tokenizer, bm25_api: BM25Okapi, bm25_corpus: Dict
+	queries: List[str],
+	top_k: int,
+	tokenizer,
+	bm25_api: BM25SegmentedIndex,
+	k1: Optional[float] = None,
+	b: Optional[float] = None,
 ) -> Tuple[List[str], List[float]]:
 	"""
 	Async BM25 retrieval function.
@@ -241,16 +403,10 @@ async def bm25_pure(
 	:param queries: A list of query strings.
 	:param top_k: The number of passages to be retrieved.
 	:param tokenizer: A tokenizer that will be used to tokenize queries.
-	:param bm25_api: A bm25 api instance that will be used to retrieve passages.
-	:param bm25_corpus: A dictionary containing the bm25 corpus, which is doc_id from corpus and tokenized corpus.
-	    Its data structure looks like this:
-
-	    .. Code:: python
-
-	        {
-	            "tokens": [], # 2d list of tokens
-	            "passage_id": [], # 2d list of passage_id. Type must be str.
-	        }
+	:param bm25_api: A bm25 index instance that will be used to retrieve passages.
+	    It contains the passage_id of each document.
+	:param k1: The BM25 k1 parameter. Default is None, which means the k1 of the bm25 index.
+	:param b: The BM25 b parameter. Default is None, which means the b of the bm25 index.
 	:return: The tuple contains a list of passage ids that retrieved from bm25 and its scores.
 	"""
 	# I don't make queries operation to async, because queries length might be small, so it will occur overhead.
@@ -258,15 +414,19 @@ async def bm25_pure(
 	id_result = []
 	score_result = []
 	for query in tokenized_queries:
-		scores = bm25_api.get_scores(query)
-		sorted_scores = sorted(scores, reverse=True)
-		top_n_index = np.argsort(scores)[::-1][:top_k]
-		ids = [bm25_corpus["passage_id"][i] for i in top_n_index]
+		top_n_index, top_n_scores = bm25_api.get_top_k(query, top_k, k1=k1, b=b)
+		ids = bm25_api.get_passage_ids(top_n_index)
 		id_result.append(ids)
-		score_result.append(sorted_scores[:top_k])
+		score_result.append(top_n_scores.tolist())
 
 	# make a total result to top_k
 	id_result, score_result = evenly_distribute_passages(id_result, score_result, top_k)
+	return sort_bm25_result(id_result, score_result)
+
+
+def sort_bm25_result(
+	id_result: List[str], score_result: List[float]
+) -> Tuple[List[str], List[float]]:
 	# sort id_result and score_result by score
 	result = [
 		(_id, score)
@@ -282,22 +442,40 @@ def get_bm25_scores(
 	queries: List[str],
 	ids: List[str],
 	tokenizer,
-	bm25_api: BM25Okapi,
-	bm25_corpus: Dict,
+	bm25_api: BM25SegmentedIndex,
+	k1: Optional[float] = None,
+	b: Optional[float] = None,
 ) -> List[float]:
+	"""
+	Get the BM25 scores of the given passage ids only.
+	The score of each passage is the max score among the queries.
+
+	:param queries: A list of query strings.
+	:param ids: The passage ids to score.
+	:param tokenizer: A tokenizer that will be used to tokenize queries.
+	:param bm25_api: A bm25 index instance.
+	:param k1: The BM25 k1 parameter. Default is None, which means the k1 of the bm25 index.
+	:param b: The BM25 b parameter. Default is None, which means the b of the bm25 index.
+	:return: The scores of the passage ids.
+	"""
 	if len(ids) == 0 or not bool(ids):
 		return []
 	tokenized_queries = tokenize(queries, tokenizer)
-	result_dict = {id_: [] for id_ in ids}
-	for query in tokenized_queries:
-		scores = bm25_api.get_scores(query)
-		for i, id_ in enumerate(ids):
-			result_dict[id_].append(scores[bm25_corpus["passage_id"].index(id_)])
-	result_df = pd.DataFrame(result_dict)
-	return result_df.max(axis=0).tolist()
+	if len(tokenized_queries) == 0:
+		return [0.0] * len(ids)
+	rows = bm25_api.find_rows(ids)
+	scores = np.stack(
+		[
+			bm25_api.get_batch_scores(query, rows, k1=k1, b=b)
+			for query in tokenized_queries
+		]
+	)
+	return scores.max(axis=0).tolist()
 
 
 def tokenize(queries: List[str], tokenizer) -> List[List[int]]:
+	if isinstance(tokenizer, BM25Tokenizer):
+		return tokenizer.tokenize_batch(queries)
 	if isinstance(tokenizer, PreTrainedTokenizerBase):
 		tokenized_queries = tokenizer(queries).input_ids
 	else:
@@ -306,60 +484,211 @@ def tokenize(queries: List[str], tokenizer) -> List[List[int]]:
 
 
 def bm25_ingest(
-	corpus_path: str, corpus_data: pd.DataFrame, bm25_tokenizer: str = "porter_stemmer"
+	corpus_path: str,
+	corpus_data: pd.DataFrame,
+	bm25_tokenizer: str = "porter_stemmer",
+	merge_factor: int = 10,
+	background: bool = False,
 ):
-	if not corpus_path.endswith(".pkl"):
-		raise ValueError(f"Corpus path {corpus_path} is not a pickle file.")
+	"""
+	Ingest given corpus data to the bm25 index.
+	The bm25 index is a directory of immutable segments, and the new passages are written as a new segment.
+	So, it does not rewrite the existing documents.
+	If there is a document id that already exists in the index, it will be ignored.
+	After ingestion, the small segments are merged by the size-tiered merge policy.
+
+	:param corpus_path: The bm25 index directory path.
+	    When the index does not exist and the legacy pickle corpus (``<corpus_path>.pkl``) exists,
+	    the pickle corpus is migrated to the index first.
+	    The legacy pickle path (``.pkl``) is deprecated.
+	    It is mapped to the directory path without the extension.
+	:param corpus_data: The corpus data that contains doc_id and contents columns.
+	:param bm25_tokenizer: The tokenizer name that is used to the BM25.
+	    Default is porter_stemmer.
+	:param merge_factor: The number of segments of the same size tier to merge at once.
+	    Default is 10.
+	:param background: Whether to merge the segments at a background thread.
+	    Use `wait_for_merges` to wait for the background merges.
+	    Default is False.
+	"""
+	if corpus_path.endswith(".pkl"):
+		logger.warning(
+			f"The bm25 pickle corpus path {corpus_path} is deprecated. "
+			f"The bm25 index is saved at the directory {os.path.splitext(corpus_path)[0]} instead."
+		)
+		corpus_path = os.path.splitext(corpus_path)[0]
 	validate_corpus_dataset(corpus_data)
-	ids = corpus_data["doc_id"].tolist()
-
-	# Initialize bm25_corpus
-	bm25_corpus = pd.DataFrame()
-
-	# Load the BM25 corpus if it exists and get the passage ids
-	if os.path.exists(corpus_path) and os.path.getsize(corpus_path) > 0:
-		with open(corpus_path, "rb") as r:
-			corpus = pickle.load(r)
-			bm25_corpus = pd.DataFrame.from_dict(corpus)
-		duplicated_passage_rows = bm25_corpus[bm25_corpus["passage_id"].isin(ids)]
-		new_passage = corpus_data[
-			~corpus_data["doc_id"].isin(duplicated_passage_rows["passage_id"])
-		]
-	else:
-		new_passage = corpus_data
+
+	pkl_path = f"{corpus_path}.pkl"
+	if not is_bm25_index(corpus_path) and os.path.exists(pkl_path):
+		migrate_bm25_pkl(pkl_path, corpus_path)
+	bm25_index = BM25SegmentedIndex.open(corpus_path, bm25_tokenizer)
+	new_passage = corpus_data[
+		~corpus_data["doc_id"].isin(bm25_index.passage_ids.tolist())
+	]
 
 	if not new_passage.empty:
-		tokenizer = select_bm25_tokenizer(bm25_tokenizer)
-		if isinstance(tokenizer, PreTrainedTokenizerBase):
-			tokenized_corpus = tokenizer(new_passage["contents"].tolist()).input_ids
-		else:
-			tokenized_corpus = tokenizer(new_passage["contents"].tolist())
-		new_bm25_corpus = pd.DataFrame(
-			{
-				"tokens": tokenized_corpus,
-				"passage_id": new_passage["doc_id"].tolist(),
-			}
+		tokenized_corpus = tokenize_corpus(
+			new_passage["contents"].tolist(), bm25_tokenizer
 		)
+		bm25_index.add(tokenized_corpus, new_passage["doc_id"].tolist())
+		bm25_index.maybe_merge(merge_factor=merge_factor, background=background)
 
-		if not bm25_corpus.empty:
-			bm25_corpus_updated = pd.concat(
-				[bm25_corpus, new_bm25_corpus], ignore_index=True
-			)
-			bm25_dict = bm25_corpus_updated.to_dict("list")
-		else:
-			bm25_dict = new_bm25_corpus.to_dict("list")
 
-		# add tokenizer name to bm25_dict
-		bm25_dict["tokenizer_name"] = bm25_tokenizer
+def bm25_delete(corpus_path: str, ids: List[str], background: bool = False) -> int:
+	"""
+	Delete the passages from the bm25 index.
+	The passages are marked as deleted, and they are removed from the files when the segments are merged.
+
+	:param corpus_path: The bm25 index directory path.
+	:param ids: The passage ids to delete.
+	:param background: Whether to merge the segments at a background thread.
+	    Use `wait_for_merges` to wait for the background merges.
+	    Default is False.
+	:return: The number of deleted passages.
+	"""
+	if not is_bm25_index(corpus_path):
+		raise FileNotFoundError(f"BM25 index {corpus_path} does not exist.")
+	bm25_index = BM25SegmentedIndex(corpus_path)
+	deleted_count = bm25_index.delete(ids)
+	bm25_index.maybe_merge(background=background)
+	return deleted_count
 
-		with open(corpus_path, "wb") as w:
-			pickle.dump(bm25_dict, w)
 
+def migrate_bm25_pkl(pkl_path: str, index_path: str):
+	"""
+	Convert the legacy bm25 pickle corpus to the bm25 index directory.
+	The index is built at a temporary directory and renamed into place,
+	so an interrupted migration does not leave a broken index.
+	If another process migrated it first, its index is kept.
 
-def select_bm25_tokenizer(
-	bm25_tokenizer: str,
-) -> Callable[[str], List[Union[int, str]]]:
-	if bm25_tokenizer in list(BM25_TOKENIZER.keys()):
-		return BM25_TOKENIZER[bm25_tokenizer]
+	:param pkl_path: The legacy bm25 pickle file path.
+	:param index_path: The bm25 index directory path to save.
+	"""
+	logger.info(f"Migrating legacy bm25 corpus {pkl_path} to {index_path}...")
+	bm25_corpus = load_bm25_corpus(pkl_path)
+	assert (
+		"tokens" in bm25_corpus.keys() and "passage_id" in bm25_corpus.keys()
+	), "bm25_corpus must contain tokens and passage_id. Please check you ingested bm25 corpus correctly."
+	tmp_dir = make_tmp_index_dir(index_path)
+	try:
+		tmp_index_path = os.path.join(tmp_dir, "index")
+		BM25SegmentedIndex.create(tmp_index_path, bm25_corpus["tokenizer_name"]).add(
+			bm25_corpus["tokens"], bm25_corpus["passage_id"]
+		)
+		rename_index_into_place(tmp_index_path, index_path)
+	except FileExistsError:
+		logger.info(f"bm25 index {index_path} is already migrated.")
+	finally:
+		shutil.rmtree(tmp_dir, ignore_errors=True)
 
+
+@functools.lru_cache(maxsize=16)
+def select_bm25_tokenizer(bm25_tokenizer: str) -> BM25Tokenizer:
+	"""
+	Get the batch tokenizer of the bm25 tokenizer name.
+
+	:param bm25_tokenizer: The tokenizer name at the BM25_TOKENIZER, or the huggingface tokenizer name.
+	:return: The BM25Tokenizer instance.
+	"""
+	if bm25_tokenizer in BM25_TOKENIZER.keys():
+		return BM25Tokenizer(
+			bm25_tokenizer,
+			BM25_TOKENIZER[bm25_tokenizer],
+			multithreaded=bm25_tokenizer in BM25_MULTITHREADED_TOKENIZERS,
+		)
+
+	huggingface_tokenizer = load_huggingface_tokenizer(bm25_tokenizer)
+	return BM25Tokenizer(
+		bm25_tokenizer, lambda texts: huggingface_tokenizer(texts).input_ids
+	)
+
+
+@functools.lru_cache(maxsize=8)
+def load_huggingface_tokenizer(bm25_tokenizer: str) -> PreTrainedTokenizerBase:
 	return AutoTokenizer.from_pretrained(bm25_tokenizer, use_fast=False)
+
+
+def tokenize_texts(
+	texts: List[str],
+	bm25_tokenizer: Union[str, BM25Tokenizer],
+	chunk_size: int = 10_000,
+	num_workers: Optional[int] = None,
+	min_chunk_size: int = 512,
+) -> List[List[Union[int, str]]]:
+	"""
+	Tokenize the texts with the batch tokenizer.
+	The texts are split into the chunks of at most chunk_size texts,
+	and the chunks are tokenized in parallel with the process pool.
+	When there are enough texts, they are split into at least num_workers chunks,
+	so the texts fewer than the chunk_size are tokenized in parallel too.
+	Each worker process loads the tokenizer once and reuses it for all chunks.
+	The multithreaded tokenizers (ko_kiwi) tokenize the chunks in the current process.
+
+	:param texts: The list of texts to tokenize.
+	:param bm25_tokenizer: The tokenizer name that is used to the BM25, or the BM25Tokenizer instance.
+	:param chunk_size: The max number of texts that a worker tokenizes at once.
+	    Default is 10,000.
+	:param num_workers: The number of worker processes.
+	    Default is None, which uses the cpu count.
+	:param min_chunk_size: The min number of texts of a chunk,
+	    because starting a worker costs more than tokenizing a few texts.
+	    Default is 512.
+	:return: 2-d list of tokens.
+	"""
+	tokenizer = (
+		select_bm25_tokenizer(bm25_tokenizer)
+		if isinstance(bm25_tokenizer, str)
+		else bm25_tokenizer
+	)
+	num_workers = num_workers or os.cpu_count() or 1
+	chunk_count = max(
+		math.ceil(len(texts) / chunk_size),
+		min(num_workers, len(texts) // max(min_chunk_size, 1)),
+	)
+	if chunk_count <= 1 or num_workers <= 1 or tokenizer.multithreaded:
+		return list(
+			chain.from_iterable(
+				tokenizer.tokenize_batch(texts[i : i + chunk_size])
+				for i in range(0, len(texts), chunk_size)
+			)
+		)
+
+	chunk_length = math.ceil(len(texts) / chunk_count)
+	chunks = [
+		texts[i : i + chunk_length] for i in range(0, len(texts), chunk_length)
+	]
+	with ProcessPoolExecutor(max_workers=min(num_workers, len(chunks))) as executor:
+		results = executor.map(tokenize_batch, chunks, [tokenizer.name] * len(chunks))
+		return list(chain.from_iterable(results))
+
+
+def tokenize_corpus(
+	texts: List[str],
+	bm25_tokenizer: str,
+	batch_size: int = 10_000,
+	num_workers: Optional[int] = None,
+) -> List[List[Union[int, str]]]:
+	"""
+	Tokenize the corpus contents with the bm25 tokenizer.
+	It is the same as `tokenize_texts` with the batch_size as the chunk size.
+
+	:param texts: The list of contents to tokenize.
+	:param bm25_tokenizer: The tokenizer name that is used to the BM25.
+	:param batch_size: The max number of texts that a worker tokenizes at once.
+	    Default is 10,000.
+	:param num_workers: The number of worker processes.
+	    Default is None, which uses the cpu count.
+	:return: 2-d list of tokens.
+	"""
+	return tokenize_texts(
+		texts,
+		bm25_tokenizer,
+		chunk_size=batch_size,
+		num_workers=num_workers,
+		min_chunk_size=min(batch_size, 512),
+	)
+
+
+def tokenize_batch(texts: List[str], bm25_tokenizer: str) -> List[List[Union[int, str]]]:
+	return select_bm25_tokenizer(bm25_tokenizer).tokenize_batch(texts)
@@ -0,0 +1,1372 @@
+import json
+import math
+import os
+import shutil
+import threading
+import uuid
+from copy import deepcopy
+from typing import List, Tuple, Union, Optional, Callable, Dict
+
+import numpy as np
+from scipy import sparse
+
+BM25_INDEX_FORMAT_VERSION = 1
+BM25_INDEX_META_FILENAME = "meta.json"
+BM25_INDEX_ARRAY_NAMES = [
+	"vocab",
+	"indptr",
+	"postings",
+	"term_freqs",
+	"doc_lens",
+	"idf",
+	"passage_ids",
+]
+
+
+class BM25Index:
+	def __init__(
+		self,
+		vocab: np.ndarray,
+		indptr: np.ndarray,
+		postings: np.ndarray,
+		term_freqs: np.ndarray,
+		doc_lens: np.ndarray,
+		idf: np.ndarray,
+		passage_ids: Optional[np.ndarray] = None,
+		k1: float = 1.5,
+		b: float = 0.75,
+		epsilon: float = 0.25,
+		avgdl: Optional[float] = None,
+		tokenizer_name: Optional[str] = None,
+	):
+		"""
+		Inverted-index BM25 engine.
+		The index is a CSR-style (compressed sparse row) posting list.
+		The postings of the term ``vocab[i]`` are stored at ``postings[indptr[i]:indptr[i + 1]]``,
+		sorted by the document row, and ``term_freqs`` holds the term frequency of each posting.
+		The scores are the same as `rank_bm25.BM25Okapi`,
+		but only the documents that contain at least one query term are scored.
+
+		:param vocab: The sorted vocabulary array. It can be a str or int array.
+		:param indptr: The offsets of each term's postings. The length is ``len(vocab) + 1``.
+		:param postings: The document rows of each posting.
+		:param term_freqs: The term frequency of each posting.
+		:param doc_lens: The token length of each document.
+		:param idf: The idf value of each term in the vocabulary.
+		:param passage_ids: The passage id (doc_id) of each document row.
+		    Default is None, which means the document rows are used as ids.
+		:param k1: The BM25 k1 parameter. Default is 1.5.
+		:param b: The BM25 b parameter. Default is 0.75.
+		:param epsilon: The floor ratio of the idf that was used to compute the idf.
+		    Default is 0.25.
+		:param avgdl: The average document length.
+		    Default is None, which means it is computed from doc_lens.
+		:param tokenizer_name: The name of the tokenizer that made the tokens of this index.
+		"""
+		self.vocab = vocab
+		self.indptr = indptr
+		self.postings = postings
+		self.term_freqs = term_freqs
+		self.doc_lens = doc_lens
+		self.idf = idf
+		self.passage_ids = (
+			passage_ids if passage_ids is not None else np.arange(len(doc_lens))
+		)
+		self.k1 = k1
+		self.b = b
+		self.epsilon = epsilon
+		self.tokenizer_name = tokenizer_name
+		self.corpus_size = len(doc_lens)
+		if avgdl is None:
+			avgdl = float(np.mean(doc_lens)) if self.corpus_size > 0 else 0.0
+		self.avgdl = avgdl
+		self._id_order = None  # the passage id index, built at the first lookup
+
+	@classmethod
+	def from_tokens(
+		cls,
+		tokenized_corpus: List[List[Union[str, int]]],
+		passage_ids: Optional[List[str]] = None,
+		k1: float = 1.5,
+		b: float = 0.75,
+		epsilon: float = 0.25,
+		tokenizer_name: Optional[str] = None,
+	) -> "BM25Index":
+		"""
+		Build the index from the tokenized corpus.
+
+		:param tokenized_corpus: 2-d list of tokens. Each element is the tokens of a document.
+		:param passage_ids: The passage id of each document.
+		    Default is None, which means the document rows are used as ids.
+		:param k1: The BM25 k1 parameter. Default is 1.5.
+		:param b: The BM25 b parameter. Default is 0.75.
+		:param epsilon: The floor value of the idf, which is multiplied to the average idf.
+		    Same as `rank_bm25.BM25Okapi`. Default is 0.25.
+		:param tokenizer_name: The name of the tokenizer that made the tokens.
+		:return: The BM25Index instance.
+		"""
+		corpus_size = len(tokenized_corpus)
+		doc_lens = np.fromiter(
+			(len(doc) for doc in tokenized_corpus), dtype=np.int32, count=corpus_size
+		)
+
+		vocab_dict = {}
+		term_ids = np.fromiter(
+			(
+				vocab_dict.setdefault(token, len(vocab_dict))
+				for doc in tokenized_corpus
+				for token in doc
+			),
+			dtype=np.int64,
+			count=int(doc_lens.sum()),
+		)
+		vocab = np.array(list(vocab_dict.keys()))
+		vocab_size = len(vocab)
+
+		# re-assign term ids by the sorted vocabulary, so the query terms can be found by binary search
+		order = np.argsort(vocab, kind="stable")
+		rank = np.empty_like(order)
+		rank[order] = np.arange(vocab_size)
+		vocab = vocab[order]
+		term_ids = rank[term_ids] if vocab_size > 0 else term_ids
+
+		doc_rows = np.repeat(np.arange(corpus_size, dtype=np.int64), doc_lens)
+		keys, term_freqs = np.unique(
+			term_ids * max(corpus_size, 1) + doc_rows, return_counts=True
+		)
+		posting_terms = keys // max(corpus_size, 1)
+		postings = (keys % max(corpus_size, 1)).astype(np.int32)
+
+		indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+		np.cumsum(np.bincount(posting_terms, minlength=vocab_size), out=indptr[1:])
+
+		idf = compute_idf(np.diff(indptr), corpus_size, epsilon)
+		return cls(
+			vocab,
+			indptr,
+			postings,
+			term_freqs.astype(np.int32),
+			doc_lens,
+			idf,
+			passage_ids=np.array(passage_ids, dtype=str)
+			if passage_ids is not None
+			else None,
+			k1=k1,
+			b=b,
+			epsilon=epsilon,
+			tokenizer_name=tokenizer_name,
+		)
+
+	@classmethod
+	def merge(cls, indexes: List["BM25Index"]) -> "BM25Index":
+		"""
+		Merge several indexes into one index without re-tokenizing.
+		The documents are concatenated in the given order, and the idf is computed again.
+
+		:param indexes: The indexes to merge. They must be made by the same tokenizer.
+		:return: The merged BM25Index instance.
+		"""
+		if len(indexes) == 0:
+			raise ValueError("indexes must contain at least one index.")
+		first = indexes[0]
+		tokenizer_names = set(index.tokenizer_name for index in indexes)
+		if len(tokenizer_names) > 1:
+			raise ValueError(
+				f"Can't merge BM25 indexes with different tokenizers {tokenizer_names}."
+			)
+		vocabs = [index.vocab for index in indexes if index.vocab_size > 0]
+		if len(vocabs) > 0:
+			vocab, inverse = np.unique(np.concatenate(vocabs), return_inverse=True)
+		else:
+			vocab, inverse = first.vocab, np.empty(0, dtype=np.int64)
+		vocab_size = len(vocab)
+		corpus_size = sum(len(index.doc_lens) for index in indexes)
+
+		term_ids, rows, term_freqs = [], [], []
+		vocab_offset, row_offset = 0, 0
+		for index in indexes:
+			remap = inverse[vocab_offset : vocab_offset + index.vocab_size]
+			term_ids.append(np.repeat(remap, np.diff(index.indptr)))
+			rows.append(np.asarray(index.postings, dtype=np.int64) + row_offset)
+			term_freqs.append(np.asarray(index.term_freqs))
+			vocab_offset += index.vocab_size
+			row_offset += len(index.doc_lens)
+		term_ids = np.concatenate(term_ids)
+		rows = np.concatenate(rows)
+		order = np.argsort(term_ids * max(corpus_size, 1) + rows, kind="stable")
+
+		indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+		np.cumsum(np.bincount(term_ids, minlength=vocab_size), out=indptr[1:])
+		return cls(
+			vocab,
+			indptr,
+			rows[order].astype(np.int32),
+			np.concatenate(term_freqs)[order],
+			np.concatenate([index.doc_lens for index in indexes]),
+			compute_idf(np.diff(indptr), corpus_size, first.epsilon),
+			passage_ids=np.concatenate([index.passage_ids for index in indexes]),
+			k1=first.k1,
+			b=first.b,
+			epsilon=first.epsilon,
+			tokenizer_name=first.tokenizer_name,
+		)
+
+	def save(self, index_dir: str):
+		"""
+		Save the index to the directory.
+		Each array is saved as a ``.npy`` file, so it can be memory-mapped at loading.
+		It writes a new directory and swaps it, so the readers of the old index are not broken.
+
+		:param index_dir: The directory path to save the index.
+		"""
+		parent_dir = os.path.dirname(os.path.abspath(index_dir))
+		os.makedirs(parent_dir, exist_ok=True)
+		tmp_dir = os.path.join(parent_dir, f".tmp-{uuid.uuid4().hex}")
+		os.makedirs(tmp_dir)
+		for array_name in BM25_INDEX_ARRAY_NAMES:
+			np.save(
+				os.path.join(tmp_dir, f"{array_name}.npy"),
+				np.asarray(getattr(self, array_name)),
+			)
+		meta = {
+			"format_version": BM25_INDEX_FORMAT_VERSION,
+			"tokenizer_name": self.tokenizer_name,
+			"corpus_size": self.corpus_size,
+			"vocab_size": self.vocab_size,
+			"avgdl": self.avgdl,
+			"k1": self.k1,
+			"b": self.b,
+			"epsilon": self.epsilon,
+		}
+		with open(os.path.join(tmp_dir, BM25_INDEX_META_FILENAME), "w") as f:
+			json.dump(meta, f, indent=4)
+
+		if os.path.exists(index_dir):
+			old_dir = os.path.join(parent_dir, f".old-{uuid.uuid4().hex}")
+			os.rename(index_dir, old_dir)
+			os.rename(tmp_dir, index_dir)
+			shutil.rmtree(old_dir, ignore_errors=True)
+		else:
+			os.rename(tmp_dir, index_dir)
+
+	@classmethod
+	def load(cls, index_dir: str, mmap: bool = True) -> "BM25Index":
+		"""
+		Load the index from the directory.
+
+		:param index_dir: The directory path of the saved index.
+		:param mmap: Whether to memory-map the arrays.
+		    With memory-mapping, the loading time does not depend on the corpus size,
+		    and several processes can share the same pages of the index.
+		    Default is True.
+		:return: The BM25Index instance.
+		"""
+		meta = load_bm25_index_meta(index_dir)
+		if meta.get("format_version") != BM25_INDEX_FORMAT_VERSION:
+			raise ValueError(
+				f"BM25 index format version {meta.get('format_version')} is not supported. "
+				f"Please delete {index_dir} and ingest again."
+			)
+		arrays = {
+			array_name: np.load(
+				os.path.join(index_dir, f"{array_name}.npy"),
+				mmap_mode="r" if mmap else None,
+			)
+			for array_name in BM25_INDEX_ARRAY_NAMES
+		}
+		return cls(
+			**arrays,
+			k1=meta["k1"],
+			b=meta["b"],
+			epsilon=meta["epsilon"],
+			avgdl=meta["avgdl"],
+			tokenizer_name=meta["tokenizer_name"],
+		)
+
+	@property
+	def vocab_size(self) -> int:
+		return len(self.vocab)
+
+	def lookup(self, query: List[Union[str, int]]) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Find the term ids of the query tokens.
+		The tokens that are not in the vocabulary are ignored.
+
+		:param query: The list of query tokens.
+		:return: The unique term ids and the count of each term in the query.
+		"""
+		if len(query) == 0:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+		positions, found = search_vocab(self.vocab, np.asarray(query))
+		return np.unique(positions[found], return_counts=True)
+
+	def _gather(self, term_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Gather the postings of the given terms.
+
+		:return: The offsets of the gathered postings at the posting list and the length of each term's postings.
+		"""
+		starts = self.indptr[term_ids]
+		lengths = self.indptr[term_ids + 1] - starts
+		total = int(lengths.sum())
+		offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(
+			total, dtype=np.int64
+		)
+		return offsets, lengths
+
+	def score_terms(
+		self,
+		term_ids: np.ndarray,
+		weights: np.ndarray,
+		avgdl: Optional[float] = None,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Score only the documents that contain at least one of the given terms.
+
+		:param term_ids: The unique term ids of this index.
+		:param weights: The weight of each term, which is the idf multiplied by the query term count.
+		:param avgdl: The average document length to use.
+		    Default is None, which means the average document length of this index.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of this index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of this index.
+		:return: The candidate document rows (sorted) and their BM25 scores.
+		"""
+		if len(term_ids) == 0:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+		offsets, lengths = self._gather(term_ids)
+		rows = self.postings[offsets]
+		contributions = np.repeat(weights, lengths) * self.saturate(
+			self.term_freqs[offsets], self.doc_lens[rows], avgdl, k1, b
+		)
+		candidates, inverse = np.unique(rows, return_inverse=True)
+		scores = np.bincount(inverse, weights=contributions, minlength=len(candidates))
+		return candidates, scores
+
+	def score_rows(
+		self,
+		term_ids: np.ndarray,
+		weights: np.ndarray,
+		rows: np.ndarray,
+		avgdl: Optional[float] = None,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> np.ndarray:
+		"""
+		Score only the given document rows.
+		The term frequency of each row is found by binary search at the posting list of each term,
+		so it does not touch the other documents.
+
+		:param term_ids: The unique term ids of this index.
+		:param weights: The weight of each term, which is the idf multiplied by the query term count.
+		:param rows: The document rows to score.
+		:param avgdl: The average document length to use.
+		    Default is None, which means the average document length of this index.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of this index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of this index.
+		:return: The BM25 scores of the rows.
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		scores = np.zeros(len(rows), dtype=np.float64)
+		if len(rows) == 0:
+			return scores
+		doc_lens = self.doc_lens[rows]
+		for term_id, weight in zip(term_ids, weights):
+			start, end = self.indptr[term_id], self.indptr[term_id + 1]
+			term_postings = self.postings[start:end]
+			positions = np.searchsorted(term_postings, rows)
+			found = positions < len(term_postings)
+			found[found] = term_postings[positions[found]] == rows[found]
+			scores[found] += weight * self.saturate(
+				self.term_freqs[start + positions[found]], doc_lens[found], avgdl, k1, b
+			)
+		return scores
+
+	def saturate(
+		self,
+		term_freqs: np.ndarray,
+		doc_lens: np.ndarray,
+		avgdl: Optional[float] = None,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> np.ndarray:
+		"""
+		Compute the term frequency saturation part of BM25 from the stored term frequencies and document lengths.
+		It is the only part that depends on k1 and b, so the different k1 and b values can be scored
+		with the same index without re-indexing.
+		"""
+		avgdl = self.avgdl if avgdl is None else avgdl
+		k1 = self.k1 if k1 is None else k1
+		b = self.b if b is None else b
+		term_freqs = np.asarray(term_freqs, dtype=np.float64)
+		norms = k1 * (1 - b + b * np.asarray(doc_lens) / avgdl)
+		return term_freqs * (k1 + 1) / (term_freqs + norms)
+
+	def find_rows(self, passage_ids: List[str]) -> np.ndarray:
+		"""
+		Find the document rows of the passage ids.
+		The sorted passage id index is built at the first call, and each lookup is a binary search.
+
+		:param passage_ids: The passage ids to find.
+		:return: The document rows. It is -1 if the passage id does not exist.
+		"""
+		all_passage_ids = np.asarray(self.passage_ids)
+		if self._id_order is None:
+			self._id_order = np.argsort(all_passage_ids, kind="stable")
+		rows = np.full(len(passage_ids), -1, dtype=np.int64)
+		if self.corpus_size == 0 or len(passage_ids) == 0:
+			return rows
+		passage_ids = np.asarray(passage_ids)
+		sorted_ids = all_passage_ids[self._id_order]
+		positions = np.minimum(
+			np.searchsorted(sorted_ids, passage_ids), self.corpus_size - 1
+		)
+		found = sorted_ids[positions] == passage_ids
+		rows[found] = self._id_order[positions[found]]
+		return rows
+
+	def _candidate_scores(
+		self, query: List[Union[str, int]]
+	) -> Tuple[np.ndarray, np.ndarray]:
+		term_ids, counts = self.lookup(query)
+		return self.score_terms(term_ids, self.idf[term_ids] * counts)
+
+	def get_scores(self, query: List[Union[str, int]]) -> np.ndarray:
+		"""
+		Get the BM25 scores of all documents.
+		It is compatible with `rank_bm25.BM25Okapi.get_scores`.
+
+		:param query: The list of query tokens.
+		:return: The score array. Its length is the same as the corpus size.
+		"""
+		scores = np.zeros(self.corpus_size, dtype=np.float64)
+		candidates, candidate_scores = self._candidate_scores(query)
+		scores[candidates] = candidate_scores
+		return scores
+
+	def get_top_k(
+		self, query: List[Union[str, int]], top_k: int
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Get the top_k documents of the query.
+		It selects the top_k with partial selection among the candidate documents only.
+
+		:param query: The list of query tokens.
+		:param top_k: The number of documents to retrieve.
+		:return: The document rows and their scores, sorted by the score.
+		"""
+		rows, scores = self._candidate_scores(query)
+		return select_top_k(rows, scores, top_k, self.corpus_size, self.fill_rows)
+
+	def fill_rows(self, exclude_rows: np.ndarray, count: int) -> np.ndarray:
+		"""
+		Get the first document rows that are not in the exclude_rows.
+		"""
+		return np.setdiff1d(
+			np.arange(min(self.corpus_size, len(exclude_rows) + count)),
+			exclude_rows,
+		)[:count]
+
+	def get_passage_ids(self, rows: np.ndarray) -> List[str]:
+		return np.asarray(self.passage_ids)[rows].tolist()
+
+	def drop_rows(self, rows: np.ndarray) -> "BM25Index":
+		"""
+		Make a new index without the given document rows.
+		The order of the remaining documents is kept.
+
+		:param rows: The document rows to drop.
+		:return: The new BM25Index instance.
+		"""
+		rows = np.unique(np.asarray(rows, dtype=np.int64))
+		keep_docs = np.ones(self.corpus_size, dtype=bool)
+		keep_docs[rows] = False
+		new_rows = np.cumsum(keep_docs) - 1
+
+		postings = np.asarray(self.postings)
+		keep_postings = keep_docs[postings]
+		term_ids = np.repeat(np.arange(self.vocab_size), np.diff(self.indptr))
+		doc_freqs = np.bincount(
+			term_ids[keep_postings], minlength=self.vocab_size
+		).astype(np.int64)
+		keep_terms = doc_freqs > 0
+		indptr = np.zeros(int(keep_terms.sum()) + 1, dtype=np.int64)
+		np.cumsum(doc_freqs[keep_terms], out=indptr[1:])
+		corpus_size = int(keep_docs.sum())
+		return BM25Index(
+			np.asarray(self.vocab)[keep_terms],
+			indptr,
+			new_rows[postings[keep_postings]].astype(np.int32),
+			np.asarray(self.term_freqs)[keep_postings],
+			np.asarray(self.doc_lens)[keep_docs],
+			compute_idf(doc_freqs[keep_terms], corpus_size, self.epsilon),
+			passage_ids=np.asarray(self.passage_ids)[keep_docs],
+			k1=self.k1,
+			b=self.b,
+			epsilon=self.epsilon,
+			tokenizer_name=self.tokenizer_name,
+		)
+
+
+def is_bm25_segment(index_dir: str) -> bool:
+	return os.path.isfile(os.path.join(index_dir, BM25_INDEX_META_FILENAME))
+
+
+def load_bm25_index_meta(index_dir: str) -> dict:
+	if not is_bm25_segment(index_dir):
+		raise FileNotFoundError(f"{index_dir} is not a BM25 index directory.")
+	with open(os.path.join(index_dir, BM25_INDEX_META_FILENAME), "r") as f:
+		return json.load(f)
+
+
+def search_vocab(
+	vocab: np.ndarray, tokens: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	Binary search the tokens at the sorted vocabulary.
+
+	:param vocab: The sorted vocabulary array.
+	:param tokens: The token array to search.
+	:return: The positions of the tokens at the vocabulary and whether each token is found.
+	"""
+	if len(vocab) == 0 or len(tokens) == 0:
+		return np.zeros(len(tokens), dtype=np.int64), np.zeros(len(tokens), dtype=bool)
+	if (tokens.dtype.kind in "iu") != (vocab.dtype.kind in "iu"):
+		return np.zeros(len(tokens), dtype=np.int64), np.zeros(len(tokens), dtype=bool)
+	positions = np.minimum(np.searchsorted(vocab, tokens), len(vocab) - 1)
+	return positions, vocab[positions] == tokens
+
+
+def select_top_k(
+	rows: np.ndarray,
+	scores: np.ndarray,
+	top_k: int,
+	corpus_size: int,
+	fill_rows: Callable[[np.ndarray, int], np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	Select the top_k rows from the candidate rows with partial selection.
+	The documents that are not the candidates have zero score,
+	so they are filled when there are not enough candidates or there are negative scores.
+
+	:param rows: The candidate document rows.
+	:param scores: The scores of the candidate rows.
+	:param top_k: The number of documents to select.
+	:param corpus_size: The number of documents that can be selected.
+	:param fill_rows: The function that returns the non-candidate rows.
+	:return: The selected rows and scores, sorted by the score.
+	"""
+	top_k = min(top_k, corpus_size)
+	if top_k <= 0:
+		return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+	if len(rows) < top_k or (len(rows) > 0 and scores.min() < 0):
+		fillers = fill_rows(rows, top_k)
+		rows = np.concatenate([rows, fillers]).astype(np.int64)
+		scores = np.concatenate([scores, np.zeros(len(fillers))])
+	if len(rows) > top_k:
+		# the ties at the k-th score are broken by the lower row, so the result is deterministic
+		kth_score = -np.partition(-scores, top_k - 1)[top_k - 1]
+		better = np.flatnonzero(scores > kth_score)
+		ties = np.flatnonzero(scores == kth_score)
+		ties = ties[np.argsort(rows[ties], kind="stable")][: top_k - len(better)]
+		selected = np.concatenate([better, ties])
+		rows, scores = rows[selected], scores[selected]
+	order = np.lexsort((rows, -scores))
+	return rows[order], scores[order]
+
+
+def compute_idf(doc_freqs: np.ndarray, corpus_size: int, epsilon: float = 0.25):
+	"""
+	Compute the idf of each term like `rank_bm25.BM25Okapi`.
+	The negative idf values are replaced with ``epsilon * average_idf``.
+
+	:param doc_freqs: The document frequency of each term.
+	:param corpus_size: The number of documents.
+	:param epsilon: The floor ratio of the idf.
+	:return: The idf array.
+	"""
+	doc_freqs = np.asarray(doc_freqs, dtype=np.float64)
+	if len(doc_freqs) == 0:
+		return doc_freqs
+	idf = np.log(corpus_size - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+	average_idf = idf.mean()
+	idf[idf < 0] = epsilon * average_idf
+	return idf
+
+
+BM25_MANIFEST_FILENAME = "manifest.json"
+BM25_STATS_ARRAY_NAMES = ["vocab", "doc_freqs", "idf"]
+
+_index_locks: Dict[str, threading.RLock] = {}
+_index_locks_guard = threading.Lock()
+_merge_threads: List[threading.Thread] = []
+_merge_threads_guard = threading.Lock()
+
+
+def _get_index_lock(index_dir: str) -> threading.RLock:
+	with _index_locks_guard:
+		return _index_locks.setdefault(os.path.abspath(index_dir), threading.RLock())
+
+
+class BM25SegmentedIndex:
+	def __init__(self, index_dir: str, mmap: bool = True):
+		"""
+		Append-only BM25 index that consists of immutable segments.
+		Each segment is a `BM25Index` directory, and new documents are written as a new segment.
+		Deleted documents are recorded as tombstones, and they are removed when the segments are merged.
+		The global term statistics (document frequency and idf) are kept at each generation,
+		so the scores are the same as the index that is built at once with the live documents.
+
+		The directory structure looks like this:
+
+		.. Code:: text
+
+		    manifest.json  # the current generation, segments and global statistics
+		    segments/<segment_name>/  # BM25Index directories
+		    generations/<generation>/  # global vocab, doc_freqs, idf and tombstones
+
+		:param index_dir: The index directory path. It must be created by `BM25SegmentedIndex.create`.
+		:param mmap: Whether to memory-map the arrays. Default is True.
+		"""
+		self.index_dir = index_dir
+		self.mmap = mmap
+		manifest = load_bm25_manifest(index_dir)
+		if manifest.get("format_version") != BM25_INDEX_FORMAT_VERSION:
+			raise ValueError(
+				f"BM25 index format version {manifest.get('format_version')} is not supported. "
+				f"Please delete {index_dir} and ingest again."
+			)
+		self.manifest = manifest
+		self.tokenizer_name = manifest["tokenizer_name"]
+		self.k1 = manifest["k1"]
+		self.b = manifest["b"]
+		self.epsilon = manifest["epsilon"]
+		self.avgdl = manifest["avgdl"]
+		self.corpus_size = manifest["corpus_size"]  # the number of live documents
+		self.generation = manifest["generation"]
+		self.segment_names = [segment["name"] for segment in manifest["segments"]]
+
+		self.segments = [
+			BM25Index.load(os.path.join(index_dir, "segments", name), mmap=mmap)
+			for name in self.segment_names
+		]
+		sizes = np.array([segment.corpus_size for segment in self.segments], dtype=np.int64)
+		self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+		generation_dir = self._generation_dir(self.generation)
+		stats = {
+			array_name: np.load(
+				os.path.join(generation_dir, f"{array_name}.npy"),
+				mmap_mode="r" if mmap else None,
+			)
+			for array_name in BM25_STATS_ARRAY_NAMES
+		}
+		self.vocab = stats["vocab"]
+		self.doc_freqs = stats["doc_freqs"]
+		self.idf = stats["idf"]
+		self.tombstones = [
+			np.load(os.path.join(generation_dir, "tombstones", f"{name}.npy"))
+			if segment["deleted"] > 0
+			else np.empty(0, dtype=np.int64)
+			for name, segment in zip(self.segment_names, manifest["segments"])
+		]
+
+	@classmethod
+	def create(
+		cls,
+		index_dir: str,
+		tokenizer_name: str,
+		k1: float = 1.5,
+		b: float = 0.75,
+		epsilon: float = 0.25,
+	) -> "BM25SegmentedIndex":
+		"""
+		Create an empty segmented index.
+		The index is built at a temporary directory and renamed into place,
+		so the other processes never see a half-created index.
+
+		:param index_dir: The index directory path to create.
+		:param tokenizer_name: The name of the tokenizer that is used to the index.
+		:param k1: The BM25 k1 parameter. Default is 1.5.
+		:param b: The BM25 b parameter. Default is 0.75.
+		:param epsilon: The floor ratio of the idf. Default is 0.25.
+		:return: The BM25SegmentedIndex instance.
+		:raises FileExistsError: If the index already exists, including when another process created it first.
+		"""
+		with _get_index_lock(index_dir):
+			if is_bm25_index(index_dir):
+				raise FileExistsError(f"BM25 index {index_dir} already exists.")
+			tmp_dir = make_tmp_index_dir(index_dir)
+			try:
+				os.makedirs(os.path.join(tmp_dir, "segments"))
+				manifest = {
+					"format_version": BM25_INDEX_FORMAT_VERSION,
+					"tokenizer_name": tokenizer_name,
+					"k1": k1,
+					"b": b,
+					"epsilon": epsilon,
+					"generation": -1,
+					"next_segment": 0,
+					"segments": [],
+				}
+				_commit(tmp_dir, manifest, [], [])
+				rename_index_into_place(tmp_dir, index_dir)
+			finally:
+				shutil.rmtree(tmp_dir, ignore_errors=True)
+		return cls(index_dir)
+
+	@classmethod
+	def open(
+		cls, index_dir: str, tokenizer_name: str, mmap: bool = True
+	) -> "BM25SegmentedIndex":
+		"""
+		Open the segmented index, or create it when it does not exist.
+		When another process creates the index at the same time, it opens that index.
+		"""
+		if not is_bm25_index(index_dir):
+			try:
+				return cls.create(index_dir, tokenizer_name)
+			except FileExistsError:
+				pass
+		index = cls(index_dir, mmap=mmap)
+		if index.tokenizer_name != tokenizer_name:
+			raise ValueError(
+				f"The bm25 index tokenizer is {index.tokenizer_name}, but your input is {tokenizer_name}."
+			)
+		return index
+
+	def _generation_dir(self, generation: int) -> str:
+		return os.path.join(self.index_dir, "generations", str(generation))
+
+	def reload(self) -> "BM25SegmentedIndex":
+		return BM25SegmentedIndex(self.index_dir, mmap=self.mmap)
+
+	@property
+	def segment_count(self) -> int:
+		return len(self.segments)
+
+	@property
+	def passage_ids(self) -> np.ndarray:
+		"""
+		The passage ids of the live documents.
+		"""
+		return np.concatenate(
+			[np.empty(0, dtype=str)]
+			+ [
+				np.delete(np.asarray(segment.passage_ids), tombstone)
+				for segment, tombstone in zip(self.segments, self.tombstones)
+			]
+		)
+
+	def add(self, tokenized_corpus: List[List[Union[str, int]]], passage_ids: List[str]):
+		"""
+		Add the documents as a new immutable segment.
+		It only writes the new segment and the global statistics, not the whole index.
+
+		:param tokenized_corpus: 2-d list of tokens of the new documents.
+		:param passage_ids: The passage ids of the new documents.
+		"""
+		if len(tokenized_corpus) == 0:
+			return
+		self.add_segment(
+			BM25Index.from_tokens(
+				tokenized_corpus,
+				passage_ids=passage_ids,
+				k1=self.k1,
+				b=self.b,
+				epsilon=self.epsilon,
+				tokenizer_name=self.tokenizer_name,
+			)
+		)
+
+	def add_segment(self, segment: BM25Index):
+		"""
+		Add the already built BM25Index as a new segment.
+
+		:param segment: The BM25Index instance to add.
+		"""
+		with _get_index_lock(self.index_dir):
+			current = self.reload()
+			manifest = deepcopy(current.manifest)
+			segment_name = f"segment_{manifest['next_segment']:06d}"
+			manifest["next_segment"] += 1
+			segment.save(os.path.join(self.index_dir, "segments", segment_name))
+			_commit(
+				self.index_dir,
+				manifest,
+				current.segments + [segment],
+				current.tombstones + [np.empty(0, dtype=np.int64)],
+				current.segment_names + [segment_name],
+			)
+		self.__dict__.update(self.reload().__dict__)
+
+	def delete(self, passage_ids: List[str]) -> int:
+		"""
+		Delete the documents by recording tombstones.
+		The deleted documents are not retrieved anymore,
+		and they are removed from the segment files when the segments are merged.
+
+		:param passage_ids: The passage ids to delete.
+		:return: The number of deleted documents.
+		"""
+		deleted_count = 0
+		with _get_index_lock(self.index_dir):
+			current = self.reload()
+			tombstones = []
+			for segment, tombstone in zip(current.segments, current.tombstones):
+				rows = np.flatnonzero(
+					np.isin(np.asarray(segment.passage_ids), np.asarray(passage_ids))
+				)
+				rows = np.setdiff1d(rows, tombstone)
+				deleted_count += len(rows)
+				tombstones.append(np.union1d(tombstone, rows).astype(np.int64))
+			if deleted_count > 0:
+				_commit(
+					self.index_dir,
+					deepcopy(current.manifest),
+					current.segments,
+					tombstones,
+					current.segment_names,
+				)
+		self.__dict__.update(self.reload().__dict__)
+		return deleted_count
+
+	def find_merges(self, merge_factor: int = 10) -> List[List[str]]:
+		"""
+		Find the segments to merge with the size-tiered merge policy.
+		The segments are grouped by the tier, which is the log of the live document count with the base of merge_factor.
+		When a tier has merge_factor segments, they are merged into one segment of the next tier.
+		The segments that more than half of the documents are deleted are merged alone to expunge the deletes.
+
+		:param merge_factor: The number of segments of a tier to merge at once. Default is 10.
+		:return: The list of segment name groups to merge.
+		"""
+		tiers: Dict[int, List[str]] = {}
+		merges = []
+		for segment in self.manifest["segments"]:
+			live_count = segment["corpus_size"] - segment["deleted"]
+			if segment["deleted"] * 2 > segment["corpus_size"]:
+				merges.append([segment["name"]])
+				continue
+			tier = int(math.log(max(live_count, 1), merge_factor))
+			tiers.setdefault(tier, []).append(segment["name"])
+		for tier in sorted(tiers.keys()):
+			names = tiers[tier]
+			for i in range(0, len(names) - merge_factor + 1, merge_factor):
+				merges.append(names[i : i + merge_factor])
+		return merges
+
+	def merge(self, segment_names: List[str]):
+		"""
+		Merge the segments into one new segment without the deleted documents.
+		The merged segment is built and saved to a temporary directory outside the lock,
+		so the readers and writers are not blocked.
+		In the lock, it only validates the segments, renames the merged segment and commits.
+		The deletes that are recorded while merging are carried over to the merged segment.
+
+		:param segment_names: The names of the segments to merge.
+		"""
+		snapshot = self.reload()
+		targets = [
+			(name, segment, tombstone)
+			for name, segment, tombstone in zip(
+				snapshot.segment_names, snapshot.segments, snapshot.tombstones
+			)
+			if name in segment_names
+		]
+		if len(targets) == 0:
+			return
+		merged = BM25Index.merge(
+			[segment.drop_rows(tombstone) for _, segment, tombstone in targets]
+		)
+		# the commit removes the unknown directories at the segments directory,
+		# so the merged segment is saved at the other directory until it is committed.
+		tmp_dir = os.path.join(self.index_dir, "merging", uuid.uuid4().hex)
+		if merged.corpus_size > 0:
+			merged.save(tmp_dir)
+		try:
+			with _get_index_lock(self.index_dir):
+				current = self.reload()
+				if not all(name in current.segment_names for name, _, _ in targets):
+					return  # merged by another merge
+				manifest = deepcopy(current.manifest)
+				merged_name = f"segment_{manifest['next_segment']:06d}"
+				manifest["next_segment"] += 1
+
+				# carry over the deletes that are recorded while merging
+				new_tombstone = []
+				row_offset = 0
+				for name, segment, old_tombstone in targets:
+					current_tombstone = current.tombstones[
+						current.segment_names.index(name)
+					]
+					kept_rows = np.setdiff1d(
+						np.arange(segment.corpus_size), old_tombstone, assume_unique=True
+					)
+					new_deleted = np.setdiff1d(current_tombstone, old_tombstone)
+					new_tombstone.append(
+						np.searchsorted(kept_rows, new_deleted) + row_offset
+					)
+					row_offset += len(kept_rows)
+				if merged.corpus_size > 0:
+					os.rename(
+						tmp_dir, os.path.join(self.index_dir, "segments", merged_name)
+					)
+
+				# the merged segment takes the place of the first merged segment
+				segments, tombstones, names = [], [], []
+				for name, segment, tombstone in zip(
+					current.segment_names, current.segments, current.tombstones
+				):
+					if name == targets[0][0]:
+						if merged.corpus_size == 0:
+							continue  # every document is deleted
+						segments.append(merged)
+						tombstones.append(np.concatenate(new_tombstone).astype(np.int64))
+						names.append(merged_name)
+					elif name not in segment_names:
+						segments.append(segment)
+						tombstones.append(tombstone)
+						names.append(name)
+				_commit(self.index_dir, manifest, segments, tombstones, names)
+		finally:
+			shutil.rmtree(tmp_dir, ignore_errors=True)
+		self.__dict__.update(self.reload().__dict__)
+
+	def maybe_merge(
+		self, merge_factor: int = 10, background: bool = True
+	) -> Optional[threading.Thread]:
+		"""
+		Merge the segments until there is nothing to merge by the size-tiered merge policy.
+
+		:param merge_factor: The number of segments of a tier to merge at once. Default is 10.
+		:param background: Whether to merge at the background thread. Default is True.
+		    The thread is a daemon, so it does not block the interpreter exit.
+		    An interrupted merge leaves the index unchanged, because the merge is committed atomically.
+		:return: The merge thread if it runs at the background. Else, None.
+		"""
+
+		def run_merges():
+			index = self.reload()
+			merges = index.find_merges(merge_factor)
+			while len(merges) > 0:
+				index.merge(merges[0])
+				merges = index.find_merges(merge_factor)
+
+		if len(self.find_merges(merge_factor)) == 0:
+			return None
+		if not background:
+			run_merges()
+			self.__dict__.update(self.reload().__dict__)
+			return None
+		thread = threading.Thread(
+			target=run_merges, name=f"bm25-merge-{self.index_dir}", daemon=True
+		)
+		with _merge_threads_guard:
+			_merge_threads.append(thread)
+		thread.start()
+		return thread
+
+	def _segment_candidates(
+		self,
+		tokens: np.ndarray,
+		weights: np.ndarray,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		rows_list, scores_list = [], []
+		for offset, segment, tombstone in zip(
+			self.offsets, self.segments, self.tombstones
+		):
+			positions, found = search_vocab(segment.vocab, tokens)
+			rows, scores = segment.score_terms(
+				positions[found], weights[found], avgdl=self.avgdl, k1=k1, b=b
+			)
+			if len(tombstone) > 0:
+				live = ~np.isin(rows, tombstone)
+				rows, scores = rows[live], scores[live]
+			rows_list.append(rows + offset)
+			scores_list.append(scores)
+		if len(rows_list) == 0:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+		return np.concatenate(rows_list), np.concatenate(scores_list)
+
+	def _query_weights(
+		self, query: List[Union[str, int]]
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Get the query tokens that are in the global vocabulary and their weights (idf * count).
+		"""
+		if len(query) == 0:
+			return np.empty(0), np.empty(0, dtype=np.float64)
+		tokens, counts = np.unique(np.asarray(query), return_counts=True)
+		positions, found = search_vocab(self.vocab, tokens)
+		return tokens[found], self.idf[positions[found]] * counts[found]
+
+	def get_scores(
+		self,
+		query: List[Union[str, int]],
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> np.ndarray:
+		"""
+		Get the BM25 scores of all documents, including the deleted documents with zero score.
+		The index of the result is the global row of the document.
+		The k1 and b of the index are used when they are None.
+		"""
+		scores = np.zeros(self.offsets[-1], dtype=np.float64)
+		rows, candidate_scores = self._segment_candidates(
+			*self._query_weights(query), k1=k1, b=b
+		)
+		scores[rows] = candidate_scores
+		return scores
+
+	def score_matrix(
+		self,
+		queries: List[List[Union[str, int]]],
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> sparse.csr_matrix:
+		"""
+		Score all queries at once with the sparse matrix product.
+		The query-term matrix holds the weight (idf * count) of each query term,
+		and the term-document matrix of each segment holds the BM25 term frequency part of each posting.
+		Both matrices are restricted to the terms that appear in the queries.
+
+		:param queries: 2-d list of query tokens.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of the index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of the index.
+		:return: The sparse score matrix. The shape is (the number of queries, the number of global rows).
+		    Only the documents that contain at least one query term are stored.
+		"""
+		query_lens = np.array([len(query) for query in queries], dtype=np.int64)
+		if query_lens.sum() == 0:
+			return sparse.csr_matrix((len(queries), int(self.offsets[-1])))
+		query_indices = np.repeat(np.arange(len(queries)), query_lens)
+		tokens, token_indices = np.unique(
+			np.concatenate([np.asarray(query) for query in queries if len(query) > 0]),
+			return_inverse=True,
+		)
+		positions, found = search_vocab(self.vocab, tokens)
+		term_weights = np.zeros(len(tokens), dtype=np.float64)
+		term_weights[found] = self.idf[positions[found]]
+		query_matrix = sparse.csr_matrix(
+			(term_weights[token_indices], (query_indices, token_indices)),
+			shape=(len(queries), len(tokens)),
+		)  # the duplicate entries are summed, so the weight is idf * count
+		query_matrix.eliminate_zeros()
+
+		score_matrices = []
+		for segment, tombstone in zip(self.segments, self.tombstones):
+			segment_positions, segment_found = search_vocab(segment.vocab, tokens)
+			term_ids = segment_positions[segment_found]
+			offsets, lengths = segment._gather(term_ids)
+			rows = np.asarray(segment.postings[offsets], dtype=np.int64)
+			contributions = segment.saturate(
+				segment.term_freqs[offsets], segment.doc_lens[rows], self.avgdl, k1, b
+			)
+			term_columns = np.repeat(np.flatnonzero(segment_found), lengths)
+			if len(tombstone) > 0:
+				live = ~np.isin(rows, tombstone)
+				rows, contributions, term_columns = (
+					rows[live],
+					contributions[live],
+					term_columns[live],
+				)
+			term_matrix = sparse.csr_matrix(
+				(contributions, (term_columns, rows)),
+				shape=(len(tokens), segment.corpus_size),
+			)
+			score_matrices.append(query_matrix @ term_matrix)
+		if len(score_matrices) == 0:
+			return sparse.csr_matrix((len(queries), 0))
+		return sparse.hstack(score_matrices, format="csr")
+
+	def get_top_k_batch(
+		self,
+		queries: List[List[Union[str, int]]],
+		top_k: int,
+		batch_size: int = 1024,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+		"""
+		Get the top_k documents of each query with the batched sparse matrix scoring.
+		The queries are scored batch by batch to bound the memory of the score matrix.
+
+		:param queries: 2-d list of query tokens.
+		:param top_k: The number of documents to retrieve for each query.
+		:param batch_size: The number of queries to score at once. Default is 1024.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of the index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of the index.
+		:return: The list of the global document rows and the list of their scores.
+		    Each element is sorted by the score.
+		"""
+		rows_list, scores_list = [], []
+		for start in range(0, len(queries), batch_size):
+			score_matrix = self.score_matrix(
+				queries[start : start + batch_size], k1=k1, b=b
+			)
+			for i in range(score_matrix.shape[0]):
+				begin, end = score_matrix.indptr[i], score_matrix.indptr[i + 1]
+				rows, scores = select_top_k(
+					score_matrix.indices[begin:end].astype(np.int64),
+					score_matrix.data[begin:end],
+					top_k,
+					self.corpus_size,
+					self.fill_rows,
+				)
+				rows_list.append(rows)
+				scores_list.append(scores)
+		return rows_list, scores_list
+
+	def get_top_k(
+		self,
+		query: List[Union[str, int]],
+		top_k: int,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+		Get the top_k documents of the query across all segments.
+
+		:param query: The list of query tokens.
+		:param top_k: The number of documents to retrieve.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of the index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of the index.
+		:return: The global document rows and their scores, sorted by the score.
+		"""
+		rows, scores = self._segment_candidates(
+			*self._query_weights(query), k1=k1, b=b
+		)
+		return select_top_k(rows, scores, top_k, self.corpus_size, self.fill_rows)
+
+	def fill_rows(self, exclude_rows: np.ndarray, count: int) -> np.ndarray:
+		"""
+		Get the first live document rows that are not in the exclude_rows.
+		"""
+		result = []
+		for offset, segment, tombstone in zip(
+			self.offsets, self.segments, self.tombstones
+		):
+			segment_rows = exclude_rows[
+				(exclude_rows >= offset) & (exclude_rows < offset + segment.corpus_size)
+			]
+			rows = segment.fill_rows(np.union1d(segment_rows - offset, tombstone), count)
+			result.append(rows + offset)
+			count -= len(result[-1])
+			if count <= 0:
+				break
+		return np.concatenate([np.empty(0, dtype=np.int64)] + result)
+
+	def find_rows(self, passage_ids: List[str]) -> np.ndarray:
+		"""
+		Find the global rows of the live documents by their passage ids.
+
+		:param passage_ids: The passage ids to find.
+		:return: The global rows. It is -1 if the passage id does not exist.
+		"""
+		rows = np.full(len(passage_ids), -1, dtype=np.int64)
+		for offset, segment, tombstone in zip(
+			self.offsets, self.segments, self.tombstones
+		):
+			segment_rows = segment.find_rows(passage_ids)
+			found = segment_rows >= 0
+			if len(tombstone) > 0:
+				found &= ~np.isin(segment_rows, tombstone)
+			rows[found] = segment_rows[found] + offset
+		return rows
+
+	def get_batch_scores(
+		self,
+		query: List[Union[str, int]],
+		rows: np.ndarray,
+		k1: Optional[float] = None,
+		b: Optional[float] = None,
+	) -> np.ndarray:
+		"""
+		Get the BM25 scores of the given global rows only.
+		The cost is proportional to the number of rows, not the corpus size.
+
+		:param query: The list of query tokens.
+		:param rows: The global document rows to score. The row -1 gets zero score.
+		:param k1: The BM25 k1 parameter to use. Default is None, which means the k1 of the index.
+		:param b: The BM25 b parameter to use. Default is None, which means the b of the index.
+		:return: The BM25 scores of the rows.
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		scores = np.zeros(len(rows), dtype=np.float64)
+		tokens, weights = self._query_weights(query)
+		if len(tokens) == 0:
+			return scores
+		segment_indices = np.searchsorted(self.offsets, rows, side="right") - 1
+		for segment_index in np.unique(segment_indices[rows >= 0]):
+			segment = self.segments[segment_index]
+			mask = (segment_indices == segment_index) & (rows >= 0)
+			positions, found = search_vocab(segment.vocab, tokens)
+			scores[mask] = segment.score_rows(
+				positions[found],
+				weights[found],
+				rows[mask] - self.offsets[segment_index],
+				avgdl=self.avgdl,
+				k1=k1,
+				b=b,
+			)
+		return scores
+
+	def get_passage_ids(self, rows: np.ndarray) -> List[str]:
+		"""
+		Get the passage ids of the global document rows.
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		segment_indices = np.searchsorted(self.offsets, rows, side="right") - 1
+		result = np.empty(len(rows), dtype=object)
+		for segment_index in np.unique(segment_indices):
+			mask = segment_indices == segment_index
+			result[mask] = self.segments[segment_index].get_passage_ids(
+				rows[mask] - self.offsets[segment_index]
+			)
+		return result.tolist()
+
+
+def wait_for_merges(timeout: Optional[float] = None):
+	"""
+	Wait until the background segment merges are finished.
+
+	:param timeout: The timeout seconds of each merge thread. Default is None, which waits forever.
+	"""
+	with _merge_threads_guard:
+		threads = list(_merge_threads)
+	for thread in threads:
+		thread.join(timeout)
+	with _merge_threads_guard:
+		_merge_threads[:] = [thread for thread in _merge_threads if thread.is_alive()]
+
+
+def make_tmp_index_dir(index_dir: str) -> str:
+	parent_dir = os.path.dirname(os.path.abspath(index_dir))
+	os.makedirs(parent_dir, exist_ok=True)
+	tmp_dir = os.path.join(parent_dir, f".tmp-{uuid.uuid4().hex}")
+	os.makedirs(tmp_dir)
+	return tmp_dir
+
+
+def rename_index_into_place(tmp_dir: str, index_dir: str):
+	"""
+	Rename the built index directory to the index_dir atomically.
+	An empty index_dir is replaced.
+
+	:raises FileExistsError: If the index_dir is not empty, for example another process created the index first.
+	"""
+	if os.path.isdir(index_dir) and len(os.listdir(index_dir)) == 0:
+		os.rmdir(index_dir)
+	try:
+		os.rename(tmp_dir, index_dir)
+	except OSError as e:
+		if os.path.exists(index_dir):
+			raise FileExistsError(f"BM25 index {index_dir} already exists.") from e
+		raise
+
+
+def is_bm25_index(index_dir: str) -> bool:
+	return os.path.isfile(os.path.join(index_dir, BM25_MANIFEST_FILENAME))
+
+
+def load_bm25_manifest(index_dir: str) -> dict:
+	if not is_bm25_index(index_dir):
+		raise FileNotFoundError(f"{index_dir} is not a BM25 index directory.")
+	with open(os.path.join(index_dir, BM25_MANIFEST_FILENAME), "r") as f:
+		return json.load(f)
+
+
+def _commit(
+	index_dir: str,
+	manifest: dict,
+	segments: List[BM25Index],
+	tombstones: List[np.ndarray],
+	segment_names: Optional[List[str]] = None,
+):
+	"""
+	Write a new generation of the segmented index.
+	It computes the global statistics of the live documents, writes them to a new generation directory,
+	and swaps the manifest atomically. The unused generations and segments are removed after that.
+	"""
+	segment_names = segment_names or []
+	vocabs, doc_freqs = [], []
+	live_docs, live_tokens = 0, 0
+	for segment, tombstone in zip(segments, tombstones):
+		segment_doc_freqs = np.diff(segment.indptr)
+		if len(tombstone) > 0:
+			# subtract the document frequencies of the deleted documents
+			deleted_positions = np.flatnonzero(
+				np.isin(np.asarray(segment.postings), tombstone)
+			)
+			deleted_terms = (
+				np.searchsorted(segment.indptr, deleted_positions, side="right") - 1
+			)
+			segment_doc_freqs = segment_doc_freqs - np.bincount(
+				deleted_terms, minlength=segment.vocab_size
+			)
+		live_docs += segment.corpus_size - len(tombstone)
+		live_tokens += int(np.sum(segment.doc_lens)) - int(
+			np.sum(np.asarray(segment.doc_lens)[tombstone])
+		)
+		if segment.vocab_size > 0:
+			vocabs.append(np.asarray(segment.vocab))
+			doc_freqs.append(segment_doc_freqs)
+
+	if len(vocabs) > 0:
+		vocab, inverse = np.unique(np.concatenate(vocabs), return_inverse=True)
+		global_doc_freqs = np.bincount(
+			inverse, weights=np.concatenate(doc_freqs), minlength=len(vocab)
+		).astype(np.int64)
+		keep = global_doc_freqs > 0
+		vocab, global_doc_freqs = vocab[keep], global_doc_freqs[keep]
+	else:
+		vocab, global_doc_freqs = np.empty(0, dtype=str), np.empty(0, dtype=np.int64)
+
+	generation = manifest["generation"] + 1
+	generation_dir = os.path.join(index_dir, "generations", str(generation))
+	os.makedirs(os.path.join(generation_dir, "tombstones"), exist_ok=True)
+	stats = {
+		"vocab": vocab,
+		"doc_freqs": global_doc_freqs,
+		"idf": compute_idf(global_doc_freqs, live_docs, manifest["epsilon"]),
+	}
+	for array_name in BM25_STATS_ARRAY_NAMES:
+		np.save(os.path.join(generation_dir, f"{array_name}.npy"), stats[array_name])
+	for name, tombstone in zip(segment_names, tombstones):
+		if len(tombstone) > 0:
+			np.save(os.path.join(generation_dir, "tombstones", f"{name}.npy"), tombstone)
+
+	manifest["generation"] = generation
+	manifest["corpus_size"] = live_docs
+	manifest["avgdl"] = live_tokens / live_docs if live_docs > 0 else 0.0
+	manifest["segments"] = [
+		{
+			"name": name,
+			"corpus_size": segment.corpus_size,
+			"deleted": len(tombstone),
+		}
+		for name, segment, tombstone in zip(segment_names, segments, tombstones)
+	]
+	tmp_manifest_path = os.path.join(index_dir, f".{BM25_MANIFEST_FILENAME}.tmp")
+	with open(tmp_manifest_path, "w") as f:
+		json.dump(manifest, f, indent=4)
+	os.replace(tmp_manifest_path, os.path.join(index_dir, BM25_MANIFEST_FILENAME))
+
+	# remove the old generations and unused segments.
+	# The previous generation is kept for the readers that are opening the index right now,
+	# and the readers that already opened them keep the memory-mapped files.
+	for old_generation in os.listdir(os.path.join(index_dir, "generations")):
+		if old_generation not in (str(generation), str(generation - 1)):
+			shutil.rmtree(
+				os.path.join(index_dir, "generations", old_generation),
+				ignore_errors=True,
+			)
+	for segment_dir in os.listdir(os.path.join(index_dir, "segments")):
+		if segment_dir not in segment_names:
+			shutil.rmtree(
+				os.path.join(index_dir, "segments", segment_dir), ignore_errors=True
+			)
@@ -1,41 +1,42 @@
 import os
 from pathlib import Path
-from typing import Tuple, List, Union
+from typing import Callable, Tuple, List, Union
 
 import numpy as np
 import pandas as pd
 
-from autorag.nodes.retrieval.base import HybridRetrieval
+from autorag.module_cache import get_module_instance
+from autorag.nodes.retrieval.base import HybridFusionTable, HybridRetrieval
 from autorag.utils.util import pop_params, fetch_contents, result_to_dataframe
 
 
 def normalize_mm(scores: List[str], fixed_min_value: float = 0):
 	arr = np.array(scores)
-	max_value = np.max(arr)
-	min_value = np.min(arr)
+	max_value = np.max(arr, axis=-1, keepdims=True)
+	min_value = np.min(arr, axis=-1, keepdims=True)
 	norm_score = (arr - min_value) / (max_value - min_value)
 	return norm_score
 
 
 def normalize_tmm(scores: List[str], fixed_min_value: float):
 	arr = np.array(scores)
-	max_value = np.max(arr)
+	max_value = np.max(arr, axis=-1, keepdims=True)
 	norm_score = (arr - fixed_min_value) / (max_value - fixed_min_value)
 	return norm_score
 
 
 def normalize_z(scores: List[str], fixed_min_value: float = 0):
 	arr = np.array(scores)
-	mean_value = np.mean(arr)
-	std_value = np.std(arr)
+	mean_value = np.mean(arr, axis=-1, keepdims=True)
+	std_value = np.std(arr, axis=-1, keepdims=True)
 	norm_score = (arr - mean_value) / std_value
 	return norm_score
 
 
 def normalize_dbsf(scores: List[str], fixed_min_value: float = 0):
 	arr = np.array(scores)
-	mean_value = np.mean(arr)
-	std_value = np.std(arr)
+	mean_value = np.mean(arr, axis=-1, keepdims=True)
+	std_value = np.std(arr, axis=-1, keepdims=True)
 	min_value = mean_value - 3 * std_value
 	max_value = mean_value + 3 * std_value
 	norm_score = (arr - min_value) / (max_value - min_value)
@@ -103,7 +104,7 @@ class HybridCC(HybridRetrieval):
 			assert (
 				"target_modules" in kwargs and "target_module_params" in kwargs
 			), "target_modules and target_module_params must be specified if there is not ids and scores."
-			instance = cls(project_dir, *args, **kwargs)
+			instance = get_module_instance(cls, project_dir, *args, **kwargs)
 			result = instance.pure(previous_result, *args, **kwargs)
 			del instance
 			return result
@@ -157,33 +158,55 @@ def hybrid_cc(
 	assert weight >= 0, "The weight must be greater than 0."
 	assert weight <= 1, "The weight must be less than 1."
 
-	df = pd.DataFrame(
-		{
-			"semantic_ids": ids[0],
-			"lexical_ids": ids[1],
-			"semantic_score": scores[0],
-			"lexical_score": scores[1],
-		}
-	)
+	table = HybridFusionTable(ids[:2], scores[:2])
+	cc_scores = make_cc_fuser(
+		table,
+		normalize_method,
+		semantic_theoretical_min_value,
+		lexical_theoretical_min_value,
+	)([weight])[0]
+	return table.select_top_k(cc_scores, top_k)
 
-	def cc_pure_apply(row):
-		return fuse_per_query(
-			row["semantic_ids"],
-			row["lexical_ids"],
-			row["semantic_score"],
-			row["lexical_score"],
-			normalize_method=normalize_method,
-			weight=weight,
-			top_k=top_k,
-			semantic_theoretical_min_value=semantic_theoretical_min_value,
-			lexical_theoretical_min_value=lexical_theoretical_min_value,
-		)
 
-	# fixed weight
-	df[["cc_id", "cc_score"]] = df.apply(
-		lambda row: cc_pure_apply(row), axis=1, result_type="expand"
-	)
-	return df["cc_id"].tolist(), df["cc_score"].tolist()
+def make_cc_fuser(
+	table: HybridFusionTable,
+	normalize_method: str = "mm",
+	semantic_theoretical_min_value: float = -1.0,
+	lexical_theoretical_min_value: float = 0.0,
+) -> Callable[[List[float]], np.ndarray]:
+	"""
+	Make the function that computes the CC scores of all slots for each weight.
+	The scores are normalized once and shared by every call of the function.
+
+	:param table: The HybridFusionTable of the semantic and the lexical module.
+	:param normalize_method: The normalization method to use.
+	:param semantic_theoretical_min_value: The theoretical minimum value of the semantic module for `tmm`.
+	:param lexical_theoretical_min_value: The theoretical minimum value of the lexical module for `tmm`.
+	:return: The function that gets the list of weights to the semantic module
+		and returns the CC scores with the shape of (weight count, slot count).
+	"""
+	normalize_func = normalize_method_dict[normalize_method]
+	module_norm_scores = []
+	for module_index, fixed_min_value in [
+		(0, semantic_theoretical_min_value),
+		(1, lexical_theoretical_min_value),
+	]:
+		norm_scores = table.normalize(module_index, normalize_func, fixed_min_value)
+		module_norm_scores.append(table.deduplicate(module_index, norm_scores))
+
+	def fuse(weights: List[float]) -> np.ndarray:
+		weights = np.asarray(weights, dtype=np.float64)[:, np.newaxis]
+		cc_scores = np.zeros((len(weights), table.slot_count))
+		for (slots, norm_scores), module_weights in zip(
+			module_norm_scores, [weights, 1.0 - weights]
+		):
+			weighted_scores = norm_scores * module_weights
+			# The NaN scores, like the min-max scaling of the same scores, count as zero.
+			weighted_scores[np.isnan(weighted_scores)] = 0.0
+			cc_scores[:, slots] += weighted_scores
+		return cc_scores
+
+	return fuse
 
 
 def fuse_per_query(
@@ -1,10 +1,12 @@
 import os
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Callable, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
-from autorag.nodes.retrieval.base import HybridRetrieval
+from autorag.module_cache import get_module_instance
+from autorag.nodes.retrieval.base import HybridFusionTable, HybridRetrieval
 from autorag.utils.util import pop_params, fetch_contents, result_to_dataframe
 
 
@@ -44,7 +46,7 @@ class HybridRRF(HybridRetrieval):
 			assert (
 				"target_modules" in kwargs and "target_module_params" in kwargs
 			), "target_modules and target_module_params must be specified if there is not ids and scores."
-			instance = cls(project_dir, *args, **kwargs)
+			instance = get_module_instance(cls, project_dir, *args, **kwargs)
 			result = instance.pure(previous_result, *args, **kwargs)
 			del instance
 			return result
@@ -91,19 +93,37 @@ def hybrid_rrf(
 	else:
 		weight = int(weight)
 
-	id_df = pd.DataFrame({f"id_{i}": id_list for i, id_list in enumerate(ids)})
-	score_df = pd.DataFrame(
-		{f"score_{i}": score_list for i, score_list in enumerate(scores)}
-	)
-	df = pd.concat([id_df, score_df], axis=1)
+	table = HybridFusionTable(ids, scores)
+	rrf_scores = make_rrf_fuser(table)([weight])[0]
+	return table.select_top_k(rrf_scores, top_k)
+
 
-	def rrf_pure_apply(row):
-		ids_tuple = tuple(row[[f"id_{i}" for i in range(len(ids))]].values)
-		scores_tuple = tuple(row[[f"score_{i}" for i in range(len(scores))]].values)
-		return pd.Series(rrf_pure(ids_tuple, scores_tuple, weight, top_k))
+def make_rrf_fuser(table: HybridFusionTable) -> Callable[[List[int]], np.ndarray]:
+	"""
+	Make the function that computes the RRF scores of all slots for each weight.
+	The ranks are computed once and shared by every call of the function.
 
-	df[["rrf_id", "rrf_score"]] = df.apply(rrf_pure_apply, axis=1)
-	return df["rrf_id"].tolist(), df["rrf_score"].tolist()
+	:param table: The HybridFusionTable of the target modules.
+	:return: The function that gets the list of weights (rrf_k)
+		and returns the RRF scores with the shape of (weight count, slot count).
+	"""
+	module_ranks = []
+	for module_index in range(table.module_count):
+		slots, module_scores = table.deduplicate(
+			module_index, table.scores[module_index]
+		)
+		ranks = table.rank(slots, module_scores)
+		ranked = ranks != 0
+		module_ranks.append((slots[ranked], ranks[ranked]))
+
+	def fuse(weights: List[int]) -> np.ndarray:
+		weights = np.asarray(weights, dtype=np.int64)[:, np.newaxis]
+		rrf_scores = np.zeros((len(weights), table.slot_count))
+		for slots, ranks in module_ranks:
+			rrf_scores[:, slots] += 1 / (ranks + weights)
+		return rrf_scores
+
+	return fuse
 
 
 def rrf_pure(
@@ -2,16 +2,37 @@ import logging
 import os
 import pathlib
 from copy import deepcopy
-from typing import List, Callable, Dict, Tuple, Union
+from typing import List, Callable, Dict, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
 from autorag.evaluation import evaluate_retrieval
+from autorag.evaluation.metric.retrieval_matrix import (
+	RETRIEVAL_MATRIX_METRICS,
+	RetrievalMetricEngine,
+)
+from autorag.evaluation.util import cast_metrics
+from autorag.module_cache import module_instance_scope
+from autorag.nodes.retrieval.weight_search import weight_search_dict
+from autorag.pruning import (
+	SuccessiveHalving,
+	filter_pruned,
+	make_metric_columns,
+	make_pruning_columns,
+	run_candidates,
+)
+from autorag.result_cache import make_cache_hit_column
+from autorag.scheduler import NodeScheduler
 from autorag.schema.metricinput import MetricInput
-from autorag.strategy import measure_speed, filter_by_threshold, select_best
+from autorag.strategy import (
+	measure_module_speed,
+	filter_by_threshold,
+	select_best,
+	make_shared_execution_column,
+)
 from autorag.support import get_support_modules
-from autorag.utils.util import get_best_row, to_list, apply_recursive
+from autorag.utils.util import get_best_row, to_list, apply_recursive, pop_params
 
 logger = logging.getLogger("AutoRAG")
 
@@ -20,6 +41,7 @@ lexical_module_names = ["bm25", "BM25"]
 hybrid_module_names = ["hybrid_rrf", "hybrid_cc", "HybridCC", "HybridRRF"]
 
 
+@module_instance_scope()
 def run_retrieval_node(
 	modules: List,
 	module_params: List[Dict],
@@ -55,11 +77,29 @@ def run_retrieval_node(
 		)
 	]
 
+	scheduler = NodeScheduler.from_strategies(strategies)
+	pruning = SuccessiveHalving.from_strategies(strategies)
 	save_dir = os.path.join(node_line_dir, "retrieval")  # node name
 	if not os.path.exists(save_dir):
 		os.makedirs(save_dir)
 
-	def run(input_modules, input_module_params) -> Tuple[List[pd.DataFrame], List]:
+	def run_modules(input_modules, input_module_params, input_result):
+		return measure_module_speed(
+			input_modules,
+			input_module_params,
+			project_dir=project_dir,
+			previous_result=input_result,
+			scheduler=scheduler,
+		)
+
+	def evaluate(result: pd.DataFrame, rows: List[int]):
+		return evaluate_retrieval_node(
+			result, [metric_inputs[row] for row in rows], strategies.get("metrics")
+		)
+
+	def run(
+		input_modules, input_module_params
+	) -> Tuple[List[pd.DataFrame], List, List[bool], Dict[str, List]]:
 		"""
 		Run input modules and parameters.
 
@@ -67,35 +107,29 @@ def run_retrieval_node(
 		:param input_module_params: Input module parameters
 		:return: First, it returns list of result dataframe.
 		Second, it returns list of execution times.
+		Third, it returns whether each result is from the result cache.
+		Fourth, it returns the CPU time and pruning columns of the summary.
 		"""
-		result, execution_times = zip(
-			*map(
-				lambda task: measure_speed(
-					task[0].run_evaluator,
-					project_dir=project_dir,
-					previous_result=previous_result,
-					**task[1],
-				),
-				zip(input_modules, input_module_params),
-			)
-		)
-		average_times = list(map(lambda x: x / len(result[0]), execution_times))
-
 		# run metrics before filtering
 		if strategies.get("metrics") is None:
 			raise ValueError("You must at least one metrics for retrieval evaluation.")
-		result = list(
-			map(
-				lambda x: evaluate_retrieval_node(
-					x,
-					metric_inputs,
-					strategies.get("metrics"),
-				),
-				result,
-			)
+		result, execution_times, cpu_times, cache_hits, pruned_stages = run_candidates(
+			list(input_modules),
+			list(input_module_params),
+			previous_result,
+			run_modules,
+			evaluate,
+			strategies.get("metrics"),
+			pruning=pruning,
 		)
+		row_counts = list(map(len, result))
+		average_times = list(map(lambda x, y: x / y, execution_times, row_counts))
+		summary_columns = {
+			**scheduler.summary_columns(cpu_times, row_counts),
+			**make_pruning_columns(pruned_stages, result),
+		}
 
-		return result, average_times
+		return result, average_times, cache_hits, summary_columns
 
 	def save_and_summary(
 		input_modules,
@@ -103,6 +137,8 @@ def run_retrieval_node(
 		result_list,
 		execution_time_list,
 		filename_start: int,
+		cache_hit_list: Optional[List[bool]] = None,
+		summary_columns: Optional[Dict[str, List]] = None,
 	):
 		"""
 		Save the result and make summary file
@@ -112,6 +148,10 @@ def run_retrieval_node(
 		:param result_list: Result list
 		:param execution_time_list: Execution times
 		:param filename_start: The first filename to use
+		:param cache_hit_list: Whether each result is from the result cache.
+			Default is None, which means no result is from the result cache.
+		:param summary_columns: The CPU time and pruning columns of the summary.
+			Default is None, which means the summary has no CPU time and pruning columns.
 		:return: First, it returns list of result dataframe.
 		Second, it returns list of execution times.
 		"""
@@ -137,17 +177,32 @@ def run_retrieval_node(
 				"module_name": list(map(lambda module: module.__name__, input_modules)),
 				"module_params": input_module_params,
 				"execution_time": execution_time_list,
-				**{
-					metric: list(map(lambda result: result[metric].mean(), result_list))
-					for metric in strategies.get("metrics")
-				},
+				**make_cache_hit_column(
+					cache_hit_list or [False] * len(input_modules)
+				),
+				**(summary_columns or {}),
+				**make_shared_execution_column(result_list, filename_list),
+				**make_metric_columns(
+					result_list,
+					strategies.get("metrics"),
+					(summary_columns or {}).get("pruned_stage"),
+				),
 			}
 		)
 		summary_df.to_csv(os.path.join(save_dir, "summary.csv"), index=False)
 		return summary_df
 
-	def find_best(results, average_times, filenames):
+	def find_best(results, average_times, summary_df: pd.DataFrame):
+		filenames = summary_df["filename"].tolist()
 		# filter by strategies
+		if "pruned_stage" in summary_df.columns:
+			pruned_stages = [
+				None if pd.isna(stage) else int(stage)
+				for stage in summary_df["pruned_stage"].tolist()
+			]
+			results, average_times, filenames = filter_pruned(
+				pruned_stages, results, average_times, filenames
+			)
 		if strategies.get("speed_threshold") is not None:
 			results, filenames = filter_by_threshold(
 				results, average_times, strategies["speed_threshold"], filenames
@@ -170,16 +225,23 @@ def run_retrieval_node(
 				zip(modules, module_params),
 			)
 		)
-		semantic_results, semantic_times = run(semantic_modules, semantic_module_params)
+		(
+			semantic_results,
+			semantic_times,
+			semantic_cache_hits,
+			semantic_summary_columns,
+		) = run(semantic_modules, semantic_module_params)
 		semantic_summary_df = save_and_summary(
 			semantic_modules,
 			semantic_module_params,
 			semantic_results,
 			semantic_times,
 			filename_first,
+			semantic_cache_hits,
+			semantic_summary_columns,
 		)
 		semantic_selected_result, semantic_selected_filename = find_best(
-			semantic_results, semantic_times, semantic_summary_df["filename"].tolist()
+			semantic_results, semantic_times, semantic_summary_df
 		)
 		semantic_summary_df["is_best"] = (
 			semantic_summary_df["filename"] == semantic_selected_filename
@@ -201,16 +263,23 @@ def run_retrieval_node(
 				zip(modules, module_params),
 			)
 		)
-		lexical_results, lexical_times = run(lexical_modules, lexical_module_params)
+		(
+			lexical_results,
+			lexical_times,
+			lexical_cache_hits,
+			lexical_summary_columns,
+		) = run(lexical_modules, lexical_module_params)
 		lexical_summary_df = save_and_summary(
 			lexical_modules,
 			lexical_module_params,
 			lexical_results,
 			lexical_times,
 			filename_first,
+			lexical_cache_hits,
+			lexical_summary_columns,
 		)
 		lexical_selected_result, lexical_selected_filename = find_best(
-			lexical_results, lexical_times, lexical_summary_df["filename"].tolist()
+			lexical_results, lexical_times, lexical_summary_df
 		)
 		lexical_summary_df["is_best"] = (
 			lexical_summary_df["filename"] == lexical_selected_filename
@@ -237,13 +306,20 @@ def run_retrieval_node(
 			["target_module_params" in x for x in hybrid_module_params]
 		):  # for Runner.run
 			# If target_module_params are already given, run hybrid retrieval directly
-			hybrid_results, hybrid_times = run(hybrid_modules, hybrid_module_params)
+			(
+				hybrid_results,
+				hybrid_times,
+				hybrid_cache_hits,
+				hybrid_summary_columns,
+			) = run(hybrid_modules, hybrid_module_params)
 			hybrid_summary_df = save_and_summary(
 				hybrid_modules,
 				hybrid_module_params,
 				hybrid_results,
 				hybrid_times,
 				filename_first,
+				hybrid_cache_hits,
+				hybrid_summary_columns,
 			)
 			filename_first += len(hybrid_modules)
 		else:  # for Evaluator
@@ -266,7 +342,7 @@ def run_retrieval_node(
 			hybrid_times = real_hybrid_times.copy()
 			hybrid_results = []
 			for module, module_param in zip(hybrid_modules, hybrid_module_params):
-				module_result_df, module_best_weight = optimize_hybrid(
+				module_result_df, module_best_weight, weight_curve = optimize_hybrid(
 					module,
 					module_param,
 					strategies,
@@ -276,6 +352,13 @@ def run_retrieval_node(
 				)
 				module_param["weight"] = module_best_weight
 				hybrid_results.append(module_result_df)
+				weight_curve.to_csv(
+					os.path.join(
+						save_dir,
+						f"{filename_first + len(hybrid_results) - 1}_weight_curve.csv",
+					),
+					index=False,
+				)
 
 			hybrid_summary_df = save_and_summary(
 				hybrid_modules,
@@ -321,10 +404,9 @@ def run_retrieval_node(
 	)
 	results = semantic_results + lexical_results + hybrid_results
 	average_times = semantic_times + lexical_times + hybrid_times
-	filenames = summary["filename"].tolist()
 
 	# filter by strategies
-	selected_result, selected_filename = find_best(results, average_times, filenames)
+	selected_result, selected_filename = find_best(results, average_times, summary)
 	best_result = pd.concat([previous_result, selected_result], axis=1)
 
 	# add summary.csv 'is_best' column
@@ -505,40 +587,264 @@ def optimize_hybrid(
 		test_weight_size = hybrid_module_param.pop("test_weight_size", 101)
 	else:
 		raise ValueError("You must input hybrid module function at hybrid_module_func.")
+	search = hybrid_module_param.pop("search", "grid")
 
 	weight_candidates = np.linspace(
 		weight_range[0], weight_range[1], test_weight_size
 	).tolist()
 
-	result_list = []
-	for weight_value in weight_candidates:
-		result_df = hybrid_module_func.run_evaluator(
-			project_dir=project_dir,
-			previous_result=previous_result,
-			weight=weight_value,
-			**hybrid_module_param,
-		)
-		result_list.append(result_df)
-
-		# evaluate here
+	# evaluate here
 	if strategy.get("metrics") is None:
 		raise ValueError("You must at least one metrics for retrieval evaluation.")
-	result_list = list(
-		map(
-			lambda x: evaluate_retrieval_node(
-				x,
-				input_metrics,
-				strategy.get("metrics"),
-			),
-			result_list,
+	best_weight, weight_curve = sweep_hybrid_weights(
+		hybrid_module_func,
+		hybrid_module_param,
+		weight_candidates,
+		input_metrics,
+		strategy.get("metrics"),
+		strategy_name=strategy.get("strategy", "normalize_mean"),
+		search=search,
+	)
+	logger.info(
+		f"{hybrid_module_func.__name__} weight curve:\n{weight_curve.to_string(index=False)}"
+	)
+
+	# make the result of the best weight only
+	best_result_df = hybrid_module_func.run_evaluator(
+		project_dir=project_dir,
+		previous_result=previous_result,
+		weight=best_weight,
+		**hybrid_module_param,
+	)
+	best_result_df = evaluate_retrieval_node(
+		best_result_df, input_metrics, strategy.get("metrics")
+	)
+	return best_result_df, best_weight, weight_curve
+
+
+class HybridWeightEvaluator:
+	def __init__(
+		self,
+		hybrid_module_func: Callable,
+		hybrid_module_param: Dict,
+		weight_candidates: List[float],
+		input_metrics: List[MetricInput],
+		metrics: Union[List[str], List[Dict]],
+		memory_limit: int = 256 * 1024**2,
+	):
+		"""
+		Evaluate the weight candidates of the hybrid module by their indices.
+		The target module results are flattened and normalized (or ranked) once,
+		and the fused scores of the requested weights are computed and sorted together.
+		Only the metrics are computed for each weight, without fetching contents.
+		Each weight candidate is evaluated at most once.
+
+		:param hybrid_module_func: The hybrid module class. HybridRRF or HybridCC.
+		:param hybrid_module_param: The hybrid module parameters, including ids, scores, and top_k.
+		:param weight_candidates: The weight values to evaluate.
+		:param input_metrics: List of metric input schema for AutoRAG.
+		:param metrics: Metric list from input strategies.
+		:param memory_limit: The approximate bytes of the fused scores that are sorted at once.
+			The weights are split into chunks by this limit.
+		"""
+		from autorag.nodes.retrieval.base import HybridFusionTable
+		from autorag.nodes.retrieval.hybrid_cc import hybrid_cc, make_cc_fuser
+		from autorag.nodes.retrieval.hybrid_rrf import hybrid_rrf, make_rrf_fuser
+
+		if hybrid_module_func.__name__ in ["HybridRRF", "hybrid_rrf"]:
+			params = pop_params(hybrid_rrf, deepcopy(hybrid_module_param))
+			rrf_k = params.get("rrf_k", -1)
+			self.table = HybridFusionTable(params["ids"], params["scores"])
+			self.weights = [
+				int(rrf_k) if rrf_k != -1 else int(weight)
+				for weight in weight_candidates
+			]
+			self.fuse = make_rrf_fuser(self.table)
+		elif hybrid_module_func.__name__ in ["HybridCC", "hybrid_cc"]:
+			params = pop_params(hybrid_cc, deepcopy(hybrid_module_param))
+			self.table = HybridFusionTable(params["ids"][:2], params["scores"][:2])
+			self.weights = weight_candidates
+			self.fuse = make_cc_fuser(self.table, **pop_params(make_cc_fuser, params))
+		else:
+			raise ValueError(
+				"You must input hybrid module function at hybrid_module_func."
+			)
+
+		self.weight_candidates = weight_candidates
+		self.top_k = params["top_k"]
+		self.input_metrics = input_metrics
+		self.metrics = metrics
+		self.metric_names, metric_params = cast_metrics(metrics)
+		self.uniques = np.asarray(self.table.uniques, dtype=object)
+		# The metrics are computed from the id codes directly when the metric engine supports all of them.
+		self.metric_engine = None
+		if all(
+			metric_name in RETRIEVAL_MATRIX_METRICS and not metric_param
+			for metric_name, metric_param in zip(self.metric_names, metric_params)
+		):
+			self.metric_engine = RetrievalMetricEngine(input_metrics)
+			self.unique_gt_codes = self.metric_engine.vocabulary.get_indexer(
+				self.uniques
+			)
+			self.unique_valid = np.array(
+				[
+					MetricInput(retrieved_ids=[unique_id]).is_fields_notnone(
+						fields_to_check=["retrieved_ids"]
+					)
+					for unique_id in self.uniques
+				],
+				dtype=bool,
+			)
+		# The padded scores, codes, and sort positions of a weight are (row count, max slot count) arrays.
+		max_slot_count = np.bincount(self.table.slot_rows, minlength=1).max()
+		weight_bytes = max(self.table.row_count * int(max_slot_count), 1) * 8 * 3
+		self.chunk_size = max(memory_limit // weight_bytes, 1)
+		self.metric_dfs: Dict[int, pd.DataFrame] = {}
+		self.objective_values: Dict[int, float] = {}
+
+	@property
+	def evaluation_count(self) -> int:
+		return len(self.metric_dfs)
+
+	def evaluate(self, indices: List[int]) -> List[pd.DataFrame]:
+		"""
+		Evaluate the weight candidates of the indices.
+
+		:param indices: The indices of the weight candidates.
+		:return: The metric dataframe of each index.
+		"""
+		new_indices = list(
+			dict.fromkeys(index for index in indices if index not in self.metric_dfs)
 		)
+		for chunk_start in range(0, len(new_indices), self.chunk_size):
+			chunk = new_indices[chunk_start : chunk_start + self.chunk_size]
+			top_codes, _, result_counts = self.table.select_top_k_codes(
+				self.fuse([self.weights[index] for index in chunk]), self.top_k
+			)
+			in_result = np.arange(top_codes.shape[2]) < np.asarray(result_counts)[:, None]
+			for index, weight_codes in zip(chunk, top_codes):
+				if self.metric_engine is not None:
+					pred_codes = np.where(in_result, self.unique_gt_codes[weight_codes], -2)
+					pred_valid = ~np.any(
+						in_result & ~self.unique_valid[weight_codes], axis=1
+					)
+					metric_df = pd.DataFrame(
+						self.metric_engine.compute(
+							pred_codes, self.metric_names, pred_valid=pred_valid
+						)
+					)
+				else:
+					pred_ids = [
+						row_ids[:count]
+						for row_ids, count in zip(
+							self.uniques[weight_codes].tolist(), result_counts
+						)
+					]
+					metric_df = evaluate_retrieval_ids(
+						pred_ids, self.input_metrics, self.metrics
+					)
+				self.metric_dfs[index] = metric_df
+				self.objective_values[index] = float(
+					metric_df[self.metric_names].mean(axis=0).mean()
+				)
+		return [self.metric_dfs[index] for index in indices]
+
+	def __call__(self, indices: List[int]) -> List[float]:
+		"""
+		The objective function for the weight search strategies.
+		The objective value is the average of the metric means.
+
+		:param indices: The indices of the weight candidates.
+		:return: The objective value of each index.
+		"""
+		self.evaluate(indices)
+		return [self.objective_values[index] for index in indices]
+
+
+def sweep_hybrid_weights(
+	hybrid_module_func: Callable,
+	hybrid_module_param: Dict,
+	weight_candidates: List[float],
+	input_metrics: List[MetricInput],
+	metrics: Union[List[str], List[Dict]],
+	strategy_name: str = "normalize_mean",
+	search: str = "grid",
+	memory_limit: int = 256 * 1024**2,
+) -> Tuple[float, pd.DataFrame]:
+	"""
+	Search the best weight of the hybrid module among the weight candidates.
+	With the 'grid' search, every weight candidate is evaluated in one pass.
+	The other search strategies evaluate a part of the candidates.
+	The best weight is selected among the evaluated weights with the strategy.
+
+	:param hybrid_module_func: The hybrid module class. HybridRRF or HybridCC.
+	:param hybrid_module_param: The hybrid module parameters, including ids, scores, and top_k.
+	:param weight_candidates: The weight values to search.
+	:param input_metrics: List of metric input schema for AutoRAG.
+	:param metrics: Metric list from input strategies.
+	:param strategy_name: The strategy name to select the best weight. Default is 'normalize_mean'.
+	:param search: The search strategy name. You can use 'grid', 'coarse_to_fine', 'golden_section', and 'plateau'.
+		Default is 'grid'.
+	:param memory_limit: The approximate bytes of the fused scores that are sorted at once.
+		The weight candidates are split into chunks by this limit.
+	:return: The best weight and the metric curve.
+		The metric curve has 'weight' column, the mean of each metric,
+		and 'evaluation_order' column of each evaluated weight.
+	"""
+	if search not in weight_search_dict:
+		raise ValueError(
+			f"search {search} is not in supported search strategies: {list(weight_search_dict.keys())}"
+		)
+	evaluator = HybridWeightEvaluator(
+		hybrid_module_func,
+		hybrid_module_param,
+		weight_candidates,
+		input_metrics,
+		metrics,
+		memory_limit=memory_limit,
+	)
+	weight_search_dict[search](evaluator, len(weight_candidates))
+	logger.info(
+		f"{hybrid_module_func.__name__} {search} search spent {evaluator.evaluation_count} evaluations "
+		f"among {len(weight_candidates)} weight candidates."
 	)
 
-	# select best result
-	best_result_df, best_weight = select_best(
-		result_list,
-		strategy.get("metrics"),
-		metadatas=weight_candidates,
-		strategy_name=strategy.get("strategy", "normalize_mean"),
+	evaluation_order = list(evaluator.metric_dfs.keys())
+	indices = sorted(evaluation_order)
+	metric_dfs = evaluator.evaluate(indices)
+	evaluated_weights = [weight_candidates[index] for index in indices]
+	_, best_weight = select_best(
+		metric_dfs,
+		metrics,
+		metadatas=evaluated_weights,
+		strategy_name=strategy_name,
+	)
+	weight_curve = pd.DataFrame([df.mean(axis=0).to_dict() for df in metric_dfs])
+	weight_curve.insert(0, "weight", evaluated_weights)
+	weight_curve["evaluation_order"] = [
+		evaluation_order.index(index) + 1 for index in indices
+	]
+	return best_weight, weight_curve
+
+
+def evaluate_retrieval_ids(
+	pred_ids: List[List[str]],
+	metric_inputs: List[MetricInput],
+	metrics: Union[List[str], List[Dict]],
+) -> pd.DataFrame:
+	"""
+	Compute the retrieval metrics of the retrieved ids only.
+
+	:param pred_ids: The retrieved ids of each query.
+	:param metric_inputs: List of metric input schema for AutoRAG.
+	:param metrics: Metric list from input strategies.
+	:return: The dataframe with metric columns.
+	"""
+
+	@evaluate_retrieval(metric_inputs=metric_inputs, metrics=metrics)
+	def evaluate_ids():
+		return [None] * len(pred_ids), pred_ids, [None] * len(pred_ids)
+
+	return evaluate_ids().drop(
+		columns=["retrieved_contents", "retrieved_ids", "retrieve_scores"]
 	)
-	return best_result_df, best_weight
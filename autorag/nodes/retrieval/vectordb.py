@@ -1,18 +1,17 @@
+import asyncio
 import itertools
 import logging
 import os
-from typing import List, Tuple, Optional
+import time
+from collections import deque
+from typing import Dict, List, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 from llama_index.core.embeddings import BaseEmbedding
 from llama_index.embeddings.openai import OpenAIEmbedding
 
-from autorag.evaluation.metric.util import (
-	calculate_l2_distance,
-	calculate_inner_product,
-	calculate_cosine_similarity,
-)
+from autorag.embedding.cache import unwrap_embedding
 from autorag.nodes.retrieval.base import evenly_distribute_passages, BaseRetrieval
 from autorag.utils import (
 	validate_corpus_dataset,
@@ -24,21 +23,28 @@ from autorag.utils.util import (
 	get_event_loop,
 	process_batch,
 	openai_truncate_by_token,
-	flatten_apply,
 	result_to_dataframe,
 	pop_params,
 	fetch_contents,
 	empty_cuda_cache,
 	convert_inputs_to_list,
 	make_batch,
+	reconstruct_list,
+	load_yaml_config,
 )
-from autorag.vectordb import load_vectordb_from_yaml
+from autorag.vectordb import get_support_vectordb, load_vectordb_from_yaml
 from autorag.vectordb.base import BaseVectorStore
+from autorag.result_cache import path_version
+from autorag.vectordb.manifest import IngestManifest, get_manifest_path
 
 logger = logging.getLogger("AutoRAG")
 
 
 class VectorDB(BaseRetrieval):
+	instance_cache_params = ("vectordb",)
+	prefix_stable = True
+	workload_type = "io"
+
 	def __init__(self, project_dir: str, vectordb: str = "default", **kwargs):
 		"""
 		Initialize VectorDB retrieval node.
@@ -59,6 +65,41 @@ class VectorDB(BaseRetrieval):
 
 		self.embedding_model = self.vector_store.embedding
 
+	@classmethod
+	def is_prefix_stable(
+		cls,
+		previous_result: pd.DataFrame,
+		project_dir=None,
+		vectordb: str = "default",
+		**kwargs,
+	) -> bool:
+		# Only the exact search keeps a smaller top_k as the prefix of a larger top_k.
+		if project_dir is None or not super().is_prefix_stable(previous_result):
+			return False
+		vectordb_config = get_vectordb_config(project_dir, vectordb)
+		if len(vectordb_config) == 0:
+			# The default vectordb is Chroma, which uses the HNSW index.
+			return False
+		params = {
+			key: value
+			for key, value in vectordb_config.items()
+			if key not in ("name", "db_type")
+		}
+		return get_support_vectordb(vectordb_config["db_type"]).is_exact_search(
+			**params
+		)
+
+	@classmethod
+	def result_cache_versions(
+		cls, project_dir, *args, vectordb: str = "default", **kwargs
+	) -> Dict[str, str]:
+		# The ingestion manifest has the content hash of every ingested passage.
+		resources_dir = os.path.join(project_dir, "resources")
+		vectordb_config = get_vectordb_config(project_dir, vectordb)
+		return {
+			"vectordb": path_version(get_manifest_path(resources_dir, vectordb_config))
+		}
+
 	def __del__(self):
 		del self.vector_store
 		del self.embedding_model
@@ -88,7 +129,9 @@ class VectorDB(BaseRetrieval):
 		:param queries: 2-d list of query strings.
 		    Each element of the list is a query strings of each row.
 		:param top_k: The number of passages to be retrieved.
-		:param embedding_batch: The number of queries to be processed in parallel.
+		:param embedding_batch: The number of queries to be embedded and searched at once.
+		    The queries of all rows are flattened and split to this size,
+		    so each batch is a single embedding call and a single multi-vector search.
 		    This is used to prevent API error at the query embedding.
 		    Default is 128.
 		:param ids: The optional list of ids that you want to retrieve.
@@ -102,23 +145,17 @@ class VectorDB(BaseRetrieval):
 		if ids is not None:
 			return self.__get_ids_scores(queries, ids, embedding_batch)
 
-		# run async vector_db_pure function
-		tasks = [
-			vectordb_pure(query_list, top_k, self.vector_store)
-			for query_list in queries
-		]
 		loop = get_event_loop()
-		results = loop.run_until_complete(
-			process_batch(tasks, batch_size=embedding_batch)
+		return loop.run_until_complete(
+			vectordb_pure_batch(
+				queries, top_k, self.vector_store, batch_size=embedding_batch
+			)
 		)
-		id_result = list(map(lambda x: x[0], results))
-		score_result = list(map(lambda x: x[1], results))
-		return id_result, score_result
 
 	def __get_ids_scores(self, queries, ids, embedding_batch: int):
 		# truncate queries and embedding execution here.
 		openai_embedding_limit = 8000
-		if isinstance(self.embedding_model, OpenAIEmbedding):
+		if isinstance(unwrap_embedding(self.embedding_model), OpenAIEmbedding):
 			queries = list(
 				map(
 					lambda query_list: openai_truncate_by_token(
@@ -130,41 +167,49 @@ class VectorDB(BaseRetrieval):
 				)
 			)
 
-		query_embeddings = flatten_apply(
-			run_query_embedding_batch,
-			queries,
+		query_lengths = list(map(len, queries))
+		query_embeddings = run_query_embedding_batch(
+			list(itertools.chain.from_iterable(queries)),
 			embedding_model=self.embedding_model,
 			batch_size=embedding_batch,
 		)
 
+		# fetch the union of the ids at once
+		unique_ids = list(dict.fromkeys(itertools.chain.from_iterable(ids)))
 		loop = get_event_loop()
-
-		async def run_fetch(ids):
-			final_result = []
-			for id_list in ids:
-				if len(id_list) == 0:
-					final_result.append([])
-				else:
-					result = await self.vector_store.fetch(id_list)
-					final_result.append(result)
-			return final_result
-
-		content_embeddings = loop.run_until_complete(run_fetch(ids))
-
-		score_result = list(
-			map(
-				lambda query_embedding_list, content_embedding_list: get_id_scores(
-					query_embedding_list,
-					content_embedding_list,
-					similarity_metric=self.vector_store.similarity_metric,
-				),
-				query_embeddings,
-				content_embeddings,
-			)
+		content_embeddings = loop.run_until_complete(
+			fetch_embeddings(self.vector_store, unique_ids)
+		)
+		id_to_index = {_id: i for i, _id in enumerate(unique_ids)}
+		content_indices = [[id_to_index[_id] for _id in id_list] for id_list in ids]
+
+		score_result = get_id_scores_batch(
+			query_embeddings,
+			query_lengths,
+			content_embeddings,
+			content_indices,
+			similarity_metric=self.vector_store.similarity_metric,
 		)
 		return ids, score_result
 
 
+def get_vectordb_config(project_dir, vectordb: str = "default") -> Dict:
+	"""
+	Get the vectordb config of the vectordb name at the vectordb.yaml file of the project.
+
+	:param project_dir: The project directory.
+	:param vectordb: The vectordb name. Default is 'default'.
+	:return: The vectordb config dictionary.
+	    It is empty if the vectordb is the default vectordb.
+	"""
+	vectordb_configs = load_yaml_config(
+		os.path.join(project_dir, "resources", "vectordb.yaml")
+	).get("vectordb", [])
+	if len(vectordb_configs) == 0 or vectordb == "default":
+		return {}
+	return next(filter(lambda x: x["name"] == vectordb, vectordb_configs), {})
+
+
 async def vectordb_pure(
 	queries: List[str], top_k: int, vectordb: BaseVectorStore
 ) -> Tuple[List[str], List[float]]:
@@ -181,6 +226,58 @@ async def vectordb_pure(
 
 	# Distribute passages evenly
 	id_result, score_result = evenly_distribute_passages(id_result, score_result, top_k)
+	return sort_vectordb_result(id_result, score_result)
+
+
+async def vectordb_pure_batch(
+	queries: List[List[str]],
+	top_k: int,
+	vectordb: BaseVectorStore,
+	batch_size: int = 128,
+	concurrency: int = 4,
+) -> Tuple[List[List[str]], List[List[float]]]:
+	"""
+	Batched VectorDB retrieval function.
+	It flattens the queries of all rows and queries the vector store with large batches,
+	instead of one embedding call and one search call for each row.
+	Then, it regroups the results to each row.
+
+	:param queries: 2-d list of query strings.
+	    Each element of the list is a query strings of each row.
+	:param top_k: The number of passages to be retrieved.
+	:param vectordb: The vector store instance.
+	:param batch_size: The number of queries to embed and search at once. Default is 128.
+	:param concurrency: The number of query batches to run concurrently. Default is 4.
+	:return: The 2-d list contains a list of passage ids that retrieved from vectordb and 2-d list of its scores.
+	"""
+	flatten_queries = list(itertools.chain.from_iterable(queries))
+	tasks = [
+		vectordb.query(queries=query_batch, top_k=top_k)
+		for query_batch in make_batch(flatten_queries, batch_size)
+	]
+	results = await process_batch(tasks, batch_size=concurrency)
+	flatten_ids = list(itertools.chain.from_iterable(map(lambda x: x[0], results)))
+	flatten_scores = list(itertools.chain.from_iterable(map(lambda x: x[1], results)))
+
+	id_result, score_result = [], []
+	query_index = 0
+	for query_list in queries:
+		ids, scores = sort_vectordb_result(
+			*evenly_distribute_passages(
+				flatten_ids[query_index : query_index + len(query_list)],
+				flatten_scores[query_index : query_index + len(query_list)],
+				top_k,
+			)
+		)
+		query_index += len(query_list)
+		id_result.append(ids)
+		score_result.append(scores)
+	return id_result, score_result
+
+
+def sort_vectordb_result(
+	id_result: List[str], score_result: List[float]
+) -> Tuple[List[str], List[float]]:
 	# sort id_result and score_result by score
 	result = [
 		(_id, score)
@@ -236,6 +333,7 @@ async def filter_exist_ids_from_retrieval_gt(
 async def vectordb_ingest(
 	vectordb: BaseVectorStore,
 	corpus_data: pd.DataFrame,
+	max_in_flight: int = 4,
 ):
 	"""
 	Ingest given corpus data to the vectordb.
@@ -243,17 +341,126 @@ async def vectordb_ingest(
 	Plus, when the corpus content is empty (whitespace), it will be ignored.
 	And if there is a document id that already exists in the collection, it will be ignored.
 
+	The ingestion is pipelined, so the next batches are embedded while the current batch is inserted.
+	The vectordb is at the bulk-load mode during the ingestion,
+	so the work like the index build is done once at the end.
+
 	:param vectordb: A vector stores instance that you want to ingest.
 	:param corpus_data: The corpus data that contains doc_id and contents columns.
+	:param max_in_flight: The maximum number of batches that are embedding or waiting for the insertion.
+	    It bounds the memory of the embeddings waiting for the insertion.
+	    Default is 4.
 	"""
 	embedding_batch = vectordb.embedding_batch
-	if not corpus_data.empty:
-		new_contents = corpus_data["contents"].tolist()
-		new_ids = corpus_data["doc_id"].tolist()
-		content_batches = make_batch(new_contents, embedding_batch)
-		id_batches = make_batch(new_ids, embedding_batch)
+	if corpus_data.empty:
+		return
+	new_contents = corpus_data["contents"].tolist()
+	new_ids = corpus_data["doc_id"].tolist()
+	content_batches = make_batch(new_contents, embedding_batch)
+	id_batches = make_batch(new_ids, embedding_batch)
+
+	start_time = time.perf_counter()
+	pending = deque()
+
+	async def insert_oldest():
+		id_batch, content_batch, embedding_task = pending.popleft()
+		await vectordb.insert(id_batch, content_batch, await embedding_task)
+
+	vectordb.begin_bulk_load()
+	try:
 		for content_batch, id_batch in zip(content_batches, id_batches):
-			await vectordb.add(ids=id_batch, texts=content_batch)
+			pending.append(
+				(id_batch, content_batch, asyncio.ensure_future(vectordb.embed(content_batch)))
+			)
+			if len(pending) >= max_in_flight:
+				await insert_oldest()
+		while len(pending) > 0:
+			await insert_oldest()
+	finally:
+		for _, _, embedding_task in pending:
+			embedding_task.cancel()
+		vectordb.end_bulk_load()
+
+	elapsed_time = time.perf_counter() - start_time
+	logger.info(
+		f"Ingested {len(new_ids)} passages to the vectordb in {elapsed_time:.2f} seconds "
+		f"({len(new_ids) / max(elapsed_time, 1e-9):.1f} rows/sec)"
+	)
+
+
+async def verify_manifest(
+	vectordb: BaseVectorStore,
+	corpus_data: pd.DataFrame,
+	manifest: IngestManifest,
+	sample_size: int = 64,
+):
+	"""
+	Spot-check that the passages at the manifest exist at the vectordb.
+	When the collection is dropped or recreated, the manifest still says the passages are ingested.
+	So, it checks a random sample of the recorded passages, and if any of them is missing,
+	it checks every recorded passage and removes the missing ones from the manifest.
+
+	:param vectordb: A vector stores instance.
+	:param corpus_data: The corpus data that contains doc_id and contents columns.
+	:param manifest: The ingestion manifest of the vectordb.
+	:param sample_size: The number of passages to check at first. 0 disables the check.
+	"""
+	recorded_corpus = corpus_data[corpus_data["doc_id"].isin(manifest.hashes.keys())]
+	if sample_size <= 0 or recorded_corpus.empty:
+		return
+	sample_ids = (
+		recorded_corpus["doc_id"]
+		.sample(n=min(sample_size, len(recorded_corpus)))
+		.tolist()
+	)
+	if all(await vectordb.is_exist(ids=sample_ids)):
+		return
+	missing_passage = await filter_exist_ids(vectordb, recorded_corpus)
+	logger.warning(
+		f"{len(missing_passage)} passages at the ingestion manifest {manifest.path} "
+		f"do not exist at the vectordb. They are ingested again."
+	)
+	manifest.remove(missing_passage["doc_id"].tolist())
+
+
+async def vectordb_ingest_with_manifest(
+	vectordb: BaseVectorStore,
+	corpus_data: pd.DataFrame,
+	manifest: IngestManifest,
+	verify_sample_size: int = 64,
+):
+	"""
+	Ingest the new and changed passages of the corpus data to the vectordb.
+	The passages to ingest are found by comparing the content hashes at the ingestion manifest,
+	so it does not call the vectordb to check every existing id.
+	The changed passages, which have the same doc_id but different contents, are deleted and re-ingested.
+	When the manifest does not exist yet, it is built from the existing ids of the vectordb once.
+	When the manifest exists, a sample of its passages is checked at the vectordb,
+	and the passages that are lost at the vectordb are ingested again.
+
+	:param vectordb: A vector stores instance that you want to ingest.
+	:param corpus_data: The corpus data that contains doc_id and contents columns.
+	:param manifest: The ingestion manifest of the vectordb.
+	:param verify_sample_size: The number of manifest passages to check at the vectordb.
+	    0 disables the check. Default is 64.
+	"""
+	corpus_data = cast_corpus_dataset(corpus_data)
+	validate_corpus_dataset(corpus_data)
+	if not manifest.exists:
+		new_passage = await filter_exist_ids(vectordb, corpus_data)
+		manifest.update(
+			corpus_data[~corpus_data["doc_id"].isin(new_passage["doc_id"])]
+		)
+	else:
+		await verify_manifest(vectordb, corpus_data, manifest, verify_sample_size)
+
+	target_corpus, changed_ids = manifest.diff(corpus_data)
+	if len(changed_ids) > 0:
+		logger.info(f"Re-ingest {len(changed_ids)} passages whose contents are changed.")
+		await vectordb.delete(changed_ids)
+	await vectordb_ingest(vectordb, target_corpus)
+	manifest.update(target_corpus)
+	manifest.save()
 
 
 def run_query_embedding_batch(
@@ -267,6 +474,105 @@ def run_query_embedding_batch(
 	return result
 
 
+async def fetch_embeddings(
+	vectordb: BaseVectorStore,
+	ids: List[str],
+	batch_size: int = 1024,
+	concurrency: int = 4,
+) -> np.ndarray:
+	"""
+	Fetch the embeddings of the ids from the vector store in large batches.
+
+	:param vectordb: The vector store instance.
+	:param ids: The ids to fetch. It must not have duplicates.
+	:param batch_size: The number of ids to fetch at once. Default is 1024.
+	:param concurrency: The number of fetch batches to run concurrently. Default is 4.
+	:return: The contiguous embedding matrix. Each row is the embedding of each id.
+	"""
+	if len(ids) == 0:
+		return np.zeros((0, 0), dtype=np.float32)
+	tasks = [vectordb.fetch(id_batch) for id_batch in make_batch(ids, batch_size)]
+	results = await process_batch(tasks, batch_size=concurrency)
+	return np.asarray(list(itertools.chain.from_iterable(results)), dtype=np.float32)
+
+
+def get_id_scores_batch(
+	query_embeddings: List[List[float]],
+	query_lengths: List[int],
+	content_embeddings: np.ndarray,
+	content_indices: List[List[int]],
+	similarity_metric: str,
+	batch_size: int = 65536,
+) -> List[List[float]]:
+	"""
+	Calculate the highest similarity scores between the query embeddings and the content embeddings of each row.
+	It gathers every (query, content) pair of all rows and computes the similarities
+	with the batched dot products, instead of the python loop of each pair.
+
+	:param query_embeddings: The flatten query embeddings of all rows.
+	:param query_lengths: The number of queries of each row.
+	:param content_embeddings: The content embedding matrix.
+	:param content_indices: The indices of the content embedding matrix to score at each row.
+	:param similarity_metric: The similarity metric to use ('l2', 'ip', or 'cosine').
+	:param batch_size: The number of pairs to compute at once. Default is 65536.
+	:return: The 2-d list of the highest similarity scores for each content of each row.
+	"""
+	if similarity_metric not in ["l2", "ip", "cosine"]:
+		raise ValueError(
+			f"similarity_metric {similarity_metric} is not supported\n"
+			"supported similarity metrics are: l2, ip, cosine"
+		)
+	content_lengths = list(map(len, content_indices))
+	if sum(content_lengths) == 0:
+		return [[] for _ in content_indices]
+	query_matrix = np.asarray(query_embeddings, dtype=np.float32)
+	content_matrix = np.asarray(content_embeddings, dtype=np.float32)
+	if similarity_metric == "cosine":
+		query_matrix = query_matrix / np.linalg.norm(query_matrix, axis=1, keepdims=True)
+		content_matrix = content_matrix / np.linalg.norm(
+			content_matrix, axis=1, keepdims=True
+		)
+
+	# the pairs are ordered by (row, content, query), so the queries of a content are contiguous
+	query_starts = np.cumsum([0] + query_lengths[:-1])
+	pair_queries, pair_contents, group_sizes = [], [], []
+	for query_start, query_length, indices in zip(
+		query_starts, query_lengths, content_indices
+	):
+		if len(indices) == 0:
+			continue
+		pair_queries.append(
+			np.tile(np.arange(query_start, query_start + query_length), len(indices))
+		)
+		pair_contents.append(np.repeat(indices, query_length))
+		group_sizes.append(np.full(len(indices), query_length))
+	pair_queries = np.concatenate(pair_queries)
+	pair_contents = np.concatenate(pair_contents)
+	group_sizes = np.concatenate(group_sizes)
+
+	dots = np.empty(len(pair_queries), dtype=np.float32)
+	for start in range(0, len(dots), batch_size):
+		end = start + batch_size
+		dots[start:end] = np.einsum(
+			"ij,ij->i",
+			query_matrix[pair_queries[start:end]],
+			content_matrix[pair_contents[start:end]],
+		)
+	if similarity_metric == "l2":
+		query_norms = np.einsum("ij,ij->i", query_matrix, query_matrix)
+		content_norms = np.einsum("ij,ij->i", content_matrix, content_matrix)
+		squared_distances = (
+			query_norms[pair_queries] + content_norms[pair_contents] - 2 * dots
+		)
+		scores = 1 - np.sqrt(np.maximum(squared_distances, 0))
+	else:
+		scores = dots
+
+	group_starts = np.concatenate([[0], np.cumsum(group_sizes)[:-1]])
+	max_scores = np.maximum.reduceat(scores, group_starts).tolist()
+	return reconstruct_list(max_scores, content_lengths)
+
+
 @convert_inputs_to_list
 def get_id_scores(  # To find the uncalculated score when fuse the scores for the hybrid retrieval
 	query_embeddings: List[
@@ -285,19 +591,10 @@ def get_id_scores(  # To find the uncalculated score when fuse the scores for th
 	:param similarity_metric: The similarity metric to use ('l2', 'ip', or 'cosine').
 	:return: A list of the highest similarity scores for each content embedding.
 	"""
-	metric_func_dict = {
-		"l2": lambda x, y: 1 - calculate_l2_distance(x, y),
-		"ip": calculate_inner_product,
-		"cosine": calculate_cosine_similarity,
-	}
-	metric_func = metric_func_dict[similarity_metric]
-
-	result = []
-	for content_embedding in content_embeddings:
-		scores = []
-		for query_embedding in query_embeddings:
-			scores.append(
-				metric_func(np.array(query_embedding), np.array(content_embedding))
-			)
-		result.append(max(scores))
-	return result
+	return get_id_scores_batch(
+		query_embeddings,
+		[len(query_embeddings)],
+		content_embeddings,
+		[list(range(len(content_embeddings)))],
+		similarity_metric,
+	)[0]
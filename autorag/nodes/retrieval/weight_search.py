@@ -0,0 +1,114 @@
+import math
+from typing import Callable, List
+
+import numpy as np
+
+# The objective function gets the indices of the weight candidates
+# and returns the objective value of each index. Higher is better.
+Objective = Callable[[List[int]], List[float]]
+
+
+def grid_search(objective: Objective, size: int) -> int:
+	"""
+	Evaluate every weight candidate.
+
+	:param objective: The objective function of the weight candidate indices.
+	:param size: The number of the weight candidates.
+	:return: The index of the best weight candidate.
+	"""
+	indices = list(range(size))
+	return indices[int(np.argmax(objective(indices)))]
+
+
+def coarse_to_fine_search(objective: Objective, size: int, coarse_size: int = 5) -> int:
+	"""
+	Evaluate a coarse grid first, and refine around the best candidate with halving steps.
+	It assumes that the metric changes smoothly with the weight.
+
+	:param objective: The objective function of the weight candidate indices.
+	:param size: The number of the weight candidates.
+	:param coarse_size: The number of the candidates at the first coarse grid.
+	    Default is 5.
+	:return: The index of the best weight candidate.
+	"""
+	step = max((size - 1) // max(coarse_size - 1, 1), 1)
+	indices = sorted(set(range(0, size, step)) | {size - 1})
+	values = objective(indices)
+	best_index, best_value = indices[int(np.argmax(values))], max(values)
+	while step > 1:
+		step = (step + 1) // 2
+		indices = [
+			index
+			for index in (best_index - step, best_index + step)
+			if 0 <= index < size
+		]
+		for index, value in zip(indices, objective(indices)):
+			if value > best_value:
+				best_index, best_value = index, value
+	return best_index
+
+
+def golden_section_search(objective: Objective, size: int) -> int:
+	"""
+	Narrow the range of the weight candidates with the golden ratio.
+	Each step evaluates at most one new candidate because the inner points are reused.
+	It assumes that the metric has one peak along the weight.
+
+	:param objective: The objective function of the weight candidate indices.
+	:param size: The number of the weight candidates.
+	:return: The index of the best weight candidate.
+	"""
+	inverse_phi = (math.sqrt(5) - 1) / 2
+	low, high = 0, size - 1
+	while high - low > 2:
+		distance = int(round((high - low) * inverse_phi))
+		left, right = high - distance, low + distance
+		if left >= right:
+			left, right = (low + high) // 2, (low + high) // 2 + 1
+		left_value, right_value = objective([left, right])
+		if left_value >= right_value:
+			high = right
+		else:
+			low = left
+	indices = list(range(low, high + 1))
+	return indices[int(np.argmax(objective(indices)))]
+
+
+def plateau_search(
+	objective: Objective, size: int, patience: int = 5, tolerance: float = 1e-4
+) -> int:
+	"""
+	Evaluate the weight candidates in order, and stop when the metric plateaus.
+	The search stops when the best value is not improved more than the tolerance
+	for the patience number of candidates.
+
+	:param objective: The objective function of the weight candidate indices.
+	:param size: The number of the weight candidates.
+	:param patience: The number of the candidates to wait for an improvement.
+	    The candidates are evaluated in batches of this size.
+	    Default is 5.
+	:param tolerance: The minimum improvement of the objective value.
+	    Default is 1e-4.
+	:return: The index of the best weight candidate.
+	"""
+	best_index, best_value = 0, -math.inf
+	stale_count = 0
+	for start in range(0, size, patience):
+		indices = list(range(start, min(start + patience, size)))
+		for index, value in zip(indices, objective(indices)):
+			if value > best_value + tolerance:
+				best_index, best_value = index, value
+				stale_count = 0
+			else:
+				stale_count += 1
+		if stale_count >= patience:
+			break
+	return best_index
+
+
+weight_search_dict = {
+	"grid": grid_search,
+	"coarse_to_fine": coarse_to_fine_search,
+	"golden_section": golden_section_search,
+	"plateau": plateau_search,
+}
@@ -0,0 +1,511 @@
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import Field, PrivateAttr
+
+from autorag.model_registry import make_model_key, model_registry
+
+logger = logging.getLogger("AutoRAG")
+
+ONNX_TASKS = ["sequence-classification", "feature-extraction", "seq2seq-first-token"]
+ONNX_FILE_NAME = "model.onnx"
+ONNX_INT8_FILE_NAME = "model_int8.onnx"
+ONNX_CONFIG_FILE_NAME = "onnx_config.json"
+
+
+def get_onnx_model_dir(project_dir: str, model_name: str, task: str) -> str:
+	"""
+	Get the directory of the exported ONNX model at the project resources directory.
+
+	:param project_dir: The project directory.
+	:param model_name: The HuggingFace model name or the local model path.
+	:param task: The export task. Must be one of ONNX_TASKS.
+	:return: The directory of the exported ONNX model.
+	"""
+	safe_model_name = model_name.strip("/").replace("/", "_").replace("\\", "_")
+	return os.path.join(project_dir, "resources", "onnx", f"{safe_model_name}_{task}")
+
+
+def _load_torch_module(model_name: str, task: str):
+	"""
+	Load the HuggingFace model as a torch module that returns a single output tensor.
+	The same module is used for the ONNX export and the PyTorch side of the benchmark.
+
+	:return: The torch module, the tokenizer and the input names of the module.
+	"""
+	if task not in ONNX_TASKS:
+		raise ValueError(f"task must be one of {ONNX_TASKS}, but got {task}.")
+	try:
+		import torch
+		from transformers import (
+			AutoModel,
+			AutoModelForSequenceClassification,
+			AutoModelForSeq2SeqLM,
+			AutoTokenizer,
+		)
+	except ImportError:
+		raise ImportError(
+			"Exporting the ONNX model needs torch and transformers. "
+			"Please install AutoRAG[gpu]."
+		)
+
+	tokenizer = AutoTokenizer.from_pretrained(model_name)
+	if task == "sequence-classification":
+		model = AutoModelForSequenceClassification.from_pretrained(model_name)
+	elif task == "feature-extraction":
+		model = AutoModel.from_pretrained(model_name)
+	else:
+		model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+	model.eval()
+
+	input_names = [
+		name
+		for name in ["input_ids", "attention_mask", "token_type_ids"]
+		if name in tokenizer.model_input_names
+	]
+	if task == "seq2seq-first-token":
+		input_names = ["input_ids", "attention_mask"]
+
+	class SingleOutputModule(torch.nn.Module):
+		def __init__(self):
+			super().__init__()
+			self.model = model
+
+		def forward(self, *inputs):
+			model_inputs = dict(zip(input_names, inputs))
+			if task == "sequence-classification":
+				return self.model(**model_inputs).logits
+			if task == "feature-extraction":
+				return self.model(**model_inputs).last_hidden_state
+			# The logits of the first decoder step, like the monoT5 scoring.
+			decoder_input_ids = torch.full(
+				(model_inputs["input_ids"].shape[0], 1),
+				self.model.config.decoder_start_token_id,
+				dtype=torch.long,
+			)
+			return self.model(
+				**model_inputs, decoder_input_ids=decoder_input_ids
+			).logits[:, 0, :]
+
+	return SingleOutputModule().eval(), tokenizer, input_names
+
+
+def export_onnx_model(
+	model_name: str, task: str, output_dir: str, opset_version: int = 17
+):
+	"""
+	Export the HuggingFace model to the ONNX graph with the dynamic batch and sequence axes.
+	The tokenizer is saved with the graph, so the exported directory works without torch.
+
+	:param model_name: The HuggingFace model name or the local model path.
+	:param task: The export task. Must be one of ONNX_TASKS.
+	:param output_dir: The directory to save the ONNX graph and the tokenizer.
+	:param opset_version: The ONNX opset version. Default is 17.
+	"""
+	module, tokenizer, input_names = _load_torch_module(model_name, task)
+	import torch
+
+	dummy_encoding = tokenizer(
+		["AutoRAG exports this model.", "ONNX"],
+		padding=True,
+		return_tensors="pt",
+	)
+	dummy_inputs = tuple(dummy_encoding[name] for name in input_names)
+	dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+	dynamic_axes["output"] = (
+		{0: "batch", 1: "sequence"} if task == "feature-extraction" else {0: "batch"}
+	)
+
+	tmp_dir = f"{output_dir}.tmp"
+	shutil.rmtree(tmp_dir, ignore_errors=True)
+	os.makedirs(tmp_dir)
+	with torch.no_grad():
+		torch.onnx.export(
+			module,
+			dummy_inputs,
+			os.path.join(tmp_dir, ONNX_FILE_NAME),
+			input_names=input_names,
+			output_names=["output"],
+			dynamic_axes=dynamic_axes,
+			opset_version=opset_version,
+		)
+	tokenizer.save_pretrained(tmp_dir)
+	with open(os.path.join(tmp_dir, ONNX_CONFIG_FILE_NAME), "w") as f:
+		json.dump({"model_name": model_name, "task": task}, f)
+	shutil.rmtree(output_dir, ignore_errors=True)
+	os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+	os.replace(tmp_dir, output_dir)
+
+
+def quantize_onnx_model(model_dir: str):
+	"""
+	Quantize the exported ONNX graph with the dynamic int8 quantization.
+	The weights are stored as int8 and the activations are quantized at the run time,
+	so it does not need the calibration data.
+
+	:param model_dir: The directory of the exported ONNX model.
+	"""
+	try:
+		from onnxruntime.quantization import QuantType, quantize_dynamic
+	except ImportError:
+		raise ImportError(
+			"Please install onnxruntime and onnx to quantize the ONNX model."
+		)
+	tmp_path = os.path.join(model_dir, f"{ONNX_INT8_FILE_NAME}.tmp")
+	graph_bytes = sum(
+		os.path.getsize(os.path.join(model_dir, file_name))
+		for file_name in os.listdir(model_dir)
+	)
+	quantize_dynamic(
+		os.path.join(model_dir, ONNX_FILE_NAME),
+		tmp_path,
+		weight_type=QuantType.QInt8,
+		# the protobuf file of the graph can not exceed 2GB
+		use_external_data_format=graph_bytes >= 2**31,
+	)
+	os.replace(tmp_path, os.path.join(model_dir, ONNX_INT8_FILE_NAME))
+
+
+class ONNXModel:
+	def __init__(
+		self, model_dir: str, quantize: bool = True, num_threads: Optional[int] = None
+	):
+		"""
+		The ONNX Runtime session of the exported model on CPU.
+
+		:param model_dir: The directory of the exported ONNX model.
+		:param quantize: Whether to use the int8 quantized graph. Default is True.
+		:param num_threads: The intra-op thread count of the session.
+			Default is None, which uses all physical cores.
+		"""
+		try:
+			import onnxruntime
+			from transformers import AutoTokenizer
+		except ImportError:
+			raise ImportError(
+				"Please install onnxruntime and transformers to use the ONNX backend."
+			)
+		self.model_dir = model_dir
+		self.model_path = os.path.join(
+			model_dir, ONNX_INT8_FILE_NAME if quantize else ONNX_FILE_NAME
+		)
+		self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+		options = onnxruntime.SessionOptions()
+		options.graph_optimization_level = (
+			onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+		)
+		if num_threads is not None:
+			options.intra_op_num_threads = num_threads
+		self.session = onnxruntime.InferenceSession(
+			self.model_path, options, providers=["CPUExecutionProvider"]
+		)
+		self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+	@property
+	def file_size(self) -> int:
+		return os.path.getsize(self.model_path)
+
+	@property
+	def model_max_length(self) -> Optional[int]:
+		"""
+		The max token length of the model from its tokenizer config.
+		None if the tokenizer does not set it.
+		"""
+		max_length = getattr(self.tokenizer, "model_max_length", None)
+		# the tokenizer without the config returns a very large sentinel value
+		if max_length is None or max_length > 1_000_000:
+			return None
+		return int(max_length)
+
+	def tokenize(
+		self,
+		texts: List[str],
+		text_pairs: Optional[List[str]] = None,
+		max_length: int = 512,
+	) -> Dict[str, np.ndarray]:
+		return dict(
+			self.tokenizer(
+				texts,
+				text_pairs,
+				padding=True,
+				truncation=True,
+				max_length=max_length,
+				return_tensors="np",
+			)
+		)
+
+	def forward(self, encoding: Dict[str, np.ndarray]) -> np.ndarray:
+		inputs = {name: encoding[name].astype(np.int64) for name in self.input_names}
+		return self.session.run(None, inputs)[0]
+
+	def __call__(
+		self,
+		texts: List[str],
+		text_pairs: Optional[List[str]] = None,
+		max_length: int = 512,
+	) -> np.ndarray:
+		return self.forward(self.tokenize(texts, text_pairs, max_length))
+
+
+def load_onnx_model(
+	model_name: str,
+	task: str,
+	project_dir: Optional[str] = None,
+	quantize: bool = True,
+	num_threads: Optional[int] = None,
+) -> ONNXModel:
+	"""
+	Load the ONNX model, exporting and quantizing it at the first use.
+	The exported graphs are cached at the project resources directory,
+	and the loaded sessions are shared with the model registry.
+
+	:param model_name: The HuggingFace model name or the local model path.
+	:param task: The export task. Must be one of ONNX_TASKS.
+	:param project_dir: The project directory.
+		Default is the PROJECT_DIR environment variable or the current directory.
+	:param quantize: Whether to use the int8 quantized graph. Default is True.
+	:param num_threads: The intra-op thread count of the session.
+	:return: The ONNXModel instance.
+	"""
+	if project_dir is None:
+		project_dir = os.environ.get("PROJECT_DIR", os.getcwd())
+	model_dir = get_onnx_model_dir(project_dir, model_name, task)
+
+	def load() -> ONNXModel:
+		if not os.path.exists(os.path.join(model_dir, ONNX_FILE_NAME)):
+			logger.info(f"Export {model_name} to the ONNX graph at {model_dir}...")
+			export_onnx_model(model_name, task, model_dir)
+		if quantize and not os.path.exists(os.path.join(model_dir, ONNX_INT8_FILE_NAME)):
+			logger.info(f"Quantize the ONNX graph of {model_name} to int8...")
+			quantize_onnx_model(model_dir)
+		return ONNXModel(model_dir, quantize=quantize, num_threads=num_threads)
+
+	return model_registry.get(
+		make_model_key("ONNXModel", model_dir, quantize, num_threads=num_threads),
+		load,
+		size_estimator=lambda model: model.file_size,
+	)
+
+
+def onnx_cross_encoder_run_model(
+	input_texts: List[List[str]],
+	model: ONNXModel,
+	batch_size: int,
+	activation: Optional[str] = None,
+	max_length: int = 512,
+) -> List[float]:
+	"""
+	Score the (query, passage) pairs with the ONNX sequence classification model.
+
+	:param input_texts: The list of [query, passage] pairs.
+	:param model: The ONNXModel exported with the sequence-classification task.
+	:param batch_size: The number of pairs in a batch.
+	:param activation: The activation of the logits. "sigmoid", "softmax" or None.
+		With the softmax, the probability of the last label is the score.
+	:param max_length: The max token length of a pair.
+	:return: The list of scores.
+	"""
+	results = []
+	for start in range(0, len(input_texts), batch_size):
+		batch_texts = input_texts[start : start + batch_size]
+		logits = model(
+			[pair[0] for pair in batch_texts],
+			[pair[1] for pair in batch_texts],
+			max_length=max_length,
+		).astype(np.float32)
+		if activation == "sigmoid":
+			logits = 1 / (1 + np.exp(-logits))
+		elif activation == "softmax" and logits.shape[1] > 1:
+			exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+			logits = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+		results.extend(logits[:, -1].tolist())
+	return results
+
+
+def pool_embeddings(
+	last_hidden_state: np.ndarray,
+	attention_mask: np.ndarray,
+	pooling: str = "cls",
+	normalize: bool = True,
+) -> np.ndarray:
+	"""
+	Pool the token embeddings to the sentence embeddings.
+
+	:param last_hidden_state: The token embeddings. The shape is (batch, sequence, dim).
+	:param attention_mask: The attention mask. The shape is (batch, sequence).
+	:param pooling: "cls" or "mean". Default is "cls".
+	:param normalize: Whether to normalize the embeddings to the unit length.
+	:return: The sentence embeddings. The shape is (batch, dim).
+	"""
+	if pooling == "cls":
+		embeddings = last_hidden_state[:, 0]
+	elif pooling == "mean":
+		mask = attention_mask[:, :, np.newaxis].astype(last_hidden_state.dtype)
+		embeddings = (last_hidden_state * mask).sum(axis=1) / np.maximum(
+			mask.sum(axis=1), 1e-9
+		)
+	else:
+		raise ValueError(f"pooling must be 'cls' or 'mean', but got {pooling}.")
+	if normalize:
+		embeddings = embeddings / np.maximum(
+			np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+		)
+	return embeddings
+
+
+class ONNXEmbedding(BaseEmbedding):
+	"""
+	The local embedding model that runs the int8 ONNX graph on CPU.
+	The inputs longer than the max_length are truncated, and it is warned once.
+	"""
+
+	pooling: str = Field(default="cls", description="'cls' or 'mean' pooling.")
+	normalize: bool = Field(default=True)
+	max_length: Optional[int] = Field(
+		default=None,
+		description="The max token length. "
+		"None means the max length of the model, or 512 if it is unknown.",
+	)
+	quantize: bool = Field(default=True)
+	query_instruction: Optional[str] = Field(default=None)
+	text_instruction: Optional[str] = Field(default=None)
+	project_dir: Optional[str] = Field(default=None)
+	_model: Any = PrivateAttr()
+	_truncation_warned: bool = PrivateAttr(default=False)
+
+	def __init__(self, model_name: str, **kwargs):
+		super().__init__(model_name=model_name, **kwargs)
+		self._model = load_onnx_model(
+			model_name,
+			"feature-extraction",
+			project_dir=self.project_dir,
+			quantize=self.quantize,
+		)
+		if self.max_length is None:
+			self.max_length = self._model.model_max_length or 512
+
+	@classmethod
+	def class_name(cls) -> str:
+		return "ONNXEmbedding"
+
+	def _warn_truncation(self, texts: List[str], attention_mask: np.ndarray):
+		if self._truncation_warned:
+			return
+		# only the inputs that fill the max_length can be truncated
+		candidates = np.flatnonzero(attention_mask.sum(axis=1) >= self.max_length)
+		if len(candidates) == 0:
+			return
+		input_ids = self._model.tokenizer([texts[i] for i in candidates])["input_ids"]
+		truncated_count = sum(len(ids) > self.max_length for ids in input_ids)
+		if truncated_count > 0:
+			logger.warning(
+				f"{truncated_count} inputs are longer than the max_length {self.max_length} "
+				f"of the embedding model {self.model_name}, and they are truncated. "
+				"This warning is shown once."
+			)
+			self._truncation_warned = True
+
+	def _embed(self, texts: List[str], instruction: Optional[str]) -> List[List[float]]:
+		if instruction is not None:
+			texts = [f"{instruction} {text}" for text in texts]
+		encoding = self._model.tokenize(texts, max_length=self.max_length)
+		self._warn_truncation(texts, encoding["attention_mask"])
+		last_hidden_state = self._model.forward(encoding)
+		return pool_embeddings(
+			last_hidden_state, encoding["attention_mask"], self.pooling, self.normalize
+		).tolist()
+
+	def _get_query_embedding(self, query: str) -> List[float]:
+		return self._embed([query], self.query_instruction)[0]
+
+	async def _aget_query_embedding(self, query: str) -> List[float]:
+		return self._get_query_embedding(query)
+
+	def _get_text_embedding(self, text: str) -> List[float]:
+		return self._embed([text], self.text_instruction)[0]
+
+	def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+		return self._embed(texts, self.text_instruction)
+
+
+def benchmark_onnx_runtime(
+	model_name: str,
+	task: str,
+	texts: List[str],
+	text_pairs: Optional[List[str]] = None,
+	project_dir: Optional[str] = None,
+	batch_size: int = 32,
+	quantize: bool = True,
+	max_length: int = 512,
+	pooling: str = "cls",
+) -> Dict[str, float]:
+	"""
+	Compare the throughput and the output drift of the ONNX backend against the eager PyTorch model on CPU.
+
+	:param model_name: The HuggingFace model name or the local model path.
+	:param task: The export task. Must be one of ONNX_TASKS.
+	:param texts: The input texts. The queries for the cross-encoders.
+	:param text_pairs: The passages paired with the texts for the cross-encoders.
+	:param project_dir: The project directory to cache the exported graph.
+	:param batch_size: The batch size of both backends.
+	:param quantize: Whether to benchmark the int8 quantized graph. Default is True.
+	:param max_length: The max token length.
+	:param pooling: The pooling of the feature-extraction task. "cls" or "mean".
+	:return: The benchmark result.
+		The throughput of both backends in texts per second, the speedup,
+		the max and mean absolute difference of the outputs,
+		and the spearman correlation of the scores (the cosine similarity of the embeddings for the feature-extraction task).
+	"""
+	import torch
+	from scipy.stats import spearmanr
+
+	onnx_model = load_onnx_model(model_name, task, project_dir, quantize=quantize)
+	torch_module, _, input_names = _load_torch_module(model_name, task)
+
+	def run(forward) -> Tuple[np.ndarray, float]:
+		outputs = []
+		start_time = time.perf_counter()
+		for start in range(0, len(texts), batch_size):
+			pairs = (
+				text_pairs[start : start + batch_size] if text_pairs is not None else None
+			)
+			encoding = onnx_model.tokenize(
+				texts[start : start + batch_size], pairs, max_length
+			)
+			output = forward(encoding)
+			if task == "feature-extraction":
+				output = pool_embeddings(output, encoding["attention_mask"], pooling)
+			outputs.append(output)
+		return np.concatenate(outputs, axis=0), time.perf_counter() - start_time
+
+	def torch_forward(encoding):
+		with torch.no_grad():
+			return (
+				torch_module(*[torch.from_numpy(encoding[name]) for name in input_names])
+				.float()
+				.numpy()
+			)
+
+	torch_output, torch_seconds = run(torch_forward)
+	onnx_output, onnx_seconds = run(onnx_model.forward)
+	onnx_output = onnx_output.astype(np.float32)
+
+	abs_diff = np.abs(torch_output - onnx_output)
+	if task == "feature-extraction":
+		agreement = float(np.mean(np.sum(torch_output * onnx_output, axis=1)))
+	else:
+		agreement = float(spearmanr(torch_output[:, -1], onnx_output[:, -1])[0])
+	return {
+		"torch_texts_per_second": len(texts) / torch_seconds,
+		"onnx_texts_per_second": len(texts) / onnx_seconds,
+		"speedup": torch_seconds / onnx_seconds,
+		"max_abs_diff": float(abs_diff.max()),
+		"mean_abs_diff": float(abs_diff.mean()),
+		"agreement": agreement,
+	}
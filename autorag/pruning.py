@@ -0,0 +1,399 @@
+import logging
+import math
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from autorag.result_cache import is_result_cache_hit
+from autorag.strategy import SHARED_EXECUTION_ATTR
+
+logger = logging.getLogger("AutoRAG")
+
+PRUNING_SUPPORTED_NODES = ["retrieval", "passage_reranker", "generator"]
+
+
+class SuccessiveHalving:
+	def __init__(
+		self,
+		min_sample_size: int = 500,
+		reduction_factor: int = 2,
+		confidence: float = 0.95,
+		stratify_column: Optional[str] = None,
+		seed: int = 42,
+	):
+		"""
+		The successive halving pruning of the module candidates in a node.
+		At first, every candidate runs on a subsample of the rows.
+		Then the worst candidates are eliminated, and the survivors run on the larger subsample,
+		until the survivors run on every row.
+		A candidate is not eliminated while the confidence interval of its score
+		overlaps the confidence interval of the weakest survivor.
+
+		:param min_sample_size: The row count of the first stage.
+		    Default is 500.
+		:param reduction_factor: At each stage, 1 / reduction_factor of the candidates survive,
+		    and the sample size grows by reduction_factor times.
+		    Default is 2.
+		:param confidence: The confidence level of the score confidence interval.
+		    Default is 0.95.
+		:param stratify_column: The column of the previous result to stratify the subsample.
+		    Each subsample has the values of this column in the same proportion as the whole rows.
+		    Default is None, which means the subsample is a simple random sample.
+		:param seed: The random seed of the subsample.
+		    Default is 42.
+		"""
+		if min_sample_size < 1:
+			raise ValueError("min_sample_size must be at least 1.")
+		if reduction_factor < 2:
+			raise ValueError("reduction_factor must be at least 2.")
+		if not 0 < confidence < 1:
+			raise ValueError("confidence must be between 0 and 1.")
+		self.min_sample_size = int(min_sample_size)
+		self.reduction_factor = int(reduction_factor)
+		self.confidence = confidence
+		self.stratify_column = stratify_column
+		self.seed = seed
+
+	@classmethod
+	def from_strategies(cls, strategies: Dict) -> Optional["SuccessiveHalving"]:
+		"""
+		Make the pruning from the `pruning` key of the node strategies.
+
+		:param strategies: The strategies of the node.
+		:return: The successive halving pruning.
+		    If the strategies do not have the `pruning` key, it returns None.
+		"""
+		pruning = strategies.get("pruning")
+		if pruning is None:
+			return None
+		pruning = dict(pruning)
+		method = pruning.pop("method", "successive_halving")
+		if method != "successive_halving":
+			raise ValueError(
+				f"pruning method {method} is not supported. Use 'successive_halving'."
+			)
+		return cls(**pruning)
+
+	def sample_order(self, previous_result: pd.DataFrame) -> np.ndarray:
+		"""
+		Make the order of the rows to sample.
+		The first n rows of the order are the subsample of size n,
+		so the subsample of a stage contains the subsample of the previous stage.
+
+		:param previous_result: The previous result dataframe.
+		:return: The row positions in the sample order.
+		"""
+		rng = np.random.default_rng(self.seed)
+		row_count = len(previous_result)
+		if self.stratify_column is None:
+			return rng.permutation(row_count)
+		if self.stratify_column not in previous_result.columns:
+			raise ValueError(
+				f"stratify_column {self.stratify_column} is not in the previous result."
+			)
+		strata = previous_result[self.stratify_column].astype(str).to_numpy()
+		# Spread the rows of each stratum evenly over the order.
+		keys = np.zeros(row_count, dtype=np.float64)
+		for value in np.unique(strata):
+			rows = rng.permutation(np.flatnonzero(strata == value))
+			keys[rows] = (np.arange(len(rows)) + rng.random()) / len(rows)
+		return np.lexsort((rng.random(row_count), keys))
+
+	def stage_sizes(self, row_count: int) -> List[int]:
+		"""
+		Get the sample size of each stage.
+		The last stage always uses every row.
+
+		:param row_count: The row count of the previous result.
+		:return: The sample sizes.
+		"""
+		sizes = []
+		size = self.min_sample_size
+		while size < row_count:
+			sizes.append(size)
+			size *= self.reduction_factor
+		sizes.append(row_count)
+		return sizes
+
+	def select_survivors(self, scores: List[np.ndarray]) -> List[bool]:
+		"""
+		Select the candidates that go to the next stage.
+		The best 1 / reduction_factor candidates by the mean score survive.
+		The other candidates also survive if the upper bound of their confidence interval
+		is not below the lower bound of the weakest survivor.
+
+		:param scores: The row scores of each candidate.
+		:return: Whether each candidate survives.
+		"""
+		z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+		means = np.array(
+			[score.mean() if len(score) > 0 else -np.inf for score in scores]
+		)
+		margins = np.array(
+			[
+				z * score.std(ddof=1) / math.sqrt(len(score))
+				if len(score) > 1
+				else (np.inf if len(score) == 1 else 0.0)
+				for score in scores
+			]
+		)
+		ranking = np.argsort(-means, kind="stable")
+		keep_count = max(1, math.ceil(len(scores) / self.reduction_factor))
+		weakest = ranking[keep_count - 1]
+		weakest_lower = means[weakest] - margins[weakest]
+		keep = [False] * len(scores)
+		for rank, index in enumerate(ranking):
+			keep[index] = bool(
+				rank < keep_count or means[index] + margins[index] >= weakest_lower
+			)
+		return keep
+
+	def run(
+		self,
+		modules: List,
+		module_params: List[Dict],
+		previous_result: pd.DataFrame,
+		run_func: Callable,
+		evaluate_func: Callable[[pd.DataFrame, List[int]], pd.DataFrame],
+		metrics: List[str],
+	) -> Tuple[
+		List[pd.DataFrame], List[float], List[float], List[bool], List[Optional[int]]
+	]:
+		"""
+		Run the candidates with the successive halving.
+		Each stage runs the survivors only on the rows that are new at the stage,
+		so a survivor runs on each row once.
+
+		:param modules: The module classes to run.
+		:param module_params: The module parameters of each module.
+		:param previous_result: The previous result dataframe.
+		:param run_func: The function that runs the modules on the previous result.
+		    It gets the modules, the module parameters, and the previous result,
+		    and returns the results, the execution times, and the CPU times.
+		:param evaluate_func: The function that adds the metric columns to a result.
+		    It gets the result and the row positions of the result at the previous result.
+		:param metrics: The metric column names to score the candidates.
+		:return: The evaluated results at the original row order, the execution times,
+		    the CPU times, whether each result is from the result cache,
+		    and the stage that each candidate is eliminated.
+		    The eliminated candidates have the result of the evaluated rows only,
+		    and the survivors have None as the stage.
+		"""
+		row_count = len(previous_result)
+		order = self.sample_order(previous_result)
+		stage_sizes = self.stage_sizes(row_count)
+		pieces: List[List[pd.DataFrame]] = [[] for _ in modules]
+		execution_times = [0.0] * len(modules)
+		cpu_times = [0.0] * len(modules)
+		cache_hits = [True] * len(modules)
+		pruned_stages: List[Optional[int]] = [None] * len(modules)
+		shared_from: List[Optional[int]] = [None] * len(modules)
+		survivors = list(range(len(modules)))
+
+		start = 0
+		for stage, size in enumerate(stage_sizes, start=1):
+			if len(survivors) == 1:
+				# Nothing to compare, so the last survivor runs on the rest rows at once.
+				size = row_count
+			rows = order[start:size].tolist()
+			results, stage_times, stage_cpu_times = run_func(
+				[modules[index] for index in survivors],
+				[module_params[index] for index in survivors],
+				previous_result.iloc[rows].reset_index(drop=True),
+			)
+			for index, result, execution_time, cpu_time in zip(
+				survivors, results, stage_times, stage_cpu_times
+			):
+				cache_hits[index] = cache_hits[index] and is_result_cache_hit(result)
+				shared_index = result.attrs.get(SHARED_EXECUTION_ATTR)
+				shared_from[index] = (
+					survivors[shared_index] if shared_index is not None else None
+				)
+				pieces[index].append(evaluate_func(result.reset_index(drop=True), rows))
+				execution_times[index] += execution_time
+				cpu_times[index] += cpu_time
+			start = size
+			if size >= row_count:
+				break
+
+			scores = [
+				row_scores(pd.concat(pieces[index], ignore_index=True), metrics)
+				for index in survivors
+			]
+			keep = self.select_survivors(scores)
+			for index, is_kept in zip(survivors, keep):
+				if not is_kept:
+					pruned_stages[index] = stage
+			logger.info(
+				f"Successive halving stage {stage}: evaluated {len(survivors)} candidates "
+				f"on {size} rows and eliminated {keep.count(False)} candidates."
+			)
+			survivors = [index for index, is_kept in zip(survivors, keep) if is_kept]
+
+		results = []
+		for candidate_pieces in pieces:
+			result = pd.concat(candidate_pieces, ignore_index=True)
+			# restore the original row order
+			result = result.iloc[
+				np.argsort(order[: len(result)], kind="stable")
+			].reset_index(drop=True)
+			results.append(result)
+		set_shared_execution(results, shared_from)
+		return results, execution_times, cpu_times, cache_hits, pruned_stages
+
+
+def row_scores(result: pd.DataFrame, metrics: List[str]) -> np.ndarray:
+	"""
+	Get the score of each row, which is the mean of the metric values of the row.
+	The rows without any metric value are skipped.
+
+	:param result: The evaluated result dataframe.
+	:param metrics: The metric column names.
+	:return: The row scores.
+	"""
+	scores = result[metrics].astype(float).mean(axis=1, skipna=True)
+	return scores.dropna().to_numpy()
+
+
+def run_candidates(
+	modules: List,
+	module_params: List[Dict],
+	previous_result: pd.DataFrame,
+	run_func: Callable,
+	evaluate_func: Callable[[pd.DataFrame, List[int]], pd.DataFrame],
+	metrics: List[str],
+	pruning: Optional[SuccessiveHalving] = None,
+) -> Tuple[
+	List[pd.DataFrame],
+	List[float],
+	List[float],
+	List[bool],
+	Optional[List[Optional[int]]],
+]:
+	"""
+	Run and evaluate the module candidates of a node.
+	If the pruning is given, the candidates run with the successive halving.
+	Else, every candidate runs on every row.
+
+	:param modules: The module classes to run.
+	:param module_params: The module parameters of each module.
+	:param previous_result: The previous result dataframe.
+	:param run_func: The function that runs the modules on the previous result.
+	    It gets the modules, the module parameters, and the previous result,
+	    and returns the results, the execution times, and the CPU times.
+	:param evaluate_func: The function that adds the metric columns to a result.
+	    It gets the result and the row positions of the result at the previous result.
+	:param metrics: The metric column names to score the candidates.
+	:param pruning: The successive halving pruning.
+	    Default is None, which means no candidate is pruned.
+	:return: The evaluated results, the execution times, the CPU times,
+	    whether each result is from the result cache,
+	    and the stage that each candidate is eliminated.
+	    The stages are None if the pruning is not used.
+	"""
+	if pruning is not None:
+		return pruning.run(
+			modules, module_params, previous_result, run_func, evaluate_func, metrics
+		)
+	results, execution_times, cpu_times = run_func(
+		modules, module_params, previous_result
+	)
+	cache_hits = list(map(is_result_cache_hit, results))
+	shared_from = [result.attrs.get(SHARED_EXECUTION_ATTR) for result in results]
+	all_rows = list(range(len(previous_result)))
+	results = list(map(lambda result: evaluate_func(result, all_rows), results))
+	set_shared_execution(results, shared_from)
+	return results, execution_times, cpu_times, cache_hits, None
+
+
+def set_shared_execution(
+	results: List[pd.DataFrame], shared_from: List[Optional[int]]
+):
+	# The evaluation makes new dataframes, so the shared run index is set again.
+	for result, index in zip(results, shared_from):
+		if index is not None:
+			result.attrs[SHARED_EXECUTION_ATTR] = index
+		else:
+			result.attrs.pop(SHARED_EXECUTION_ATTR, None)
+
+
+def make_pruning_columns(
+	pruned_stages: Optional[List[Optional[int]]], results: List[pd.DataFrame]
+) -> Dict[str, List]:
+	"""
+	Make the pruning columns of the node summary.
+	`pruned_stage` is the stage that the candidate is eliminated, and it is empty for the survivors.
+	`evaluated_rows` is the row count that the candidate is evaluated on.
+	It is empty when the pruning is not used, so the summary does not change.
+
+	:param pruned_stages: The stage that each candidate is eliminated.
+	:param results: The evaluated results of each candidate.
+	:return: The dictionary of the pruning columns.
+	"""
+	if pruned_stages is None:
+		return {}
+	return {
+		"pruned_stage": pd.array(pruned_stages, dtype="Int64"),
+		"evaluated_rows": list(map(len, results)),
+	}
+
+
+def make_metric_columns(
+	results: List[pd.DataFrame],
+	metrics: List[str],
+	pruned_stages: Optional[Sequence[Optional[int]]] = None,
+	prefix: str = "",
+) -> Dict[str, List[float]]:
+	"""
+	Make the metric columns of the node summary.
+	The metric columns are the means on every row, so they are NaN for the eliminated candidates,
+	which are evaluated on fewer rows.
+	The means of the eliminated candidates on their evaluated rows are at the `stage_` columns,
+	and the `stage_` columns are empty when the pruning is not used.
+
+	:param results: The evaluated results of each candidate.
+	:param metrics: The metric column names of the results.
+	:param pruned_stages: The stage that each candidate is eliminated.
+	    Default is None, which means the pruning is not used.
+	:param prefix: The prefix of the summary column names, like 'passage_reranker_'.
+	    Default is ''.
+	:return: The dictionary of the metric columns.
+	"""
+	means = {
+		metric: [result[metric].mean() for result in results] for metric in metrics
+	}
+	if pruned_stages is None:
+		return {f"{prefix}{metric}": values for metric, values in means.items()}
+	is_pruned = [stage is not None and not pd.isna(stage) for stage in pruned_stages]
+	return {
+		**{
+			f"{prefix}{metric}": [
+				np.nan if pruned else value for value, pruned in zip(values, is_pruned)
+			]
+			for metric, values in means.items()
+		},
+		**{
+			f"stage_{prefix}{metric}": [
+				value if pruned else np.nan for value, pruned in zip(values, is_pruned)
+			]
+			for metric, values in means.items()
+		},
+	}
+
+
+def filter_pruned(pruned_stages: Optional[List[Optional[int]]], *values: List):
+	"""
+	Remove the eliminated candidates from the lists, before selecting the best candidate.
+
+	:param pruned_stages: The stage that each candidate is eliminated.
+	:param values: The lists of each candidate, like the results or the filenames.
+	:return: The lists of the survivors.
+	"""
+	if pruned_stages is None:
+		return tuple(map(list, values))
+	return tuple(
+		[value for value, stage in zip(value_list, pruned_stages) if stage is None]
+		for value_list in values
+	)
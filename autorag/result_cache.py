@@ -0,0 +1,457 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from autorag.utils.util import to_list
+
+logger = logging.getLogger("AutoRAG")
+
+CACHE_HIT_ATTR = "result_cache_hit"
+CACHE_EXECUTION_TIME_ATTR = "result_cache_execution_time"
+CACHE_CPU_TIME_ATTR = "result_cache_cpu_time"
+# The module parameters longer than this at the json are saved as their hash.
+CACHE_PARAM_MAX_LENGTH = 256
+
+
+def get_result_cache_dir(project_dir) -> str:
+	return os.path.join(str(project_dir), "resources", "result_cache")
+
+
+def _json_default(obj):
+	if hasattr(obj, "tolist"):
+		return obj.tolist()
+	return str(obj)
+
+
+def hash_object(obj) -> str:
+	return hashlib.sha256(
+		json.dumps(obj, sort_keys=True, default=_json_default).encode("utf-8")
+	).hexdigest()
+
+
+def hash_dataframe(df: pd.DataFrame) -> str:
+	"""
+	Hash the contents of the dataframe.
+	The numpy arrays at the cells are hashed the same as the lists,
+	so the dataframe that is read from the parquet file has the same hash.
+
+	:param df: The dataframe to hash.
+	:return: The hex digest of the dataframe.
+	"""
+	columns = sorted(df.columns)
+	return hash_object({column: df[column].tolist() for column in columns})
+
+
+def compact_params(params, max_length: int = CACHE_PARAM_MAX_LENGTH):
+	"""
+	Make the module parameters short for the cache key and metadata.
+	The parameters that are longer than max_length at the json,
+	like the ids and scores lists of the hybrid retrieval, are replaced with a short summary
+	and the blake2b hash of their json, so the key still changes when they change.
+
+	:param params: The module parameters. The dictionaries are compacted by their values.
+	:param max_length: The max json length of a parameter to keep as it is.
+	    Default is 256.
+	:return: The compact parameters.
+	"""
+	if isinstance(params, dict):
+		return {
+			str(key): compact_params(value, max_length)
+			for key, value in params.items()
+		}
+	dumped = json.dumps(params, sort_keys=True, default=_json_default)
+	if len(dumped) <= max_length:
+		return json.loads(dumped)
+	digest = hashlib.blake2b(dumped.encode("utf-8"), digest_size=16).hexdigest()
+	if isinstance(params, str):
+		summary = f"str {params[:32]!r}..."
+	elif hasattr(params, "__len__"):
+		summary = f"{type(params).__name__} of {len(params)} items"
+	else:
+		summary = type(params).__name__
+	return f"<{summary}, blake2b:{digest}>"
+
+
+_path_versions: Dict[Tuple[str, int, int], str] = {}
+
+
+def path_version(path: str) -> str:
+	"""
+	Get the version of the file or directory.
+	The file version is the hash of its contents, and it is memorized with the file size and mtime.
+	The directory version is the hash of the relative path, size, and mtime of its files.
+
+	:param path: The file or directory path.
+	:return: The version string. It is 'missing' when the path does not exist.
+	"""
+	if not os.path.exists(path):
+		return "missing"
+	if os.path.isdir(path):
+		stats = []
+		for root, _, files in os.walk(path):
+			for file in sorted(files):
+				file_path = os.path.join(root, file)
+				stat = os.stat(file_path)
+				stats.append(
+					(os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns)
+				)
+		return hash_object(sorted(stats))
+	stat = os.stat(path)
+	memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+	if memo_key not in _path_versions:
+		digest = hashlib.sha256()
+		with open(path, "rb") as f:
+			for chunk in iter(lambda: f.read(1 << 20), b""):
+				digest.update(chunk)
+		_path_versions[memo_key] = digest.hexdigest()
+	return _path_versions[memo_key]
+
+
+class ResultCache:
+	def __init__(self, project_dir):
+		"""
+		The content-addressed cache of the module results in the project.
+		The key is made from the module name, the module parameters,
+		the hash of the previous result columns that the module reads, and the corpus and index versions.
+		Each result is saved as a parquet file with a json file of its metadata
+		at the `resources/result_cache` directory.
+
+		:param project_dir: The project directory.
+		"""
+		self.project_dir = str(project_dir)
+		self.cache_dir = get_result_cache_dir(project_dir)
+		self._lock = threading.RLock()
+		self.hits = 0
+		self.misses = 0
+
+	def make_key(
+		self, module_cls, previous_result: pd.DataFrame, *args, **kwargs
+	) -> Tuple[str, Dict[str, Any]]:
+		"""
+		Make the cache key of the module run.
+		The long module parameters are hashed with `compact_params`,
+		so the key and the metadata stay small.
+
+		:param module_cls: The module class.
+		:param previous_result: The previous result dataframe.
+		:param args: The positional arguments of the module run.
+		:param kwargs: The module parameters.
+		:return: The cache key and its metadata.
+		"""
+		metadata = {
+			"module_name": module_cls.__name__,
+			"module_path": f"{module_cls.__module__}.{module_cls.__qualname__}",
+			"module_params": compact_params({"args": list(args), "kwargs": kwargs}),
+			"input_hash": hash_dataframe(module_cls.result_cache_input(previous_result)),
+			"versions": {
+				"corpus": path_version(
+					os.path.join(self.project_dir, "data", "corpus.parquet")
+				),
+				**module_cls.result_cache_versions(self.project_dir, *args, **kwargs),
+			},
+		}
+		key_fields = {
+			key: value for key, value in metadata.items() if key != "module_name"
+		}
+		return hash_object(key_fields), metadata
+
+	def _paths(self, key: str) -> Tuple[str, str]:
+		return (
+			os.path.join(self.cache_dir, f"{key}.parquet"),
+			os.path.join(self.cache_dir, f"{key}.json"),
+		)
+
+	def get(self, key: str) -> Optional[pd.DataFrame]:
+		result_path, metadata_path = self._paths(key)
+		with self._lock:
+			if not (os.path.exists(result_path) and os.path.exists(metadata_path)):
+				return None
+			try:
+				result = pd.read_parquet(result_path, engine="pyarrow")
+				with open(metadata_path, "r") as f:
+					metadata = json.load(f)
+			except Exception as e:
+				logger.warning(f"Failed to read the cached result {key}: {e}")
+				return None
+			metadata["hits"] = metadata.get("hits", 0) + 1
+			metadata["last_used_at"] = time.time()
+			_write_json(metadata_path, metadata)
+		for column in result.columns:
+			if result[column].dtype == object:
+				result[column] = to_list(result[column])
+		if metadata.get("execution_time") is not None:
+			result.attrs[CACHE_EXECUTION_TIME_ATTR] = metadata["execution_time"]
+		if metadata.get("cpu_time") is not None:
+			result.attrs[CACHE_CPU_TIME_ATTR] = metadata["cpu_time"]
+		return result
+
+	def put(self, key: str, result: pd.DataFrame, metadata: Dict[str, Any]):
+		result_path, metadata_path = self._paths(key)
+		with self._lock:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			temp_path = f"{result_path}.{os.getpid()}.tmp"
+			try:
+				result.to_parquet(temp_path, index=False)
+				os.replace(temp_path, result_path)
+			except Exception as e:
+				# Some results can not be saved as a parquet file. They are not cached.
+				logger.warning(
+					f"Failed to cache the result of {metadata['module_name']}: {e}"
+				)
+				if os.path.exists(temp_path):
+					os.remove(temp_path)
+				return
+			now = time.time()
+			_write_json(
+				metadata_path,
+				{
+					**metadata,
+					"key": key,
+					"rows": len(result),
+					"created_at": now,
+					"last_used_at": now,
+					"hits": 0,
+				},
+			)
+
+	def run(
+		self,
+		run_func: Callable[[], pd.DataFrame],
+		module_cls,
+		previous_result: pd.DataFrame,
+		*args,
+		**kwargs,
+	) -> pd.DataFrame:
+		"""
+		Return the cached result of the module run if the key matches.
+		Else, run the module and cache its result.
+		The result has the `result_cache_hit` attribute at its `attrs`.
+		The result also has the execution time and CPU time of the module run without the cache overhead,
+		and the cached result has the ones of its original run.
+		So `measure_speed` reports the real execution time of the module, not the loading time.
+
+		:param run_func: The function that runs the module.
+		:param module_cls: The module class.
+		:param previous_result: The previous result dataframe.
+		    It is hashed before the run because the module can change it.
+		:param args: The positional arguments of the module run.
+		:param kwargs: The module parameters.
+		:return: The result dataframe.
+		"""
+		key, metadata = self.make_key(module_cls, previous_result, *args, **kwargs)
+		result = self.get(key)
+		if result is not None:
+			with self._lock:
+				self.hits += 1
+			logger.info(f"Use the cached result of {module_cls.__name__}. ({key[:12]})")
+			result.attrs[CACHE_HIT_ATTR] = True
+			return result
+		with self._lock:
+			self.misses += 1
+		start_time, start_cpu_time = time.time(), time.thread_time()
+		result = run_func()
+		execution_time = time.time() - start_time
+		cpu_time = time.thread_time() - start_cpu_time
+		if isinstance(result, pd.DataFrame):
+			self.put(
+				key,
+				result,
+				{**metadata, "execution_time": execution_time, "cpu_time": cpu_time},
+			)
+			result.attrs[CACHE_HIT_ATTR] = False
+			result.attrs[CACHE_EXECUTION_TIME_ATTR] = execution_time
+			result.attrs[CACHE_CPU_TIME_ATTR] = cpu_time
+		return result
+
+	def entries(self) -> pd.DataFrame:
+		"""
+		Get the metadata of all cached results.
+
+		:return: The dataframe that has key, module_name, module_params, rows,
+		    size_bytes, created_at, last_used_at, and hits columns.
+		"""
+		columns = [
+			"key",
+			"module_name",
+			"module_params",
+			"rows",
+			"size_bytes",
+			"created_at",
+			"last_used_at",
+			"hits",
+		]
+		if not os.path.exists(self.cache_dir):
+			return pd.DataFrame(columns=columns)
+		rows = []
+		for filename in sorted(os.listdir(self.cache_dir)):
+			if not filename.endswith(".json"):
+				continue
+			key = filename[: -len(".json")]
+			result_path, metadata_path = self._paths(key)
+			try:
+				with open(metadata_path, "r") as f:
+					metadata = json.load(f)
+			except (OSError, ValueError):
+				continue
+			rows.append(
+				{
+					"key": key,
+					"module_name": metadata.get("module_name"),
+					"module_params": json.dumps(metadata.get("module_params", {})),
+					"rows": metadata.get("rows"),
+					"size_bytes": os.path.getsize(result_path)
+					if os.path.exists(result_path)
+					else 0,
+					"created_at": pd.to_datetime(metadata.get("created_at"), unit="s"),
+					"last_used_at": pd.to_datetime(
+						metadata.get("last_used_at"), unit="s"
+					),
+					"hits": metadata.get("hits", 0),
+				}
+			)
+		return pd.DataFrame(rows, columns=columns)
+
+	def prune(
+		self,
+		module_name: Optional[str] = None,
+		max_age_days: Optional[float] = None,
+		max_size_mb: Optional[float] = None,
+		prune_all: bool = False,
+	) -> int:
+		"""
+		Delete the cached results.
+
+		:param module_name: Delete the cached results of this module name.
+		:param max_age_days: Delete the cached results that are not used for more than this days.
+		:param max_size_mb: Delete the least recently used results until the cache size is under this size.
+		:param prune_all: Delete all cached results.
+		:return: The number of deleted results.
+		"""
+		entries = self.entries()
+		if prune_all:
+			targets = entries["key"].tolist()
+		else:
+			targets = []
+			if module_name is not None:
+				targets += entries.loc[
+					entries["module_name"] == module_name, "key"
+				].tolist()
+			if max_age_days is not None:
+				threshold = pd.Timestamp(time.time() - max_age_days * 86400, unit="s")
+				targets += entries.loc[
+					entries["last_used_at"] < threshold, "key"
+				].tolist()
+			if max_size_mb is not None:
+				remains = entries.loc[~entries["key"].isin(targets)].sort_values(
+					"last_used_at", ascending=False
+				)
+				sizes = remains["size_bytes"].cumsum()
+				targets += remains.loc[sizes > max_size_mb * 1024 * 1024, "key"].tolist()
+		targets = list(dict.fromkeys(targets))
+		with self._lock:
+			for key in targets:
+				for path in self._paths(key):
+					if os.path.exists(path):
+						os.remove(path)
+		return len(targets)
+
+	def clear(self):
+		with self._lock:
+			if os.path.exists(self.cache_dir):
+				shutil.rmtree(self.cache_dir)
+
+
+def _write_json(path: str, obj: Dict[str, Any]):
+	temp_path = f"{path}.{os.getpid()}.tmp"
+	with open(temp_path, "w") as f:
+		json.dump(obj, f, default=_json_default)
+	os.replace(temp_path, path)
+
+
+_active_cache: Optional[ResultCache] = None
+_scope_lock = threading.Lock()
+
+
+@contextmanager
+def result_cache_scope(project_dir):
+	"""
+	Use the result cache of the project inside this scope.
+	The nested scope joins the outer scope.
+
+	:param project_dir: The project directory.
+	:return: The result cache of the scope.
+	"""
+	global _active_cache
+	with _scope_lock:
+		outer_cache = _active_cache
+		if outer_cache is None:
+			_active_cache = ResultCache(project_dir)
+		cache = _active_cache
+	if outer_cache is not None:
+		yield cache
+		return
+	try:
+		yield cache
+	finally:
+		with _scope_lock:
+			_active_cache = None
+		if cache.hits > 0:
+			logger.info(
+				f"Used the cached module results {cache.hits} times. "
+				f"({cache.misses} results are computed)"
+			)
+
+
+def get_result_cache() -> Optional[ResultCache]:
+	return _active_cache
+
+
+def run_with_result_cache(
+	run_func: Callable[[], pd.DataFrame],
+	module_cls,
+	previous_result: pd.DataFrame,
+	*args,
+	**kwargs,
+) -> pd.DataFrame:
+	"""
+	Run the module with the result cache if there is an active result cache scope.
+	Else, just run the module.
+
+	:param run_func: The function that runs the module.
+	:param module_cls: The module class.
+	:param previous_result: The previous result dataframe.
+	:param args: The positional arguments of the module run.
+	:param kwargs: The module parameters.
+	:return: The result dataframe.
+	"""
+	cache = _active_cache
+	if cache is None:
+		return run_func()
+	return cache.run(run_func, module_cls, previous_result, *args, **kwargs)
+
+
+def is_result_cache_hit(result) -> bool:
+	return isinstance(result, pd.DataFrame) and bool(
+		result.attrs.get(CACHE_HIT_ATTR, False)
+	)
+
+
+def make_cache_hit_column(cache_hits: List[bool]) -> Dict[str, List[bool]]:
+	"""
+	Make the `cache_hit` column of the node summary.
+	It is empty when there is no active result cache scope, so the summary does not change.
+
+	:param cache_hits: Whether each result is from the result cache.
+	:return: The dictionary of the `cache_hit` column.
+	"""
+	if _active_cache is None:
+		return {}
+	return {"cache_hit": list(cache_hits)}
@@ -0,0 +1,260 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from autorag.module_cache import module_instance_bypass, module_instance_scope
+from autorag.result_cache import (
+	CACHE_CPU_TIME_ATTR,
+	CACHE_EXECUTION_TIME_ATTR,
+	get_result_cache,
+	result_cache_scope,
+)
+
+logger = logging.getLogger("AutoRAG")
+
+IO_BOUND = "io"
+CPU_BOUND = "cpu"
+
+
+def get_workload_type(module) -> str:
+	"""
+	Get whether the module is I/O-bound or CPU-bound.
+	The module declares it with the `workload_type` class attribute.
+	The modules that call remote APIs, like the LLM generators or API rerankers, are I/O-bound.
+
+	:param module: The module class.
+	:return: 'io' or 'cpu'.
+	"""
+	workload_type = getattr(module, "workload_type", CPU_BOUND)
+	if workload_type not in (IO_BOUND, CPU_BOUND):
+		raise ValueError(
+			f"workload_type of {module.__name__} must be '{IO_BOUND}' or '{CPU_BOUND}', "
+			f"but got {workload_type}."
+		)
+	return workload_type
+
+
+def measure_run(
+	func: Callable, *args, cpu_clock: Callable[[], float] = time.thread_time, **kwargs
+) -> Tuple[pd.DataFrame, float, float]:
+	"""
+	Run the function and measure its wall-clock time and CPU time.
+	The CPU time is measured with the thread CPU clock by default,
+	so the other candidates running at the same time are not counted.
+
+	:param func: The function to run.
+	:param args: The positional arguments of the function.
+	:param cpu_clock: The CPU clock function. Default is `time.thread_time`.
+	:param kwargs: The keyword arguments of the function.
+	:return: The result, the wall-clock time, and the CPU time.
+	"""
+	start_time, start_cpu_time = time.time(), cpu_clock()
+	result = func(*args, **kwargs)
+	wall_time, cpu_time = time.time() - start_time, cpu_clock() - start_cpu_time
+	if isinstance(result, pd.DataFrame):
+		# The result cache reports the times of the module run.
+		if result.attrs.get(CACHE_EXECUTION_TIME_ATTR) is not None:
+			wall_time = result.attrs[CACHE_EXECUTION_TIME_ATTR]
+		if result.attrs.get(CACHE_CPU_TIME_ATTR) is not None:
+			cpu_time = result.attrs[CACHE_CPU_TIME_ATTR]
+	return result, wall_time, cpu_time
+
+
+def run_candidate_process(
+	module,
+	module_params: Dict,
+	project_dir,
+	previous_result: pd.DataFrame,
+	result_cache_project_dir: Optional[str] = None,
+) -> Tuple[pd.DataFrame, float, float]:
+	"""
+	Run a candidate at the worker process.
+	The worker process uses the result cache of the project if the node uses it.
+
+	:param module: The module class.
+	:param module_params: The module parameters.
+	:param project_dir: The project directory.
+	:param previous_result: The previous result dataframe.
+	:param result_cache_project_dir: The project directory of the active result cache.
+	    Default is None, which means the result cache is not used.
+	:return: The result, the wall-clock time, and the CPU time.
+	"""
+	with module_instance_scope():
+		if result_cache_project_dir is None:
+			return measure_run(
+				module.run_evaluator,
+				project_dir=project_dir,
+				previous_result=previous_result,
+				cpu_clock=time.process_time,
+				**module_params,
+			)
+		with result_cache_scope(result_cache_project_dir):
+			return measure_run(
+				module.run_evaluator,
+				project_dir=project_dir,
+				previous_result=previous_result,
+				cpu_clock=time.process_time,
+				**module_params,
+			)
+
+
+class NodeScheduler:
+	def __init__(self, io_concurrency: int = 1, cpu_workers: int = 1):
+		"""
+		The scheduler that runs the module candidates of a node.
+		The I/O-bound candidates run at the threads up to `io_concurrency` at the same time.
+		The CPU-bound candidates run at `cpu_workers` worker processes, so they use separate cores.
+		When both are 1, every candidate runs one by one at the current thread, like before.
+
+		:param io_concurrency: The maximum number of the I/O-bound candidates running at the same time.
+		    Default is 1.
+		:param cpu_workers: The number of the worker processes for the CPU-bound candidates.
+		    Default is 1, which means the CPU-bound candidates run at the current process one by one.
+		"""
+		if io_concurrency < 1 or cpu_workers < 1:
+			raise ValueError("io_concurrency and cpu_workers must be at least 1.")
+		self.io_concurrency = io_concurrency
+		self.cpu_workers = cpu_workers
+
+	@classmethod
+	def from_strategies(cls, strategies: Dict) -> "NodeScheduler":
+		"""
+		Make the scheduler from the node strategies.
+		It uses the `io_concurrency` and `cpu_workers` keys of the strategies.
+
+		:param strategies: The strategies of the node.
+		:return: The node scheduler.
+		"""
+		return cls(
+			io_concurrency=int(strategies.get("io_concurrency", 1)),
+			cpu_workers=int(strategies.get("cpu_workers", 1)),
+		)
+
+	@property
+	def is_concurrent(self) -> bool:
+		return self.io_concurrency > 1 or self.cpu_workers > 1
+
+	def run(
+		self,
+		modules: List,
+		module_params: List[Dict],
+		project_dir,
+		previous_result: pd.DataFrame,
+	) -> Tuple[List[pd.DataFrame], List[float], List[float]]:
+		"""
+		Run the module candidates.
+		Each candidate records its own wall-clock time and CPU time.
+
+		:param modules: The module classes to run.
+		:param module_params: The module parameters of each module.
+		:param project_dir: The project directory.
+		:param previous_result: The previous result dataframe.
+		:return: The results, the wall-clock times, and the CPU times of each candidate.
+		"""
+
+		def run_in_thread(module, params, input_result=previous_result):
+			return measure_run(
+				module.run_evaluator,
+				project_dir=project_dir,
+				previous_result=input_result,
+				**params,
+			)
+
+		def run_in_io_thread(module, params, input_result):
+			# Each thread runs its own event loop, so it does not share the cached instances
+			# and their async clients with the other threads.
+			with module_instance_bypass():
+				return run_in_thread(module, params, input_result)
+
+		if not self.is_concurrent:
+			runs = [
+				run_in_thread(module, params)
+				for module, params in zip(modules, module_params)
+			]
+			return _unzip_runs(runs)
+
+		workload_types = list(map(get_workload_type, modules))
+		logger.info(
+			f"Running {workload_types.count(IO_BOUND)} I/O-bound candidates with "
+			f"{self.io_concurrency} concurrency and {workload_types.count(CPU_BOUND)} "
+			f"CPU-bound candidates with {self.cpu_workers} workers."
+		)
+		futures: Dict[int, Future] = {}
+		runs: List[Optional[Tuple]] = [None] * len(modules)
+		io_executor = ThreadPoolExecutor(max_workers=self.io_concurrency)
+		cpu_executor = (
+			ProcessPoolExecutor(
+				max_workers=self.cpu_workers,
+				mp_context=multiprocessing.get_context("spawn"),
+			)
+			if self.cpu_workers > 1 and CPU_BOUND in workload_types
+			else None
+		)
+		result_cache = get_result_cache()
+		try:
+			for index, (module, params, workload_type) in enumerate(
+				zip(modules, module_params, workload_types)
+			):
+				if workload_type == IO_BOUND:
+					# Some modules add columns to the previous result, so each thread gets a copy.
+					futures[index] = io_executor.submit(
+						run_in_io_thread, module, params, previous_result.copy()
+					)
+				elif cpu_executor is not None:
+					futures[index] = cpu_executor.submit(
+						run_candidate_process,
+						module,
+						params,
+						project_dir,
+						previous_result,
+						result_cache.project_dir if result_cache is not None else None,
+					)
+			# The CPU-bound candidates without worker processes run here,
+			# while the I/O-bound candidates are waiting for the responses.
+			for index, (module, params, workload_type) in enumerate(
+				zip(modules, module_params, workload_types)
+			):
+				if index not in futures:
+					runs[index] = run_in_thread(module, params)
+			for index, future in futures.items():
+				runs[index] = future.result()
+		finally:
+			io_executor.shutdown(wait=True)
+			if cpu_executor is not None:
+				cpu_executor.shutdown(wait=True)
+		return _unzip_runs(runs)
+
+	def summary_columns(
+		self, cpu_times: List[float], row_count: Union[int, List[int]]
+	) -> Dict[str, List[float]]:
+		"""
+		Make the `cpu_time` column of the node summary.
+		It is the average CPU time per a row, like the `execution_time` column.
+		It is empty when the candidates run one by one, so the summary does not change.
+
+		:param cpu_times: The CPU times of each candidate.
+		:param row_count: The number of the rows of the results.
+		    It can be a list of the row count of each candidate.
+		:return: The dictionary of the `cpu_time` column.
+		"""
+		if not self.is_concurrent:
+			return {}
+		row_counts = (
+			row_count if isinstance(row_count, list) else [row_count] * len(cpu_times)
+		)
+		return {
+			"cpu_time": [
+				cpu_time / max(count, 1) for cpu_time, count in zip(cpu_times, row_counts)
+			]
+		}
+
+
+def _unzip_runs(runs) -> Tuple[List[pd.DataFrame], List[float], List[float]]:
+	if len(runs) == 0:
+		return [], [], []
+	results, wall_times, cpu_times = zip(*runs)
+	return list(results), list(wall_times), list(cpu_times)
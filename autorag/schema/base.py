@@ -1,11 +1,27 @@
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
-from typing import Union
+from typing import Dict, Optional, Tuple, Union
 
 import pandas as pd
 
+from autorag.module_cache import get_module_instance
+from autorag.result_cache import run_with_result_cache
+
 
 class BaseModule(metaclass=ABCMeta):
+	# The init parameters that make the module instance different.
+	# If it is set, the module instance is reused in the module instance scope.
+	instance_cache_params: Optional[Tuple[str, ...]] = None
+	# If it is True, the result of a smaller top_k is the prefix of the result of a larger top_k.
+	# Then the node runs the module once at the largest top_k and truncates the result.
+	prefix_stable: bool = False
+	# The previous result columns that the module reads.
+	# The result cache key is made from these columns. If it is None, every column is used.
+	result_cache_columns: Optional[Tuple[str, ...]] = None
+	# 'io' if the module waits for the remote APIs, like the LLM or the reranker APIs.
+	# The node scheduler runs the I/O-bound modules at the threads and the others at the processes.
+	workload_type: str = "cpu"
+
 	@abstractmethod
 	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
 		pass
@@ -14,6 +30,32 @@ class BaseModule(metaclass=ABCMeta):
 	def _pure(self, *args, **kwargs):
 		pass
 
+	@classmethod
+	def is_prefix_stable(
+		cls, previous_result: pd.DataFrame, project_dir=None, **kwargs
+	) -> bool:
+		return cls.prefix_stable
+
+	@classmethod
+	def result_cache_input(cls, previous_result: pd.DataFrame) -> pd.DataFrame:
+		if cls.result_cache_columns is None:
+			return previous_result
+		return previous_result[
+			[
+				column
+				for column in cls.result_cache_columns
+				if column in previous_result.columns
+			]
+		]
+
+	@classmethod
+	def result_cache_versions(cls, project_dir, *args, **kwargs) -> Dict[str, str]:
+		"""
+		The versions of the resources that the module reads, like an index.
+		The corpus version is always in the result cache key.
+		"""
+		return {}
+
 	@classmethod
 	def run_evaluator(
 		cls,
@@ -22,10 +64,13 @@ class BaseModule(metaclass=ABCMeta):
 		*args,
 		**kwargs,
 	):
-		instance = cls(project_dir, *args, **kwargs)
-		result = instance.pure(previous_result, *args, **kwargs)
-		del instance
-		return result
+		def run():
+			instance = get_module_instance(cls, project_dir, *args, **kwargs)
+			result = instance.pure(previous_result, *args, **kwargs)
+			del instance
+			return result
+
+		return run_with_result_cache(run, cls, previous_result, *args, **kwargs)
 
 	@abstractmethod
 	def cast_to_run(self, previous_result: pd.DataFrame, *args, **kwargs):
@@ -6,6 +6,8 @@ from typing import Dict, List, Callable, Tuple, Any
 
 import pandas as pd
 
+from autorag.model_registry import model_registry
+from autorag.pruning import PRUNING_SUPPORTED_NODES
 from autorag.schema.module import Module
 from autorag.support import get_support_nodes
 from autorag.utils.util import make_combinations, explode, find_key_values
@@ -25,6 +27,14 @@ class Node:
 		self.run_node = get_support_nodes(self.node_type)
 		if self.run_node is None:
 			raise ValueError(f"Node type {self.node_type} is not supported.")
+		if (
+			self.strategy.get("pruning") is not None
+			and self.node_type not in PRUNING_SUPPORTED_NODES
+		):
+			logger.warning(
+				f"pruning strategy is not supported at {self.node_type} node. "
+				f"It is supported at {PRUNING_SUPPORTED_NODES} nodes. Ignoring pruning."
+			)
 
 	def get_param_combinations(self) -> Tuple[List[Callable], List[Dict]]:
 		"""
@@ -54,13 +64,17 @@ class Node:
 	def run(self, previous_result: pd.DataFrame, node_line_dir: str) -> pd.DataFrame:
 		logger.info(f"Running node {self.node_type}...")
 		input_modules, input_params = self.get_param_combinations()
-		return self.run_node(
-			modules=input_modules,
-			module_params=input_params,
-			previous_result=previous_result,
-			node_line_dir=node_line_dir,
-			strategies=self.strategy,
-		)
+		try:
+			return self.run_node(
+				modules=input_modules,
+				module_params=input_params,
+				previous_result=previous_result,
+				node_line_dir=node_line_dir,
+				strategies=self.strategy,
+			)
+		finally:
+			# release the GPU memory for the models of the next node
+			model_registry.release_gpu_models()
 
 
 def extract_values(node: Node, key: str) -> List[str]:
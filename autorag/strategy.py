@@ -1,10 +1,22 @@
 import functools
+import json
+import logging
 import time
-from typing import List, Iterable, Tuple, Any, Optional, Callable
+from typing import List, Iterable, Tuple, Any, Optional, Callable, Dict
 
 import numpy as np
 import pandas as pd
 
+from autorag.result_cache import CACHE_EXECUTION_TIME_ATTR
+from autorag.scheduler import NodeScheduler
+from autorag.utils.util import select_top_k
+
+logger = logging.getLogger("AutoRAG")
+
+# The result attribute of a truncated result.
+# It is the index of the combination that actually ran and shares its execution time.
+SHARED_EXECUTION_ATTR = "shared_execution_from"
+
 
 def measure_speed(func, *args, **kwargs):
 	"""
@@ -13,9 +25,127 @@ def measure_speed(func, *args, **kwargs):
 	start_time = time.time()
 	result = func(*args, **kwargs)
 	end_time = time.time()
+	if (
+		isinstance(result, pd.DataFrame)
+		and result.attrs.get(CACHE_EXECUTION_TIME_ATTR) is not None
+	):
+		# The cached result reports the execution time of its original run.
+		return result, result.attrs[CACHE_EXECUTION_TIME_ATTR]
 	return result, end_time - start_time
 
 
+def measure_module_speed(
+	modules: List,
+	module_params: List[Dict],
+	project_dir,
+	previous_result: pd.DataFrame,
+	prefix_param: str = "top_k",
+	prefix_columns: Tuple[str, ...] = (
+		"retrieved_contents",
+		"retrieved_ids",
+		"retrieve_scores",
+	),
+	scheduler: Optional[NodeScheduler] = None,
+) -> Tuple[List[pd.DataFrame], List[float], List[float]]:
+	"""
+	Run each module with its parameters and measure the execution speed.
+	The combinations of a prefix-stable module that differ only in `prefix_param` run once
+	at the largest value, and the results of the smaller values are made by truncation.
+	Each truncated result gets the execution time of the shared run,
+	because it is the real time that is spent to get the result.
+	The truncated result has the index of the shared run at its `shared_execution_from` attribute,
+	so the node summary can mark that its execution time is shared, not measured.
+
+	:param modules: The module classes to run.
+	:param module_params: The module parameters of each module.
+	:param project_dir: The project directory.
+	:param previous_result: The previous result dataframe.
+	:param prefix_param: The parameter that makes the prefix of the result.
+	    Default is 'top_k'.
+	:param prefix_columns: The list columns of the result to truncate.
+	    Default is the retrieval result columns.
+	:param scheduler: The node scheduler that runs the modules.
+	    Default is None, which means the modules run one by one.
+	:return: The result dataframes, the execution times, and the CPU times
+	    of each module and its parameters.
+	"""
+	if scheduler is None:
+		scheduler = NodeScheduler()
+	groups: Dict[Any, List[int]] = {}
+	for index, (module, params) in enumerate(zip(modules, module_params)):
+		other_params = {
+			key: value for key, value in params.items() if key != prefix_param
+		}
+		if params.get(prefix_param) is not None and getattr(
+			module, "is_prefix_stable", lambda *args, **kwargs: False
+		)(previous_result, project_dir=project_dir, **other_params):
+			key = (module, json.dumps(other_params, sort_keys=True, default=str))
+		else:
+			key = index
+		groups.setdefault(key, []).append(index)
+
+	group_indices = list(groups.values())
+	largest_indices = [
+		max(indices, key=lambda i: module_params[i].get(prefix_param) or 0)
+		for indices in group_indices
+	]
+	group_results, group_times, group_cpu_times = scheduler.run(
+		[modules[index] for index in largest_indices],
+		[module_params[index] for index in largest_indices],
+		project_dir,
+		previous_result,
+	)
+
+	results: List[Optional[pd.DataFrame]] = [None] * len(modules)
+	execution_times: List[float] = [0.0] * len(modules)
+	cpu_times: List[float] = [0.0] * len(modules)
+	for indices, largest, result, execution_time, cpu_time in zip(
+		group_indices, largest_indices, group_results, group_times, group_cpu_times
+	):
+		for index in indices:
+			if index == largest:
+				results[index] = result
+			else:
+				results[index] = select_top_k(
+					result.copy(),
+					[column for column in prefix_columns if column in result.columns],
+					module_params[index][prefix_param],
+				)
+				results[index].attrs[SHARED_EXECUTION_ATTR] = largest
+			execution_times[index] = execution_time
+			cpu_times[index] = cpu_time
+		if len(indices) > 1:
+			logger.info(
+				f"Reused the result of {modules[largest].__name__} with "
+				f"{prefix_param}={module_params[largest][prefix_param]} "
+				f"for {len(indices) - 1} smaller {prefix_param} combinations."
+			)
+	return results, execution_times, cpu_times
+
+
+def make_shared_execution_column(
+	results: List[pd.DataFrame], filenames: List[str]
+) -> Dict[str, List[Optional[str]]]:
+	"""
+	Make the `shared_execution_from` column of the node summary.
+	It is the result filename of the shared run for the truncated results,
+	whose execution time is the time of the shared run, and it is empty for the other results.
+	It is empty when no result is truncated, so the summary does not change.
+
+	:param results: The results of each combination.
+	:param filenames: The result filenames of each combination.
+	:return: The dictionary of the `shared_execution_from` column.
+	"""
+	shared_from = [result.attrs.get(SHARED_EXECUTION_ATTR) for result in results]
+	if all(index is None for index in shared_from):
+		return {}
+	return {
+		"shared_execution_from": [
+			filenames[index] if index is not None else None for index in shared_from
+		]
+	}
+
+
 def avoid_empty_result(return_index: List[int]):
 	"""
 	Decorator for avoiding empty results from the function.
@@ -26,6 +26,8 @@ from llama_index.embeddings.openai import OpenAIEmbedding
 from pydantic import BaseModel as BM
 from pydantic.v1 import BaseModel
 
+from autorag.embedding.cache import unwrap_embedding
+
 logger = logging.getLogger("AutoRAG")
 
 
@@ -533,7 +535,7 @@ def embedding_query_content(
 	flatten_contents = list(itertools.chain.from_iterable(contents_list))
 
 	openai_embedding_limit = 8000  # all openai embedding model has 8000 max token input
-	if isinstance(embedding_model, OpenAIEmbedding):
+	if isinstance(unwrap_embedding(embedding_model), OpenAIEmbedding):
 		queries = openai_truncate_by_token(
 			queries, openai_embedding_limit, embedding_model.model_name
 		)
@@ -3,7 +3,7 @@ from typing import List, Tuple
 
 from llama_index.embeddings.openai import OpenAIEmbedding
 
-from autorag import embedding_models
+from autorag.embedding.cache import load_embedding_model, unwrap_embedding
 from autorag.utils.util import openai_truncate_by_token
 
 
@@ -16,22 +16,64 @@ class BaseVectorStore:
 		similarity_metric: str = "cosine",
 		embedding_batch: int = 100,
 	):
-		self.embedding = embedding_models[embedding_model]()
+		self.embedding = load_embedding_model(embedding_model)
 		self.embedding_batch = embedding_batch
 		self.embedding.embed_batch_size = embedding_batch
 		assert (
 			similarity_metric in self.support_similarity_metrics
 		), f"search method {similarity_metric} is not supported"
 		self.similarity_metric = similarity_metric
+		self.bulk_load = False
+
+	@classmethod
+	def is_exact_search(cls, **kwargs) -> bool:
+		"""
+		Whether the search of the Vector DB with the given parameters is the exact search.
+		Only with the exact search, the result of a smaller top_k is the prefix of the result of a larger top_k.
+		The Vector DB servers search with the approximate index like HNSW, so the default is False.
+
+		:param kwargs: The parameters of the Vector DB at the YAML file.
+		:return: Whether the search is the exact search.
+		"""
+		return False
 
-	@abstractmethod
 	async def add(
 		self,
 		ids: List[str],
 		texts: List[str],
 	):
+		text_embeddings = await self.embed(texts)
+		await self.insert(ids, texts, text_embeddings)
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		"""
+		Embed the texts to add with the embedding model.
+		"""
+		texts = self.truncated_inputs(texts)
+		return await self.embedding.aget_text_embedding_batch(texts)
+
+	@abstractmethod
+	async def insert(
+		self, ids: List[str], texts: List[str], embeddings: List[List[float]]
+	):
+		"""
+		Insert the already embedded texts to the Vector DB.
+		"""
 		pass
 
+	def begin_bulk_load(self):
+		"""
+		Start the bulk-load mode.
+		At the bulk-load mode, the Vector DB can skip the per-insert work like flush and index build.
+		"""
+		self.bulk_load = True
+
+	def end_bulk_load(self):
+		"""
+		Finish the bulk-load mode. The deferred work of the bulk-load mode is done here at once.
+		"""
+		self.bulk_load = False
+
 	@abstractmethod
 	async def query(
 		self, queries: List[str], top_k: int, **kwargs
@@ -57,7 +99,7 @@ class BaseVectorStore:
 		pass
 
 	def truncated_inputs(self, inputs: List[str]) -> List[str]:
-		if isinstance(self.embedding, OpenAIEmbedding):
+		if isinstance(unwrap_embedding(self.embedding), OpenAIEmbedding):
 			openai_embedding_limit = 8000
 			results = openai_truncate_by_token(
 				inputs, openai_embedding_limit, self.embedding.model_name
@@ -64,13 +64,13 @@ class Chroma(BaseVectorStore):
 			metadata={"hnsw:space": similarity_metric},
 		)
 
-	async def add(self, ids: List[str], texts: List[str]):
-		texts = self.truncated_inputs(texts)
-		text_embeddings = await self.embedding.aget_text_embedding_batch(texts)
+	async def insert(
+		self, ids: List[str], texts: List[str], embeddings: List[List[float]]
+	):
 		if isinstance(self.collection, AsyncCollection):
-			await self.collection.add(ids=ids, embeddings=text_embeddings)
+			await self.collection.add(ids=ids, embeddings=embeddings)
 		else:
-			self.collection.add(ids=ids, embeddings=text_embeddings)
+			self.collection.add(ids=ids, embeddings=embeddings)
 
 	async def fetch(self, ids: List[str]) -> List[List[float]]:
 		if isinstance(self.collection, AsyncCollection):
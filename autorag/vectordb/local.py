@@ -0,0 +1,713 @@
+import json
+import logging
+import os
+from typing import List, Tuple, Optional, Dict
+
+import numpy as np
+
+from autorag.vectordb.base import BaseVectorStore
+
+logger = logging.getLogger("AutoRAG")
+
+LOCAL_VECTORDB_META_FILENAME = "meta.json"
+LOCAL_VECTORDB_COMPACT_JOURNAL = "compact.json"
+
+
+class Local(BaseVectorStore):
+	support_dtypes = ["float32", "float16"]
+	support_index_types = ["flat", "ivf"]
+	support_quantizations = ["int8", "binary"]
+
+	def __init__(
+		self,
+		embedding_model: str,
+		collection_name: str,
+		path: str,
+		embedding_batch: int = 100,
+		similarity_metric: str = "cosine",
+		dtype: str = "float32",
+		index_type: str = "flat",
+		nlist: Optional[int] = None,
+		nprobe: int = 8,
+		search_batch: int = 16384,
+		query_batch: int = 1024,
+		quantization: Optional[str] = None,
+		rescore_factor: int = 4,
+	):
+		"""
+		In-process vector store that does not need any vector DB server.
+		The embeddings are stored at a memory-mapped matrix file, and the search is the exact search
+		with the batched matrix multiplication and the partial top_k selection.
+		For the large corpus, you can use the IVF (inverted file) index,
+		which searches only the nprobe nearest clusters of the query.
+
+		The collection directory looks like this:
+
+		.. Code:: text
+
+		    meta.json  # the dimension, dtype, row count and the index settings
+		    ids.jsonl  # the id of each row, appended at each add
+		    embeddings.npy  # the memory-mapped embedding matrix
+		    valid.npy  # the memory-mapped bool array, which is False for the deleted rows
+		    centroids.npy, assignments.npy  # the IVF index (only when index_type is ivf)
+		    codes.npy, calibration.npy  # the quantized codes and its calibration (only when quantization is set)
+		    compact.json  # the journal of the compacted files (only while compacting)
+
+		:param embedding_model: The embedding model name.
+		:param collection_name: The collection name. It is the directory name at the path.
+		:param path: The directory path to save the collections.
+		:param embedding_batch: The embedding batch size. Default is 100.
+		:param similarity_metric: The similarity metric. 'cosine', 'ip' or 'l2'. Default is 'cosine'.
+		    The score of the 'l2' metric is the negative squared l2 distance.
+		:param dtype: The dtype to store the embeddings. 'float32' or 'float16'. Default is 'float32'.
+		:param index_type: The index type. 'flat' for the exact search, 'ivf' for the IVF index.
+		    Default is 'flat'.
+		:param nlist: The number of IVF clusters.
+		    Default is None, which means the square root of the row count when the index is trained.
+		:param nprobe: The number of IVF clusters to search for each query. Default is 8.
+		:param search_batch: The number of rows to score at once. It bounds the memory of the search.
+		    Default is 16384.
+		:param query_batch: The number of queries to search at once. Default is 1024.
+		:param quantization: The quantization of the first search pass. 'int8', 'binary' or None.
+		    The 'int8' quantizes each dimension to 256 levels between its min and max,
+		    and the 'binary' quantizes each dimension to the sign from its mean.
+		    The search scores the quantized codes first, and exactly rescores the top candidates
+		    with the full-precision embeddings on the disk.
+		    Default is None, which means the exact search with the full-precision embeddings only.
+		:param rescore_factor: The first pass of the quantized search selects top_k * rescore_factor candidates
+		    to rescore. The larger value gives the better recall with the slower search. Default is 4.
+		"""
+		super().__init__(embedding_model, similarity_metric, embedding_batch)
+		if dtype not in self.support_dtypes:
+			raise ValueError(
+				f"dtype {dtype} is not supported\n"
+				f"supported dtypes are: {', '.join(self.support_dtypes)}"
+			)
+		if index_type not in self.support_index_types:
+			raise ValueError(
+				f"index_type {index_type} is not supported\n"
+				f"supported index types are: {', '.join(self.support_index_types)}"
+			)
+		if quantization is not None and quantization not in self.support_quantizations:
+			raise ValueError(
+				f"quantization {quantization} is not supported\n"
+				f"supported quantizations are: {', '.join(self.support_quantizations)}"
+			)
+		self.collection_name = collection_name
+		self.collection_path = os.path.join(path, collection_name)
+		self.index_type = index_type
+		self.nlist = nlist
+		self.nprobe = nprobe
+		self.search_batch = search_batch
+		self.query_batch = query_batch
+		self.rescore_factor = rescore_factor
+		os.makedirs(self.collection_path, exist_ok=True)
+		# finish the compaction that is stopped while swapping the files
+		self._finish_compact()
+
+		meta_path = os.path.join(self.collection_path, LOCAL_VECTORDB_META_FILENAME)
+		if os.path.exists(meta_path):
+			with open(meta_path, "r") as f:
+				self.meta = json.load(f)
+			if self.meta["similarity_metric"] != similarity_metric:
+				raise ValueError(
+					f"The collection {collection_name} uses {self.meta['similarity_metric']} similarity metric, "
+					f"but your input is {similarity_metric}."
+				)
+			if self.meta["dtype"] != dtype:
+				logger.warning(
+					f"The collection {collection_name} stores the embeddings as {self.meta['dtype']}, "
+					f"but your input is {dtype}. The stored dtype {self.meta['dtype']} is used. "
+					f"Delete the collection and ingest again to change the dtype."
+				)
+		else:
+			self.meta = {
+				"dimension": None,
+				"dtype": dtype,
+				"similarity_metric": similarity_metric,
+				"count": 0,
+				"capacity": 0,
+				"trained_count": 0,
+			}
+		self.meta.setdefault("quantization", None)
+		self.meta.setdefault("calibrated_count", 0)
+		if self.meta["quantization"] != quantization:
+			# the codes of the other quantization are rebuilt
+			self.meta.update({"quantization": quantization, "calibrated_count": 0})
+			for filename in ["codes.npy", "calibration.npy"]:
+				if os.path.exists(self._file_path(filename)):
+					os.remove(self._file_path(filename))
+			self._save_meta()
+		self._load()
+		if self._need_calibrate():
+			self.calibrate()
+
+	@classmethod
+	def is_exact_search(
+		cls, index_type: str = "flat", quantization: Optional[str] = None, **kwargs
+	) -> bool:
+		# The IVF index searches only the nearest clusters, and the quantized search
+		# rescores only the top_k * rescore_factor candidates of the first pass.
+		return index_type == "flat" and quantization is None
+
+	def _file_path(self, filename: str) -> str:
+		return os.path.join(self.collection_path, filename)
+
+	def _load(self):
+		count = self.meta["count"]
+		with open(self._file_path("ids.jsonl"), "a+") as f:
+			f.seek(0)
+			self.ids: List[str] = [json.loads(line) for line in f][:count]
+		if self.meta["capacity"] > 0:
+			self.embeddings = np.load(self._file_path("embeddings.npy"), mmap_mode="r+")
+			self.valid = np.load(self._file_path("valid.npy"), mmap_mode="r+")
+		else:
+			self.embeddings, self.valid = None, np.zeros(0, dtype=bool)
+		valid = np.asarray(self.valid[:count]).tolist()
+		self.id_to_row: Dict[str, int] = {
+			_id: row for row, (_id, is_valid) in enumerate(zip(self.ids, valid)) if is_valid
+		}
+		if self.meta["trained_count"] > 0:
+			self.centroids = np.load(self._file_path("centroids.npy"))
+			self.assignments = np.load(
+				self._file_path("assignments.npy"), mmap_mode="r+"
+			)
+		else:
+			self.centroids, self.assignments = None, None
+		if self.meta["calibrated_count"] > 0:
+			self.calibration = np.load(self._file_path("calibration.npy"))
+			self.codes = np.load(self._file_path("codes.npy"), mmap_mode="r+")
+		else:
+			self.calibration, self.codes = None, None
+
+	def _save_meta(self):
+		tmp_path = self._file_path(f".{LOCAL_VECTORDB_META_FILENAME}.tmp")
+		with open(tmp_path, "w") as f:
+			json.dump(self.meta, f, indent=4)
+		os.replace(tmp_path, self._file_path(LOCAL_VECTORDB_META_FILENAME))
+
+	def _normalize(self, embeddings: np.ndarray) -> np.ndarray:
+		embeddings = np.asarray(embeddings, dtype=np.float32)
+		if self.similarity_metric == "cosine":
+			norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+			embeddings = embeddings / np.maximum(norms, 1e-12)
+		return embeddings
+
+	def _reserve(self, count: int, dimension: int):
+		"""
+		Grow the memory-mapped files to hold the count rows.
+		The capacity is doubled, so the total copy cost of the appends is linear.
+		"""
+		if self.meta["dimension"] is None:
+			self.meta["dimension"] = dimension
+		elif self.meta["dimension"] != dimension:
+			raise ValueError(
+				f"The embedding dimension of the collection is {self.meta['dimension']}, "
+				f"but the new embedding dimension is {dimension}."
+			)
+		capacity = self.meta["capacity"]
+		if count <= capacity:
+			return
+		new_capacity = max(count, capacity * 2, 1024)
+		used = self.meta["count"]
+		for filename, dtype, shape in [
+			("embeddings.npy", self.meta["dtype"], (new_capacity, dimension)),
+			("valid.npy", bool, (new_capacity,)),
+			("assignments.npy", np.int32, (new_capacity,)),
+			("codes.npy", self._code_dtype(), (new_capacity, self._code_dimension())),
+		]:
+			old = {
+				"embeddings.npy": self.embeddings,
+				"valid.npy": self.valid,
+				"assignments.npy": self.assignments,
+				"codes.npy": self.codes,
+			}[filename]
+			if filename in ["assignments.npy", "codes.npy"] and old is None:
+				continue
+			tmp_path = self._file_path(f".{filename}.tmp")
+			new = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+			if old is not None and used > 0:
+				new[:used] = old[:used]
+			new.flush()
+			del new
+			os.replace(tmp_path, self._file_path(filename))
+		self.meta["capacity"] = new_capacity
+		self.embeddings = np.load(self._file_path("embeddings.npy"), mmap_mode="r+")
+		self.valid = np.load(self._file_path("valid.npy"), mmap_mode="r+")
+		if self.assignments is not None:
+			self.assignments = np.load(
+				self._file_path("assignments.npy"), mmap_mode="r+"
+			)
+		if self.codes is not None:
+			self.codes = np.load(self._file_path("codes.npy"), mmap_mode="r+")
+
+	def add_embeddings(self, ids: List[str], embeddings: List[List[float]]):
+		"""
+		Add the embeddings in bulk. The existing ids are overwritten.
+
+		:param ids: The ids of the embeddings.
+		:param embeddings: The embedding vectors.
+		"""
+		if len(ids) == 0:
+			return
+		if len(set(ids)) != len(ids):
+			raise ValueError("The ids to add must be unique.")
+		embeddings = self._normalize(embeddings)
+		self._delete_rows(
+			[self.id_to_row[_id] for _id in ids if _id in self.id_to_row]
+		)
+		start = self.meta["count"]
+		end = start + len(ids)
+		self._reserve(end, embeddings.shape[1])
+		self.embeddings[start:end] = embeddings.astype(self.meta["dtype"])
+		self.valid[start:end] = True
+		if self.assignments is not None:
+			self.assignments[start:end] = self._nearest_centroids(embeddings)
+		if self.codes is not None:
+			self.codes[start:end] = self._quantize(embeddings)
+			self.codes.flush()
+		self.embeddings.flush()
+		self.valid.flush()
+
+		with open(self._file_path("ids.jsonl"), "a") as f:
+			f.writelines(json.dumps(_id) + "\n" for _id in ids)
+		self.ids.extend(ids)
+		self.id_to_row.update(zip(ids, range(start, end)))
+		self.meta["count"] = end
+		self._save_meta()
+
+		# at the bulk-load mode, the IVF index is trained once at the end_bulk_load
+		if self.index_type == "ivf" and not self.bulk_load and self._need_train():
+			self.train_ivf()
+		if not self.bulk_load and self._need_calibrate():
+			self.calibrate()
+
+	async def insert(
+		self, ids: List[str], texts: List[str], embeddings: List[List[float]]
+	):
+		self.add_embeddings(ids, embeddings)
+
+	def end_bulk_load(self):
+		super().end_bulk_load()
+		if self.index_type == "ivf" and self._need_train():
+			self.train_ivf()
+		if self._need_calibrate():
+			self.calibrate()
+
+	def search(
+		self, query_embeddings: List[List[float]], top_k: int
+	) -> Tuple[List[List[str]], List[List[float]]]:
+		"""
+		Search the nearest embeddings of the query embeddings.
+
+		:param query_embeddings: The query embedding vectors.
+		:param top_k: The number of results for each query.
+		:return: The ids and the scores of each query, sorted by the score.
+		"""
+		queries = self._normalize(query_embeddings)
+		if self.meta["count"] == 0 or len(self.id_to_row) == 0:
+			return [[] for _ in range(len(queries))], [[] for _ in range(len(queries))]
+		if self.index_type == "ivf" and self.centroids is not None:
+			rows, scores = self._search_ivf(queries, top_k)
+		else:
+			rows, scores = self._search_flat(queries, top_k)
+		ids = [[self.ids[row] for row in row_list] for row_list in rows]
+		return ids, [score_list.tolist() for score_list in scores]
+
+	async def query(
+		self, queries: List[str], top_k: int, **kwargs
+	) -> Tuple[List[List[str]], List[List[float]]]:
+		queries = self.truncated_inputs(queries)
+		query_embeddings: List[
+			List[float]
+		] = await self.embedding.aget_text_embedding_batch(queries)
+		return self.search(query_embeddings, top_k)
+
+	async def fetch(self, ids: List[str]) -> List[List[float]]:
+		missing_ids = [_id for _id in ids if _id not in self.id_to_row]
+		if len(missing_ids) > 0:
+			raise ValueError(
+				f"The ids {missing_ids} do not exist at the collection {self.collection_name}."
+			)
+		rows = [self.id_to_row[_id] for _id in ids]
+		return np.asarray(self.embeddings[rows], dtype=np.float32).tolist()
+
+	async def is_exist(self, ids: List[str]) -> List[bool]:
+		return [_id in self.id_to_row for _id in ids]
+
+	async def delete(self, ids: List[str]):
+		self._delete_rows([self.id_to_row[_id] for _id in ids if _id in self.id_to_row])
+		if self.meta["count"] > 2 * len(self.id_to_row):
+			self.compact()
+
+	def _delete_rows(self, rows: List[int]):
+		if len(rows) == 0:
+			return
+		self.valid[rows] = False
+		self.valid.flush()
+		for row in rows:
+			self.id_to_row.pop(self.ids[row], None)
+
+	def compact(self):
+		"""
+		Rewrite the collection files without the deleted rows.
+		The compacted files are written with temporary names first, and the journal of them is written.
+		After that, each file is swapped with `os.replace`, and the meta.json is swapped last.
+		If the process stops while swapping, the swap is finished from the journal when the collection is opened again.
+		"""
+		live_rows = np.flatnonzero(self.valid[: self.meta["count"]])
+		meta = {**self.meta, "count": len(live_rows), "capacity": len(live_rows)}
+		filenames = ["ids.jsonl"]
+		with open(self._file_path(".ids.jsonl.compact"), "w") as f:
+			f.writelines(json.dumps(self.ids[row]) + "\n" for row in live_rows)
+		if len(live_rows) > 0:
+			for filename, old in [
+				("embeddings.npy", self.embeddings),
+				("valid.npy", self.valid),
+				("assignments.npy", self.assignments),
+				("codes.npy", self.codes),
+			]:
+				if old is None:
+					continue
+				new = np.lib.format.open_memmap(
+					self._file_path(f".{filename}.compact"),
+					mode="w+",
+					dtype=old.dtype,
+					shape=(len(live_rows),) + old.shape[1:],
+				)
+				for start in range(0, len(live_rows), self.search_batch):
+					rows = live_rows[start : start + self.search_batch]
+					new[start : start + len(rows)] = old[rows]
+				new.flush()
+				del new
+				filenames.append(filename)
+		else:
+			meta.update({"trained_count": 0, "calibrated_count": 0})
+		meta_tmp_path = self._file_path(f".{LOCAL_VECTORDB_META_FILENAME}.compact")
+		with open(meta_tmp_path, "w") as f:
+			json.dump(meta, f, indent=4)
+		filenames.append(LOCAL_VECTORDB_META_FILENAME)
+
+		tmp_journal_path = self._file_path(f".{LOCAL_VECTORDB_COMPACT_JOURNAL}.tmp")
+		with open(tmp_journal_path, "w") as f:
+			json.dump(filenames, f)
+		os.replace(tmp_journal_path, self._file_path(LOCAL_VECTORDB_COMPACT_JOURNAL))
+		self.embeddings, self.valid, self.assignments, self.codes = None, None, None, None
+		self._finish_compact()
+		with open(self._file_path(LOCAL_VECTORDB_META_FILENAME), "r") as f:
+			self.meta = json.load(f)
+		self._load()
+
+	def _finish_compact(self):
+		"""
+		Swap the compacted files that are recorded at the compact journal.
+		It is safe to run again, because the already swapped files have no temporary file.
+		"""
+		journal_path = self._file_path(LOCAL_VECTORDB_COMPACT_JOURNAL)
+		if not os.path.exists(journal_path):
+			return
+		with open(journal_path, "r") as f:
+			filenames = json.load(f)
+		for filename in filenames:
+			tmp_path = self._file_path(f".{filename}.compact")
+			if os.path.exists(tmp_path):
+				os.replace(tmp_path, self._file_path(filename))
+		os.remove(journal_path)
+
+	def _scores(self, queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+		vectors = np.asarray(vectors, dtype=np.float32)
+		scores = queries @ vectors.T
+		if self.similarity_metric == "l2":
+			scores = (
+				2 * scores
+				- np.sum(queries**2, axis=1, keepdims=True)
+				- np.sum(vectors**2, axis=1)[np.newaxis, :]
+			)
+		return scores
+
+	def _search_flat(
+		self, queries: np.ndarray, top_k: int
+	) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+		count = self.meta["count"]
+		candidate_k = self._candidate_k(top_k)
+		rows_list, scores_list = [], []
+		for query_start in range(0, len(queries), self.query_batch):
+			query_batch = queries[query_start : query_start + self.query_batch]
+			best_rows = np.empty((len(query_batch), 0), dtype=np.int64)
+			best_scores = np.empty((len(query_batch), 0), dtype=np.float32)
+			for start in range(0, count, self.search_batch):
+				end = min(start + self.search_batch, count)
+				valid = np.asarray(self.valid[start:end])
+				if not valid.any():
+					continue
+				if self.codes is not None:
+					scores = self._approximate_scores(query_batch, self.codes[start:end])
+				else:
+					scores = self._scores(query_batch, self.embeddings[start:end])
+				scores[:, ~valid] = -np.inf
+				block_rows, block_scores = _select_top_k(scores, candidate_k)
+				best_rows, best_scores = _select_top_k(
+					np.concatenate([best_scores, block_scores], axis=1),
+					candidate_k,
+					np.concatenate([best_rows, block_rows + start], axis=1),
+				)
+			for row_array, score_array in zip(best_rows, best_scores):
+				# the deleted rows have -inf score, and they are only selected when there are not enough rows
+				valid = np.isfinite(score_array)
+				rows_list.append(row_array[valid])
+				scores_list.append(score_array[valid])
+		if self.codes is not None:
+			return self._rescore(queries, rows_list, top_k)
+		return rows_list, scores_list
+
+	def _need_train(self) -> bool:
+		live_count = len(self.id_to_row)
+		trained_count = self.meta["trained_count"]
+		if trained_count == 0:
+			return live_count >= 39 * self._get_nlist(live_count)
+		# retrain when the collection grows a lot after the training
+		return live_count >= 4 * trained_count
+
+	def _get_nlist(self, count: int) -> int:
+		if self.nlist is not None:
+			return self.nlist
+		return max(1, int(np.sqrt(count)))
+
+	def train_ivf(self, iterations: int = 20, sample_size: int = 100_000):
+		"""
+		Train the IVF centroids with the k-means clustering, and assign every row to the nearest centroid.
+
+		:param iterations: The number of k-means iterations. Default is 20.
+		:param sample_size: The number of rows to train the centroids. Default is 100,000.
+		"""
+		live_rows = np.flatnonzero(self.valid[: self.meta["count"]])
+		nlist = min(self._get_nlist(len(live_rows)), len(live_rows))
+		if nlist == 0:
+			return
+		rng = np.random.default_rng(0)
+		sample_rows = np.sort(
+			rng.choice(live_rows, min(sample_size, len(live_rows)), replace=False)
+		)
+		samples = np.asarray(self.embeddings[sample_rows], dtype=np.float32)
+		centroids = _kmeans_plus_plus(samples, nlist, rng)
+		for _ in range(iterations):
+			labels = np.argmax(self._centroid_scores(samples, centroids), axis=1)
+			order = np.argsort(labels, kind="stable")
+			sizes = np.bincount(labels, minlength=nlist)
+			non_empty = sizes > 0
+			starts = (np.cumsum(sizes) - sizes)[non_empty]
+			sums = np.add.reduceat(samples[order], starts, axis=0)
+			centroids[non_empty] = sums / sizes[non_empty, np.newaxis]
+		if self.similarity_metric == "cosine":
+			centroids = self._normalize(centroids)
+		self.centroids = centroids
+		np.save(self._file_path("centroids.npy"), centroids)
+
+		self.assignments = np.lib.format.open_memmap(
+			self._file_path("assignments.npy"),
+			mode="w+",
+			dtype=np.int32,
+			shape=(self.meta["capacity"],),
+		)
+		for start in range(0, self.meta["count"], self.search_batch):
+			end = min(start + self.search_batch, self.meta["count"])
+			self.assignments[start:end] = self._nearest_centroids(
+				np.asarray(self.embeddings[start:end], dtype=np.float32)
+			)
+		self.assignments.flush()
+		self.meta["trained_count"] = len(live_rows)
+		self._save_meta()
+		logger.info(
+			f"Trained the IVF index of {self.collection_name} with {nlist} clusters."
+		)
+
+	def _centroid_scores(self, vectors: np.ndarray, centroids: np.ndarray):
+		# the centroid with the highest score is the nearest
+		if self.similarity_metric == "l2":
+			return 2 * vectors @ centroids.T - np.sum(centroids**2, axis=1)
+		return vectors @ centroids.T
+
+	def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+		if len(vectors) == 0:
+			return np.empty(0, dtype=np.int32)
+		return np.argmax(self._centroid_scores(vectors, self.centroids), axis=1).astype(
+			np.int32
+		)
+
+	def _search_ivf(
+		self, queries: np.ndarray, top_k: int
+	) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+		count = self.meta["count"]
+		assignments = np.asarray(self.assignments[:count])
+		valid = np.asarray(self.valid[:count])
+		order = np.argsort(assignments, kind="stable")
+		order = order[valid[order]]
+		list_offsets = np.searchsorted(
+			assignments[order], np.arange(len(self.centroids) + 1)
+		)
+		nprobe = min(self.nprobe, len(self.centroids))
+		candidate_k = self._candidate_k(top_k)
+		probes = np.argpartition(
+			-self._centroid_scores(queries, self.centroids), nprobe - 1, axis=1
+		)[:, :nprobe]
+
+		rows_list, scores_list = [], []
+		for query, probe in zip(queries, probes):
+			rows = np.concatenate(
+				[order[list_offsets[c] : list_offsets[c + 1]] for c in probe]
+			)
+			rows = np.sort(rows)
+			if self.codes is not None:
+				scores = self._approximate_scores(query[np.newaxis, :], self.codes[rows])
+			else:
+				scores = self._scores(query[np.newaxis, :], self.embeddings[rows])
+			best_rows, best_scores = _select_top_k(
+				scores, candidate_k, rows[np.newaxis, :]
+			)
+			rows_list.append(best_rows[0])
+			scores_list.append(best_scores[0])
+		if self.codes is not None:
+			return self._rescore(queries, rows_list, top_k)
+		return rows_list, scores_list
+
+	def _candidate_k(self, top_k: int) -> int:
+		if self.codes is not None:
+			return top_k * self.rescore_factor
+		return top_k
+
+	def _rescore(
+		self, queries: np.ndarray, rows_list: List[np.ndarray], top_k: int
+	) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+		"""
+		Rescore the candidates of the quantized search with the full-precision embeddings.
+		"""
+		result_rows, result_scores = [], []
+		for query, rows in zip(queries, rows_list):
+			rows = np.sort(rows)
+			scores = self._scores(query[np.newaxis, :], self.embeddings[rows])
+			best_rows, best_scores = _select_top_k(scores, top_k, rows[np.newaxis, :])
+			result_rows.append(best_rows[0])
+			result_scores.append(best_scores[0])
+		return result_rows, result_scores
+
+	def _code_dtype(self):
+		return np.uint8 if self.meta["quantization"] == "binary" else np.int8
+
+	def _code_dimension(self) -> int:
+		if self.meta["quantization"] == "binary":
+			return (self.meta["dimension"] + 7) // 8
+		return self.meta["dimension"]
+
+	def _need_calibrate(self) -> bool:
+		if self.meta["quantization"] is None:
+			return False
+		live_count = len(self.id_to_row)
+		calibrated_count = self.meta["calibrated_count"]
+		if calibrated_count == 0:
+			return live_count > 0
+		# recalibrate when the collection grows a lot after the calibration
+		return live_count >= 4 * calibrated_count
+
+	def calibrate(self, sample_size: int = 100_000):
+		"""
+		Calibrate the quantization with the sample of the embeddings, and quantize every row.
+		The 'int8' calibration is the center and the step of each dimension from its min and max,
+		and the 'binary' calibration is the mean of each dimension.
+
+		:param sample_size: The number of rows to calibrate. Default is 100,000.
+		"""
+		live_rows = np.flatnonzero(self.valid[: self.meta["count"]])
+		if len(live_rows) == 0:
+			return
+		rng = np.random.default_rng(0)
+		sample_rows = np.sort(
+			rng.choice(live_rows, min(sample_size, len(live_rows)), replace=False)
+		)
+		samples = np.asarray(self.embeddings[sample_rows], dtype=np.float32)
+		if self.meta["quantization"] == "int8":
+			lower, upper = samples.min(axis=0), samples.max(axis=0)
+			offset = (lower + upper) / 2
+			scale = np.maximum((upper - lower) / 254, 1e-12)
+		else:
+			offset = samples.mean(axis=0)
+			scale = np.ones_like(offset)
+		self.calibration = np.stack([offset, scale]).astype(np.float32)
+		np.save(self._file_path("calibration.npy"), self.calibration)
+
+		self.codes = np.lib.format.open_memmap(
+			self._file_path("codes.npy"),
+			mode="w+",
+			dtype=self._code_dtype(),
+			shape=(self.meta["capacity"], self._code_dimension()),
+		)
+		for start in range(0, self.meta["count"], self.search_batch):
+			end = min(start + self.search_batch, self.meta["count"])
+			self.codes[start:end] = self._quantize(
+				np.asarray(self.embeddings[start:end], dtype=np.float32)
+			)
+		self.codes.flush()
+		self.meta["calibrated_count"] = len(live_rows)
+		self._save_meta()
+		logger.info(
+			f"Calibrated the {self.meta['quantization']} quantization of {self.collection_name}."
+		)
+
+	def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+		offset, scale = self.calibration
+		if self.meta["quantization"] == "int8":
+			return np.clip(np.rint((vectors - offset) / scale), -127, 127).astype(
+				np.int8
+			)
+		return np.packbits(vectors > offset, axis=1)
+
+	def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+		offset, scale = self.calibration
+		codes = np.asarray(codes)
+		if self.meta["quantization"] == "int8":
+			return self._scores(queries, offset + scale * codes.astype(np.float32))
+		# the number of the same signs, minus the number of the different signs
+		code_signs = np.unpackbits(codes, axis=1, count=len(offset)).astype(np.float32)
+		query_signs = (queries > offset).astype(np.float32)
+		return (2 * query_signs - 1) @ (2 * code_signs - 1).T
+
+
+def _kmeans_plus_plus(
+	samples: np.ndarray, k: int, rng: np.random.Generator
+) -> np.ndarray:
+	"""
+	Choose the initial k-means centroids, which are far from each other.
+	"""
+	centroids = [samples[rng.integers(len(samples))]]
+	distances = np.sum((samples - centroids[0]) ** 2, axis=1)
+	for _ in range(1, k):
+		total = distances.sum()
+		if total <= 0:
+			index = rng.integers(len(samples))
+		else:
+			index = rng.choice(len(samples), p=distances / total)
+		centroids.append(samples[index])
+		distances = np.minimum(distances, np.sum((samples - samples[index]) ** 2, axis=1))
+	return np.stack(centroids).astype(np.float32)
+
+
+def _select_top_k(
+	scores: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	Select the top_k of each query with the partial selection, sorted by the score.
+
+	:param scores: The score matrix. The shape is (the number of queries, the number of candidates).
+	:param top_k: The number of candidates to select.
+	:param rows: The row of each candidate. Default is None, which means the column index.
+	:return: The selected rows and scores.
+	"""
+	if rows is None:
+		rows = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+	if scores.shape[1] > top_k:
+		selected = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+		rows = np.take_along_axis(rows, selected, axis=1)
+		scores = np.take_along_axis(scores, selected, axis=1)
+	order = np.argsort(-scores, axis=1, kind="stable")
+	return np.take_along_axis(rows, order, axis=1), np.take_along_axis(
+		scores, order, axis=1
+	)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger("AutoRAG")
+
+
+# The config fields that define the collection. The other fields, like the api keys,
+# the tokens and the batch sizes, don't change the ingested passages.
+MANIFEST_IDENTITY_KEYS = [
+	"db_type",
+	"collection_name",
+	"index_name",
+	"embedding_model",
+	"similarity_metric",
+	"client_type",
+	"path",
+	"uri",
+	"url",
+	"host",
+	"port",
+	"db_name",
+	"tenant",
+	"database",
+]
+
+
+def get_manifest_path(resources_dir: str, vectordb_config: Dict) -> str:
+	"""
+	Get the ingestion manifest path of the vectordb config.
+	The path contains the hash of the config fields that define the collection,
+	so the changed vectordb (for example, another embedding model or another collection) gets a new manifest.
+	The secrets like the api keys are not hashed, so rotating them keeps the manifest.
+
+	:param resources_dir: The resources directory of the project.
+	:param vectordb_config: The vectordb config dictionary at the YAML file.
+	:return: The manifest file path.
+	"""
+	identity = {
+		key: vectordb_config[key]
+		for key in MANIFEST_IDENTITY_KEYS
+		if key in vectordb_config
+	}
+	config_hash = hashlib.blake2b(
+		json.dumps(identity, sort_keys=True, default=str).encode("utf-8"),
+		digest_size=8,
+	).hexdigest()
+	name = vectordb_config.get("name", "default")
+	return os.path.join(
+		resources_dir, "vectordb_manifest", f"{name}_{config_hash}.parquet"
+	)
+
+
+def content_hashes(contents: List[str]) -> List[bytes]:
+	return [
+		hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+		for content in contents
+	]
+
+
+class IngestManifest:
+	def __init__(self, path: str):
+		"""
+		The local table of the passage ids and the content hashes ingested to a vectordb.
+		With this, the new and changed passages are found without calling the vectordb.
+
+		:param path: The parquet file path of the manifest.
+		"""
+		self.path = path
+		self.exists = os.path.exists(path)
+		if self.exists:
+			manifest_df = pd.read_parquet(path, engine="pyarrow")
+			self.hashes: Dict[str, bytes] = dict(
+				zip(manifest_df["doc_id"], manifest_df["content_hash"])
+			)
+		else:
+			self.hashes = {}
+
+	def __len__(self):
+		return len(self.hashes)
+
+	def diff(self, corpus_data: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+		"""
+		Find the passages to ingest.
+
+		:param corpus_data: The corpus data that contains doc_id and contents columns.
+		:return: The new or changed passages, and the ids of the changed passages.
+		    The changed passages must be deleted from the vectordb before the ingestion.
+		"""
+		doc_ids = corpus_data["doc_id"].tolist()
+		hashes = content_hashes(corpus_data["contents"].tolist())
+		ingested_hashes = [self.hashes.get(doc_id) for doc_id in doc_ids]
+		target_mask = [
+			ingested_hash != content_hash
+			for ingested_hash, content_hash in zip(ingested_hashes, hashes)
+		]
+		changed_ids = [
+			doc_id
+			for doc_id, ingested_hash, is_target in zip(
+				doc_ids, ingested_hashes, target_mask
+			)
+			if is_target and ingested_hash is not None
+		]
+		return corpus_data[target_mask], changed_ids
+
+	def remove(self, doc_ids: List[str]):
+		"""
+		Forget the passages, so they are ingested again at the next diff.
+
+		:param doc_ids: The passage ids to remove from the manifest.
+		"""
+		for doc_id in doc_ids:
+			self.hashes.pop(doc_id, None)
+
+	def update(self, corpus_data: pd.DataFrame):
+		"""
+		Record the passages as ingested.
+
+		:param corpus_data: The ingested corpus data that contains doc_id and contents columns.
+		"""
+		self.hashes.update(
+			zip(
+				corpus_data["doc_id"].tolist(),
+				content_hashes(corpus_data["contents"].tolist()),
+			)
+		)
+
+	def save(self):
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		manifest_df = pd.DataFrame(
+			{
+				"doc_id": list(self.hashes.keys()),
+				"content_hash": list(self.hashes.values()),
+			}
+		)
+		tmp_path = f"{self.path}.tmp"
+		manifest_df.to_parquet(tmp_path, index=False, engine="pyarrow")
+		os.replace(tmp_path, self.path)
+		self.exists = True
@@ -69,15 +69,12 @@ class Milvus(BaseVectorStore):
 		else:
 			self.collection = Collection(name=self.collection_name)
 
-	async def add(self, ids: List[str], texts: List[str]):
-		texts = self.truncated_inputs(texts)
-		text_embeddings: List[
-			List[float]
-		] = await self.embedding.aget_text_embedding_batch(texts)
-
+	async def insert(
+		self, ids: List[str], texts: List[str], embeddings: List[List[float]]
+	):
 		# make data for insertion
 		data = list(
-			map(lambda _id, vector: {"id": _id, "vector": vector}, ids, text_embeddings)
+			map(lambda _id, vector: {"id": _id, "vector": vector}, ids, embeddings)
 		)
 
 		# Insert data into the collection
@@ -86,6 +83,11 @@ class Milvus(BaseVectorStore):
 			res.insert_count == len(ids)
 		), f"Insertion failed. Try to insert {len(ids)} but only {res['insert_count']} inserted."
 
+		# at the bulk-load mode, flush and build the index once at the end_bulk_load
+		if not self.bulk_load:
+			self.build_index()
+
+	def build_index(self):
 		self.collection.flush(timeout=self.timeout)
 
 		index_params = {
@@ -97,6 +99,10 @@ class Milvus(BaseVectorStore):
 			field_name="vector", index_params=index_params, timeout=self.timeout
 		)
 
+	def end_bulk_load(self):
+		super().end_bulk_load()
+		self.build_index()
+
 	async def query(
 		self, queries: List[str], top_k: int, **kwargs
 	) -> Tuple[List[List[str]], List[List[float]]]:
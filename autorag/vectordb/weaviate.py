@@ -76,10 +76,9 @@ class Weaviate(BaseVectorStore):
 		self.collection = self.client.collections.get(collection_name)
 		self.collection_name = collection_name
 
-	async def add(self, ids: List[str], texts: List[str]):
-		texts = self.truncated_inputs(texts)
-		text_embeddings = await self.embedding.aget_text_embedding_batch(texts)
-
+	async def insert(
+		self, ids: List[str], texts: List[str], embeddings: List[List[float]]
+	):
 		with self.client.batch.dynamic() as batch:
 			for i, text in enumerate(texts):
 				data_properties = {self.text_key: text}
@@ -88,7 +87,7 @@ class Weaviate(BaseVectorStore):
 					collection=self.collection_name,
 					properties=data_properties,
 					uuid=ids[i],
-					vector=text_embeddings[i],
+					vector=embeddings[i],
 				)
 
 		failed_objs = self.client.batch.failed_objects
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from typing import List
+
+import numpy as np
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from autorag import embedding_models, LazyInit
+from autorag.embedding import (
+	CachedEmbedding,
+	EmbeddingCache,
+	set_embedding_cache,
+	load_embedding_model,
+)
+
+
+class CountingEmbedding(BaseEmbedding):
+	embedded_texts: List[str] = []
+
+	def _embed(self, text: str) -> List[float]:
+		self.embedded_texts.append(text)
+		return [float(len(text)), float(ord(text[0])), 1.0]
+
+	def _get_query_embedding(self, query: str) -> List[float]:
+		return self._embed(query)
+
+	async def _aget_query_embedding(self, query: str) -> List[float]:
+		return self._embed(query)
+
+	def _get_text_embedding(self, text: str) -> List[float]:
+		return self._embed(text)
+
+
+@pytest.fixture
+def counting_embedding(tmp_path):
+	embedding_models["counting"] = LazyInit(CountingEmbedding)
+	set_embedding_cache(str(tmp_path / "embedding_cache"))
+	yield embedding_models["counting"]()
+	set_embedding_cache(None)
+	embedding_models.pop("counting")
+
+
+def test_cached_embedding(counting_embedding):
+	embedding_model = load_embedding_model("counting")
+	assert isinstance(embedding_model, CachedEmbedding)
+	embedding_model.embed_batch_size = 2
+	assert counting_embedding.embed_batch_size == 2
+
+	texts = ["apple", "banana", "apple", "cherry"]
+	result = embedding_model.get_text_embedding_batch(texts)
+	assert result == [counting_embedding._embed(text) for text in texts]
+	assert counting_embedding.embedded_texts[:3] == ["apple", "banana", "cherry"]
+
+	counting_embedding.embedded_texts.clear()
+	result = asyncio.run(
+		embedding_model.aget_text_embedding_batch([" banana", "durian", "apple"])
+	)
+	# only the miss is embedded, and the whitespace is normalized
+	assert counting_embedding.embedded_texts == ["durian"]
+	assert result == [counting_embedding._embed(text) for text in ["banana", "durian", "apple"]]
+
+
+def test_embedding_cache_persistent(counting_embedding, tmp_path):
+	load_embedding_model("counting").get_text_embedding_batch(["apple", "banana"])
+	set_embedding_cache(str(tmp_path / "other_cache"))
+	set_embedding_cache(str(tmp_path / "embedding_cache"))
+	counting_embedding.embedded_texts.clear()
+	load_embedding_model("counting").get_text_embedding_batch(["banana", "apple"])
+	assert counting_embedding.embedded_texts == []
+
+
+def test_embedding_cache_eviction(tmp_path):
+	row_bytes = 4 * 4 + 16 + 8
+	cache = EmbeddingCache(str(tmp_path / "embedding_cache"), max_bytes=row_bytes * 8)
+	store = cache.store("model")
+	digests = [str(i).encode() for i in range(8)]
+	vectors = np.arange(32, dtype=np.float32).reshape(8, 4)
+	store.write(digests, vectors)
+	assert len(store) == 8
+	# use the first two slots recently
+	assert np.array_equal(store.read(store.lookup(digests[:2])), vectors[:2])
+	store.write([b"new"], np.ones((1, 4)))
+	assert len(store) <= 8
+	slots = store.lookup(digests[:2] + [b"new"])
+	assert np.all(slots >= 0)
+	assert np.array_equal(store.read(slots[:2]), vectors[:2])
+	assert (store.lookup(digests[2:]) < 0).sum() >= 1
+
+
+def test_embedding_cache_eviction_threaded(tmp_path):
+	row_bytes = 3 * 4 + 16 + 8
+	cache = EmbeddingCache(str(tmp_path / "embedding_cache"), max_bytes=row_bytes * 16)
+	embedding_model = CachedEmbedding(CountingEmbedding(), "counting", cache)
+	texts = [f"{chr(ord('a') + i % 26)}{'x' * i}" for i in range(64)]
+	errors = []
+
+	def embed(seed: int):
+		rng = np.random.default_rng(seed)
+		for _ in range(100):
+			batch = rng.choice(texts, size=8).tolist()
+			result = embedding_model.get_text_embedding_batch(batch)
+			expected = [[float(len(text)), float(ord(text[0])), 1.0] for text in batch]
+			if result != expected:
+				errors.append((batch, result))
+
+	threads = [threading.Thread(target=embed, args=(seed,)) for seed in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert errors == []
+	assert len(cache.store("counting")) <= 16
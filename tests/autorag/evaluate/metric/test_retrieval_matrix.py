@@ -0,0 +1,106 @@
+import math
+import random
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from autorag.evaluation.metric.retrieval_matrix import (
+	RETRIEVAL_MATRIX_METRICS,
+	RetrievalMetricEngine,
+	python_sum,
+)
+from autorag.evaluation.retrieval import RETRIEVAL_METRIC_FUNC_DICT
+from autorag.schema.metricinput import MetricInput
+from tests.autorag.evaluate.metric.test_retrieval_metric import retrieval_gt, pred
+
+
+def per_row_metrics(retrieval_gts, preds):
+	metric_inputs = [
+		MetricInput(retrieval_gt=gt, retrieved_ids=pr)
+		for gt, pr in zip(retrieval_gts, preds)
+	]
+	return {
+		metric: RETRIEVAL_METRIC_FUNC_DICT[metric](metric_inputs=metric_inputs)
+		for metric in RETRIEVAL_MATRIX_METRICS
+	}
+
+
+def engine_metrics(retrieval_gts, preds):
+	engine = RetrievalMetricEngine(
+		[MetricInput(retrieval_gt=gt) for gt in retrieval_gts]
+	)
+	return engine.compute_ids(preds, RETRIEVAL_MATRIX_METRICS)
+
+
+def test_retrieval_metric_engine():
+	assert engine_metrics(retrieval_gt, pred) == per_row_metrics(retrieval_gt, pred)
+
+
+def test_retrieval_metric_engine_numpy():
+	retrieval_gt_np = [[np.array(["test-1", "test-4"])], np.array([["test-2"]])]
+	pred_np = list(
+		np.array([["test-2", "test-3", "test-1"], ["test-5", "test-6", "test-8"]])
+	)
+	assert engine_metrics(retrieval_gt_np, pred_np) == per_row_metrics(
+		retrieval_gt_np, pred_np
+	)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_retrieval_metric_engine_random(seed):
+	rng = random.Random(seed)
+	retrieval_gts, preds = [], []
+	for _ in range(200):
+		retrieval_gts.append(
+			rng.choice(
+				[
+					None,
+					[[]],
+					[
+						[f"id-{rng.randint(0, 25)}" for _ in range(rng.randint(1, 3))]
+						for _ in range(rng.randint(1, 4))
+					],
+				]
+			)
+		)
+		preds.append(
+			rng.choice(
+				[
+					[],
+					["id-1", " "],
+					[f"id-{rng.randint(0, 30)}" for _ in range(rng.randint(1, 25))],
+				]
+			)
+		)
+	assert engine_metrics(retrieval_gts, preds) == per_row_metrics(
+		retrieval_gts, preds
+	)
+
+
+def test_python_sum():
+	rng = random.Random(0)
+	terms = np.array(
+		[
+			[rng.choice([0.0, 1 / math.log2(i + 2), rng.random() * 1e5]) for i in range(20)]
+			for _ in range(100)
+		]
+	)
+	assert python_sum(terms).tolist() == [sum(row) for row in terms.tolist()]
+
+	def neumaier_sum(values):
+		result, compensation = 0.0, 0.0
+		for value in values:
+			total = result + value
+			if abs(result) >= abs(value):
+				compensation += (result - total) + value
+			else:
+				compensation += (value - total) + result
+			result = total
+		return result + compensation
+
+	with patch.object(sys, "version_info", (3, 12)):
+		assert python_sum(terms).tolist() == [
+			neumaier_sum(row) for row in terms.tolist()
+		]
@@ -5,7 +5,7 @@ import tempfile
 import pandas as pd
 import pytest
 
-from autorag.nodes.passagereranker import MonoT5
+from autorag.nodes.passagereranker import MonoT5, PassReranker
 from autorag.nodes.passagereranker.run import run_passage_reranker_node
 from autorag.utils.util import load_summary_file
 from tests.delete_tests import is_github_action
@@ -155,3 +155,28 @@ def test_run_passage_reranker_node(node_line_dir):
 	assert os.path.exists(
 		os.path.join(node_line_dir, "passage_reranker", f"best_{best_path}")
 	)
+
+
+def test_run_passage_reranker_node_pruning(node_line_dir):
+	modules = [PassReranker, PassReranker]
+	module_params = [{"top_k": 1}, {"top_k": 2}]
+	strategies = {
+		"metrics": ["retrieval_f1", "retrieval_recall"],
+		"pruning": {"min_sample_size": 1, "reduction_factor": 2},
+	}
+	best_result = run_passage_reranker_node(
+		modules, module_params, previous_result, node_line_dir, strategies
+	)
+	assert len(best_result) == len(previous_result)
+	assert best_result["qid"].tolist() == previous_result["qid"].tolist()
+	summary_df = load_summary_file(
+		os.path.join(node_line_dir, "passage_reranker", "summary.csv")
+	)
+	assert {"pruned_stage", "evaluated_rows"}.issubset(summary_df.columns)
+	best_row = summary_df[summary_df["is_best"]].iloc[0]
+	assert pd.isna(best_row["pruned_stage"])
+	assert best_row["evaluated_rows"] == len(previous_result)
+	assert "stage_passage_reranker_retrieval_f1" in summary_df.columns
+	assert not pd.isna(best_row["passage_reranker_retrieval_f1"])
+	pruned_rows = summary_df[summary_df["pruned_stage"].notna()]
+	assert pruned_rows["passage_reranker_retrieval_f1"].isna().all()
@@ -46,3 +46,15 @@ def test_sentence_transformer_reranker_node():
 		project_dir=project_dir, previous_result=previous_result, top_k=top_k
 	)
 	base_reranker_node_test(result_df, top_k)
+
+
+@pytest.mark.skipif(is_github_action(), reason="Skipping this test on GitHub Actions")
+def test_sentence_transformer_reranker_onnx():
+	top_k = 3
+	reranker = SentenceTransformerReranker(
+		project_dir, "cross-encoder/ms-marco-MiniLM-L-2-v2", backend="onnx"
+	)
+	contents_result, id_result, score_result = reranker._pure(
+		queries_example, contents_example, ids_example, top_k
+	)
+	base_reranker_test(contents_result, id_result, score_result, top_k)
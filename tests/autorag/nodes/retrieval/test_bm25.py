@@ -4,20 +4,33 @@ import shutil
 import tempfile
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from autorag.nodes.retrieval import BM25
 from autorag.nodes.retrieval.bm25 import (
 	bm25_ingest,
+	bm25_delete,
+	bm25_pure,
+	migrate_bm25_pkl,
 	tokenize_ko_kiwi,
 	tokenize_porter_stemmer,
 	tokenize_space,
 	tokenize_ko_kkma,
 	tokenize_ko_okt,
 	tokenize_ja_sudachipy,
+	tokenize_corpus,
+	tokenize_texts,
+	select_bm25_tokenizer,
+	BM25Tokenizer,
+	load_kiwi,
 )
-from autorag.utils.util import to_list
+from autorag.nodes.retrieval.bm25_index import (
+	BM25Index,
+	BM25SegmentedIndex,
+)
+from autorag.utils.util import to_list, get_event_loop
 from tests.autorag.nodes.retrieval.test_retrieval_base import (
 	queries,
 	project_dir,
@@ -43,11 +56,10 @@ ja_texts = [
 
 @pytest.fixture
 def ingested_bm25_path():
-	with tempfile.NamedTemporaryFile(suffix=".pkl", mode="w+b", delete=False) as path:
-		bm25_ingest(path.name, corpus_df)
-		yield path.name
-		path.close()
-		os.unlink(path.name)
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		bm25_path = os.path.join(temp_dir, "bm25_porter_stemmer")
+		bm25_ingest(bm25_path, corpus_df)
+		yield bm25_path
 
 
 @pytest.fixture
@@ -55,13 +67,11 @@ def bm25_instance(ingested_bm25_path):
 	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_project_dir:
 		os.makedirs(os.path.join(temp_project_dir, "resources"))
 		os.makedirs(os.path.join(temp_project_dir, "data"))
-		bm25_path = os.path.join(
-			temp_project_dir, "resources", "bm25_porter_stemmer.pkl"
-		)
+		bm25_path = os.path.join(temp_project_dir, "resources", "bm25_porter_stemmer")
 		corpus_df.to_parquet(
 			os.path.join(temp_project_dir, "data", "corpus.parquet"), index=False
 		)
-		shutil.copy(ingested_bm25_path, bm25_path)
+		shutil.copytree(ingested_bm25_path, bm25_path)
 		bm25 = BM25(project_dir=temp_project_dir)
 		yield bm25
 
@@ -117,15 +127,18 @@ def test_bm25_node_ids():
 
 
 def test_bm25_ingest(ingested_bm25_path, bm25_instance):
-	with open(ingested_bm25_path, "rb") as r:
-		corpus = pickle.load(r)
-	assert set(corpus.keys()) == {"tokens", "passage_id", "tokenizer_name"}
-	assert isinstance(corpus["tokens"], list)
-	assert isinstance(corpus["passage_id"], list)
-	assert isinstance(corpus["tokenizer_name"], str)
-	assert corpus["tokenizer_name"] == "porter_stemmer"
-	assert len(corpus["tokens"]) == len(corpus["passage_id"]) == 5
-	assert set(corpus["passage_id"]) == {"doc1", "doc2", "doc3", "doc4", "doc5"}
+	bm25_index = BM25SegmentedIndex(ingested_bm25_path)
+	assert bm25_index.tokenizer_name == "porter_stemmer"
+	assert bm25_index.corpus_size == len(bm25_index.passage_ids) == 5
+	assert bm25_index.segment_count == 1
+	assert isinstance(bm25_index.segments[0].postings, np.memmap)
+	assert set(bm25_index.passage_ids.tolist()) == {
+		"doc1",
+		"doc2",
+		"doc3",
+		"doc4",
+		"doc5",
+	}
 
 	top_k = 2
 	id_result, score_result = bm25_instance._pure(
@@ -141,6 +154,35 @@ def test_bm25_ingest(ingested_bm25_path, bm25_instance):
 			assert _id in ["doc1", "doc2", "doc3", "doc4", "doc5"]
 
 
+def test_bm25_pure_batch(bm25_instance):
+	queries = [
+		["What is test document?", "test document number 2"],
+		["What is test document number 2?"],
+		["no matching word zzzzzz", "test"],
+	]
+	id_result, score_result = bm25_instance._pure(queries, top_k=3)
+	loop = get_event_loop()
+	for query_list, ids, scores in zip(queries, id_result, score_result):
+		expected_ids, expected_scores = loop.run_until_complete(
+			bm25_pure(
+				query_list, 3, bm25_instance.tokenizer, bm25_instance.bm25_instance
+			)
+		)
+		assert ids == expected_ids
+		assert scores == pytest.approx(expected_scores)
+
+
+def test_bm25_k1_b():
+	bm25 = BM25(project_dir=project_dir)
+	_, default_scores = bm25._pure(queries, top_k=3)
+	_, scores = bm25._pure(queries, top_k=3, k1=1.5, b=0.75)
+	assert scores == default_scores
+	_, scores = bm25._pure(queries, top_k=3, k1=0.8, b=0.3)
+	assert scores != default_scores
+	with pytest.raises(ValueError):
+		bm25._pure(queries, top_k=3, b=1.5)
+
+
 def test_duplicate_id_bm25_ingest(ingested_bm25_path):
 	new_doc_id = ["doc4", "doc5", "doc6", "doc7", "doc8"]
 	new_contents = [
@@ -155,9 +197,103 @@ def test_duplicate_id_bm25_ingest(ingested_bm25_path):
 		{"doc_id": new_doc_id, "contents": new_contents, "metadata": new_metadata}
 	)
 	bm25_ingest(ingested_bm25_path, new_corpus_df)
-	with open(ingested_bm25_path, "rb") as r:
-		corpus = pickle.load(r)
-	assert len(corpus["tokens"]) == len(corpus["passage_id"]) == 8
+	bm25_index = BM25SegmentedIndex(ingested_bm25_path)
+	assert bm25_index.corpus_size == len(bm25_index.passage_ids) == 8
+	assert bm25_index.segment_count == 2
+
+	# the merged index must be the same as the index built at once
+	full_corpus_df = pd.concat([corpus_df, new_corpus_df.iloc[2:]], ignore_index=True)
+	full_bm25_index = BM25Index.from_tokens(
+		tokenize_porter_stemmer(full_corpus_df["contents"].tolist())
+	)
+	query = tokenize_porter_stemmer(["test document 7"])[0]
+	assert np.allclose(bm25_index.get_scores(query), full_bm25_index.get_scores(query))
+
+
+def test_bm25_delete(ingested_bm25_path):
+	assert bm25_delete(ingested_bm25_path, ["doc1", "doc2", "doc3"]) == 3
+	bm25_index = BM25SegmentedIndex(ingested_bm25_path)
+	assert bm25_index.passage_ids.tolist() == ["doc4", "doc5"]
+	# the segment with more than half of deleted documents is merged
+	assert bm25_index.manifest["segments"][0]["deleted"] == 0
+
+	query = tokenize_porter_stemmer(["test document"])[0]
+	rows, _ = bm25_index.get_top_k(query, 5)
+	assert sorted(bm25_index.get_passage_ids(rows)) == ["doc4", "doc5"]
+
+	# deleted document can be ingested again
+	bm25_ingest(ingested_bm25_path, corpus_df)
+	assert BM25SegmentedIndex(ingested_bm25_path).corpus_size == 5
+
+
+def dump_legacy_pkl(pkl_path: str, size: int = len(corpus_df)):
+	with open(pkl_path, "wb") as w:
+		pickle.dump(
+			{
+				"tokens": tokenize_porter_stemmer(corpus_df["contents"].tolist()[:size]),
+				"passage_id": corpus_df["doc_id"].tolist()[:size],
+				"tokenizer_name": "porter_stemmer",
+			},
+			w,
+		)
+
+
+def test_legacy_pkl_bm25():
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_project_dir:
+		os.makedirs(os.path.join(temp_project_dir, "resources"))
+		os.makedirs(os.path.join(temp_project_dir, "data"))
+		corpus_df.to_parquet(
+			os.path.join(temp_project_dir, "data", "corpus.parquet"), index=False
+		)
+		dump_legacy_pkl(
+			os.path.join(temp_project_dir, "resources", "bm25_porter_stemmer.pkl")
+		)
+		bm25_path = os.path.join(temp_project_dir, "resources", "bm25_porter_stemmer")
+		# the retrieval module does not touch the files, the ingestion migrates them
+		with pytest.raises(AssertionError):
+			BM25(project_dir=temp_project_dir)
+		assert not os.path.exists(bm25_path)
+		bm25_ingest(bm25_path, corpus_df)
+		bm25 = BM25(project_dir=temp_project_dir)
+		assert bm25.bm25_instance.corpus_size == len(corpus_df)
+		id_result, score_result = bm25._pure(queries, top_k=3)
+		base_retrieval_test(id_result, score_result, 3)
+
+
+def test_migrate_bm25_pkl_interrupted(tmp_path, monkeypatch):
+	pkl_path = os.path.join(tmp_path, "bm25_porter_stemmer.pkl")
+	index_path = os.path.join(tmp_path, "bm25_porter_stemmer")
+	dump_legacy_pkl(pkl_path)
+
+	def interrupt(*args, **kwargs):
+		raise KeyboardInterrupt
+
+	with monkeypatch.context() as m:
+		m.setattr(BM25SegmentedIndex, "add", interrupt)
+		with pytest.raises(KeyboardInterrupt):
+			migrate_bm25_pkl(pkl_path, index_path)
+	assert sorted(os.listdir(tmp_path)) == ["bm25_porter_stemmer.pkl"]
+
+	# the index that is migrated by another process first is kept
+	BM25SegmentedIndex.create(index_path, "porter_stemmer")
+	migrate_bm25_pkl(pkl_path, index_path)
+	assert BM25SegmentedIndex(index_path).corpus_size == 0
+	assert BM25SegmentedIndex.open(index_path, "porter_stemmer").corpus_size == 0
+	assert sorted(os.listdir(tmp_path)) == [
+		"bm25_porter_stemmer",
+		"bm25_porter_stemmer.pkl",
+	]
+
+
+def test_bm25_ingest_pkl_path(tmp_path):
+	pkl_path = os.path.join(tmp_path, "bm25_porter_stemmer.pkl")
+	dump_legacy_pkl(pkl_path, size=3)
+	bm25_ingest(pkl_path, corpus_df)
+	bm25_index = BM25SegmentedIndex(os.path.join(tmp_path, "bm25_porter_stemmer"))
+	assert sorted(bm25_index.passage_ids.tolist()) == sorted(
+		corpus_df["doc_id"].tolist()
+	)
+	assert bm25_index.segment_count == 2
 
 
 def test_other_method_bm25():
@@ -172,6 +308,51 @@ def test_tokenize_ko_wiki():
 	assert all(isinstance(x, str) for x in tokenized_list[0])
 
 
+def test_tokenize_ko_kiwi_reuse():
+	tokenize_ko_kiwi(ko_texts)
+	kiwi = load_kiwi()
+	tokenize_ko_kiwi(ko_texts)
+	assert load_kiwi() is kiwi
+
+
+def test_tokenize_corpus():
+	texts = corpus_df["contents"].tolist() * 4
+	tokenized_list = tokenize_corpus(
+		texts, "porter_stemmer", batch_size=3, num_workers=2
+	)
+	assert tokenized_list == tokenize_porter_stemmer(texts)
+
+
+def test_bm25_tokenizer_batch():
+	tokenizer = select_bm25_tokenizer("ko_kiwi")
+	assert isinstance(tokenizer, BM25Tokenizer)
+	assert tokenizer.multithreaded
+	assert select_bm25_tokenizer("ko_kiwi") is tokenizer
+	assert tokenizer.tokenize_batch(ko_texts) == tokenize_ko_kiwi(ko_texts)
+	assert tokenizer.tokenize_batch([]) == []
+
+	space_tokenizer = select_bm25_tokenizer("space")
+	assert not space_tokenizer.multithreaded
+	assert space_tokenizer(["kia tigers", "seoul"]) == [["kia", "tigers"], ["seoul"]]
+
+
+def test_tokenize_texts_chunks():
+	texts = corpus_df["contents"].tolist() * 4
+	expected = tokenize_porter_stemmer(texts)
+	# fewer texts than the chunk size are still split to the workers
+	assert (
+		tokenize_texts(texts, "porter_stemmer", num_workers=2, min_chunk_size=2)
+		== expected
+	)
+	assert (
+		tokenize_texts(
+			texts, select_bm25_tokenizer("porter_stemmer"), chunk_size=5, num_workers=1
+		)
+		== expected
+	)
+	assert tokenize_texts([], "porter_stemmer") == []
+
+
 def test_tokenize_ko_kkma():
 	tokenized_list = tokenize_ko_kkma(ko_texts)
 	assert len(tokenized_list) == len(ko_texts)
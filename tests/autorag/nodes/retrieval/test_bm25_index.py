@@ -0,0 +1,214 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from autorag.nodes.retrieval.bm25 import tokenize_porter_stemmer
+from autorag.nodes.retrieval.bm25_index import (
+	BM25Index,
+	BM25SegmentedIndex,
+	_get_index_lock,
+	wait_for_merges,
+)
+from tests.autorag.nodes.retrieval.test_retrieval_base import corpus_data
+
+tokenized_corpus = tokenize_porter_stemmer(corpus_data["contents"].tolist())
+tokenized_queries = tokenize_porter_stemmer(
+	[
+		"What is Visconde structure?",
+		"What is the structure of StrategyQA dataset in this paper?",
+		"Is RAG framework have source?",
+		"no matching word zzzzzz",
+	]
+)
+
+
+def test_bm25_index_scores():
+	bm25_okapi = BM25Okapi(tokenized_corpus)
+	bm25_index = BM25Index.from_tokens(tokenized_corpus)
+	assert bm25_index.corpus_size == len(tokenized_corpus)
+	for query in tokenized_queries:
+		assert np.allclose(bm25_okapi.get_scores(query), bm25_index.get_scores(query))
+
+
+def test_bm25_index_top_k():
+	bm25_okapi = BM25Okapi(tokenized_corpus)
+	bm25_index = BM25Index.from_tokens(tokenized_corpus)
+	top_k = 5
+	for query in tokenized_queries:
+		rows, scores = bm25_index.get_top_k(query, top_k)
+		assert len(rows) == len(scores) == top_k
+		expected_scores = np.sort(bm25_okapi.get_scores(query))[::-1][:top_k]
+		assert np.allclose(scores, expected_scores)
+		assert np.allclose(bm25_index.get_scores(query)[rows], scores)
+
+
+def test_bm25_index_k1_b(tmp_path):
+	segmented_index = BM25SegmentedIndex.create(
+		os.path.join(tmp_path, "bm25_index"), "porter_stemmer"
+	)
+	segmented_index.add(tokenized_corpus, [str(i) for i in range(len(tokenized_corpus))])
+	for k1, b in [(1.2, 0.5), (2.0, 1.0), (0.5, 0.0)]:
+		bm25_okapi = BM25Okapi(tokenized_corpus, k1=k1, b=b)
+		for query in tokenized_queries:
+			expected_scores = bm25_okapi.get_scores(query)
+			assert np.allclose(segmented_index.get_scores(query, k1=k1, b=b), expected_scores)
+			score_matrix = segmented_index.score_matrix([query], k1=k1, b=b)
+			assert np.allclose(score_matrix.toarray()[0], expected_scores)
+
+
+def test_bm25_index_int_tokens():
+	corpus = [[1, 2, 3], [2, 3], [3], []]
+	bm25_okapi = BM25Okapi(corpus)
+	bm25_index = BM25Index.from_tokens(corpus)
+	assert np.allclose(bm25_okapi.get_scores([3, 1]), bm25_index.get_scores([3, 1]))
+	rows, scores = bm25_index.get_top_k([3, 1], 10)
+	assert len(rows) == 4
+	assert list(scores) == sorted(scores, reverse=True)
+
+
+def assert_same_as_full_index(segmented_index, live_indices):
+	full_index = BM25Index.from_tokens(
+		[tokenized_corpus[i] for i in live_indices],
+		passage_ids=[str(i) for i in live_indices],
+	)
+	assert segmented_index.corpus_size == len(live_indices)
+	assert sorted(segmented_index.passage_ids.tolist()) == sorted(
+		str(i) for i in live_indices
+	)
+	for query in tokenized_queries:
+		rows, scores = segmented_index.get_top_k(query, 4)
+		full_rows, full_scores = full_index.get_top_k(query, 4)
+		assert np.allclose(scores, full_scores)
+		full_score_map = dict(
+			zip(full_index.passage_ids.tolist(), full_index.get_scores(query))
+		)
+		for passage_id, score in zip(segmented_index.get_passage_ids(rows), scores):
+			assert full_score_map[passage_id] == pytest.approx(score)
+
+
+def test_bm25_segmented_index(tmp_path):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	assert segmented_index.corpus_size == 0
+	assert len(segmented_index.get_top_k(tokenized_queries[0], 3)[0]) == 0
+
+	segmented_index.add(tokenized_corpus[:2], ["0", "1"])
+	segmented_index.add(tokenized_corpus[2:5], ["2", "3", "4"])
+	assert segmented_index.segment_count == 2
+	assert_same_as_full_index(segmented_index, [0, 1, 2, 3, 4])
+
+	assert segmented_index.delete(["1", "3", "not_exist"]) == 2
+	assert_same_as_full_index(segmented_index, [0, 2, 4])
+	assert_same_as_full_index(BM25SegmentedIndex(index_dir), [0, 2, 4])
+
+
+def test_bm25_segmented_index_batch_scores(tmp_path):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	segmented_index.add(tokenized_corpus[:3], ["0", "1", "2"])
+	segmented_index.add(tokenized_corpus[3:6], ["3", "4", "5"])
+	segmented_index.delete(["4"])
+
+	ids = ["5", "0", "4", "not_exist", "3", "10"]
+	rows = segmented_index.find_rows(ids)
+	assert rows[2] == rows[3] == rows[5] == -1
+	assert segmented_index.get_passage_ids(rows[[0, 1, 4]]) == ["5", "0", "3"]
+	for query in tokenized_queries:
+		scores = segmented_index.get_batch_scores(query, rows)
+		full_scores = segmented_index.get_scores(query)
+		assert np.allclose(scores[rows >= 0], full_scores[rows[rows >= 0]])
+		assert np.all(scores[rows < 0] == 0)
+
+
+def test_bm25_segmented_index_top_k_batch(tmp_path):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	segmented_index.add(tokenized_corpus[:3], ["0", "1", "2"])
+	segmented_index.add(tokenized_corpus[3:6], ["3", "4", "5"])
+	segmented_index.delete(["1"])
+
+	queries = tokenized_queries + [[]]
+	score_matrix = segmented_index.score_matrix(queries)
+	assert score_matrix.shape == (len(queries), 6)
+	rows_list, scores_list = segmented_index.get_top_k_batch(queries, 4, batch_size=2)
+	assert len(rows_list) == len(scores_list) == len(queries)
+	for query, dense_scores, rows, scores in zip(
+		queries, score_matrix.toarray(), rows_list, scores_list
+	):
+		assert np.allclose(dense_scores, segmented_index.get_scores(query))
+		expected_rows, expected_scores = segmented_index.get_top_k(query, 4)
+		assert np.allclose(scores, expected_scores)
+		assert rows.tolist() == expected_rows.tolist()
+		assert segmented_index.find_rows(["1"])[0] == -1
+		assert 1 not in rows
+
+
+def test_bm25_segmented_index_merge(tmp_path):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	for i, tokens in enumerate(tokenized_corpus[:5]):
+		segmented_index.add([tokens], [str(i)])
+	segmented_index.delete(["2"])
+	assert segmented_index.find_merges(merge_factor=2) == [
+		["segment_000002"],
+		["segment_000000", "segment_000001"],
+		["segment_000003", "segment_000004"],
+	]
+	thread = segmented_index.maybe_merge(merge_factor=2)
+	assert thread is not None and thread.daemon
+	wait_for_merges()
+	segmented_index = segmented_index.reload()
+	assert segmented_index.find_merges(merge_factor=2) == []
+	assert segmented_index.segment_count == 1
+	assert sum(segment["deleted"] for segment in segmented_index.manifest["segments"]) == 0
+	assert_same_as_full_index(segmented_index, [0, 1, 3, 4])
+	assert len(os.listdir(os.path.join(index_dir, "segments"))) == 1
+
+
+def test_bm25_segmented_index_merge_saves_outside_lock(tmp_path, monkeypatch):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	segmented_index.add(tokenized_corpus[:3], ["0", "1", "2"])
+	segmented_index.add(tokenized_corpus[3:5], ["3", "4"])
+	lock_free_while_saving = []
+	original_save = BM25Index.save
+
+	def save(self, save_dir):
+		# try the lock at another thread, because the index lock is reentrant
+		def try_lock():
+			lock = _get_index_lock(index_dir)
+			acquired = lock.acquire(timeout=1)
+			if acquired:
+				lock.release()
+			lock_free_while_saving.append(acquired)
+
+		thread = threading.Thread(target=try_lock)
+		thread.start()
+		thread.join()
+		original_save(self, save_dir)
+
+	monkeypatch.setattr(BM25Index, "save", save)
+	segmented_index.merge(segmented_index.segment_names)
+	assert lock_free_while_saving == [True]
+	segmented_index = segmented_index.reload()
+	assert segmented_index.segment_count == 1
+	assert_same_as_full_index(segmented_index, [0, 1, 2, 3, 4])
+	assert os.listdir(os.path.join(index_dir, "merging")) == []
+
+
+def test_bm25_segmented_index_delete_while_merging(tmp_path):
+	index_dir = os.path.join(tmp_path, "bm25_index")
+	segmented_index = BM25SegmentedIndex.create(index_dir, "porter_stemmer")
+	segmented_index.add(tokenized_corpus[:3], ["0", "1", "2"])
+	segmented_index.add(tokenized_corpus[3:5], ["3", "4"])
+	segmented_index.delete(["0"])
+	snapshot = segmented_index.reload()
+	segmented_index.delete(["2", "4"])
+	# merge with the snapshot before the second delete
+	snapshot.merge(snapshot.segment_names)
+	segmented_index = segmented_index.reload()
+	assert segmented_index.segment_count == 1
+	assert_same_as_full_index(segmented_index, [1, 3])
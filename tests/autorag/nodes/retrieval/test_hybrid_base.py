@@ -1,4 +1,5 @@
 import os
+import random
 import tempfile
 from datetime import datetime
 
@@ -131,7 +132,7 @@ def pseudo_project_dir():
 		qa_df.to_parquet(os.path.join(project_dir, "data", "qa.parquet"))
 		resource_dir = os.path.join(project_dir, "resources")
 		os.makedirs(resource_dir)
-		bm25_ingest(os.path.join(resource_dir, "bm25_porter_stemmer.pkl"), corpus_df)
+		bm25_ingest(os.path.join(resource_dir, "bm25_porter_stemmer"), corpus_df)
 		chroma_path = os.path.join(resource_dir, "chroma")
 
 		vectordb_config_path = os.path.join(resource_dir, "vectordb.yaml")
@@ -178,3 +179,23 @@ def base_hybrid_weights_node_test(hybrid_func, pseudo_project_dir, retrieve_scor
 	assert result["retrieved_ids"].tolist()[0] == ["id-1", "id-4", "id-2"]
 	assert result["retrieve_scores"].tolist()[0] == pytest.approx(retrieve_scores)
 	assert result["retrieved_contents"].tolist()[0] == ["doc-1", "doc-4", "doc-2"]
+
+
+def make_random_hybrid_results(row_count: int, module_count: int, seed: int, tie: bool):
+	"""The random retrieval results with duplicated ids, overlapped ids and tied scores."""
+	rng = random.Random(seed)
+	ids = tuple(
+		[
+			[f"id-{rng.randint(0, 30)}" for _ in range(rng.choice([5, 10, 20]))]
+			for _ in range(row_count)
+		]
+		for _ in range(module_count)
+	)
+	scores = tuple(
+		[
+			[float(rng.randint(0, 4)) if tie else rng.random() for _ in row_ids]
+			for row_ids in module_ids
+		]
+		for module_ids in ids
+	)
+	return ids, scores
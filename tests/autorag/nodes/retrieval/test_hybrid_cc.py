@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -12,6 +13,7 @@ from tests.autorag.nodes.retrieval.test_hybrid_base import (
 	sample_ids_non_overlap,
 	pseudo_project_dir,
 	previous_result,
+	make_random_hybrid_results,
 )
 
 
@@ -57,6 +59,31 @@ def test_hybrid_cc():
 	assert result_scores[1] == pytest.approx([1.0, 0.4285714, 0.2857142], rel=1e-3)
 
 
+@pytest.mark.parametrize("normalize_method", ["mm", "tmm", "z", "dbsf"])
+@pytest.mark.parametrize("tie", [False, True])
+def test_hybrid_cc_same_as_fuse_per_query(normalize_method, tie):
+	ids, scores = make_random_hybrid_results(30, 2, seed=7, tie=tie)
+	for top_k, weight in [(3, 0.3), (10, 0.0), (50, 1.0)]:
+		with np.errstate(divide="ignore", invalid="ignore"):
+			result_id, result_scores = hybrid_cc(
+				ids, scores, top_k, weight, normalize_method=normalize_method
+			)
+			for row in range(30):
+				expected_id, expected_scores = fuse_per_query(
+					ids[0][row],
+					ids[1][row],
+					scores[0][row],
+					scores[1][row],
+					normalize_method=normalize_method,
+					weight=weight,
+					top_k=top_k,
+					semantic_theoretical_min_value=-1.0,
+					lexical_theoretical_min_value=0.0,
+				)
+				assert result_id[row] == expected_id
+				assert result_scores[row] == expected_scores
+
+
 def test_hybrid_cc_node(pseudo_project_dir):
 	retrieve_scores = [1.0, 0.23792372, 0.175]
 	base_hybrid_weights_node_test(
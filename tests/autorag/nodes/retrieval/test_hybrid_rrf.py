@@ -11,6 +11,7 @@ from tests.autorag.nodes.retrieval.test_hybrid_base import (
 	sample_scores,
 	previous_result,
 	pseudo_project_dir,
+	make_random_hybrid_results,
 )
 from tests.mock import mock_get_text_embedding_batch
 
@@ -30,6 +31,22 @@ def test_rrf_pure():
 	assert result_id == ["id-3", "id-1", "id-2"]
 
 
+@pytest.mark.parametrize("module_count, tie", [(2, False), (2, True), (3, True)])
+def test_hybrid_rrf_same_as_rrf_pure(module_count, tie):
+	ids, scores = make_random_hybrid_results(30, module_count, seed=module_count, tie=tie)
+	for top_k, weight in [(3, 1), (10, 60), (50, 60)]:
+		result_id, result_scores = hybrid_rrf(ids, scores, top_k=top_k, weight=weight)
+		for row in range(30):
+			expected_id, expected_scores = rrf_pure(
+				tuple(module_ids[row] for module_ids in ids),
+				tuple(module_scores[row] for module_scores in scores),
+				rrf_k=weight,
+				top_k=top_k,
+			)
+			assert result_id[row] == expected_id
+			assert result_scores[row] == expected_scores
+
+
 def test_hybrid_rrf_node(pseudo_project_dir):
 	modules = {
 		"ids": (
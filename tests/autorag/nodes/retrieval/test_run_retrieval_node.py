@@ -4,6 +4,7 @@ import shutil
 import tempfile
 from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 import pytest
 import yaml
@@ -12,10 +13,19 @@ from llama_index.embeddings.openai import OpenAIEmbedding
 
 import autorag
 from autorag.nodes.retrieval import BM25, VectorDB, HybridCC, HybridRRF
-from autorag.nodes.retrieval.run import run_retrieval_node
+from autorag.nodes.retrieval.hybrid_cc import hybrid_cc
+from autorag.nodes.retrieval.hybrid_rrf import hybrid_rrf
+from autorag.nodes.retrieval.run import (
+	run_retrieval_node,
+	sweep_hybrid_weights,
+	evaluate_retrieval_ids,
+)
 from autorag.nodes.retrieval.vectordb import vectordb_ingest
 from autorag.utils.util import load_summary_file, get_event_loop
+from autorag.schema.metricinput import MetricInput
+from autorag.strategy import select_best
 from autorag.vectordb.chroma import Chroma
+from tests.autorag.nodes.retrieval.test_hybrid_base import make_random_hybrid_results
 from tests.mock import mock_get_text_embedding_batch
 
 root_dir = pathlib.PurePath(
@@ -324,3 +334,94 @@ def test_run_retrieval_node_only_hybrid(node_line_dir):
 	assert os.path.exists(best_path)
 	best_df = pd.read_parquet(best_path)
 	assert all([expect_column in best_df.columns for expect_column in expect_columns])
+
+
+@pytest.mark.parametrize(
+	"hybrid_module, hybrid_func, weight_candidates, hybrid_param",
+	[
+		(HybridRRF, hybrid_rrf, np.linspace(1, 30, 30).tolist(), {}),
+		(
+			HybridCC,
+			hybrid_cc,
+			np.linspace(0.0, 1.0, 21).tolist(),
+			{"normalize_method": "z"},
+		),
+		(
+			HybridCC,
+			hybrid_cc,
+			np.linspace(0.0, 1.0, 21).tolist(),
+			{"normalize_method": "tmm", "semantic_theoretical_min_value": 0.0},
+		),
+	],
+)
+def test_sweep_hybrid_weights(
+	hybrid_module, hybrid_func, weight_candidates, hybrid_param
+):
+	ids, scores = make_random_hybrid_results(40, 2, seed=3, tie=False)
+	retrieval_gt = [
+		[[f"id-{row % 31}"], [f"id-{(row * 7) % 31}", f"id-{(row + 3) % 31}"]]
+		for row in range(40)
+	]
+	metric_inputs = [MetricInput(retrieval_gt=gt) for gt in retrieval_gt]
+	metrics = ["retrieval_f1", "retrieval_ndcg", "retrieval_map"]
+	hybrid_module_param = {"ids": ids, "scores": scores, "top_k": 5, **hybrid_param}
+
+	best_weight, weight_curve = sweep_hybrid_weights(
+		hybrid_module,
+		hybrid_module_param,
+		weight_candidates,
+		metric_inputs,
+		metrics,
+		memory_limit=10_000,
+	)
+
+	# the same as evaluating each weight one by one
+	expected_metric_dfs = []
+	for weight in weight_candidates:
+		pred_ids, _ = hybrid_func(ids, scores, weight=weight, top_k=5, **hybrid_param)
+		expected_metric_dfs.append(
+			evaluate_retrieval_ids(pred_ids, metric_inputs, metrics)
+		)
+	_, expected_best_weight = select_best(
+		expected_metric_dfs,
+		metrics,
+		metadatas=weight_candidates,
+		strategy_name="normalize_mean",
+	)
+	assert best_weight == expected_best_weight
+	assert weight_curve["weight"].tolist() == weight_candidates
+	assert list(weight_curve.columns) == ["weight"] + metrics + ["evaluation_order"]
+	for metric in metrics:
+		assert weight_curve[metric].tolist() == [
+			df[metric].mean() for df in expected_metric_dfs
+		]
+
+
+@pytest.mark.parametrize("search", ["coarse_to_fine", "golden_section", "plateau"])
+def test_sweep_hybrid_weights_search(search):
+	ids, scores = make_random_hybrid_results(40, 2, seed=3, tie=False)
+	retrieval_gt = [[[f"id-{row % 31}"]] for row in range(40)]
+	metric_inputs = [MetricInput(retrieval_gt=gt) for gt in retrieval_gt]
+	weight_candidates = np.linspace(0.0, 1.0, 101).tolist()
+	best_weight, weight_curve = sweep_hybrid_weights(
+		HybridCC,
+		{"ids": ids, "scores": scores, "top_k": 5},
+		weight_candidates,
+		metric_inputs,
+		["retrieval_recall", "retrieval_mrr"],
+		search=search,
+	)
+	assert best_weight in weight_curve["weight"].tolist()
+	assert 0 < len(weight_curve) < len(weight_candidates)
+	assert sorted(weight_curve["evaluation_order"].tolist()) == list(
+		range(1, len(weight_curve) + 1)
+	)
+	with pytest.raises(ValueError):
+		sweep_hybrid_weights(
+			HybridCC,
+			{"ids": ids, "scores": scores, "top_k": 5},
+			weight_candidates,
+			metric_inputs,
+			["retrieval_recall"],
+			search="random",
+		)
@@ -7,19 +7,34 @@ import uuid
 from datetime import datetime
 from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 import pytest
 import yaml
 from llama_index.embeddings.openai import OpenAIEmbedding
 
+from autorag.evaluation.metric.util import (
+	calculate_cosine_similarity,
+	calculate_l2_distance,
+	calculate_inner_product,
+)
+from autorag.module_cache import module_instance_scope
 from autorag.nodes.retrieval import VectorDB
 from autorag.nodes.retrieval.vectordb import (
 	vectordb_ingest,
+	vectordb_pure,
+	vectordb_pure_batch,
+	vectordb_ingest_with_manifest,
 	get_id_scores,
+	get_id_scores_batch,
 	filter_exist_ids_from_retrieval_gt,
 	filter_exist_ids,
 )
+from autorag.scheduler import NodeScheduler
+from autorag.vectordb.base import BaseVectorStore
 from autorag.vectordb.chroma import Chroma
+from autorag.vectordb.local import Local
+from autorag.vectordb.manifest import IngestManifest, get_manifest_path
 from tests.autorag.nodes.retrieval.test_retrieval_base import (
 	queries,
 	corpus_df,
@@ -146,6 +161,155 @@ def test_vectordb_retrieval(vectordb_instance):
 	base_retrieval_test(id_result, score_result, top_k)
 
 
+def test_vectordb_pure_batch():
+	class FakeVectorStore:
+		def __init__(self):
+			self.query_sizes = []
+
+		async def query(self, queries, top_k):
+			self.query_sizes.append(len(queries))
+			ids = [[f"{query}-{i}" for i in range(top_k)] for query in queries]
+			scores = [
+				[len(query) / (i + 1) for i in range(top_k)] for query in queries
+			]
+			return ids, scores
+
+	batch_queries = [["a", "bb"], ["ccc"], ["dddd", "e", "ff"]] * 5
+	vector_store = FakeVectorStore()
+	id_result, score_result = asyncio.run(
+		vectordb_pure_batch(batch_queries, 4, vector_store, batch_size=4)
+	)
+	assert vector_store.query_sizes == [4, 4, 4, 4, 4, 4, 4, 2]
+	for query_list, ids, scores in zip(batch_queries, id_result, score_result):
+		expected_ids, expected_scores = asyncio.run(
+			vectordb_pure(query_list, 4, FakeVectorStore())
+		)
+		assert ids == expected_ids
+		assert scores == expected_scores
+
+
+def test_vectordb_ingest_pipeline():
+	class RecordingVectorStore(BaseVectorStore):
+		def __init__(self):
+			super().__init__("mock", embedding_batch=2)
+			self.events = []
+			self.embedding_count = 0
+			self.max_embedding_count = 0
+
+		async def embed(self, texts):
+			self.embedding_count += 1
+			self.max_embedding_count = max(
+				self.max_embedding_count, self.embedding_count
+			)
+			await asyncio.sleep(0.01)
+			self.embedding_count -= 1
+			return [[float(len(text))] for text in texts]
+
+		async def insert(self, ids, texts, embeddings):
+			self.events.append(("insert", ids, self.bulk_load))
+
+		def end_bulk_load(self):
+			super().end_bulk_load()
+			self.events.append(("end_bulk_load",))
+
+		async def query(self, queries, top_k, **kwargs):
+			pass
+
+		async def fetch(self, ids):
+			pass
+
+		async def is_exist(self, ids):
+			pass
+
+		async def delete(self, ids):
+			pass
+
+	vector_store = RecordingVectorStore()
+	asyncio.run(vectordb_ingest(vector_store, corpus_df, max_in_flight=3))
+	doc_ids = corpus_df["doc_id"].tolist()
+	assert vector_store.events == [
+		("insert", doc_ids[i : i + 2], True) for i in range(0, len(doc_ids), 2)
+	] + [("end_bulk_load",)]
+	assert 1 < vector_store.max_embedding_count <= 3
+	assert vector_store.bulk_load is False
+
+
+def test_vectordb_ingest_with_manifest(tmp_path):
+	local = Local(
+		embedding_model="mock",
+		collection_name="test_manifest",
+		path=str(tmp_path / "local"),
+	)
+	manifest_path = str(tmp_path / "manifest.parquet")
+	asyncio.run(vectordb_ingest(local, corpus_df.iloc[:2]))
+
+	# the manifest is built from the vectordb at the first ingestion
+	manifest = IngestManifest(manifest_path)
+	asyncio.run(vectordb_ingest_with_manifest(local, corpus_df, manifest))
+	assert asyncio.run(local.is_exist(corpus_df["doc_id"].tolist())) == [True] * len(
+		corpus_df
+	)
+	manifest = IngestManifest(manifest_path)
+	assert manifest.exists and len(manifest) == len(corpus_df)
+
+	changed_corpus_df = corpus_df.copy()
+	changed_corpus_df.loc[1, "contents"] = "changed contents"
+	with patch.object(
+		Local, "is_exist", side_effect=local.is_exist
+	) as mock_is_exist, patch.object(
+		Local, "add_embeddings", side_effect=local.add_embeddings
+	) as mock_add_embeddings:
+		asyncio.run(
+			vectordb_ingest_with_manifest(
+				local, changed_corpus_df, manifest, verify_sample_size=2
+			)
+		)
+		# only a sample of the manifest is checked at the vectordb
+		mock_is_exist.assert_called_once()
+		assert len(mock_is_exist.call_args.kwargs["ids"]) == 2
+		mock_add_embeddings.assert_called_once()
+		assert mock_add_embeddings.call_args.args[0] == [corpus_df["doc_id"][1]]
+
+	target_corpus, changed_ids = IngestManifest(manifest_path).diff(changed_corpus_df)
+	assert target_corpus.empty and changed_ids == []
+
+	# the collection is recreated, but the manifest is left
+	shutil.rmtree(str(tmp_path / "local"))
+	local = Local(
+		embedding_model="mock",
+		collection_name="test_manifest",
+		path=str(tmp_path / "local"),
+	)
+	asyncio.run(
+		vectordb_ingest_with_manifest(
+			local, changed_corpus_df, IngestManifest(manifest_path)
+		)
+	)
+	assert asyncio.run(local.is_exist(corpus_df["doc_id"].tolist())) == [True] * len(
+		corpus_df
+	)
+
+
+def test_get_manifest_path():
+	config = {
+		"name": "milvus_openai",
+		"db_type": "milvus",
+		"embedding_model": "openai",
+		"collection_name": "openai",
+		"uri": "http://localhost:19530",
+		"token": "secret-token",
+		"embedding_batch": 100,
+	}
+	path = get_manifest_path("resources", config)
+	assert os.path.basename(path).startswith("milvus_openai_")
+	assert "secret-token" not in path
+	# rotating the secret or changing the batch size keeps the manifest
+	assert get_manifest_path(
+		"resources", {**config, "token": "new-token", "embedding_batch": 10}
+	) == path
+	assert get_manifest_path("resources", {**config, "collection_name": "other"}) != path
+
+
 def test_vectordb_retrieval_ids(vectordb_instance):
 	ids = [["doc2", "doc3"], ["doc1", "doc2"], ["doc4", "doc5"]]
 	id_result, score_result = vectordb_instance._pure(
@@ -182,6 +346,82 @@ def test_vectordb_node(project_dir_for_vectordb_node_from_sample_project):
 	base_retrieval_node_test(result_df)
 
 
+def test_vectordb_node_io_concurrency(
+	project_dir_for_vectordb_node_from_sample_project,
+):
+	scheduler = NodeScheduler(io_concurrency=2)
+	with module_instance_scope() as cache:
+		results, _, _ = scheduler.run(
+			[VectorDB, VectorDB],
+			[
+				{"top_k": 4, "vectordb": "mock"},
+				{"top_k": 4, "vectordb": "mock", "embedding_batch": 2},
+			],
+			project_dir_for_vectordb_node_from_sample_project,
+			previous_result,
+		)
+		# The scheduler threads do not share the cached instances and their event loops.
+		assert cache.summary()["creates"] == 0
+	for result in results:
+		base_retrieval_node_test(result)
+
+
+def test_vectordb_is_prefix_stable(tmp_path):
+	resources_dir = os.path.join(tmp_path, "resources")
+	os.makedirs(resources_dir)
+	local_config = {
+		"db_type": "local",
+		"embedding_model": "mock",
+		"path": os.path.join(resources_dir, "local"),
+	}
+	vectordb_configs = [
+		{"name": "flat", "collection_name": "flat", **local_config},
+		{
+			"name": "binary",
+			"collection_name": "binary",
+			"quantization": "binary",
+			"rescore_factor": 2,
+			**local_config,
+		},
+		{"name": "ivf", "collection_name": "ivf", "index_type": "ivf", **local_config},
+		{
+			"name": "chroma",
+			"db_type": "chroma",
+			"client_type": "persistent",
+			"path": os.path.join(resources_dir, "chroma"),
+			"embedding_model": "mock",
+			"collection_name": "mock",
+		},
+	]
+	with open(os.path.join(resources_dir, "vectordb.yaml"), "w") as f:
+		yaml.safe_dump({"vectordb": vectordb_configs}, f)
+
+	single_query_result = pd.DataFrame({"query": ["query-1"]})
+	assert VectorDB.is_prefix_stable(
+		single_query_result, project_dir=tmp_path, vectordb="flat"
+	)
+	for vectordb in ["binary", "ivf", "chroma", "default"]:
+		assert not VectorDB.is_prefix_stable(
+			single_query_result, project_dir=tmp_path, vectordb=vectordb
+		)
+
+	# the quantized search does not keep a smaller top_k as the prefix of a larger top_k
+	rng = np.random.default_rng(42)
+	embeddings = rng.normal(size=(2000, 64))
+	query_embeddings = rng.normal(size=(200, 64))
+	quantized = Local(
+		collection_name="binary",
+		quantization="binary",
+		rescore_factor=2,
+		embedding_model="mock",
+		path=local_config["path"],
+	)
+	quantized.add_embeddings([f"id-{i}" for i in range(2000)], embeddings)
+	top_1_ids, _ = quantized.search(query_embeddings, 1)
+	top_10_ids, _ = quantized.search(query_embeddings, 10)
+	assert any(small[0] != large[0] for small, large in zip(top_1_ids, top_10_ids))
+
+
 def test_vectordb_node_ids(project_dir_for_vectordb_node_from_sample_project):
 	result_df = VectorDB.run_evaluator(
 		project_dir=project_dir_for_vectordb_node_from_sample_project,
@@ -385,3 +625,42 @@ def test_get_id_scores():
 	assert len(scores) == len(content_embeddings)
 	assert all(isinstance(score, float) for score in scores)
 	assert scores == pytest.approx([0.5, 1.22, 1.94])
+
+
+@pytest.mark.parametrize("similarity_metric", ["cosine", "l2", "ip"])
+def test_get_id_scores_batch(similarity_metric):
+	rng = np.random.default_rng(42)
+	query_lengths = [1, 3, 2, 2]
+	query_embeddings = rng.normal(size=(sum(query_lengths), 8)).tolist()
+	content_embeddings = rng.normal(size=(10, 8))
+	content_indices = [[0, 3, 3], [9, 1], [], [5, 2, 4, 7]]
+
+	score_result = get_id_scores_batch(
+		query_embeddings,
+		query_lengths,
+		content_embeddings,
+		content_indices,
+		similarity_metric,
+		batch_size=3,
+	)
+	assert list(map(len, score_result)) == [3, 2, 0, 4]
+	query_start = 0
+	for query_length, indices, scores in zip(
+		query_lengths, content_indices, score_result
+	):
+		metric_func = {
+			"cosine": calculate_cosine_similarity,
+			"l2": lambda x, y: 1 - calculate_l2_distance(x, y),
+			"ip": calculate_inner_product,
+		}[similarity_metric]
+		expected_scores = [
+			max(
+				metric_func(np.array(query_embedding), content_embeddings[index])
+				for query_embedding in query_embeddings[
+					query_start : query_start + query_length
+				]
+			)
+			for index in indices
+		]
+		assert scores == pytest.approx(expected_scores, rel=1e-5)
+		query_start += query_length
@@ -0,0 +1,56 @@
+import pytest
+
+from autorag.nodes.retrieval.weight_search import (
+	grid_search,
+	coarse_to_fine_search,
+	golden_section_search,
+	plateau_search,
+)
+
+
+class CountingObjective:
+	def __init__(self, values):
+		self.values = values
+		self.evaluated = []
+
+	def __call__(self, indices):
+		self.evaluated.extend(index for index in indices if index not in self.evaluated)
+		return [self.values[index] for index in indices]
+
+
+def peak_values(size: int, peak: int):
+	return [-abs(index - peak) / size for index in range(size)]
+
+
+def test_grid_search():
+	objective = CountingObjective(peak_values(101, 37))
+	assert grid_search(objective, 101) == 37
+	assert len(objective.evaluated) == 101
+
+
+@pytest.mark.parametrize("peak", [0, 37, 64, 100])
+def test_coarse_to_fine_search(peak):
+	objective = CountingObjective(peak_values(101, peak))
+	assert coarse_to_fine_search(objective, 101) == peak
+	assert len(objective.evaluated) <= 15
+
+
+@pytest.mark.parametrize("peak", [0, 37, 64, 100])
+def test_golden_section_search(peak):
+	objective = CountingObjective(peak_values(101, peak))
+	assert golden_section_search(objective, 101) == peak
+	assert len(objective.evaluated) <= 15
+
+
+def test_golden_section_search_small():
+	for size in range(1, 6):
+		for peak in range(size):
+			objective = CountingObjective(peak_values(size, peak))
+			assert golden_section_search(objective, size) == peak
+
+
+def test_plateau_search():
+	values = [min(index, 20) / 20 for index in range(101)]
+	objective = CountingObjective(values)
+	assert plateau_search(objective, 101, patience=5) == 20
+	assert len(objective.evaluated) == 30
@@ -4,9 +4,12 @@ import subprocess
 import tempfile
 from distutils.dir_util import copy_tree
 
+import pandas as pd
 from click.testing import CliRunner
 
 from autorag.cli import cli
+from autorag.result_cache import ResultCache, result_cache_scope
+from tests.autorag.test_result_cache import FakeRetrievalModule, previous_result
 
 root_dir = pathlib.PurePath(os.path.dirname(os.path.realpath(__file__))).parent
 resource_dir = os.path.join(root_dir, "resources")
@@ -119,3 +122,33 @@ def test_restart_evaluate_leads_start_evaluate():
 		subprocess.run(["autorag", "restart_evaluate", "--trial_path", trial_path])
 		restart_path = os.path.join(project_dir, "4")
 		assert os.path.exists(os.path.join(restart_path, "summary.csv"))
+
+
+def test_result_cache_cli(tmp_path):
+	project_dir = str(tmp_path)
+	os.makedirs(os.path.join(project_dir, "data"))
+	pd.DataFrame({"doc_id": ["a"], "contents": ["apple"]}).to_parquet(
+		os.path.join(project_dir, "data", "corpus.parquet"), index=False
+	)
+	runner = CliRunner()
+	result = runner.invoke(cli, ["result_cache", "--project_dir", project_dir])
+	assert result.exit_code == 0
+	assert "There is no cached result" in result.output
+
+	with result_cache_scope(project_dir):
+		FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=1)
+	result = runner.invoke(cli, ["result_cache", "--project_dir", project_dir])
+	assert result.exit_code == 0
+	assert "FakeRetrievalModule" in result.output
+	assert "1 cached results" in result.output
+
+	result = runner.invoke(
+		cli, ["result_cache", "--project_dir", project_dir, "--prune"]
+	)
+	assert result.exit_code != 0
+	result = runner.invoke(
+		cli, ["result_cache", "--project_dir", project_dir, "--prune", "--all"]
+	)
+	assert result.exit_code == 0
+	assert "Deleted 1 cached results." in result.output
+	assert ResultCache(project_dir).entries().empty
@@ -0,0 +1,123 @@
+from autorag import LazyInit
+from autorag.model_registry import (
+	ModelRegistry,
+	estimate_model_bytes,
+	estimate_model_gpu_bytes,
+	make_model_key,
+	model_registry,
+)
+
+
+class FakeDevice:
+	def __init__(self, device_type: str):
+		self.type = device_type
+
+
+class FakeTensor:
+	def __init__(self, numel: int, element_size: int = 4, device: str = "cpu"):
+		self._numel = numel
+		self._element_size = element_size
+		self.device = FakeDevice(device)
+
+	def numel(self):
+		return self._numel
+
+	def element_size(self):
+		return self._element_size
+
+
+class FakeModule:
+	def __init__(self, numel: int, device: str = "cpu"):
+		self.weight = FakeTensor(numel, device=device)
+
+	def parameters(self):
+		return [self.weight]
+
+	def buffers(self):
+		return []
+
+
+class FakeCrossEncoder:
+	def __init__(self, numel: int):
+		self.model = FakeModule(numel)
+
+
+def test_estimate_model_bytes():
+	assert estimate_model_bytes(FakeModule(10)) == 40
+	assert estimate_model_bytes(FakeCrossEncoder(10)) == 40
+	shared = FakeModule(10)
+	assert estimate_model_bytes(("tokenizer", shared, shared)) == 40
+	assert estimate_model_bytes("api model") == 0
+	assert estimate_model_gpu_bytes(FakeModule(10)) == 0
+	assert estimate_model_gpu_bytes(("tokenizer", FakeModule(10, "cuda"))) == 40
+
+
+def test_model_registry_release_gpu_models():
+	registry = ModelRegistry(memory_budget=None)
+	registry.get("cpu", lambda: FakeModule(10))
+	gpu_model = registry.get("gpu", lambda: FakeModule(10, "cuda"))
+	assert registry.resident_gpu_bytes == 40
+	assert registry.release_gpu_models() == 1
+	assert "gpu" not in registry and "cpu" in registry
+	assert registry.resident_gpu_bytes == 0
+	assert registry.get("gpu", lambda: FakeModule(10, "cuda")) is not gpu_model
+	assert registry.summary()["gpu_releases"] == 1
+
+
+def test_model_registry_lru():
+	registry = ModelRegistry(memory_budget=100)
+	load_count = {"a": 0, "b": 0, "c": 0}
+
+	def loader(name):
+		def load():
+			load_count[name] += 1
+			return FakeCrossEncoder(10)
+
+		return load
+
+	model_a = registry.get("a", loader("a"))
+	assert registry.get("a", loader("a")) is model_a
+	registry.get("b", loader("b"))
+	assert registry.resident_bytes == 80
+	registry.get("a", loader("a"))  # "b" becomes the least recently used model
+	registry.get("c", loader("c"))
+	assert "b" not in registry
+	assert "a" in registry and "c" in registry
+	assert registry.resident_bytes <= 100
+
+	registry.get("b", loader("b"))
+	assert load_count == {"a": 1, "b": 2, "c": 1}
+	summary = registry.summary()
+	assert summary["loads"] == 4
+	assert summary["hits"] == 2
+	assert summary["evictions"] == 2
+	assert summary["saved_seconds"] >= 0
+
+
+def test_model_registry_keep_over_budget():
+	registry = ModelRegistry(memory_budget=10)
+	model = registry.get("big", lambda: FakeModule(100))
+	assert "big" in registry
+	assert registry.get("big", lambda: FakeModule(100)) is model
+	registry.get("other", lambda: FakeModule(100))
+	assert "big" not in registry
+
+
+def test_make_model_key():
+	assert make_model_key("CrossEncoder", "model", max_length=512) == make_model_key(
+		"CrossEncoder", "model", max_length=512
+	)
+	assert make_model_key("CrossEncoder", "model") != make_model_key(
+		"CrossEncoder", "model", max_length=512
+	)
+	hash(make_model_key("MonoT5", "model", device_map={"": 0}))
+
+
+def test_lazy_init_shared():
+	lazy_model = LazyInit(FakeCrossEncoder, 10)
+	model = lazy_model()
+	assert lazy_model() is model
+	assert lazy_model.model is model.model
+	assert lazy_model in model_registry
+	model_registry.evict(lazy_model)
+	assert lazy_model() is not model
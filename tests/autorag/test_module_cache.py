@@ -0,0 +1,68 @@
+import pandas as pd
+
+from autorag.module_cache import get_module_instance, module_instance_scope
+from autorag.schema import BaseModule
+
+
+class FakeModule(BaseModule):
+	instance_cache_params = ("index_name",)
+	init_count = 0
+
+	def __init__(self, project_dir, *args, **kwargs):
+		FakeModule.init_count += 1
+		self.index_name = kwargs.get("index_name")
+
+	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
+		return pd.DataFrame({"index_name": [self.index_name], "top_k": [kwargs["top_k"]]})
+
+	def _pure(self, *args, **kwargs):
+		pass
+
+	def cast_to_run(self, previous_result: pd.DataFrame, *args, **kwargs):
+		pass
+
+
+class FakeUncachedModule(FakeModule):
+	instance_cache_params = None
+
+
+def test_get_module_instance_without_scope():
+	first = get_module_instance(FakeModule, "project", index_name="a")
+	assert get_module_instance(FakeModule, "project", index_name="a") is not first
+
+
+def test_module_instance_scope():
+	FakeModule.init_count = 0
+	with module_instance_scope() as cache:
+		first = get_module_instance(FakeModule, "project", index_name="a", top_k=3)
+		assert get_module_instance(FakeModule, "project", index_name="a", top_k=5) is first
+		assert get_module_instance(FakeModule, "project", index_name="b") is not first
+		assert get_module_instance(FakeModule, "other_project", index_name="a") is not first
+		with module_instance_scope() as inner_cache:
+			assert inner_cache is cache
+			assert get_module_instance(FakeModule, "project", index_name="a") is first
+		assert len(cache) == 3
+		assert get_module_instance(FakeUncachedModule, "project", index_name="a") is not (
+			get_module_instance(FakeUncachedModule, "project", index_name="a")
+		)
+		assert cache.summary() == {"resident_instances": 3, "creates": 3, "hits": 2}
+	assert len(cache) == 0
+	assert get_module_instance(FakeModule, "project", index_name="a") is not first
+
+
+def test_run_evaluator_reuse():
+	FakeModule.init_count = 0
+	previous_result = pd.DataFrame({"query": ["query"]})
+
+	@module_instance_scope()
+	def run_twice():
+		return [
+			FakeModule.run_evaluator("project", previous_result, index_name="a", top_k=k)
+			for k in [3, 5]
+		]
+
+	results = run_twice()
+	assert [result["top_k"][0] for result in results] == [3, 5]
+	assert FakeModule.init_count == 1
+	run_twice()
+	assert FakeModule.init_count == 2
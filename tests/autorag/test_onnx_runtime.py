@@ -0,0 +1,143 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from autorag.onnx_runtime import (
+	ONNXEmbedding,
+	get_onnx_model_dir,
+	load_onnx_model,
+	onnx_cross_encoder_run_model,
+	pool_embeddings,
+	benchmark_onnx_runtime,
+)
+
+pairs = [
+	["What is the capital of France?", "Paris is the capital of France."],
+	["What is the capital of France?", "The Eiffel Tower is in Paris."],
+	["Who wrote Hamlet?", "Hamlet is a tragedy written by William Shakespeare."],
+	["Who wrote Hamlet?", "The capital of Korea is Seoul."],
+]
+
+
+class FakeONNXModel:
+	def __init__(self, logits: np.ndarray):
+		self.logits = logits
+		self.calls = []
+
+	def __call__(self, texts, text_pairs=None, max_length=512):
+		self.calls.append((texts, text_pairs))
+		start = sum(len(call[0]) for call in self.calls[:-1])
+		return self.logits[start : start + len(texts)]
+
+
+class FakeTokenizer:
+	model_max_length = 8
+
+	def __call__(self, texts):
+		return {"input_ids": [text.split() for text in texts]}
+
+
+class FakeEmbeddingONNXModel:
+	tokenizer = FakeTokenizer()
+	model_max_length = 8
+
+	def tokenize(self, texts, text_pairs=None, max_length=512):
+		lengths = [min(len(text.split()), max_length) for text in texts]
+		attention_mask = np.zeros((len(texts), max(lengths)), dtype=np.int64)
+		for row, length in enumerate(lengths):
+			attention_mask[row, :length] = 1
+		return {"input_ids": attention_mask, "attention_mask": attention_mask}
+
+	def forward(self, encoding):
+		return np.ones(encoding["attention_mask"].shape + (4,), dtype=np.float32)
+
+
+def test_onnx_embedding_max_length(monkeypatch):
+	monkeypatch.setattr(
+		"autorag.onnx_runtime.load_onnx_model",
+		lambda *args, **kwargs: FakeEmbeddingONNXModel(),
+	)
+	embedding = ONNXEmbedding(model_name="fake")
+	assert embedding.max_length == 8
+	assert ONNXEmbedding(model_name="fake", max_length=4).max_length == 4
+
+	with patch("autorag.onnx_runtime.logger") as logger:
+		embedding.get_text_embedding_batch(["a b c", "a b c d e f g h"])
+		logger.warning.assert_not_called()
+		embedding.get_text_embedding_batch(["a b c d e f g h i j", "a"])
+		assert "1 inputs" in logger.warning.call_args[0][0]
+		# warned once
+		embedding.get_text_embedding_batch(["a b c d e f g h i j"])
+		assert logger.warning.call_count == 1
+
+
+def test_get_onnx_model_dir():
+	model_dir = get_onnx_model_dir(
+		"project", "cross-encoder/ms-marco-MiniLM-L-2-v2", "sequence-classification"
+	)
+	assert model_dir == os.path.join(
+		"project",
+		"resources",
+		"onnx",
+		"cross-encoder_ms-marco-MiniLM-L-2-v2_sequence-classification",
+	)
+
+
+def test_onnx_cross_encoder_run_model():
+	logits = np.array([[2.0], [-1.0], [0.5], [0.0]], dtype=np.float32)
+	model = FakeONNXModel(logits)
+	scores = onnx_cross_encoder_run_model(pairs, model, batch_size=3)
+	assert scores == pytest.approx([2.0, -1.0, 0.5, 0.0])
+	assert [len(call[0]) for call in model.calls] == [3, 1]
+	assert model.calls[0][1][0] == pairs[0][1]
+
+	model = FakeONNXModel(logits)
+	scores = onnx_cross_encoder_run_model(
+		pairs, model, batch_size=4, activation="sigmoid"
+	)
+	assert scores == pytest.approx((1 / (1 + np.exp(-logits[:, 0]))).tolist())
+
+	two_label_logits = np.array([[0.0, 1.0], [1.0, 0.0]], dtype=np.float32)
+	model = FakeONNXModel(two_label_logits)
+	scores = onnx_cross_encoder_run_model(
+		pairs[:2], model, batch_size=4, activation="softmax"
+	)
+	assert scores == pytest.approx([np.e / (1 + np.e), 1 / (1 + np.e)])
+
+
+def test_pool_embeddings():
+	last_hidden_state = np.array(
+		[[[1.0, 0.0], [3.0, 4.0], [100.0, 100.0]], [[0.0, 2.0], [0.0, 0.0], [0.0, 0.0]]]
+	)
+	attention_mask = np.array([[1, 1, 0], [1, 0, 0]])
+	cls_embeddings = pool_embeddings(last_hidden_state, attention_mask, "cls", False)
+	assert np.allclose(cls_embeddings, [[1.0, 0.0], [0.0, 2.0]])
+	mean_embeddings = pool_embeddings(last_hidden_state, attention_mask, "mean")
+	assert np.allclose(mean_embeddings, [[np.sqrt(0.5), np.sqrt(0.5)], [0.0, 1.0]])
+	with pytest.raises(ValueError):
+		pool_embeddings(last_hidden_state, attention_mask, "max")
+
+
+def test_onnx_runtime_drift(tmp_path):
+	pytest.importorskip("torch")
+	pytest.importorskip("onnx")
+	model_name = "cross-encoder/ms-marco-MiniLM-L-2-v2"
+	model = load_onnx_model(model_name, "sequence-classification", str(tmp_path))
+	model_dir = get_onnx_model_dir(str(tmp_path), model_name, "sequence-classification")
+	assert os.path.exists(os.path.join(model_dir, "model.onnx"))
+	assert os.path.exists(os.path.join(model_dir, "model_int8.onnx"))
+	assert model is load_onnx_model(
+		model_name, "sequence-classification", str(tmp_path)
+	)
+
+	result = benchmark_onnx_runtime(
+		model_name,
+		"sequence-classification",
+		[pair[0] for pair in pairs],
+		[pair[1] for pair in pairs],
+		project_dir=str(tmp_path),
+	)
+	assert result["onnx_texts_per_second"] > 0
+	assert result["agreement"] > 0.7
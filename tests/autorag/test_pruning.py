@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from autorag.pruning import (
+	SuccessiveHalving,
+	filter_pruned,
+	make_metric_columns,
+	make_pruning_columns,
+	run_candidates,
+)
+
+previous_result = pd.DataFrame(
+	{
+		"row_id": list(range(400)),
+		"query_type": ["short"] * 300 + ["long"] * 100,
+	}
+)
+
+
+class FakeModule:
+	calls = []
+
+	@classmethod
+	def run(cls, modules, module_params, input_result):
+		results = []
+		for params in module_params:
+			cls.calls.append((params["quality"], len(input_result)))
+			noise = np.sin(input_result["row_id"].to_numpy() * (params["quality"] + 1))
+			results.append(
+				pd.DataFrame(
+					{
+						"row_id": input_result["row_id"].tolist(),
+						"value": params["quality"] + params.get("noise", 0.1) * noise,
+					}
+				)
+			)
+		return results, [0.1] * len(results), [0.05] * len(results)
+
+
+def evaluate(result, rows):
+	assert result["row_id"].tolist() == rows
+	return result.assign(score=result["value"])
+
+
+@pytest.fixture
+def module_params():
+	FakeModule.calls = []
+	return [{"quality": quality / 10} for quality in range(1, 9)]
+
+
+def test_stage_sizes():
+	pruning = SuccessiveHalving(min_sample_size=50, reduction_factor=2)
+	assert pruning.stage_sizes(400) == [50, 100, 200, 400]
+	assert pruning.stage_sizes(30) == [30]
+
+
+def test_sample_order_stratified():
+	pruning = SuccessiveHalving(stratify_column="query_type")
+	order = pruning.sample_order(previous_result)
+	assert sorted(order.tolist()) == list(range(400))
+	first_rows = previous_result.iloc[order[:40]]
+	assert (first_rows["query_type"] == "long").sum() == 10
+	assert order.tolist() == pruning.sample_order(previous_result).tolist()
+
+
+def test_successive_halving(module_params):
+	pruning = SuccessiveHalving(
+		min_sample_size=50, reduction_factor=2, stratify_column="query_type"
+	)
+	results, execution_times, cpu_times, cache_hits, pruned_stages = run_candidates(
+		[FakeModule] * 8,
+		module_params,
+		previous_result,
+		FakeModule.run,
+		evaluate,
+		["score"],
+		pruning=pruning,
+	)
+	assert pruned_stages == [1, 1, 1, 1, 2, 2, 3, None]
+	assert [len(result) for result in results] == [50] * 4 + [100] * 2 + [200, 400]
+	assert results[-1]["row_id"].tolist() == list(range(400))
+	assert results[0]["row_id"].is_monotonic_increasing
+	# each survivor runs on each row once
+	assert sum(rows for quality, rows in FakeModule.calls if quality == 0.8) == 400
+	assert execution_times[-1] == pytest.approx(0.4)
+	assert cpu_times[0] == pytest.approx(0.05)
+	assert cache_hits == [False] * 8
+
+	columns = make_pruning_columns(pruned_stages, results)
+	assert columns["evaluated_rows"] == [50] * 4 + [100] * 2 + [200, 400]
+	assert filter_pruned(pruned_stages, list(range(8))) == ([7],)
+
+	metric_columns = make_metric_columns(results, ["score"], pruned_stages, "node_")
+	assert list(metric_columns.keys()) == ["node_score", "stage_node_score"]
+	# the eliminated candidates do not have the means on every row
+	assert np.isnan(metric_columns["node_score"][:7]).all()
+	assert metric_columns["node_score"][7] == pytest.approx(results[7]["score"].mean())
+	assert metric_columns["stage_node_score"][0] == pytest.approx(
+		results[0]["score"].mean()
+	)
+	assert np.isnan(metric_columns["stage_node_score"][7])
+	# the pruned stages from the summary have NA for the survivors
+	summary_stages = pd.array(pruned_stages, dtype="Int64")
+	scores = make_metric_columns(results, ["score"], summary_stages)["score"]
+	assert np.isnan(scores[0])
+	assert scores[7] == pytest.approx(results[7]["score"].mean())
+
+
+def test_successive_halving_confidence():
+	pruning = SuccessiveHalving(min_sample_size=50, reduction_factor=2)
+	module_params = [
+		{"quality": 0.5, "noise": 1.0},
+		{"quality": 0.49, "noise": 1.0},
+	]
+	*_, pruned_stages = pruning.run(
+		[FakeModule] * 2,
+		module_params,
+		previous_result,
+		FakeModule.run,
+		evaluate,
+		["score"],
+	)
+	assert pruned_stages == [None, None]
+
+
+def test_run_candidates_without_pruning(module_params):
+	results, _, _, _, pruned_stages = run_candidates(
+		[FakeModule] * 8,
+		module_params,
+		previous_result,
+		FakeModule.run,
+		evaluate,
+		["score"],
+	)
+	assert pruned_stages is None
+	assert all(len(result) == 400 for result in results)
+	assert make_pruning_columns(pruned_stages, results) == {}
+	assert list(make_metric_columns(results, ["score"], pruned_stages).keys()) == [
+		"score"
+	]
+	assert filter_pruned(pruned_stages, [1, 2]) == ([1, 2],)
+
+
+def test_from_strategies():
+	assert SuccessiveHalving.from_strategies({"metrics": ["retrieval_f1"]}) is None
+	pruning = SuccessiveHalving.from_strategies(
+		{"pruning": {"method": "successive_halving", "min_sample_size": 100}}
+	)
+	assert pruning.min_sample_size == 100
+	with pytest.raises(ValueError):
+		SuccessiveHalving.from_strategies({"pruning": {"method": "hyperband"}})
+	with pytest.raises(ValueError):
+		SuccessiveHalving(reduction_factor=1)
@@ -0,0 +1,158 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from autorag.result_cache import (
+	ResultCache,
+	compact_params,
+	get_result_cache,
+	hash_dataframe,
+	is_result_cache_hit,
+	make_cache_hit_column,
+	result_cache_scope,
+)
+from autorag.schema import BaseModule
+from autorag.strategy import measure_speed
+
+
+class FakeRetrievalModule(BaseModule):
+	result_cache_columns = ("query",)
+	run_count = 0
+
+	def __init__(self, project_dir, *args, **kwargs):
+		pass
+
+	def pure(self, previous_result: pd.DataFrame, *args, **kwargs):
+		FakeRetrievalModule.run_count += 1
+		top_k = kwargs["top_k"]
+		return pd.DataFrame(
+			{
+				"retrieved_ids": [
+					[f"{query}-{i}" for i in range(top_k)]
+					for query in previous_result["query"]
+				],
+				"retrieve_scores": [[1.0] * top_k] * len(previous_result),
+			}
+		)
+
+	def _pure(self, *args, **kwargs):
+		pass
+
+	def cast_to_run(self, previous_result: pd.DataFrame, *args, **kwargs):
+		pass
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+	os.makedirs(os.path.join(tmp_path, "data"))
+	pd.DataFrame({"doc_id": ["a"], "contents": ["apple"]}).to_parquet(
+		os.path.join(tmp_path, "data", "corpus.parquet"), index=False
+	)
+	FakeRetrievalModule.run_count = 0
+	return str(tmp_path)
+
+
+previous_result = pd.DataFrame({"query": ["q1", "q2"], "retrieval_f1": [0.1, 0.2]})
+
+
+def test_hash_dataframe():
+	list_df = pd.DataFrame({"ids": [["a", "b"]], "query": ["q"]})
+	parquet_df = pd.DataFrame(
+		{"query": ["q"], "ids": [pd.Series(["a", "b"]).to_numpy()]}
+	)
+	assert hash_dataframe(list_df) == hash_dataframe(parquet_df)
+	assert hash_dataframe(list_df) != hash_dataframe(list_df.assign(query="p"))
+
+
+def test_compact_params():
+	ids = [[f"id{i}" for i in range(100)]] * 3
+	params = {"top_k": 3, "target_modules": ("bm25",), "ids": ids}
+	compact = compact_params(params)
+	assert compact["top_k"] == 3
+	assert compact["target_modules"] == ["bm25"]
+	assert compact["ids"].startswith("<list of 3 items, blake2b:")
+	assert compact_params({**params, "ids": ids[:2]})["ids"] != compact["ids"]
+	assert compact_params(params) == compact
+
+
+def test_result_cache_large_params(project_dir):
+	cache = ResultCache(project_dir)
+	ids = [[f"id{i}" for i in range(100)]] * 2
+	key, metadata = cache.make_key(FakeRetrievalModule, previous_result, ids=ids)
+	assert len(json.dumps(metadata)) < 1000
+	assert metadata["module_params"]["kwargs"]["ids"].startswith("<list of 2 items")
+	other_key, _ = cache.make_key(
+		FakeRetrievalModule, previous_result, ids=[ids[0], ids[0][:99]]
+	)
+	assert key != other_key
+
+
+def test_result_cache_without_scope(project_dir):
+	assert get_result_cache() is None
+	FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=2)
+	FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=2)
+	assert FakeRetrievalModule.run_count == 2
+	assert make_cache_hit_column([False]) == {}
+	assert not os.path.exists(os.path.join(project_dir, "resources", "result_cache"))
+
+
+def test_result_cache_hit(project_dir):
+	with result_cache_scope(project_dir) as cache:
+		first, first_time = measure_speed(
+			FakeRetrievalModule.run_evaluator,
+			project_dir=project_dir,
+			previous_result=previous_result,
+			top_k=2,
+		)
+		assert not is_result_cache_hit(first)
+		assert make_cache_hit_column([False]) == {"cache_hit": [False]}
+
+	# another trial with changed metric columns of the previous result
+	with result_cache_scope(project_dir) as cache:
+		second, second_time = measure_speed(
+			FakeRetrievalModule.run_evaluator,
+			project_dir=project_dir,
+			previous_result=previous_result.assign(retrieval_f1=[0.5, 0.5]),
+			top_k=2,
+		)
+		assert FakeRetrievalModule.run_count == 1
+		assert cache.hits == 1
+		assert is_result_cache_hit(second)
+		assert second["retrieved_ids"].tolist() == first["retrieved_ids"].tolist()
+		assert isinstance(second["retrieved_ids"].tolist()[0], list)
+		assert second_time == pytest.approx(first_time, abs=0.05)
+
+		# the different parameters, inputs, and corpus are not hits
+		FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=3)
+		FakeRetrievalModule.run_evaluator(
+			project_dir, previous_result.assign(query=["q3", "q4"]), top_k=2
+		)
+		assert FakeRetrievalModule.run_count == 3
+		pd.DataFrame({"doc_id": ["b"], "contents": ["banana"]}).to_parquet(
+			os.path.join(project_dir, "data", "corpus.parquet"), index=False
+		)
+		FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=2)
+		assert FakeRetrievalModule.run_count == 4
+
+	entries = ResultCache(project_dir).entries()
+	assert len(entries) == 4
+	assert set(entries["module_name"]) == {"FakeRetrievalModule"}
+	assert entries["hits"].sum() == 1
+
+
+def test_result_cache_prune(project_dir):
+	with result_cache_scope(project_dir):
+		for top_k in range(1, 4):
+			FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=top_k)
+	cache = ResultCache(project_dir)
+	assert len(cache.entries()) == 3
+	assert cache.prune(max_age_days=1) == 0
+	assert cache.prune(max_size_mb=0) == 3
+	assert len(cache.entries()) == 0
+
+	with result_cache_scope(project_dir):
+		FakeRetrievalModule.run_evaluator(project_dir, previous_result, top_k=1)
+	assert cache.prune(module_name="OtherModule") == 0
+	assert cache.prune(module_name="FakeRetrievalModule") == 1
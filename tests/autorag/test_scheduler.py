@@ -0,0 +1,87 @@
+import time
+
+import pandas as pd
+import pytest
+
+from autorag.nodes.passagereranker import PassReranker
+from autorag.scheduler import NodeScheduler, get_workload_type
+
+previous_result = pd.DataFrame(
+	{
+		"qid": ["qid1", "qid2"],
+		"query": ["q1", "q2"],
+		"retrieval_gt": [[["id1"]], [["id5"]]],
+		"generation_gt": [["a"], ["e"]],
+		"retrieved_contents": [["a", "b", "c"], ["d", "e", "f"]],
+		"retrieved_ids": [["id1", "id2", "id3"], ["id4", "id5", "id6"]],
+		"retrieve_scores": [[0.3, 0.2, 0.1], [0.6, 0.5, 0.4]],
+	}
+)
+
+
+class SleepModule:
+	workload_type = "io"
+
+	@classmethod
+	def run_evaluator(cls, project_dir, previous_result, wait, **kwargs):
+		previous_result["touched"] = True
+		time.sleep(wait)
+		return pd.DataFrame({"wait": [wait] * len(previous_result)})
+
+
+class InvalidModule(SleepModule):
+	workload_type = "gpu"
+
+
+def test_node_scheduler_sequential():
+	scheduler = NodeScheduler.from_strategies({"metrics": ["retrieval_f1"]})
+	assert not scheduler.is_concurrent
+	results, wall_times, cpu_times = scheduler.run(
+		[SleepModule, SleepModule],
+		[{"wait": 0.2}, {"wait": 0.1}],
+		"project",
+		previous_result.copy(),
+	)
+	assert [result["wait"].tolist()[0] for result in results] == [0.2, 0.1]
+	assert wall_times[0] == pytest.approx(0.2, abs=0.1)
+	assert cpu_times[0] < wall_times[0]
+	assert scheduler.summary_columns(cpu_times, 2) == {}
+
+
+def test_node_scheduler_io_concurrency():
+	scheduler = NodeScheduler.from_strategies({"io_concurrency": 3})
+	start_time = time.time()
+	results, wall_times, cpu_times = scheduler.run(
+		[SleepModule] * 3,
+		[{"wait": 0.5}, {"wait": 0.3}, {"wait": 0.1}],
+		"project",
+		previous_result,
+	)
+	assert time.time() - start_time < 0.8
+	assert "touched" not in previous_result.columns
+	assert [result["wait"].tolist()[0] for result in results] == [0.5, 0.3, 0.1]
+	assert wall_times == pytest.approx([0.5, 0.3, 0.1], abs=0.1)
+	assert list(scheduler.summary_columns(cpu_times, 2).keys()) == ["cpu_time"]
+
+
+def test_node_scheduler_cpu_workers():
+	scheduler = NodeScheduler(cpu_workers=2)
+	results, wall_times, cpu_times = scheduler.run(
+		[PassReranker, SleepModule, PassReranker],
+		[{"top_k": 1}, {"wait": 0.1}, {"top_k": 2}],
+		"project",
+		previous_result,
+	)
+	assert results[0]["retrieved_ids"].tolist() == [["id1"], ["id4"]]
+	assert results[1]["wait"].tolist() == [0.1, 0.1]
+	assert results[2]["retrieved_ids"].tolist() == [["id1", "id2"], ["id4", "id5"]]
+	assert len(wall_times) == len(cpu_times) == 3
+
+
+def test_node_scheduler_invalid():
+	with pytest.raises(ValueError):
+		NodeScheduler(io_concurrency=0)
+	assert get_workload_type(PassReranker) == "cpu"
+	assert get_workload_type(SleepModule) == "io"
+	with pytest.raises(ValueError):
+		get_workload_type(InvalidModule)
@@ -5,6 +5,8 @@ import pytest
 
 from autorag.strategy import (
 	measure_speed,
+	measure_module_speed,
+	make_shared_execution_column,
 	filter_by_threshold,
 	select_best_average,
 	select_best_rr,
@@ -43,6 +45,69 @@ def test_measure_speed():
 	assert pytest.approx(2, 0.1) == five_seconds
 
 
+class PrefixStableModule:
+	prefix_stable = True
+	calls = []
+
+	@classmethod
+	def is_prefix_stable(cls, previous_result, project_dir=None, **kwargs):
+		return cls.prefix_stable
+
+	@classmethod
+	def run_evaluator(cls, project_dir, previous_result, top_k, **kwargs):
+		cls.calls.append(top_k)
+		ids = [[f"id{i}" for i in range(top_k)] for _ in range(len(previous_result))]
+		return pd.DataFrame(
+			{
+				"retrieved_contents": ids,
+				"retrieved_ids": ids,
+				"retrieve_scores": [list(range(top_k, 0, -1)) for _ in ids],
+			}
+		)
+
+
+class PrefixUnstableModule(PrefixStableModule):
+	prefix_stable = False
+	calls = []
+
+
+def test_measure_module_speed():
+	previous_result = pd.DataFrame({"query": ["a", "b"]})
+	modules = [PrefixStableModule] * 3 + [PrefixUnstableModule] * 2
+	module_params = [
+		{"top_k": 3, "k1": 1.2},
+		{"top_k": 5, "k1": 1.2},
+		{"top_k": 2, "k1": 1.5},
+		{"top_k": 3},
+		{"top_k": 5},
+	]
+	results, execution_times, cpu_times = measure_module_speed(
+		modules, module_params, "project", previous_result
+	)
+	assert sorted(PrefixStableModule.calls) == [2, 5]
+	assert PrefixUnstableModule.calls == [3, 5]
+	assert len(results) == len(execution_times) == len(cpu_times) == 5
+	for result, params in zip(results, module_params):
+		assert result["retrieved_ids"].tolist() == [
+			[f"id{i}" for i in range(params["top_k"])]
+		] * 2
+	assert [result["retrieve_scores"].tolist()[0] for result in results] == [
+		[5, 4, 3],
+		[5, 4, 3, 2, 1],
+		[2, 1],
+		[3, 2, 1],
+		[5, 4, 3, 2, 1],
+	]
+	assert execution_times[0] == execution_times[1]
+	assert cpu_times[0] == cpu_times[1]
+	# the truncated results are marked to share the execution time of the largest top_k
+	filenames = [f"{index}.parquet" for index in range(5)]
+	assert make_shared_execution_column(results, filenames) == {
+		"shared_execution_from": ["1.parquet", None, None, None, None]
+	}
+	assert make_shared_execution_column(results[3:], filenames[3:]) == {}
+
+
 def test_filter_by_threshold():
 	results = [1, 2, 3, 4]
 	values = [1, 2, 3, 4]
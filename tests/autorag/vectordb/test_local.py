@@ -0,0 +1,311 @@
+import asyncio
+import os
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from autorag.vectordb import load_vectordb
+from autorag.vectordb.local import Local
+
+
+@pytest.fixture
+def local_vectordb():
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		yield Local(
+			embedding_model="mock",
+			collection_name="test_collection",
+			path=temp_dir,
+		)
+
+
+def brute_force_search(embeddings, query_embeddings, top_k):
+	embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+	query_embeddings = query_embeddings / np.linalg.norm(
+		query_embeddings, axis=1, keepdims=True
+	)
+	scores = query_embeddings @ embeddings.T
+	return np.argsort(-scores, axis=1)[:, :top_k], np.sort(scores, axis=1)[:, ::-1][
+		:, :top_k
+	]
+
+
+@pytest.mark.asyncio
+async def test_add_and_query_documents(local_vectordb):
+	# Add documents
+	ids = ["doc1", "doc2"]
+	texts = ["This is a test document.", "This is another test document."]
+	await local_vectordb.add(ids, texts)
+
+	# Query documents
+	queries = ["test document"]
+	contents, scores = await local_vectordb.query(queries, top_k=2)
+
+	assert len(contents) == 1
+	assert len(scores) == 1
+	assert len(contents[0]) == 2
+	assert len(scores[0]) == 2
+	assert scores[0][0] > scores[0][1]
+
+	embeddings = await local_vectordb.fetch([ids[0]])
+	assert len(embeddings) == 1
+	assert len(embeddings[0]) == 768
+
+	exist = await local_vectordb.is_exist([ids[0], "doc3"])
+	assert exist == [True, False]
+
+	with pytest.raises(ValueError, match="doc3"):
+		await local_vectordb.fetch([ids[0], "doc3"])
+
+
+@pytest.mark.asyncio
+async def test_delete_documents(local_vectordb):
+	# Add documents
+	ids = ["doc1", "doc2", "doc3"]
+	texts = [
+		"This is a test document.",
+		"This is another test document.",
+		"This is the third test document.",
+	]
+	await local_vectordb.add(ids, texts)
+
+	# Delete documents
+	await local_vectordb.delete([ids[0]])
+
+	# Query documents to ensure they are deleted
+	queries = ["test document"]
+	contents, scores = await local_vectordb.query(queries, top_k=3)
+
+	assert len(contents[0]) == 2
+	assert len(scores[0]) == 2
+	assert "doc1" not in contents[0]
+
+	# more than half of the rows are deleted, so the files are compacted
+	await local_vectordb.delete([ids[1]])
+	assert local_vectordb.meta["count"] == 1
+	assert await local_vectordb.is_exist(ids) == [False, False, True]
+
+
+def test_local_flat_search():
+	rng = np.random.default_rng(42)
+	embeddings = rng.normal(size=(300, 16))
+	query_embeddings = rng.normal(size=(5, 16))
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		local_vectordb = Local(
+			embedding_model="mock",
+			collection_name="flat",
+			path=temp_dir,
+			search_batch=64,
+			query_batch=2,
+		)
+		ids = [f"id-{i}" for i in range(len(embeddings))]
+		local_vectordb.add_embeddings(ids[:100], embeddings[:100])
+		local_vectordb.add_embeddings(ids[100:], embeddings[100:])
+
+		expected_rows, expected_scores = brute_force_search(
+			embeddings, query_embeddings, 10
+		)
+		result_ids, result_scores = local_vectordb.search(query_embeddings, 10)
+		for expected_row_list, result_id_list in zip(expected_rows, result_ids):
+			assert result_id_list == [ids[row] for row in expected_row_list]
+		assert np.allclose(result_scores, expected_scores, atol=1e-5)
+
+		# reload from the disk
+		reloaded = Local(embedding_model="mock", collection_name="flat", path=temp_dir)
+		assert isinstance(reloaded.embeddings, np.memmap)
+		assert reloaded.search(query_embeddings, 10)[0] == result_ids
+
+
+def test_local_ivf_search():
+	rng = np.random.default_rng(42)
+	centers = rng.normal(size=(8, 16)) * 10
+	embeddings = np.concatenate(
+		[center + rng.normal(size=(300, 16)) for center in centers]
+	)
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		local_vectordb = Local(
+			embedding_model="mock",
+			collection_name="ivf",
+			path=temp_dir,
+			index_type="ivf",
+			nlist=8,
+			nprobe=2,
+		)
+		ids = [f"id-{i}" for i in range(len(embeddings))]
+		local_vectordb.add_embeddings(ids, embeddings)
+		assert local_vectordb.centroids.shape == (8, 16)
+		assert os.path.exists(os.path.join(temp_dir, "ivf", "assignments.npy"))
+
+		query_embeddings = embeddings[::300] + rng.normal(size=(8, 16)) * 0.1
+		expected_rows, _ = brute_force_search(embeddings, query_embeddings, 5)
+		result_ids, _ = local_vectordb.search(query_embeddings, 5)
+		hits = sum(
+			len(set(result_id_list) & {ids[row] for row in expected_row_list})
+			for expected_row_list, result_id_list in zip(expected_rows, result_ids)
+		)
+		assert hits / expected_rows.size >= 0.9
+
+
+@pytest.mark.parametrize("index_type, quantization", [("flat", None), ("ivf", "int8")])
+def test_local_compact_interrupted(index_type, quantization):
+	rng = np.random.default_rng(42)
+	embeddings = rng.normal(size=(200, 16))
+	ids = [f"id-{i}" for i in range(len(embeddings))]
+	live_ids = ids[::3]
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		local_vectordb = Local(
+			embedding_model="mock",
+			collection_name="compact",
+			path=temp_dir,
+			index_type=index_type,
+			nlist=4,
+			quantization=quantization,
+		)
+		local_vectordb.add_embeddings(ids, embeddings)
+		local_vectordb._delete_rows(
+			[local_vectordb.id_to_row[_id] for _id in ids if _id not in live_ids]
+		)
+		expected_ids, _ = local_vectordb.search(embeddings[:5], 3)
+
+		# the process stops after swapping two files
+		original_replace = os.replace
+		swapped = []
+
+		def replace(src, dst):
+			if src.endswith(".compact"):
+				if len(swapped) == 2:
+					raise KeyboardInterrupt
+				swapped.append(dst)
+			original_replace(src, dst)
+
+		with patch("autorag.vectordb.local.os.replace", side_effect=replace):
+			with pytest.raises(KeyboardInterrupt):
+				local_vectordb.compact()
+
+		reopened_vectordb = Local(
+			embedding_model="mock",
+			collection_name="compact",
+			path=temp_dir,
+			index_type=index_type,
+			nlist=4,
+			quantization=quantization,
+		)
+		assert reopened_vectordb.meta["count"] == len(live_ids)
+		assert asyncio.run(reopened_vectordb.is_exist(ids)) == [
+			_id in live_ids for _id in ids
+		]
+		assert reopened_vectordb.search(embeddings[:5], 3)[0] == expected_ids
+		assert not os.path.exists(os.path.join(temp_dir, "compact", "compact.json"))
+
+
+def test_local_float16():
+	rng = np.random.default_rng(42)
+	embeddings = rng.normal(size=(50, 16))
+	query_embeddings = rng.normal(size=(3, 16))
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		local_vectordb = Local(
+			embedding_model="mock",
+			collection_name="float16",
+			path=temp_dir,
+			dtype="float16",
+		)
+		local_vectordb.add_embeddings([str(i) for i in range(50)], embeddings)
+		assert local_vectordb.embeddings.dtype == np.float16
+		_, expected_scores = brute_force_search(embeddings, query_embeddings, 5)
+		_, result_scores = local_vectordb.search(query_embeddings, 5)
+		assert np.allclose(result_scores, expected_scores, atol=1e-2)
+
+		# the stored dtype is kept, and the conflict is warned
+		with patch("autorag.vectordb.local.logger") as logger:
+			reopened_vectordb = Local(
+				embedding_model="mock",
+				collection_name="float16",
+				path=temp_dir,
+			)
+		assert reopened_vectordb.embeddings.dtype == np.float16
+		assert "float16" in logger.warning.call_args[0][0]
+
+
+@pytest.mark.parametrize(
+	"quantization, code_dtype, code_dimension, rescore_factor, index_type",
+	[
+		("int8", np.int8, 64, 4, "flat"),
+		("binary", np.uint8, 8, 10, "flat"),
+		("int8", np.int8, 64, 4, "ivf"),
+		("binary", np.uint8, 8, 10, "ivf"),
+	],
+)
+def test_local_quantization(
+	quantization, code_dtype, code_dimension, rescore_factor, index_type
+):
+	rng = np.random.default_rng(42)
+	centers = rng.normal(size=(20, 64))
+	embeddings = np.concatenate(
+		[center + rng.normal(size=(100, 64)) * 0.7 for center in centers]
+	)
+	query_embeddings = embeddings[::100] + rng.normal(size=(20, 64)) * 0.3
+	ids = [f"id-{i}" for i in range(len(embeddings))]
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		params = {
+			"embedding_model": "mock",
+			"path": temp_dir,
+			"index_type": index_type,
+			"nprobe": 4,
+		}
+		exact_vectordb = Local(collection_name="exact", **params)
+		exact_vectordb.add_embeddings(ids, embeddings)
+		expected_ids, _ = exact_vectordb.search(query_embeddings, 10)
+
+		local_vectordb = Local(
+			collection_name="quantization",
+			quantization=quantization,
+			rescore_factor=rescore_factor,
+			search_batch=256,
+			**params,
+		)
+		local_vectordb.add_embeddings(ids[:10], embeddings[:10])
+		local_vectordb.add_embeddings(ids[10:], embeddings[10:])
+		assert local_vectordb.codes.dtype == code_dtype
+		assert local_vectordb.codes.shape[1] == code_dimension
+		assert local_vectordb.meta["calibrated_count"] == len(embeddings)
+		assert os.path.exists(os.path.join(temp_dir, "quantization", "calibration.npy"))
+
+		result_ids, result_scores = local_vectordb.search(query_embeddings, 10)
+		hits = sum(
+			len(set(result_id_list) & set(expected_id_list))
+			for expected_id_list, result_id_list in zip(expected_ids, result_ids)
+		)
+		assert hits / (len(query_embeddings) * 10) >= 0.95
+		# the candidates are rescored with the full-precision embeddings
+		for result_id_list, score_list, query_embedding in zip(
+			result_ids, result_scores, query_embeddings
+		):
+			vectors = embeddings[[ids.index(_id) for _id in result_id_list]]
+			expected_scores = (
+				vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+			) @ (query_embedding / np.linalg.norm(query_embedding))
+			assert np.allclose(score_list, expected_scores, atol=1e-5)
+
+		reloaded = Local(
+			collection_name="quantization",
+			quantization=quantization,
+			rescore_factor=rescore_factor,
+			**params,
+		)
+		assert np.array_equal(reloaded.calibration, local_vectordb.calibration)
+		assert reloaded.search(query_embeddings, 10)[0] == result_ids
+
+		# turning off the quantization removes the codes
+		reloaded = Local(collection_name="quantization", **params)
+		assert reloaded.codes is None
+		assert not os.path.exists(os.path.join(temp_dir, "quantization", "codes.npy"))
+
+
+def test_load_local_vectordb():
+	with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+		db = load_vectordb(
+			"local", embedding_model="mock", collection_name="jax1", path=temp_dir
+		)
+		assert isinstance(db, Local)
+		assert os.path.isdir(os.path.join(temp_dir, "jax1"))